@@ -1,20 +1,21 @@
 from flask import make_response, session
 
-from utils.captcha import captcha_generator
+from utils.captcha import get_captcha_pool
+from utils.decorators import rate_limit
 
 from . import auth_bp, logger
 
 
 @auth_bp.route('/captcha', methods=['GET'])
+@rate_limit(max_requests=30, per_seconds=60)
 def generate_captcha():
     """生成验证码"""
     try:
-        # 生成验证码
-        text, image_data = captcha_generator.generate()
+        # 从预生成池中取一张验证码（池空时当场生成）
+        text, image_data = get_captcha_pool().get()
         
         # 将验证码文本存储到session中
         session['captcha'] = text.upper()
-        logger.info(f"生成验证码: {text}, 存储到session: {session['captcha']}")
         
         # 创建响应
         response = make_response(image_data)
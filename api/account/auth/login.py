@@ -3,13 +3,16 @@ from flask import request, jsonify, session
 import secrets
 
 from models import UserStatus
-from utils.decorators import validate_json, log_action, handle_db_errors
+from utils.decorators import validate_json, log_action, handle_db_errors, rate_limit
 from user_manager import user_manager
+from utils.password_hashing import PasswordHashingBusy
+from utils.server_session import server_sessions_enabled, revoke_user_sessions
 
 from . import auth_bp, db_manager, logger
 
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit(max_requests=20, per_seconds=300)
 @validate_json(['username', 'password'])
 @log_action('用户登录')
 @handle_db_errors
@@ -19,7 +22,14 @@ def login():
     username = data['username'].strip()
     password = data['password']
 
-    user, auth_message = user_manager.authenticate_user(username, password)
+    try:
+        user, auth_message = user_manager.authenticate_user(username, password)
+    except PasswordHashingBusy as e:
+        # 密码校验排队已满：快速失败，让客户端稍后重试，而不是占着 worker 等待
+        response = jsonify({'success': False, 'message': str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
 
     if not user:
         message = auth_message or '用户名或密码错误'
@@ -55,11 +65,15 @@ def login():
     session_token = secrets.token_hex(32)
     try:
         db_manager.update_user_session_token(user.user_id, session_token)
-        db_manager.invalidate_session_token_cache(user.user_id)
     except Exception as e:
         logger.error(f"更新用户session_token失败: {e}")
         return jsonify({'success': False, 'message': '登录失败，请稍后重试'}), 500
 
+    # 服务端会话：直接删除该用户的其他会话（单点登录），并更换会话 ID 防止会话固定
+    if server_sessions_enabled():
+        revoke_user_sessions(user.user_id)
+        session.regenerate()
+
     # 设置会话
     session['logged_in'] = True
     session['user_id'] = user.user_id
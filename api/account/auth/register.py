@@ -1,7 +1,7 @@
 from flask import request, jsonify, session
 
 from models import User, UserRole
-from utils.decorators import validate_json, log_action, handle_db_errors
+from utils.decorators import validate_json, log_action, handle_db_errors, rate_limit
 from utils.helpers import validate_phone
 from utils.sms_service import sms_provider
 
@@ -9,6 +9,7 @@ from . import auth_bp, db_manager, logger
 
 
 @auth_bp.route('/register', methods=['POST'])
+@rate_limit(max_requests=10, per_seconds=3600)
 @validate_json(['username', 'password', 'confirmPassword', 'nickname', 'phone', 'captcha', 'sms_code'])
 @log_action('用户注册')
 @handle_db_errors
@@ -2,14 +2,22 @@ import os
 
 from flask import request, jsonify
 
-from utils.decorators import validate_json, log_action, handle_db_errors
+from utils.decorators import validate_json, log_action, handle_db_errors, rate_limit
 from utils.helpers import validate_phone
 from utils.sms_service import sms_provider
 
 from . import auth_bp, db_manager, logger
 
 
+def _phone_key():
+    """按手机号限流，防止换 IP 对单个号码轰炸"""
+    data = request.get_json(silent=True) or {}
+    return f"phone:{str(data.get('phone') or '').strip()}"
+
+
 @auth_bp.route('/send-verification-code', methods=['POST'])
+@rate_limit(max_requests=10, per_seconds=600)
+@rate_limit(max_requests=5, per_seconds=3600, key=_phone_key, scope='auth.sms_phone')
 @validate_json(['phone'])
 @log_action('发送验证码')
 @handle_db_errors
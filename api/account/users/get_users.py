@@ -1,10 +1,11 @@
-from flask import jsonify, session
+from flask import jsonify, session, request
 import time
 import logging
 
 from models import UserRole
 from user_manager import user_manager
 from utils.decorators import log_action, handle_db_errors, cache_result
+from utils.pagination import encode_cursor, decode_cursor, parse_total_mode, InvalidCursorError
 
 from . import users_bp
 
@@ -24,35 +25,43 @@ def api_get_users():
     if user_role not in ['super_admin', 'admin']:
         return jsonify({'success': False, 'message': '权限不足，只有管理员可以查看用户列表'})
 
-    t_start = time.perf_counter()
-    users = user_manager.get_all_users()
-    t_after_db = time.perf_counter()
-
-    users_data = []
-    current_user_role = session.get('user_role')
-    current_username = session.get('username')
-
-    for user in users:
-        user_dict = user.to_dict() if hasattr(user, 'to_dict') else {
-            'user_id': user.user_id,
-            'username': user.username,
-            'role': user.role.value,
-        }
+    # 传入 cursor / limit / pagination=cursor 时按 (created_at, user_id) 游标分页，否则保持返回全量列表
+    cursor_token = request.args.get('cursor', '').strip()
+    paginate = (
+        bool(cursor_token)
+        or 'limit' in request.args
+        or request.args.get('pagination', '').strip().lower() == 'cursor'
+    )
 
-        if current_user_role == 'super_admin':
-            user_dict['password'] = user.password
-        elif current_user_role == 'admin':
-            if user.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN] and user.username != current_username:
-                user_dict['password'] = '*'
-            else:
-                user_dict['password'] = user.password
-        else:
-            user_dict['password'] = '*'
+    t_start = time.perf_counter()
+    total = None
+    next_cursor = None
+    if paginate:
+        try:
+            limit = max(min(int(request.args.get('limit', 50) or 50), 200), 1)
+        except ValueError:
+            return jsonify({'success': False, 'message': '分页参数必须是数字'}), 400
+        after = None
+        if cursor_token:
+            try:
+                after = decode_cursor(cursor_token, 'created_at', 'DESC')
+            except InvalidCursorError as e:
+                return jsonify({'success': False, 'message': str(e)}), 400
+        role_filter = request.args.get('role', '').strip() or None
+        total_mode = parse_total_mode(request.args.get('include_total'), default='none')
 
-        user_dict['full_name'] = user.real_name
-        user_dict['team_name'] = getattr(user, 'team_name', None) or user.real_name
+        total, users = user_manager.get_users_page(
+            role=role_filter, limit=limit + 1, after=after, total_mode=total_mode
+        )
+        if len(users) > limit:
+            users = users[:limit]
+            last = users[-1]
+            next_cursor = encode_cursor('created_at', 'DESC', (last.created_at, last.user_id))
+    else:
+        users = user_manager.get_all_users()
+    t_after_db = time.perf_counter()
 
-        users_data.append(user_dict)
+    users_data = [_serialize_user(user) for user in users]
 
     t_after_python = time.perf_counter()
     logger.info(
@@ -62,8 +71,42 @@ def api_get_users():
         (t_after_python - t_start) * 1000,
     )
 
-    return jsonify({
+    response = {
         'success': True,
         'data': users_data,
         'users': users_data,
-    })
+    }
+    if paginate:
+        response['pagination'] = {
+            'limit': limit,
+            'total': total,
+            'total_is_estimate': total_mode == 'approx',
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor,
+        }
+    return jsonify(response)
+
+
+def _serialize_user(user):
+    current_user_role = session.get('user_role')
+    current_username = session.get('username')
+
+    user_dict = user.to_dict() if hasattr(user, 'to_dict') else {
+        'user_id': user.user_id,
+        'username': user.username,
+        'role': user.role.value,
+    }
+
+    if current_user_role == 'super_admin':
+        user_dict['password'] = user.password
+    elif current_user_role == 'admin':
+        if user.role in [UserRole.SUPER_ADMIN, UserRole.ADMIN] and user.username != current_username:
+            user_dict['password'] = '*'
+        else:
+            user_dict['password'] = user.password
+    else:
+        user_dict['password'] = '*'
+
+    user_dict['full_name'] = user.real_name
+    user_dict['team_name'] = getattr(user, 'team_name', None) or user.real_name
+    return user_dict
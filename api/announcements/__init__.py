@@ -8,6 +8,7 @@ from . import (
     create_announcement,
     delete_announcement,
     download_announcement_file,
+    attachment_migration,
 )
 
 __all__ = ['announcements_bp']
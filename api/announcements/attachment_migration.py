@@ -0,0 +1,66 @@
+import logging
+
+from database import DatabaseManager
+from utils.attachment_store import get_attachment_store
+from utils.jobs import job_handler
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATE_JOB = 'announcements.migrate_attachments'
+
+
+def move_blob_to_store(conn, announcement_id):
+    """把一条公告的 file_content BLOB 写入附件存储并清空该列，返回 sha256（无内容时返回 None）"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT file_content FROM announcements WHERE id = %s AND file_sha256 IS NULL FOR UPDATE",
+            (announcement_id,),
+        )
+        row = cursor.fetchone()
+        if not row or not row[0]:
+            conn.rollback()
+            return None
+        # 先落盘再更新数据库：中途失败时文件只是多存了一份，不会出现记录指向不存在的文件
+        sha256, size = get_attachment_store().save_bytes(bytes(row[0]))
+        cursor.execute(
+            """
+            UPDATE announcements
+            SET file_sha256 = %s, file_size = %s, file_content = NULL
+            WHERE id = %s
+            """,
+            (sha256, size, announcement_id),
+        )
+        conn.commit()
+        return sha256
+    finally:
+        cursor.close()
+
+
+@job_handler(MIGRATE_JOB)
+def run_announcement_attachment_migration(ctx, payload):
+    """后台任务：把历史公告附件从 file_content BLOB 逐条迁出到附件存储"""
+    db_manager = DatabaseManager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SHOW COLUMNS FROM announcements LIKE 'file_content'")
+        if not cursor.fetchone():
+            cursor.close()
+            return {'migrated': 0}
+        # 只取 id，BLOB 按条读取，避免一次把所有附件加载到内存
+        cursor.execute(
+            "SELECT id FROM announcements WHERE file_content IS NOT NULL AND file_sha256 IS NULL ORDER BY id"
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+
+        migrated = 0
+        total = len(ids)
+        for index, announcement_id in enumerate(ids, 1):
+            if move_blob_to_store(conn, announcement_id):
+                migrated += 1
+            ctx.report_progress(index * 100 // total, f'已迁移 {index}/{total} 个公告附件')
+
+    logger.info(f"公告附件迁移完成，共迁移 {migrated} 个")
+    return {'migrated': migrated}
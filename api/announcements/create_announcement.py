@@ -4,6 +4,7 @@ from flask import request, jsonify, session
 from werkzeug.utils import secure_filename
 
 from database import DatabaseManager
+from utils.attachment_store import get_attachment_store
 from utils.decorators import log_action, handle_db_errors
 
 from . import announcements_bp
@@ -31,8 +32,7 @@ def create_announcement():
     file_name = None
     file_size = 0
     file_type = None
-    # 使用十六进制字符串 + UNHEX 写入，避免字符集导致的 Invalid utf8mb4 错误
-    file_content_hex = None  # 数据库存储仍为 BLOB，只是传参时用 hex 字符串
+    file_sha256 = None  # 附件内容存放在附件存储目录，数据库只记录哈希
 
     if 'file' in request.files:
         file = request.files['file']
@@ -41,17 +41,14 @@ def create_announcement():
             filename = secure_filename(file.filename)
             file_ext = os.path.splitext(filename)[1]
 
-            # 读取整个文件内容到内存，转为十六进制字符串，通过 UNHEX 写入 BLOB 字段
-            file_bytes = file.read()
-            if file_bytes:
-                file_content_hex = file_bytes.hex()
+            # 按块写入附件存储并同时计算 SHA-256，不把整个文件读入内存
+            sha256, size = get_attachment_store().save_stream(file.stream)
+            if size:
+                file_sha256 = sha256
                 file_name = filename
-                file_size = len(file_bytes)
+                file_size = size
                 file_type = file_ext
 
-            # 如果你希望在过渡期同时保留磁盘文件，可以在此处继续调用 file.save()
-            # 当前实现不再写入 uploads/announcements 目录
-
     db = DatabaseManager()
     with db.get_connection() as conn:
         cursor = conn.cursor()
@@ -65,10 +62,10 @@ def create_announcement():
                 file_name,
                 file_size,
                 file_type,
-                file_content,
+                file_sha256,
                 created_by
             )
-            VALUES (%s, %s, %s, %s, %s, %s, UNHEX(%s), %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             """,
             (
                 title,
@@ -77,7 +74,7 @@ def create_announcement():
                 file_name,
                 file_size,
                 file_type,
-                file_content_hex,
+                file_sha256,
                 session.get('user_id'),
             ),
         )
@@ -91,7 +88,7 @@ def create_announcement():
         'file_name': file_name,
         'file_size': file_size,
         'file_type': file_type,
-        'has_file': bool(file_content_hex),
+        'has_file': bool(file_sha256),
     }
 
     return jsonify({
@@ -1,12 +1,21 @@
+import logging
 import os
-from io import BytesIO
 
 from flask import jsonify, session, send_file
+from mysql.connector import Error
 
 from database import DatabaseManager
+from utils.attachment_store import get_attachment_store, guess_mimetype, send_attachment
+from utils.counters import register_counter, increment
 from utils.decorators import log_action, handle_db_errors
 
 from . import announcements_bp
+from .attachment_migration import move_blob_to_store
+
+
+logger = logging.getLogger(__name__)
+
+ANNOUNCEMENT_VIEWS = register_counter('announcements.view_count', 'announcements', 'view_count')
 
 
 @announcements_bp.route('/announcements/<int:announcement_id>/download')
@@ -21,9 +30,10 @@ def download_announcement_file(announcement_id):
     with db.get_connection() as conn:
         cursor = conn.cursor(dictionary=True)
 
+        # 不再读取 BLOB 列，附件内容从附件存储按块发送
         cursor.execute(
             """
-            SELECT file_path, file_name, file_type, file_content, view_count
+            SELECT file_path, file_name, file_type, file_sha256
             FROM announcements 
             WHERE id = %s AND is_active = TRUE
             """,
@@ -35,50 +45,31 @@ def download_announcement_file(announcement_id):
         if not announcement:
             return jsonify({'success': False, 'message': '公告不存在'}), 404
 
-        # 如果存在 BLOB 内容，则优先从数据库返回
-        file_content = announcement.get('file_content')
+        file_sha256 = announcement.get('file_sha256')
         file_name = announcement.get('file_name') or 'attachment'
         file_type = announcement.get('file_type') or ''
 
-        # 更新浏览次数
-        cursor.execute(
-            """
-            UPDATE announcements 
-            SET view_count = view_count + 1 
-            WHERE id = %s
-            """,
-            (announcement_id,),
-        )
-        conn.commit()
-
-        if file_content:
-            # 根据扩展名简单推断 MIME 类型
-            ext = (file_type or '').lower()
-            mimetype = 'application/octet-stream'
-            if ext in ['.pdf']:
-                mimetype = 'application/pdf'
-            elif ext in ['.jpg', '.jpeg']:
-                mimetype = 'image/jpeg'
-            elif ext in ['.png']:
-                mimetype = 'image/png'
-            elif ext in ['.doc', '.docx']:
-                mimetype = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif ext in ['.xls', '.xlsx']:
-                mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-
-            return send_file(
-                BytesIO(file_content),
-                mimetype=mimetype,
-                as_attachment=True,
-                download_name=file_name,
-            )
-
-        # 否则回退到旧的文件路径逻辑（兼容历史数据）
-        if not announcement['file_path'] or not os.path.exists(announcement['file_path']):
-            return jsonify({'success': False, 'message': '文件不存在'}), 404
-
-        return send_file(
-            announcement['file_path'],
-            as_attachment=True,
-            download_name=announcement['file_name'],
-        )
+        # 浏览次数由计数聚合器批量写回，不在请求内争抢行锁
+        increment(ANNOUNCEMENT_VIEWS, announcement_id)
+
+        if not file_sha256 and not announcement.get('file_path'):
+            # 尚未被后台任务迁出的旧附件：读取时顺带迁移到附件存储
+            try:
+                file_sha256 = move_blob_to_store(conn, announcement_id)
+            except Error as e:
+                logger.warning(f"公告 {announcement_id} 的附件迁移失败: {e}")
+                conn.rollback()
+
+    store = get_attachment_store()
+    if file_sha256 and store.exists(file_sha256):
+        return send_attachment(file_sha256, file_name, guess_mimetype(file_name, file_type))
+
+    # 否则回退到旧的文件路径逻辑（兼容历史数据）
+    if not announcement['file_path'] or not os.path.exists(announcement['file_path']):
+        return jsonify({'success': False, 'message': '文件不存在'}), 404
+
+    return send_file(
+        announcement['file_path'],
+        as_attachment=True,
+        download_name=announcement['file_name'],
+    )
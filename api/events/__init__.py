@@ -9,6 +9,9 @@ events_bp = Blueprint('events', __name__)
 db_manager = DatabaseManager()
 logger = logging.getLogger(__name__)
 
+# 赛事列表/概览等读接口的缓存标签，赛事写操作后按此标签失效
+EVENTS_CACHE_TAG = 'events'
+
 # 每个具体路由实现在本包下的独立模块中
 from . import (
     get_events,
@@ -24,6 +27,7 @@ from . import (
     search_events,
     get_events_summary,
     get_structured_events,
+    send_final_confirmations,
 )
 
 __all__ = ['events_bp']
@@ -2,9 +2,10 @@ from flask import request, jsonify, session
 
 from models import Event, EventStatus
 from utils.decorators import login_required, role_required, validate_json, log_action, handle_db_errors
+from utils.cache import invalidate_cache_tags
 from utils.helpers import parse_datetime
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/', methods=['POST'])
@@ -82,6 +83,7 @@ def create_event():
         
         # 保存到数据库
         created_event = db_manager.create_event(event)
+        invalidate_cache_tags(EVENTS_CACHE_TAG)
         
         logger.info(f"用户 {user_id} 创建赛事: {event.name}")
         
@@ -2,8 +2,9 @@ from flask import jsonify, session
 
 from models import EventStatus
 from utils.decorators import login_required, role_required, log_action, handle_db_errors
+from utils.cache import invalidate_cache_tags
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/<int:event_id>', methods=['DELETE'])
@@ -43,6 +44,7 @@ def delete_event(event_id):
         success = db_manager.delete_event(event_id)
         
         if success:
+            invalidate_cache_tags(EVENTS_CACHE_TAG)
             logger.info(f"用户 {user_id} 删除了赛事 {event_id}: {event.name}")
             return jsonify({
                 'success': True,
@@ -1,7 +1,6 @@
-from flask import jsonify, current_app
+from flask import jsonify, current_app, request
 
 from utils.decorators import login_required, log_action, handle_db_errors
-from utils.helpers import calculate_average_score
 
 from . import events_bp, db_manager, logger
 
@@ -20,19 +19,26 @@ def get_event_results(event_id):
             'message': '赛事不存在'
         }), 404
     
-    # 获取原始成绩数据
-    results = db_manager.get_event_results(event_id, include_scores=False)
-    
     # 获取评分配置
     scoring_config = current_app.config.get('SCORING_CONFIG', {})
     min_judges = scoring_config.get('min_judges', 3)
     drop_highest = scoring_config.get('drop_highest', True)
     drop_lowest = scoring_config.get('drop_lowest', True)
+
+    # 轮次：默认 0 表示全部轮次汇总
+    round_number = request.args.get('round', 0, type=int)
+
+    # 参赛者列表 + 排行榜物化表（按索引范围扫描，已包含去极值平均分与排名）
+    participants = db_manager.get_participants_by_event(event_id)
+    leaderboard = {
+        row['participant_id']: row
+        for row in db_manager.get_event_leaderboard(event_id, round_number=round_number)
+    }
     
     processed_results = []
-    for result in results:
-        score_count = result['score_count']
-        scores_list = result['scores_list']
+    for participant in participants:
+        board_row = leaderboard.get(participant.participant_id)
+        score_count = board_row['judge_count'] if board_row else 0
         
         # 数据验证
         validation = {
@@ -55,26 +61,20 @@ def get_event_results(event_id):
             validation['is_valid'] = True
             validation['status'] = 'valid'
         
-        # 计算平均分（使用统一的去最高最低分算法）
-        if scores_list:
-            average_score = calculate_average_score(
-                scores_list,
-                drop_highest=drop_highest,
-                drop_lowest=drop_lowest
-            )
-        else:
-            average_score = None
+        # 平均分与排名由评分提交时增量维护（去最高最低分，无评分时为 None）
+        average_score = board_row['average_score'] if board_row else None
         
         # 构建处理后的结果
         processed_result = {
-            'participant_id': result['participant_id'],
-            'registration_number': result['registration_number'],
-            'real_name': result['real_name'],
-            'category': result['category'],
-            'weight_class': result['weight_class'],
-            'status': result['status'],
+            'participant_id': participant.participant_id,
+            'registration_number': participant.registration_number,
+            'real_name': getattr(participant, 'real_name', None),
+            'category': participant.category,
+            'weight_class': participant.weight_class,
+            'status': participant.status,
             'score_count': score_count,
             'average_score': average_score,
+            'rank': board_row['rank_in_round'] if board_row else None,
             'validation': validation
         }
         
@@ -97,5 +97,6 @@ def get_event_results(event_id):
             'drop_highest': drop_highest,
             'drop_lowest': drop_lowest,
         },
+        'round_number': round_number,
         'data': processed_results,
     })
@@ -4,14 +4,16 @@ import time
 from flask import request, jsonify, session
 
 from utils.decorators import log_action, handle_db_errors, cache_result
+from utils.pagination import encode_cursor, decode_cursor, parse_total_mode, InvalidCursorError
+from db_modules.db_events import EVENT_KEYSET_ORDER_FIELDS
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/', methods=['GET'])
 @log_action('获取赛事列表')
 @handle_db_errors
-@cache_result(timeout=15)
+@cache_result(timeout=15, tags=EVENTS_CACHE_TAG)
 def get_events():
     """获取赛事列表（支持高级筛选与分页）
     可选查询参数：
@@ -25,6 +27,8 @@ def get_events():
     - max_participants: 最大参赛人数
     - page: 第几页，默认1
     - page_size: 每页数量，默认10
+    - cursor: 游标分页，传入上一页返回的 next_cursor（首页传 pagination=cursor），传入后忽略 page
+    - include_total: 是否返回总数 true/approx/false，页码分页默认 true，游标分页默认 false
     - order_by: 排序字段，默认start_date
     - order_dir: 排序方向，ASC/DESC，默认DESC
     - include_stats: 是否包含统计信息，默认false
@@ -154,6 +158,26 @@ def get_events():
                 'message': '排序方向必须是 ASC 或 DESC'
             }), 400
 
+        # 游标分页：按 (排序列, event_id) 定位下一页，深翻页不再随页码变慢
+        cursor_token = request.args.get('cursor', '').strip()
+        use_cursor = bool(cursor_token) or request.args.get('pagination', '').strip().lower() == 'cursor'
+        after = None
+        if use_cursor:
+            if order_by not in EVENT_KEYSET_ORDER_FIELDS:
+                return jsonify({
+                    'success': False,
+                    'message': f'游标分页不支持按 {order_by} 排序，可用字段: {", ".join(EVENT_KEYSET_ORDER_FIELDS)}'
+                }), 400
+            if cursor_token:
+                try:
+                    after = decode_cursor(cursor_token, order_by, order_dir)
+                except InvalidCursorError as e:
+                    return jsonify({'success': False, 'message': str(e)}), 400
+        total_mode = parse_total_mode(
+            request.args.get('include_total'),
+            default='none' if use_cursor else 'exact',
+        )
+
         # 是否包含统计信息
         include_stats = request.args.get('include_stats', 'false').lower() == 'true'
 
@@ -171,10 +195,20 @@ def get_events():
             max_participants=max_participants_int,
             order_by=order_by,
             order_dir=order_dir,
-            limit=page_size,
-            offset=offset
+            limit=page_size + 1,
+            offset=offset,
+            after=after,
+            total_mode=total_mode,
         )
 
+        # 多取一行用于判断是否还有下一页
+        has_more = len(events) > page_size
+        events = events[:page_size]
+        next_cursor = None
+        if has_more and events and order_by in EVENT_KEYSET_ORDER_FIELDS:
+            last = events[-1]
+            next_cursor = encode_cursor(order_by, order_dir, (getattr(last, order_by), last.event_id))
+
         t_after_count = time.perf_counter()
         t_after_list = t_after_count
         t_after_participants = t_after_count
@@ -218,9 +252,9 @@ def get_events():
             events_data.append(event_dict)
 
         # 计算分页信息
-        total_pages = (total + page_size - 1) // page_size
-        has_next = page < total_pages
-        has_prev = page > 1
+        total_pages = (total + page_size - 1) // page_size if total is not None else None
+        has_next = has_more
+        has_prev = bool(after) if use_cursor else page > 1
 
         t_after_python = time.perf_counter()
         logger.info(
@@ -243,7 +277,9 @@ def get_events():
                 'total': total,
                 'total_pages': total_pages,
                 'has_next': has_next,
-                'has_prev': has_prev
+                'has_prev': has_prev,
+                'total_is_estimate': total_mode == 'approx',
+                'next_cursor': next_cursor,
             },
             'filters': {
                 'status': status,
@@ -1,14 +1,15 @@
 from flask import jsonify
 
-from utils.decorators import login_required, log_action, handle_db_errors
+from utils.decorators import login_required, log_action, handle_db_errors, cache_result
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/summary', methods=['GET'])
 @login_required
 @log_action('获取赛事概览')
 @handle_db_errors
+@cache_result(timeout=15, tags=EVENTS_CACHE_TAG)
 def get_events_summary():
     """获取赛事概览统计API"""
     # 统计各状态的赛事数量（单次聚合查询）
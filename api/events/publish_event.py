@@ -1,8 +1,9 @@
 from flask import jsonify
 
 from utils.decorators import login_required, role_required, log_action, handle_db_errors
+from utils.cache import invalidate_cache_tags
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/<int:event_id>/publish', methods=['POST'])
@@ -24,6 +25,7 @@ def publish_event(event_id):
     # 由于当前的 DatabaseManager 没有相关方法，
     # 这里只是示例代码
     
+    invalidate_cache_tags(EVENTS_CACHE_TAG)
     logger.info(f"赛事 {event_id} 发布成功")
     
     return jsonify({
@@ -0,0 +1,38 @@
+from flask import jsonify, session
+
+from utils.decorators import login_required, role_required, log_action, handle_db_errors
+from utils.jobs import enqueue_job
+
+from . import events_bp, db_manager, logger
+
+
+@events_bp.route('/<int:event_id>/final-confirmations', methods=['POST'])
+@login_required
+@role_required(['admin', 'super_admin'])
+@log_action('批量发送参赛确认通知')
+@handle_db_errors
+def send_final_confirmations(event_id):
+    """报名截止后给所有审核通过的参赛者批量发送参赛确认通知（后台任务）"""
+    event = db_manager.get_event_by_id(event_id)
+    if not event:
+        return jsonify({
+            'success': False,
+            'message': '赛事不存在'
+        }), 404
+
+    job_id = enqueue_job(
+        'notifications.final_confirmation',
+        {'event_id': event_id},
+        created_by=session.get('user_id'),
+        max_attempts=1,
+    )
+    logger.info(f"赛事 {event_id} 参赛确认通知任务已提交: job_id={job_id}")
+
+    return jsonify({
+        'success': True,
+        'message': '参赛确认通知任务已提交，正在后台发送',
+        'data': {
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+        },
+    }), 202
@@ -2,9 +2,10 @@ from flask import request, jsonify
 
 from models import Event, EventStatus
 from utils.decorators import login_required, role_required, validate_json, log_action, handle_db_errors
+from utils.cache import invalidate_cache_tags
 from utils.helpers import parse_datetime
 
-from . import events_bp, db_manager, logger
+from . import events_bp, db_manager, logger, EVENTS_CACHE_TAG
 
 
 @events_bp.route('/<int:event_id>', methods=['PUT'])
@@ -85,6 +86,7 @@ def update_event(event_id):
     result_event = db_manager.update_event(event_id, updated_event)
     
     if result_event:
+        invalidate_cache_tags(EVENTS_CACHE_TAG)
         logger.info(f"赛事 {event_id} 更新成功")
         event_dict = result_event.to_dict()
         return jsonify({
@@ -0,0 +1,11 @@
+from flask import Blueprint
+
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# 将具体路由实现拆分到独立模块中
+from . import (
+    get_job_status,
+)
+
+__all__ = ['jobs_bp']
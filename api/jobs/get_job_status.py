@@ -0,0 +1,27 @@
+from flask import jsonify, session
+
+from utils.decorators import handle_db_errors
+from utils.jobs import get_job
+
+from . import jobs_bp
+
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@handle_db_errors
+def api_get_job_status(job_id):
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': '任务不存在'}), 404
+
+    # 只有任务创建者和管理员可以查看任务状态
+    is_admin = session.get('user_role') in ['admin', 'super_admin']
+    if not is_admin and job.get('created_by') != session.get('user_id'):
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    return jsonify({
+        'success': True,
+        'data': job,
+    })
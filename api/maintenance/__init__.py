@@ -1,4 +1,4 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, has_request_context
 
 from database import DatabaseManager
 
@@ -6,7 +6,9 @@ from database import DatabaseManager
 maintenance_bp = Blueprint('maintenance', __name__)
 
 
-def log_maintenance_operation(user_id, operation, details, status='success', error_msg=None, file_size=None, duration=None):
+def log_maintenance_operation(user_id, operation, details, status='success', error_msg=None, file_size=None, duration=None, ip_address=None):
+    if ip_address is None and has_request_context():
+        ip_address = request.remote_addr
     try:
         db_manager = DatabaseManager()
         with db_manager.get_connection() as conn:
@@ -17,7 +19,7 @@ def log_maintenance_operation(user_id, operation, details, status='success', err
                 (user_id, operation, details, status, error_message, ip_address, file_size, duration, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW())
                 """,
-                (user_id, operation, details, status, error_msg, request.remote_addr, file_size, duration),
+                (user_id, operation, details, status, error_msg, ip_address, file_size, duration),
             )
             conn.commit()
     except Exception:
@@ -1,97 +1,174 @@
-from flask import jsonify, session, current_app
+from flask import jsonify, session, current_app, request
 import os
 import subprocess
+import tempfile
 import time
 from datetime import datetime
 
 from config import Config
 from utils.decorators import log_action, handle_db_errors
+from utils.jobs import job_handler, enqueue_job
 from . import maintenance_bp, log_maintenance_operation, check_mysqldump_available
 
 
-@maintenance_bp.route('/admin/maintenance/backup', methods=['POST'])
-@log_action('执行数据库备份')
-@handle_db_errors
-def api_maintenance_backup():
-    if not session.get('logged_in'):
-        return jsonify({'success': False, 'message': '请先登录'}), 401
+def _run_mysqldump(ctx, cmd, backup_file):
+    """执行 mysqldump，运行期间按 JOB_HEARTBEAT_SECONDS 汇报心跳
 
-    if session.get('user_role') not in ['admin', 'super_admin']:
-        return jsonify({'success': False, 'message': '权限不足，只有管理员可以执行数据库备份操作'}), 403
+    备份可能超过 JOB_STALE_SECONDS，没有心跳会被当作 worker 崩溃重新入队，
+    导致同一个库被并发导出两次。超过 BACKUP_TIMEOUT_SECONDS 时终止进程并抛出 TimeoutExpired。
 
-    start_time = time.time()
+    Returns:
+        (returncode, stderr)
+    """
+    timeout = Config.BACKUP_TIMEOUT_SECONDS
+    heartbeat = max(1, getattr(Config, 'JOB_HEARTBEAT_SECONDS', 60))
+    deadline = time.monotonic() + timeout
 
-    try:
-        if not check_mysqldump_available():
-            log_maintenance_operation(
-                session.get('user_id'),
-                'database_backup',
-                '数据库备份失败：mysqldump 不可用或未安装',
-                status='failed',
-                error_msg='mysqldump 不可用或未安装',
-            )
-            return jsonify({
-                'success': False,
-                'message': '数据库备份失败：mysqldump 不可用或未安装，请检查服务器环境配置',
-            }), 500
-
-        backup_dir = os.path.join(current_app.root_path, 'backups')
-        os.makedirs(backup_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_file = os.path.join(backup_dir, f'wushu_backup_{timestamp}.sql')
-
-        cmd = [
-            'mysqldump',
-            f'-h{Config.DB_HOST}',
-            f'-P{Config.DB_PORT}',
-            f'-u{Config.DB_USER}',
-            f'-p{Config.DB_PASSWORD}',
-            '--single-transaction',
-            '--quick',
-            '--lock-tables=false',
-            Config.DB_NAME,
-        ]
-
-        with open(backup_file, 'w', encoding='utf8') as f:
-            result = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, text=True, timeout=300)
-
-        if result.returncode != 0:
-            raise Exception(result.stderr or 'mysqldump 执行失败')
-
-        file_size = os.path.getsize(backup_file) / (1024 * 1024)
-        duration = time.time() - start_time
+    # stderr 写入临时文件而不是管道，避免输出过多时管道写满阻塞 mysqldump
+    with open(backup_file, 'w', encoding='utf8') as out, tempfile.TemporaryFile(mode='w+', encoding='utf8') as err:
+        process = subprocess.Popen(cmd, stdout=out, stderr=err, text=True)
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+                try:
+                    returncode = process.wait(timeout=min(heartbeat, remaining))
+                    break
+                except subprocess.TimeoutExpired:
+                    size_mb = os.path.getsize(backup_file) / (1024 * 1024)
+                    ctx.report_progress(10, f'正在导出数据库（已导出 {size_mb:.1f} MB）')
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        err.seek(0)
+        return returncode, err.read()
+
+
+@job_handler('maintenance.backup')
+def run_database_backup(ctx, payload):
+    """后台任务：使用 mysqldump 导出数据库"""
+    user_id = payload.get('user_id')
+    ip_address = payload.get('ip_address')
+    start_time = time.time()
 
+    if not check_mysqldump_available():
         log_maintenance_operation(
-            session.get('user_id'),
+            user_id,
             'database_backup',
-            f'数据库备份成功：{os.path.basename(backup_file)}',
-            status='success',
-            file_size=file_size,
-            duration=duration,
+            '数据库备份失败：mysqldump 不可用或未安装',
+            status='failed',
+            error_msg='mysqldump 不可用或未安装',
+            ip_address=ip_address,
         )
+        raise RuntimeError('mysqldump 不可用或未安装，请检查服务器环境配置')
 
-        return jsonify({
-            'success': True,
-            'message': f'数据库备份成功，文件大小约 {file_size:.2f} MB，耗时 {duration:.1f} 秒',
-            'data': {
-                'filename': os.path.basename(backup_file),
-                'file_size_mb': file_size,
-                'duration_seconds': duration,
-            },
-        })
+    backup_dir = payload['backup_dir']
+    os.makedirs(backup_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    backup_file = os.path.join(backup_dir, f'wushu_backup_{timestamp}.sql')
+
+    cmd = [
+        'mysqldump',
+        f'-h{Config.DB_HOST}',
+        f'-P{Config.DB_PORT}',
+        f'-u{Config.DB_USER}',
+        f'-p{Config.DB_PASSWORD}',
+        '--single-transaction',
+        '--quick',
+        '--lock-tables=false',
+        Config.DB_NAME,
+    ]
 
+    ctx.report_progress(10, '正在导出数据库')
+    try:
+        returncode, stderr = _run_mysqldump(ctx, cmd, backup_file)
     except subprocess.TimeoutExpired:
-        duration = time.time() - start_time
         log_maintenance_operation(
-            session.get('user_id'),
+            user_id,
             'database_backup',
             '数据库备份超时',
             status='failed',
             error_msg='数据库备份超时',
-            duration=duration,
+            duration=time.time() - start_time,
+            ip_address=ip_address,
+        )
+        raise
+
+    if returncode != 0:
+        log_maintenance_operation(
+            user_id,
+            'database_backup',
+            '数据库备份失败',
+            status='failed',
+            error_msg=stderr or 'mysqldump 执行失败',
+            duration=time.time() - start_time,
+            ip_address=ip_address,
+        )
+        raise RuntimeError(stderr or 'mysqldump 执行失败')
+
+    file_size = os.path.getsize(backup_file) / (1024 * 1024)
+    duration = time.time() - start_time
+
+    log_maintenance_operation(
+        user_id,
+        'database_backup',
+        f'数据库备份成功：{os.path.basename(backup_file)}',
+        status='success',
+        file_size=file_size,
+        duration=duration,
+        ip_address=ip_address,
+    )
+
+    return {
+        'filename': os.path.basename(backup_file),
+        'file_size_mb': file_size,
+        'duration_seconds': duration,
+    }
+
+
+@maintenance_bp.route('/admin/maintenance/backup', methods=['POST'])
+@log_action('执行数据库备份')
+@handle_db_errors
+def api_maintenance_backup():
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    if session.get('user_role') not in ['admin', 'super_admin']:
+        return jsonify({'success': False, 'message': '权限不足，只有管理员可以执行数据库备份操作'}), 403
+
+    if not check_mysqldump_available():
+        log_maintenance_operation(
+            session.get('user_id'),
+            'database_backup',
+            '数据库备份失败：mysqldump 不可用或未安装',
+            status='failed',
+            error_msg='mysqldump 不可用或未安装',
         )
         return jsonify({
             'success': False,
-            'message': '数据库备份超时，请稍后重试或检查服务器负载',
+            'message': '数据库备份失败：mysqldump 不可用或未安装，请检查服务器环境配置',
         }), 500
+
+    # mysqldump 可能超过 gunicorn worker 超时，改为后台任务执行，前端通过 /api/jobs/<id> 轮询
+    job_id = enqueue_job(
+        'maintenance.backup',
+        {
+            'backup_dir': os.path.join(current_app.root_path, 'backups'),
+            'user_id': session.get('user_id'),
+            'ip_address': request.remote_addr,
+        },
+        created_by=session.get('user_id'),
+        max_attempts=1,
+    )
+
+    return jsonify({
+        'success': True,
+        'message': '数据库备份任务已提交，正在后台执行',
+        'data': {
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+        },
+    }), 202
@@ -3,7 +3,7 @@ import os
 import shutil
 from datetime import datetime
 
-from database import DatabaseManager
+from database import DatabaseManager, get_connection_metrics
 from utils.decorators import log_action, handle_db_errors
 from . import maintenance_bp
 
@@ -125,6 +125,34 @@ def api_system_health():
             'message': f'数据表状态检查失败: {str(e)}',
         }
 
+    try:
+        # 连接池统计是当前 worker 进程的数据，多 worker 部署时每次请求可能落到不同进程
+        metrics = get_connection_metrics()
+        pool_stats = metrics.get('pool') or {}
+        capacity = pool_stats.get('pool_size', 0) + pool_stats.get('max_overflow', 0)
+        if pool_stats.get('waiters'):
+            status = 'warning'
+            message = f"当前有 {pool_stats['waiters']} 个请求在排队等待数据库连接"
+        elif capacity and pool_stats.get('in_use', 0) >= capacity:
+            status = 'warning'
+            message = '数据库连接已全部占用'
+        else:
+            status = 'healthy'
+            message = '连接池运行正常'
+
+        health_status['connection_pool'] = {
+            'status': status,
+            'message': message,
+            'pid': os.getpid(),
+            'pool': pool_stats,
+            'request_reuses': metrics.get('reuses', 0),
+        }
+    except Exception as e:
+        health_status['connection_pool'] = {
+            'status': 'unknown',
+            'message': f'连接池状态获取失败: {str(e)}',
+        }
+
     statuses = [h.get('status') for h in health_status.values()]
     if any(s == 'critical' for s in statuses):
         overall_status = 'critical'
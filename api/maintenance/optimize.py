@@ -1,21 +1,17 @@
-from flask import jsonify, session
+from flask import jsonify, session, request
 import time
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.jobs import job_handler, enqueue_job
 from . import maintenance_bp, log_maintenance_operation
 
 
-@maintenance_bp.route('/admin/maintenance/optimize', methods=['POST'])
-@log_action('执行数据库优化')
-@handle_db_errors
-def api_maintenance_optimize():
-    if not session.get('logged_in'):
-        return jsonify({'success': False, 'message': '请先登录'}), 401
-
-    if session.get('user_role') not in ['admin', 'super_admin']:
-        return jsonify({'success': False, 'message': '权限不足，只有管理员可以执行数据库优化操作'}), 403
-
+@job_handler('maintenance.optimize')
+def run_database_optimize(ctx, payload):
+    """后台任务：逐表执行 OPTIMIZE TABLE"""
+    user_id = payload.get('user_id')
+    ip_address = payload.get('ip_address')
     start_time = time.time()
 
     try:
@@ -28,48 +24,72 @@ def api_maintenance_optimize():
             cursor.execute('SHOW TABLES')
             tables = [row[0] for row in cursor.fetchall()]
 
-            for table in tables:
+            for index, table in enumerate(tables, start=1):
                 try:
                     cursor.execute(f'OPTIMIZE TABLE {table}')
+                    cursor.fetchall()
                     optimized_count += 1
                 except Exception:
                     continue
+                finally:
+                    ctx.report_progress(index * 100 // len(tables), f'已处理 {index}/{len(tables)} 张表')
 
         duration = time.time() - start_time
 
         log_maintenance_operation(
-            session.get('user_id'),
+            user_id,
             'database_optimize',
             f'数据库优化完成，成功优化 {optimized_count}/{len(tables)} 张表',
             status='success',
             duration=duration,
+            ip_address=ip_address,
         )
 
-        return jsonify({
-            'success': True,
-            'message': f'数据库优化完成，成功优化 {optimized_count}/{len(tables)} 张表，耗时 {duration:.1f} 秒',
-            'data': {
-                'optimized_tables': optimized_count,
-                'total_tables': len(tables),
-                'duration_seconds': duration,
-            },
-        })
+        return {
+            'optimized_tables': optimized_count,
+            'total_tables': len(tables),
+            'duration_seconds': duration,
+        }
 
     except Exception as e:
-        duration = time.time() - start_time
-        import traceback
-        traceback.print_exc()
-
         log_maintenance_operation(
-            session.get('user_id'),
+            user_id,
             'database_optimize',
             '数据库优化失败',
             status='failed',
             error_msg=str(e),
-            duration=duration,
+            duration=time.time() - start_time,
+            ip_address=ip_address,
         )
+        raise
+
+
+@maintenance_bp.route('/admin/maintenance/optimize', methods=['POST'])
+@log_action('执行数据库优化')
+@handle_db_errors
+def api_maintenance_optimize():
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    if session.get('user_role') not in ['admin', 'super_admin']:
+        return jsonify({'success': False, 'message': '权限不足，只有管理员可以执行数据库优化操作'}), 403
+
+    # OPTIMIZE TABLE 可能持续数分钟，改为后台任务执行，前端通过 /api/jobs/<id> 轮询
+    job_id = enqueue_job(
+        'maintenance.optimize',
+        {
+            'user_id': session.get('user_id'),
+            'ip_address': request.remote_addr,
+        },
+        created_by=session.get('user_id'),
+        max_attempts=1,
+    )
 
-        return jsonify({
-            'success': False,
-            'message': f'数据库优化失败：{str(e)}',
-        }), 500
+    return jsonify({
+        'success': True,
+        'message': '数据库优化任务已提交，正在后台执行',
+        'data': {
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+        },
+    }), 202
@@ -11,6 +11,7 @@ from . import (
     mark_all_read,
     get_notification_detail,
     get_unread_notification_count,
+    get_notification_delivery,
 )
 
 __all__ = ['notifications_bp']
@@ -0,0 +1,26 @@
+from flask import jsonify, session
+
+from utils.decorators import log_action, handle_db_errors
+from utils.notification_service import notification_service
+
+from . import notifications_bp
+
+
+@notifications_bp.route('/notifications/<int:notification_id>/delivery', methods=['GET'])
+@log_action('查询通知分发进度')
+@handle_db_errors
+def api_get_notification_delivery(notification_id):
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    if session.get('user_role') != 'super_admin':
+        return jsonify({'success': False, 'message': '权限不足，只有超级管理员可以查看通知分发进度'}), 403
+
+    delivery = notification_service.get_delivery_status(notification_id)
+    if not delivery:
+        return jsonify({'success': False, 'message': '通知不存在'}), 404
+
+    return jsonify({
+        'success': True,
+        'data': delivery,
+    })
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.jobs import enqueue_job
 
 from . import notifications_bp
 
@@ -27,6 +28,9 @@ def api_send_notification():
     if not title or not content:
         return jsonify({'success': False, 'message': '标题和内容不能为空'})
 
+    if recipient_type not in ('all', 'role', 'event'):
+        return jsonify({'success': False, 'message': '不支持的收件人类型'})
+
     db_manager = DatabaseManager()
     sender_id = session.get('user_id')
 
@@ -36,68 +40,36 @@ def api_send_notification():
         cursor.execute(
             '''
             INSERT INTO notifications 
-            (sender_id, title, content, recipient_type, roles, priority, created_at)
-            VALUES (%s, %s, %s, %s, %s, %s, NOW())
+            (sender_id, title, content, recipient_type, roles, priority, delivery_status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, 'pending', NOW())
             ''',
             (sender_id, title, content, recipient_type, ','.join(roles) if roles else None, priority),
         )
 
         notification_id = cursor.lastrowid
-
-        if recipient_type == 'all':
-            cursor.execute('SELECT user_id FROM users WHERE user_id != %s', (sender_id,))
-            recipients = cursor.fetchall()
-        elif recipient_type == 'role':
-            placeholders = ','.join(['%s'] * len(roles))
-            cursor.execute(
-                f'''
-                SELECT user_id FROM users 
-                WHERE role IN ({placeholders}) AND user_id != %s
-                ''',
-                tuple(roles) + (sender_id,),
-            )
-            recipients = cursor.fetchall()
-        elif recipient_type == 'event':
-            # 优先从 event_participants 中选择该赛事的参赛运动员（排除发送者）
-            cursor.execute(
-                '''
-                SELECT DISTINCT user_id FROM event_participants
-                WHERE event_id = %s AND user_id != %s AND role = 'athlete'
-                ''',
-                (event_id, sender_id),
-            )
-            recipients = cursor.fetchall()
-
-            # 如新表中尚无数据，则回退到旧的 participants 表
-            if not recipients:
-                cursor.execute(
-                    '''
-                    SELECT DISTINCT user_id FROM participants 
-                    WHERE event_id = %s AND user_id != %s
-                    ''',
-                    (event_id, sender_id),
-                )
-                recipients = cursor.fetchall()
-        else:
-            recipients = []
-
-        for recipient in recipients:
-            cursor.execute(
-                '''
-                INSERT INTO user_notifications 
-                (notification_id, user_id, is_read, created_at)
-                VALUES (%s, %s, FALSE, NOW())
-                ''',
-                (notification_id, recipient[0]),
-            )
-
         conn.commit()
 
-        return jsonify({
-            'success': True,
-            'message': f'通知已发送给 {len(recipients)} 个用户',
-            'data': {
-                'notification_id': notification_id,
-                'recipient_count': len(recipients),
-            },
-        })
+    # 收件人分发交给后台任务分块执行，请求立即返回任务句柄
+    job_id = enqueue_job(
+        'notifications.fan_out',
+        {
+            'notification_id': notification_id,
+            'sender_id': sender_id,
+            'recipient_type': recipient_type,
+            'roles': roles,
+            'event_id': event_id,
+        },
+        created_by=sender_id,
+    )
+
+    return jsonify({
+        'success': True,
+        'message': '通知已创建，正在后台分发给收件人',
+        'data': {
+            'notification_id': notification_id,
+            'job_id': job_id,
+            'status': 'pending',
+            'status_url': f'/api/jobs/{job_id}',
+            'delivery_url': f'/api/notifications/{notification_id}/delivery',
+        },
+    }), 202
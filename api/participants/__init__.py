@@ -7,6 +7,7 @@ from . import (
     get_team_fees,
     approve_participant,
     save_team_fees,
+    player_demographics,
 )
 
 __all__ = ['participants_bp']
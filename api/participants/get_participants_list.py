@@ -1,16 +1,29 @@
 from flask import request, jsonify, session
-from datetime import datetime
 import time
 import logging
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors, cache_result
+from utils.helpers import PLAYER_AGE_GROUPS, calculate_age, derive_player_demographics, normalize_gender
+from utils.pagination import (
+    encode_cursor, decode_cursor, keyset_condition, parse_total_mode,
+    estimate_row_count, InvalidCursorError,
+)
 
 from . import participants_bp
 
 
 logger = logging.getLogger(__name__)
 
+_REGISTERED_AT_SQL = 'COALESCE(p.registered_at, tp.created_at)'
+
+# 游标分页的排序键：(报名时间, team_players 主键, 报名条目主键)，三列都不为 NULL，
+# 否则 NULL 行无法越过、游标也无法编码。旧库 entries.registration_number 可能缺唯一约束，
+# 同一队员可能对应多条报名条目，因此条目主键也要参与排序，保证键值唯一
+_SORT_AT_SQL = "COALESCE(p.registered_at, tp.created_at, TIMESTAMP('1970-01-01'))"
+_ENTRY_KEY_SQL = 'COALESCE(en.entry_id, 0)'
+_KEYSET_COLUMNS = (_SORT_AT_SQL, 'tp.player_id', _ENTRY_KEY_SQL)
+
 
 @participants_bp.route('/participants/list', methods=['GET'])
 @log_action('获取参赛者列表')
@@ -49,6 +62,17 @@ def api_get_participants_list():
 
     offset = (page - 1) * per_page
 
+    # 传入 cursor（或首页 pagination=cursor）时使用游标分页，忽略 page
+    cursor_token = (request.args.get('cursor') or '').strip()
+    use_cursor = bool(cursor_token) or (request.args.get('pagination') or '').strip().lower() == 'cursor'
+    after = None
+    if cursor_token:
+        try:
+            after = decode_cursor(cursor_token, 'registered_at', 'DESC', key_length=len(_KEYSET_COLUMNS))
+        except InvalidCursorError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+    total_mode = parse_total_mode(request.args.get('include_total'), default='none' if use_cursor else 'exact')
+
         # 只统计已提交队伍的参赛者：
         # 参赛者管理需要覆盖“队伍报名名单”里的所有选手。
         # 仅用 participants 作为主表会漏掉：team_players 中存在但未生成 participants 记录（尤其 user_id 为空的历史/离线录入数据）。
@@ -83,11 +107,17 @@ def api_get_participants_list():
         pattern = f'%{category}%'
         params.extend([pattern, pattern, pattern, pattern])
 
-        # 性别也不在SQL中做等值过滤，因为历史数据可能未写入gender
-        # 在Python层基于持久化字段或身份证推导后再过滤
+    # 性别、年龄组在写入 team_players 时已由身份证号推导并持久化（见 player_demographics），
+    # 直接在 SQL 中等值过滤，可使用 idx_event_gender_age_group 索引
+    if gender:
+        where_clauses.append('tp.gender = %s')
+        params.append(normalize_gender(gender))
 
-        # 注意：年龄组不在SQL中做等值过滤，因为历史数据可能未写入age_group，等值过滤会误排除
-        # 在Python层基于持久化字段或身份证推导后再过滤并分页
+    if age_group:
+        # 兼容带 A/B/C 组标注的写法，如 "青年组(C组)"
+        canonical = next((name for _, name in PLAYER_AGE_GROUPS if name in age_group), age_group)
+        where_clauses.append('tp.age_group = %s')
+        params.append(canonical)
 
     if search_term:
         where_clauses.append('('
@@ -112,9 +142,13 @@ def api_get_participants_list():
             'p.event_member_no AS event_member_no, '
             'p.category AS category, '
             'COALESCE(p.status, tp.status) AS status, '
-            'COALESCE(p.registered_at, tp.created_at) AS registered_at, '
-            'COALESCE(p.gender, tp.gender) AS gender, '
-            'COALESCE(p.age_group, NULL) AS age_group, '
+            + _REGISTERED_AT_SQL + ' AS registered_at, '
+            + _SORT_AT_SQL + ' AS sort_at, '
+            'tp.player_id AS row_key, '
+            + _ENTRY_KEY_SQL + ' AS entry_key, '
+            'COALESCE(tp.gender, p.gender) AS gender, '
+            'COALESCE(tp.age_group, p.age_group) AS age_group, '
+            'tp.birth_date AS birth_date, '
             'COALESCE(u.real_name, tp.name) AS real_name, '
             'COALESCE(u.phone, tp.phone) AS phone, '
             'tp.phone AS player_phone, '
@@ -128,49 +162,50 @@ def api_get_participants_list():
 
     count_query = 'SELECT COUNT(*) AS total' + base_from + where_sql
 
+    list_where_sql = where_sql
+    list_params = list(params)
+    if after is not None:
+        condition, condition_params = keyset_condition(_KEYSET_COLUMNS, after, 'DESC')
+        list_where_sql += (' AND ' if list_where_sql else ' WHERE ') + condition
+        list_params.extend(condition_params)
+
     data_query_base = (
         select_fields
         + base_from
-        + where_sql
-        + ' ORDER BY p.registered_at DESC'
+        + list_where_sql
+        + ' ORDER BY ' + ', '.join(f'{column} DESC' for column in _KEYSET_COLUMNS)
     )
 
-    # 是否需要在Python层做过滤与分页（年龄组或性别任一存在）
-    do_python_filter = bool(age_group or gender)
-
     t_after_params = time.perf_counter()
 
     with db_manager.get_connection() as conn:
         cursor = conn.cursor(dictionary=True)
 
-        if do_python_filter:
-            # 先不分页取出数据，后续在Python中过滤年龄组并分页
-            if params:
-                cursor.execute(data_query_base, tuple(params))
-            else:
-                cursor.execute(data_query_base)
-            rows = cursor.fetchall()
-            # total 暂不确定，待Python层过滤后计算
-            total = None
-        else:
-            if params:
-                cursor.execute(count_query, tuple(params))
-            else:
-                cursor.execute(count_query)
-
+        total = None
+        if total_mode == 'exact':
+            cursor.execute(count_query, tuple(params))
             row = cursor.fetchone()
             total = row['total'] if row else 0
+        elif total_mode == 'approx':
+            total = estimate_row_count(cursor, base_from + where_sql, params)
 
+        # 多取一行用于判断是否还有下一页
+        if use_cursor:
+            data_query = data_query_base + ' LIMIT %s'
+            data_params = list_params + [per_page + 1]
+        else:
             data_query = data_query_base + ' LIMIT %s OFFSET %s'
-            data_params = params + [per_page, offset]
-            cursor.execute(data_query, tuple(data_params))
-            rows = cursor.fetchall()
+            data_params = list_params + [per_page + 1, offset]
+        cursor.execute(data_query, tuple(data_params))
+        rows = cursor.fetchall()
 
     t_after_db = time.perf_counter()
 
+    # 多取的一行只用于判断是否还有下一页
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
     participants_list = []
-    # 在循环外获取当前时间，避免对每条记录重复调用 datetime.now()
-    today = datetime.now()
     for p in rows:
         # 优先使用 team_players 中同步的身份证号，其次使用 participants.registration_number
         id_card = p.get('player_id_card') or p['registration_number'] or ''
@@ -179,40 +214,16 @@ def api_get_participants_list():
         selected_events = (p.get('player_selected_events') or '').strip()
         resolved_category = competition_event or selected_events or p.get('event_item_name') or p.get('category')
 
-        # 性别和年龄组优先使用表中的持久化字段，缺失时才从身份证兜底
+        # 性别和年龄组优先使用表中的持久化字段，缺失时（回填任务尚未覆盖）才从身份证兜底
+        birth_date = p.get('birth_date')
         gender_value = p.get('gender')
         age_group_value = p.get('age_group')
-        age = None
-
-        if len(id_card) == 18:
-            try:
-                birth_year = int(id_card[6:10])
-                birth_month = int(id_card[10:12])
-                birth_day = int(id_card[12:14])
-
-                age = today.year - birth_year
-                if (today.month, today.day) < (birth_month, birth_day):
-                    age -= 1
-
-                # 如果性别为空，从身份证兜底计算
-                if not gender_value:
-                    gender_digit = int(id_card[-2])
-                    gender_value = '男' if gender_digit % 2 == 1 else '女'
-
-                # 如果年龄组为空，从年龄兜底计算（与旧逻辑一致）
-                if age is not None and not age_group_value:
-                    if age < 12:
-                        age_group_value = '儿童组'
-                    elif 12 <= age <= 17:
-                        age_group_value = '少年组'
-                    elif 18 <= age <= 39:
-                        age_group_value = '青年组'
-                    elif 40 <= age <= 59:
-                        age_group_value = '中年组'
-                    elif age >= 60:
-                        age_group_value = '老年组'
-            except Exception:
-                age = None
+        if not birth_date or not gender_value:
+            derived_birth_date, derived_gender, derived_age_group = derive_player_demographics(id_card, gender_value)
+            birth_date = birth_date or derived_birth_date
+            gender_value = derived_gender
+            age_group_value = age_group_value or derived_age_group
+        age = calculate_age(birth_date)
 
         participants_list.append({
             'participant_id': p['participant_id'],
@@ -234,30 +245,12 @@ def api_get_participants_list():
             'age_group': age_group_value,
         })
 
-    # 如果需要在Python层进行年龄组/性别过滤与分页，这里处理
-    if do_python_filter:
-        # 年龄组匹配（容忍带A/B/C组标注）
-        def match_age_group(g):
-            if not age_group:
-                return True
-            if not g:
-                return False
-            return age_group in g
-
-        # 性别匹配：使用持久化/推导后的gender字段
-        def match_gender(g):
-            if not gender:
-                return True
-            return g == gender
-
-        participants_list = [p for p in participants_list if match_age_group(p['age_group']) and match_gender(p['gender'])]
-
-        total = len(participants_list)
-        start = offset
-        end = offset + per_page
-        participants_list = participants_list[start:end]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor('registered_at', 'DESC', (last['sort_at'], last['row_key'], last['entry_key']))
 
-    total_pages = (total + per_page - 1) // per_page if per_page else 1
+    total_pages = (total + per_page - 1) // per_page if total is not None else None
 
     t_after_python = time.perf_counter()
     logger.info(
@@ -281,5 +274,8 @@ def api_get_participants_list():
             'per_page': per_page,
             'total': total,
             'total_pages': total_pages,
+            'total_is_estimate': total_mode == 'approx',
+            'has_next': has_more,
+            'next_cursor': next_cursor,
         },
     })
@@ -0,0 +1,73 @@
+from flask import jsonify, session
+from datetime import datetime, timedelta
+import logging
+
+from database import DatabaseManager
+from utils.decorators import log_action, handle_db_errors
+from utils.jobs import job_handler, enqueue_job, has_pending_job
+
+from . import participants_bp
+
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB = 'players.backfill_demographics'
+REFRESH_JOB = 'players.refresh_age_groups'
+
+
+def schedule_age_group_refresh():
+    """安排下一次年龄组刷新（每天凌晨执行一次，已有排队中的刷新任务时不重复入队）"""
+    if has_pending_job(REFRESH_JOB, statuses=('queued',)):
+        return None
+    now = datetime.now()
+    next_run = (now + timedelta(days=1)).replace(hour=0, minute=5, second=0, microsecond=0)
+    return enqueue_job(REFRESH_JOB, delay_seconds=(next_run - now).total_seconds())
+
+
+@job_handler(BACKFILL_JOB)
+def run_player_demographics_backfill(ctx, payload):
+    """后台任务：根据身份证号为所有队员回填出生日期、性别与年龄组"""
+    db_manager = DatabaseManager()
+
+    def report(done, total):
+        ctx.report_progress(done * 100 // total, f'已处理 {done}/{total} 名队员')
+
+    processed = db_manager.backfill_player_demographics(progress_callback=report)
+    schedule_age_group_refresh()
+    return {'processed': processed}
+
+
+@job_handler(REFRESH_JOB)
+def run_player_age_group_refresh(ctx, payload):
+    """周期任务：年龄随日期增长，按出生日期重算年龄组，并安排下一次执行"""
+    try:
+        updated = DatabaseManager().refresh_player_age_groups()
+    finally:
+        # 失败重试时已有排队中的下一次任务，不会重复入队
+        schedule_age_group_refresh()
+    return {'updated': updated}
+
+
+@participants_bp.route('/participants/demographics/backfill', methods=['POST'])
+@log_action('回填队员出生日期/性别/年龄组')
+@handle_db_errors
+def api_backfill_player_demographics():
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    if session.get('user_role') not in ['admin', 'super_admin']:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    if has_pending_job(BACKFILL_JOB):
+        return jsonify({'success': False, 'message': '回填任务已在执行中'}), 409
+
+    job_id = enqueue_job(BACKFILL_JOB, created_by=session.get('user_id'), max_attempts=1)
+
+    return jsonify({
+        'success': True,
+        'message': '回填任务已提交，正在后台执行',
+        'data': {
+            'job_id': job_id,
+            'status_url': f'/api/jobs/{job_id}',
+        },
+    }), 202
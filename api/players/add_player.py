@@ -197,6 +197,8 @@ def api_add_player():
                                 'registered',
                             ),
                         )
+                    player_id = existing_player['player_id'] if existing_player else cursor.lastrowid
+                    db_manager.refresh_player_demographics_with_conn(conn, [player_id])
                     conn.commit()
         except Exception as e:
             print(f'同步到 team_players 失败: {e}')
@@ -28,6 +28,8 @@ from . import (
     add_team_staff,
     update_team_staff,
     export_team_info,
+    export_event_teams,
+    import_team_roster,
 )
 
 __all__ = ['teams_bp']
@@ -4,6 +4,7 @@ import json
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.helpers import derive_player_demographics, calculate_age, player_age_group, id_card_gender_conflict
 
 from . import teams_bp
 
@@ -30,59 +31,8 @@ def api_add_team_player(team_id):
     raw_gender = (data.get('gender') or '').strip()
     raw_age = data.get('age')
 
-    def normalize_gender(value):
-        if not value:
-            return None
-        value = str(value).strip()
-        mapping = {
-            'male': '男',
-            'm': '男',
-            '男': '男',
-            'female': '女',
-            'f': '女',
-            '女': '女'
-        }
-        return mapping.get(value.lower(), value)
-
-    def extract_gender_from_id(card):
-        if not card or len(card) != 18:
-            return None
-        try:
-            return '男' if int(card[-2]) % 2 == 1 else '女'
-        except Exception:
-            return None
-
-    def calculate_age_from_id(card):
-        if not card or len(card) != 18:
-            return None
-        try:
-            birth_year = int(card[6:10])
-            birth_month = int(card[10:12])
-            birth_day = int(card[12:14])
-            today = datetime.now()
-            age_value = today.year - birth_year
-            if (today.month, today.day) < (birth_month, birth_day):
-                age_value -= 1
-            if 0 <= age_value <= 150:
-                return age_value
-        except Exception:
-            return None
-        return None
-
-    def calculate_age_group(age_value):
-        if age_value is None:
-            return None
-        if age_value < 12:
-            return '儿童组'
-        if 12 <= age_value <= 17:
-            return '少年组'
-        if 18 <= age_value <= 39:
-            return '青年组'
-        if 40 <= age_value <= 59:
-            return '中年组'
-        return '老年组'
-
-    gender_value = normalize_gender(raw_gender) or extract_gender_from_id(id_card)
+    # 出生日期、性别、年龄组写入时由身份证号推导一次并持久化，参赛者列表直接在 SQL 中按其筛选
+    birth_date, gender_value, age_group_value = derive_player_demographics(id_card, raw_gender)
 
     age_value = None
     if raw_age not in (None, ''):
@@ -91,9 +41,10 @@ def api_add_team_player(team_id):
         except (TypeError, ValueError):
             age_value = None
     if age_value is None:
-        age_value = calculate_age_from_id(id_card)
+        age_value = calculate_age(birth_date)
 
-    age_group_value = calculate_age_group(age_value) if age_value is not None else None
+    if age_group_value is None:
+        age_group_value = player_age_group(age_value)
 
     if not event_id or not real_name or not id_card or not phone:
         return jsonify({
@@ -101,6 +52,10 @@ def api_add_team_player(team_id):
             'message': 'event_id、姓名、身份证号和手机号为必填项'
         }), 400
 
+    # 性别以身份证号为准，明确填写了不一致的性别时拒绝，而不是静默覆盖
+    if id_card_gender_conflict(id_card, raw_gender):
+        return jsonify({'success': False, 'message': '性别与身份证号不符'}), 400
+
     db_manager = DatabaseManager()
     with db_manager.get_connection() as conn:
         cursor = conn.cursor(dictionary=True)
@@ -195,11 +150,11 @@ def api_add_team_player(team_id):
             """
             INSERT INTO team_players (
                 event_id, team_id, user_id,
-                name, gender, age, phone, id_card,
+                name, gender, age, birth_date, age_group, phone, id_card,
                 competition_event, selected_events,
                 level, registration_number,
                 pair_partner_name, pair_registered, team_registered, status
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """,
             (
                 event_id,
@@ -208,6 +163,8 @@ def api_add_team_player(team_id):
                 real_name,
                 gender_value,
                 age_value,
+                birth_date,
+                age_group_value,
                 phone,
                 id_card,
                 competition_event,
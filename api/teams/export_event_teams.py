@@ -0,0 +1,177 @@
+from flask import jsonify, request, session, Response, stream_with_context
+from datetime import datetime
+import logging
+
+from database import DatabaseManager
+from utils.decorators import log_action, handle_db_errors
+from utils.xlsx_export import (
+    XLSX_MIMETYPE, new_workbook, iter_file_chunks, iter_rows, iter_zip, safe_sheet_name, discard_file,
+)
+
+from . import teams_bp
+from .export_team_info import (
+    TEAM_EXPORT_FIELDS,
+    create_team_formats,
+    write_team_sheet,
+    attachment_headers,
+    _safe_filename,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# 选手与随行人员合并为一个按 (team_id, kind, id) 排序的结果集，一次查询流式读完整场赛事；
+# 通过 teams 过滤出与 _load_teams 相同的队伍，结果集中不会留下导出范围之外的成员
+_EVENT_MEMBERS_SQL = """
+    SELECT tp.team_id, 0 AS kind, tp.player_id AS member_id,
+           tp.name, tp.gender, tp.age, tp.phone, tp.id_card, tp.competition_event, tp.selected_events,
+           NULL AS position
+    FROM team_players tp
+    JOIN teams t ON t.team_id = tp.team_id AND t.event_id = tp.event_id{team_filter}
+    WHERE tp.event_id = %s
+    UNION ALL
+    SELECT ts.team_id, 1 AS kind, ts.staff_id AS member_id,
+           ts.name, ts.gender, ts.age, ts.phone, ts.id_card, NULL, NULL, ts.position
+    FROM team_staff ts
+    JOIN teams t ON t.team_id = ts.team_id AND t.event_id = ts.event_id{team_filter}
+    WHERE ts.event_id = %s AND ts.status = 'active'
+    ORDER BY team_id, kind, member_id
+"""
+
+_SUBMITTED_FILTER = " AND t.submitted_for_review = 1"
+
+_KIND_PLAYER = 0
+_KIND_STAFF = 1
+
+
+class _MemberStream:
+    """在按 team_id 排序的成员结果集上按队伍、按类别依次取行（只向前读，不回看）"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._head = next(self._rows, None)
+
+    def take(self, team_id, kind):
+        while self._head is not None and (self._head['team_id'], self._head['kind']) < (team_id, kind):
+            # 不属于导出范围的队伍（如已删除队伍残留的成员）直接跳过
+            self._head = next(self._rows, None)
+        while self._head is not None and self._head['team_id'] == team_id and self._head['kind'] == kind:
+            yield self._head
+            self._head = next(self._rows, None)
+
+
+def _load_teams(cursor, event_id, submitted_only):
+    sql = f"SELECT {TEAM_EXPORT_FIELDS} FROM teams t WHERE event_id = %s"
+    if submitted_only:
+        sql += _SUBMITTED_FILTER
+    cursor.execute(sql + " ORDER BY team_id ASC", (event_id,))
+    # 队伍基本信息每队一行，数据量小；选手/随行人员才是需要流式读取的部分
+    return cursor.fetchall() or []
+
+
+def _iter_team_sheets(conn, event_id, teams, submitted_only=False):
+    """生成器：按队伍顺序产出 (team, players, staff)，成员行直接来自非缓冲游标"""
+    cursor = conn.cursor(dictionary=True, buffered=False)
+    try:
+        sql = _EVENT_MEMBERS_SQL.format(team_filter=_SUBMITTED_FILTER if submitted_only else '')
+        cursor.execute(sql, (event_id, event_id))
+        members = _MemberStream(iter_rows(cursor))
+        for team in teams:
+            team_id = team['team_id']
+            yield team, members.take(team_id, _KIND_PLAYER), members.take(team_id, _KIND_STAFF)
+    finally:
+        # 非缓冲游标关闭前必须读完结果集，否则 close() 抛出 "Unread result found"
+        # （导出期间新增的队伍、写表出错或客户端中途断开时都可能留下未读的行）
+        for _ in iter_rows(cursor):
+            pass
+        cursor.close()
+
+
+def _build_event_workbook(db_manager, event_id, teams, submitted_only=False):
+    """整场赛事导出为一个工作簿，每支队伍一张工作表"""
+    workbook, path = new_workbook()
+    try:
+        formats = create_team_formats(workbook)
+        used_names = set()
+        with db_manager.get_connection() as conn:
+            for team, players, staff in _iter_team_sheets(conn, event_id, teams, submitted_only):
+                worksheet = workbook.add_worksheet(safe_sheet_name(team.get('team_name'), used_names))
+                write_team_sheet(worksheet, formats, team, players, staff)
+        workbook.close()
+    except Exception:
+        discard_file(path)
+        raise
+    return path
+
+
+def _iter_team_workbooks(db_manager, event_id, teams, submitted_only=False):
+    """生成器：逐队生成独立工作簿，产出 (ZIP 内文件名, 临时文件路径)"""
+    used_names = set()
+    with db_manager.get_connection() as conn:
+        for team, players, staff in _iter_team_sheets(conn, event_id, teams, submitted_only):
+            workbook, path = new_workbook()
+            try:
+                worksheet = workbook.add_worksheet('队伍信息表')
+                write_team_sheet(worksheet, create_team_formats(workbook), team, players, staff)
+                workbook.close()
+            except Exception:
+                discard_file(path)
+                raise
+            name = _safe_filename(team.get('team_name'))
+            if name.lower() in used_names:
+                name = f"{name}_{team['team_id']}"
+            used_names.add(name.lower())
+            yield f"{name}_队伍信息表.xlsx", path
+
+
+@teams_bp.route('/events/<int:event_id>/teams/export', methods=['GET'])
+@log_action('批量导出赛事队伍信息')
+@handle_db_errors
+def api_export_event_teams(event_id):
+    """批量导出整场赛事的队伍信息表
+
+    Query:
+        format: workbook（默认，一个工作簿、每队一张工作表）/ zip（每队一个工作簿打包为 ZIP）
+        submitted_only: true 时只导出已提交审核的队伍
+    """
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    if session.get('user_role') not in ['admin', 'super_admin']:
+        return jsonify({'success': False, 'message': '权限不足'}), 403
+
+    export_format = (request.args.get('format') or 'workbook').strip().lower()
+    if export_format not in ('workbook', 'zip'):
+        return jsonify({'success': False, 'message': 'format 只能是 workbook 或 zip'}), 400
+    submitted_only = (request.args.get('submitted_only') or '').lower() in ('1', 'true', 'yes')
+
+    db_manager = DatabaseManager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT event_id, name FROM events WHERE event_id = %s", (event_id,))
+        event = cursor.fetchone()
+        if not event:
+            cursor.close()
+            return jsonify({'success': False, 'message': '赛事不存在'}), 404
+        teams = _load_teams(cursor, event_id, submitted_only)
+        cursor.close()
+
+    if not teams:
+        return jsonify({'success': False, 'message': '该赛事暂无可导出的队伍'}), 404
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    base_name = f"{_safe_filename(event.get('name'))}_队伍信息表_{timestamp}"
+
+    if export_format == 'zip':
+        # 每生成一支队伍的工作簿就打包输出，首个字节无需等待全部队伍生成完
+        body = stream_with_context(iter_zip(_iter_team_workbooks(db_manager, event_id, teams, submitted_only)))
+        return Response(body, mimetype='application/zip', headers=attachment_headers(f"{base_name}.zip"))
+
+    # xlsx 的 ZIP 目录需在所有工作表写完后生成，单工作簿模式先写入临时文件再流式返回
+    path = _build_event_workbook(db_manager, event_id, teams, submitted_only)
+    logger.info(f"赛事 {event_id} 队伍信息导出完成：{len(teams)} 支队伍")
+    return Response(
+        iter_file_chunks(path),
+        mimetype=XLSX_MIMETYPE,
+        headers=attachment_headers(f"{base_name}.xlsx"),
+    )
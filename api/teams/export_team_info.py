@@ -1,13 +1,11 @@
-from flask import jsonify, session, send_file
-from io import BytesIO
+from flask import jsonify, session, Response
 from datetime import datetime
+from urllib.parse import quote
 import json
 
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
-
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.xlsx_export import XLSX_MIMETYPE, new_workbook, iter_file_chunks, iter_rows, discard_file
 
 from . import teams_bp
 
@@ -92,121 +90,79 @@ def _format_selected_events(selected_events, competition_event) -> str:
     return '、'.join(items)
 
 
-@teams_bp.route('/team/<int:team_id>/export', methods=['GET'])
-@log_action('导出队伍信息')
-@handle_db_errors
-def api_export_team_info(team_id):
-    """导出队伍信息表（xlsx）"""
-    if not session.get('logged_in'):
-        return jsonify({'success': False, 'message': '请先登录'}), 401
-
-    user_role = session.get('user_role')
-    current_user_id = session.get('user_id')
-
-    db_manager = DatabaseManager()
-    with db_manager.get_connection() as conn:
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute(
-            """
-            SELECT
-                team_id,
-                event_id,
-                team_name,
-                leader_name,
-                leader_phone,
-                leader_email,
-                team_address,
-                team_description,
-                submitted_for_review,
-                submitted_at,
-                created_by
-            FROM teams
-            WHERE team_id = %s
-            LIMIT 1
-            """,
-            (team_id,),
-        )
-        team = cursor.fetchone()
-        if not team:
-            cursor.close()
-            return jsonify({'success': False, 'message': '队伍不存在'}), 404
-
-        is_admin = user_role in ['admin', 'super_admin']
-        if not is_admin and team.get('created_by') != current_user_id:
-            cursor.close()
-            return jsonify({'success': False, 'message': '您没有权限导出此队伍信息'}), 403
-
-        event_id = team.get('event_id')
-
-        cursor.execute(
-            """
-            SELECT
-                name,
-                gender,
-                age,
-                phone,
-                id_card,
-                competition_event,
-                selected_events
-            FROM team_players
-            WHERE team_id = %s AND event_id = %s
-            ORDER BY player_id ASC
-            """,
-            (team_id, event_id),
-        )
-        players = cursor.fetchall() or []
-
-        cursor.execute(
-            """
-            SELECT
-                name,
-                position,
-                gender,
-                age,
-                phone,
-                id_card
-            FROM team_staff
-            WHERE team_id = %s AND event_id = %s AND status = 'active'
-            ORDER BY staff_id ASC
-            """,
-            (team_id, event_id),
-        )
-        staff = cursor.fetchall() or []
-
-        cursor.close()
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = '队伍信息表'
-
-    header_fill = PatternFill('solid', fgColor='0D6EFD')
-    header_font = Font(color='FFFFFF', bold=True)
-    title_font = Font(size=14, bold=True)
-    bold_font = Font(bold=True)
-    thin = Side(style='thin', color='D0D7DE')
-    border = Border(left=thin, right=thin, top=thin, bottom=thin)
-
-    def set_cell(row, col, value, *, font=None, align=None, fill=None):
-        c = ws.cell(row=row, column=col, value=value)
-        c.border = border
-        if font:
-            c.font = font
-        if align:
-            c.alignment = align
-        if fill:
-            c.fill = fill
-        return c
-
-    center = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    left = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-    ws.merge_cells('A1:F1')
-    set_cell(1, 1, '队伍信息表', font=title_font, align=center)
-
-    row = 3
-    ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-    set_cell(row, 1, '队伍基本信息', font=header_font, fill=header_fill, align=left)
+TEAM_EXPORT_FIELDS = """
+    team_id,
+    event_id,
+    team_name,
+    leader_name,
+    leader_phone,
+    leader_email,
+    team_address,
+    team_description,
+    submitted_for_review,
+    submitted_at,
+    created_by
+"""
+
+_PLAYER_HEADERS = ['姓名', '身份证号', '联系电话', '性别', '年龄', '参赛项目']
+_STAFF_HEADERS = ['姓名', '身份证号', '联系电话', '性别', '年龄', '角色/职务']
+_COLUMN_WIDTHS = [14, 20, 14, 22, 14, 44]
+
+_POSITION_LABELS = {
+    'coach': '教练',
+    'head_coach': '教练',
+    'manager': '领队',
+    'medical': '医务人员',
+    'doctor': '医务人员',
+    'staff': '随行人员',
+}
+
+
+def create_team_formats(workbook):
+    """队伍信息表用到的单元格格式（整个工作簿共享，不再逐单元格创建样式）"""
+    border = {'border': 1, 'border_color': '#D0D7DE', 'valign': 'vcenter', 'text_wrap': True}
+    return {
+        'title': workbook.add_format({**border, 'bold': True, 'font_size': 14, 'align': 'center'}),
+        'section': workbook.add_format({
+            **border, 'bold': True, 'font_color': '#FFFFFF', 'bg_color': '#0D6EFD', 'align': 'left',
+        }),
+        'label': workbook.add_format({**border, 'bold': True, 'align': 'center'}),
+        'left': workbook.add_format({**border, 'align': 'left'}),
+        'center': workbook.add_format({**border, 'align': 'center'}),
+    }
+
+
+def _member_values(row, kind):
+    if kind == 'player':
+        last = _format_selected_events(row.get('selected_events'), row.get('competition_event'))
+    else:
+        pos = row.get('position') or ''
+        last = _POSITION_LABELS.get(str(pos).lower(), pos)
+    return [
+        row.get('name') or '',
+        row.get('id_card') or '',
+        row.get('phone') or '',
+        _normalize_gender(row.get('gender')),
+        row.get('age') if row.get('age') is not None else '',
+        last,
+    ]
+
+
+def write_team_sheet(worksheet, formats, team, players, staff):
+    """按行顺序写入一张队伍信息表
+
+    players / staff 为可迭代对象（可以直接是游标上的生成器），逐行写入后即落盘。
+    constant_memory 模式要求按行递增写入，因此先写完选手再写随行人员。
+    """
+    ws = worksheet
+    for col, width in enumerate(_COLUMN_WIDTHS):
+        ws.set_column(col, col, width)
+    ws.set_row(0, 28)
+
+    ws.merge_range(0, 0, 0, 5, '队伍信息表', formats['title'])
+
+    row = 2
+    ws.merge_range(row, 0, row, 5, '队伍基本信息', formats['section'])
     row += 1
 
     submitted_at = team.get('submitted_at')
@@ -219,124 +175,149 @@ def api_export_team_info(team_id):
 
     # 前两行：三列排版（每列 2 个单元格：label/value）
     # 第一行：队伍名称、领队姓名、提交状态
-    set_cell(row, 1, '队伍名称', font=bold_font, align=center)
-    set_cell(row, 2, team.get('team_name') or '', align=left)
-    set_cell(row, 3, '领队姓名', font=bold_font, align=center)
-    set_cell(row, 4, team.get('leader_name') or '', align=left)
-    set_cell(row, 5, '提交状态', font=bold_font, align=center)
-    set_cell(row, 6, submit_status, align=center)
+    ws.write(row, 0, '队伍名称', formats['label'])
+    ws.write(row, 1, team.get('team_name') or '', formats['left'])
+    ws.write(row, 2, '领队姓名', formats['label'])
+    ws.write(row, 3, team.get('leader_name') or '', formats['left'])
+    ws.write(row, 4, '提交状态', formats['label'])
+    ws.write(row, 5, submit_status, formats['center'])
     row += 1
 
     # 第二行：联系电话、邮箱地址、提交时间
-    set_cell(row, 1, '联系电话', font=bold_font, align=center)
-    set_cell(row, 2, team.get('leader_phone') or '', align=left)
-    set_cell(row, 3, '邮箱地址', font=bold_font, align=center)
-    set_cell(row, 4, team.get('leader_email') or '', align=left)
-    set_cell(row, 5, '提交时间', font=bold_font, align=center)
-    set_cell(row, 6, submitted_at_str, align=center)
+    ws.write(row, 0, '联系电话', formats['label'])
+    ws.write(row, 1, team.get('leader_phone') or '', formats['left'])
+    ws.write(row, 2, '邮箱地址', formats['label'])
+    ws.write(row, 3, team.get('leader_email') or '', formats['left'])
+    ws.write(row, 4, '提交时间', formats['label'])
+    ws.write(row, 5, submitted_at_str, formats['center'])
     row += 1
 
     # 地址/简介：单独两行，value 跨列
-    set_cell(row, 1, '队伍地址', font=bold_font, align=center)
-    ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
-    set_cell(row, 2, team.get('team_address') or '', align=left)
+    ws.write(row, 0, '队伍地址', formats['label'])
+    ws.merge_range(row, 1, row, 5, team.get('team_address') or '', formats['left'])
     row += 1
 
-    set_cell(row, 1, '队伍简介', font=bold_font, align=center)
-    ws.merge_cells(start_row=row, start_column=2, end_row=row, end_column=6)
-    set_cell(row, 2, team.get('team_description') or '', align=left)
-    row += 1
+    ws.write(row, 0, '队伍简介', formats['label'])
+    ws.merge_range(row, 1, row, 5, team.get('team_description') or '', formats['left'])
+    row += 2
 
-    row += 1
+    for title, headers, rows, kind, empty_text in (
+        ('参赛选手列表', _PLAYER_HEADERS, players, 'player', '（暂无选手数据）'),
+        ('随行人员列表', _STAFF_HEADERS, staff, 'staff', '（暂无随行人员数据）'),
+    ):
+        ws.merge_range(row, 0, row, 5, title, formats['section'])
+        row += 1
+        for idx, header in enumerate(headers):
+            ws.write(row, idx, header, formats['label'])
+        row += 1
 
-    ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-    set_cell(row, 1, '参赛选手列表', font=header_font, fill=header_fill, align=left)
-    row += 1
+        start = row
+        for member in rows:
+            for idx, val in enumerate(_member_values(member, kind)):
+                ws.write(row, idx, val, formats['left'] if idx in (0, 1, 5) else formats['center'])
+            row += 1
+        if row == start:
+            ws.merge_range(row, 0, row, 5, empty_text, formats['center'])
+            row += 1
+        row += 1
 
-    player_headers = ['姓名', '身份证号', '联系电话', '性别', '年龄', '参赛项目']
-    for idx, h in enumerate(player_headers, start=1):
-        set_cell(row, idx, h, font=bold_font, align=center)
-    row += 1
 
-    if players:
-        for p in players:
-            events_text = _format_selected_events(
-                p.get('selected_events'),
-                p.get('competition_event'),
-            )
+def team_export_filename(team_name, suffix='xlsx'):
+    return f"{_safe_filename(team_name)}_队伍信息表_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{suffix}"
 
-            values = [
-                p.get('name') or '',
-                (p.get('id_card') or ''),
-                p.get('phone') or '',
-                _normalize_gender(p.get('gender')),
-                p.get('age') if p.get('age') is not None else '',
-                events_text,
-            ]
-            for idx, val in enumerate(values, start=1):
-                set_cell(row, idx, val, align=left if idx in [1, 2, 6] else center)
-            row += 1
-    else:
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-        set_cell(row, 1, '（暂无选手数据）', align=center)
-        row += 1
 
-    row += 1
+def attachment_headers(filename):
+    """Content-Disposition（中文文件名按 RFC 5987 编码）"""
+    return {'Content-Disposition': f"attachment; filename*=UTF-8''{quote(filename)}"}
 
-    ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-    set_cell(row, 1, '随行人员列表', font=header_font, fill=header_fill, align=left)
-    row += 1
 
-    staff_headers = ['姓名', '身份证号', '联系电话', '性别', '年龄', '角色/职务']
-    for idx, h in enumerate(staff_headers, start=1):
-        set_cell(row, idx, h, font=bold_font, align=center)
-    row += 1
+@teams_bp.route('/team/<int:team_id>/export', methods=['GET'])
+@log_action('导出队伍信息')
+@handle_db_errors
+def api_export_team_info(team_id):
+    """导出队伍信息表（xlsx）"""
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
 
-    if staff:
-        position_map = {
-            'coach': '教练',
-            'head_coach': '教练',
-            'manager': '领队',
-            'medical': '医务人员',
-            'doctor': '医务人员',
-            'staff': '随行人员',
-        }
-        for s in staff:
-            pos = s.get('position') or ''
-            pos_label = position_map.get(str(pos).lower(), pos)
-            values = [
-                s.get('name') or '',
-                s.get('id_card') or '',
-                s.get('phone') or '',
-                _normalize_gender(s.get('gender')),
-                s.get('age') if s.get('age') is not None else '',
-                pos_label,
-            ]
-            for idx, val in enumerate(values, start=1):
-                set_cell(row, idx, val, align=left if idx in [1, 2, 6] else center)
-            row += 1
-    else:
-        ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-        set_cell(row, 1, '（暂无随行人员数据）', align=center)
-        row += 1
+    user_role = session.get('user_role')
+    current_user_id = session.get('user_id')
+
+    db_manager = DatabaseManager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute(
+            f"SELECT {TEAM_EXPORT_FIELDS} FROM teams WHERE team_id = %s LIMIT 1",
+            (team_id,),
+        )
+        team = cursor.fetchone()
+        if not team:
+            cursor.close()
+            return jsonify({'success': False, 'message': '队伍不存在'}), 404
 
-    # Column widths
-    widths = [14, 20, 14, 22, 14, 44]
-    for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[chr(ord('A') + i - 1)].width = w
+        is_admin = user_role in ['admin', 'super_admin']
+        if not is_admin and team.get('created_by') != current_user_id:
+            cursor.close()
+            return jsonify({'success': False, 'message': '您没有权限导出此队伍信息'}), 403
 
-    # Row heights for header blocks
-    ws.row_dimensions[1].height = 28
+        event_id = team.get('event_id')
 
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+        cursor.close()
 
-    filename = f"{_safe_filename(team.get('team_name'))}_队伍信息表_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        workbook, path = new_workbook()
+        # 选手与随行人员用非缓冲游标按批读取、逐行写入，不在内存中保留整表；
+        # 选手行全部读完（写完）后才执行随行人员查询，同一连接上不会有未读结果
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        try:
+            worksheet = workbook.add_worksheet('队伍信息表')
+            formats = create_team_formats(workbook)
+
+            cursor.execute(
+                """
+                SELECT
+                    name,
+                    gender,
+                    age,
+                    phone,
+                    id_card,
+                    competition_event,
+                    selected_events
+                FROM team_players
+                WHERE team_id = %s AND event_id = %s
+                ORDER BY player_id ASC
+                """,
+                (team_id, event_id),
+            )
+            players = iter_rows(cursor)
+
+            def staff_rows():
+                cursor.execute(
+                    """
+                    SELECT
+                        name,
+                        position,
+                        gender,
+                        age,
+                        phone,
+                        id_card
+                    FROM team_staff
+                    WHERE team_id = %s AND event_id = %s AND status = 'active'
+                    ORDER BY staff_id ASC
+                    """,
+                    (team_id, event_id),
+                )
+                yield from iter_rows(cursor)
+
+            write_team_sheet(worksheet, formats, team, players, staff_rows())
+            workbook.close()
+        except Exception:
+            discard_file(path)
+            raise
+        finally:
+            cursor.close()
 
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename,
+    return Response(
+        iter_file_chunks(path),
+        mimetype=XLSX_MIMETYPE,
+        headers=attachment_headers(team_export_filename(team.get('team_name'))),
     )
@@ -0,0 +1,237 @@
+from flask import request, jsonify, session
+from io import BytesIO
+import logging
+import time
+
+from config import Config
+from database import DatabaseManager
+from utils.decorators import log_action, handle_db_errors
+from utils.roster_import import parse_roster, RosterImportError
+
+from . import teams_bp
+
+
+logger = logging.getLogger(__name__)
+
+_ACTIVE_PLAYER_SQL = "x.status NOT IN ('withdrawn', 'disqualified')"
+_ACTIVE_STAFF_SQL = "x.status = 'active'"
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _query_conflicts(cursor, table, filter_sql, event_id, candidates, exclude_team_id=None):
+    """查询本赛事内与 candidates 身份证号或手机号相同的记录，返回命中的行"""
+    id_cards = [r['id_card'] for r in candidates]
+    phones = [r['phone'] for r in candidates if r.get('phone')]
+    sql = f"SELECT x.id_card, x.phone FROM {table} x WHERE x.event_id = %s AND {filter_sql}"
+    params = [event_id]
+    if exclude_team_id is not None:
+        # 同一队伍同一身份证号的记录即本人（导入时会被更新），不算冲突
+        sql += f" AND NOT (x.team_id = %s AND x.id_card IN ({_placeholders(id_cards)}))"
+        params += [exclude_team_id, *id_cards]
+    sql += f" AND (x.id_card IN ({_placeholders(id_cards)})"
+    params += id_cards
+    if phones:
+        sql += f" OR x.phone IN ({_placeholders(phones)})"
+        params += phones
+    cursor.execute(sql + ")", tuple(params))
+    return cursor.fetchall()
+
+
+def _find_role_conflicts(cursor, event_id, team_id, kind, rows):
+    """整份名单按规则各查一次角色冲突，返回 {身份证号: 错误信息}
+
+    规则与单条添加接口一致：参赛人员与随行人员（position='staff'）互斥，
+    随行人员与教练/医务人员互斥。
+    """
+    if kind == 'players':
+        checks = [(
+            rows, 'team_staff', f"{_ACTIVE_STAFF_SQL} AND x.position = 'staff'", None,
+            '该人员已在本赛事登记为随行人员，不能登记为参赛人员',
+        )]
+    else:
+        staff_rows = [r for r in rows if r['position'] == 'staff']
+        role_rows = [r for r in rows if r['position'] in ('coach', 'medical')]
+        checks = [
+            (
+                staff_rows, 'team_players', _ACTIVE_PLAYER_SQL, None,
+                '该人员已在本赛事登记为参赛人员，不能登记为随行人员',
+            ),
+            (
+                staff_rows, 'team_staff', f"{_ACTIVE_STAFF_SQL} AND x.position IN ('coach', 'medical')", team_id,
+                '该人员已在本赛事登记为教练/医务人员，不能登记为随行人员',
+            ),
+            (
+                role_rows, 'team_staff', f"{_ACTIVE_STAFF_SQL} AND x.position = 'staff'", team_id,
+                '该人员已在本赛事登记为随行人员，不能登记为教练/医务人员',
+            ),
+        ]
+
+    conflicts = {}
+    for candidates, table, filter_sql, exclude_team_id, message in checks:
+        if not candidates:
+            continue
+        found = _query_conflicts(cursor, table, filter_sql, event_id, candidates, exclude_team_id)
+        hit_ids = {(r['id_card'] or '').upper() for r in found}
+        hit_phones = {r['phone'] for r in found if r['phone']}
+        for r in candidates:
+            if r['id_card'] in hit_ids or (r.get('phone') and r['phone'] in hit_phones):
+                conflicts.setdefault(r['id_card'], message)
+    return conflicts
+
+
+def _link_existing_users(cursor, rows):
+    """按手机号一次查出已注册用户，关联到队员行（批量导入不逐个创建账号）"""
+    phones = sorted({r['phone'] for r in rows if r.get('phone')})
+    if not phones:
+        return 0
+    cursor.execute(
+        f"SELECT user_id, phone FROM users WHERE phone IN ({_placeholders(phones)})",
+        tuple(phones),
+    )
+    user_ids = {r['phone']: r['user_id'] for r in cursor.fetchall()}
+    linked = 0
+    for r in rows:
+        r['user_id'] = user_ids.get(r.get('phone'))
+        if r['user_id']:
+            linked += 1
+    return linked
+
+
+@teams_bp.route('/team/<int:team_id>/import', methods=['POST'])
+@log_action('批量导入队伍名单')
+@handle_db_errors
+def api_import_team_roster(team_id):
+    """从 xlsx/csv 批量导入队员或随行人员
+
+    Form:
+        file: 名单文件（.xlsx / .csv，第一行为表头）
+        kind: players（默认）/ staff
+        dry_run: true 时只校验并返回报告，不写入
+        skip_invalid: true 时跳过有错误的行，只导入校验通过的行；默认有任何错误则整份不导入
+    """
+    if not session.get('logged_in'):
+        return jsonify({'success': False, 'message': '请先登录'}), 401
+
+    current_user_id = session.get('user_id')
+    user_role = session.get('user_role')
+
+    kind = (request.form.get('kind') or request.args.get('kind') or 'players').strip().lower()
+    dry_run = (request.form.get('dry_run') or '').lower() in ('1', 'true', 'yes')
+    skip_invalid = (request.form.get('skip_invalid') or '').lower() in ('1', 'true', 'yes')
+
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'message': '请上传名单文件'}), 400
+
+    started = time.perf_counter()
+    try:
+        result = parse_roster(
+            BytesIO(file.read()),
+            file.filename,
+            kind,
+            max_rows=getattr(Config, 'ROSTER_IMPORT_MAX_ROWS', 2000),
+        )
+    except RosterImportError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    db_manager = DatabaseManager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+
+        cursor.execute("SELECT team_id, event_id, created_by FROM teams WHERE team_id = %s", (team_id,))
+        team = cursor.fetchone()
+        if not team:
+            cursor.close()
+            return jsonify({'success': False, 'message': '队伍不存在'}), 404
+
+        is_admin = user_role in ['admin', 'super_admin']
+        if not (is_admin or team.get('created_by') == current_user_id):
+            cursor.close()
+            return jsonify({'success': False, 'message': '您没有权限为该队伍导入名单'}), 403
+
+        event_id = team['event_id']
+
+        if result.rows:
+            conflicts = _find_role_conflicts(cursor, event_id, team_id, kind, result.rows)
+            if conflicts:
+                valid = []
+                for row in result.rows:
+                    message = conflicts.get(row['id_card'])
+                    if message:
+                        result.add_error(row['_row'], 'id_card', message)
+                    else:
+                        valid.append(row)
+                result.rows = valid
+
+        report = result.to_report()
+        if result.errors and not skip_invalid:
+            cursor.close()
+            return jsonify({
+                'success': False,
+                'message': f'名单中有 {report["invalid_rows"]} 行数据有误，未导入任何数据',
+                'data': {'report': report},
+            }), 400
+
+        if dry_run or not result.rows:
+            cursor.close()
+            return jsonify({
+                'success': True,
+                'message': '校验完成' if dry_run else '没有可导入的数据',
+                'data': {'inserted': 0, 'updated': 0, 'dry_run': dry_run, 'report': report},
+            })
+
+        # 全部行在一个事务内分块 upsert，任何一块失败则整体回滚
+        try:
+            if kind == 'players':
+                linked = _link_existing_users(cursor, result.rows)
+                inserted, updated = db_manager.bulk_upsert_team_players_with_conn(
+                    conn, event_id, team_id, result.rows,
+                )
+                # 与单条添加一致：已关联账号的队员同时生成 participants 记录，评分与成绩才能看到
+                participants_created, _, participants_skipped = db_manager.bulk_ensure_participants_with_conn(
+                    conn, event_id, team_id, result.rows,
+                )
+            else:
+                linked = 0
+                participants_created = participants_skipped = 0
+                for row in result.rows:
+                    row['user_id'] = current_user_id
+                inserted, updated = db_manager.bulk_upsert_team_staff_with_conn(
+                    conn, event_id, team_id, result.rows, created_by=current_user_id,
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"队伍 {team_id} 导入{'队员' if kind == 'players' else '随行人员'}: "
+        f"新增 {inserted}，更新 {updated}，跳过 {report['invalid_rows']}，耗时 {elapsed_ms:.0f} ms"
+    )
+
+    message = f'导入完成：新增 {inserted} 人，更新 {updated} 人'
+    unlinked = len(result.rows) - linked if kind == 'players' else 0
+    if unlinked:
+        # participants.user_id 不可为空：未注册账号的队员要等关联账号后才会出现在评分与成绩中
+        message += f'；{unlinked} 人未找到手机号对应的账号，暂未生成参赛记录'
+
+    return jsonify({
+        'success': True,
+        'message': message,
+        'data': {
+            'inserted': inserted,
+            'updated': updated,
+            'linked_users': linked,
+            'unlinked_players': unlinked,
+            'participants_created': participants_created,
+            'participants_skipped': participants_skipped,
+            'elapsed_ms': round(elapsed_ms, 1),
+            'report': report,
+        },
+    })
@@ -172,6 +172,8 @@ def api_review_team_application(application_id):
                         'registered',
                     ),
                 )
+            player_id = exists['player_id'] if exists else cursor.lastrowid
+            db_manager.refresh_player_demographics_with_conn(conn, [player_id])
 
             # 确保 participants 有记录（参赛者列表页来源）
             if user_id and event_id:
@@ -2,6 +2,7 @@ from flask import request, jsonify, session
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.jobs import job_handler, enqueue_job
 
 from . import teams_bp
 
@@ -35,6 +36,18 @@ def _send_system_notification(user_id, title, content, priority='normal'):
         return False
 
 
+@job_handler('teams.notify_members')
+def run_notify_team_members(ctx, payload):
+    """后台任务：逐个通知队员队伍已报名成功"""
+    member_ids = payload.get('member_ids') or []
+    success_count = 0
+    for index, member_id in enumerate(member_ids, start=1):
+        if _send_system_notification(member_id, payload['title'], payload['content'], priority='important'):
+            success_count += 1
+        ctx.report_progress(index * 100 // len(member_ids), f'已通知 {index}/{len(member_ids)} 位队员')
+    return {'notified_members': success_count, 'total_members': len(member_ids)}
+
+
 def _persist_team_submission(team_id, current_user_id, user_role):
     db_manager = DatabaseManager()
     with db_manager.get_connection() as conn:
@@ -148,19 +161,23 @@ def api_submit_team_info():
             )
         title = '队伍报名成功'
         content = f'您所在的【{team_name}】已成功报名【{event_name}】。队长已完成队伍信息上报，请做好参赛准备。'
-        success_count = 0
-        for member_id in member_ids:
-            if _send_system_notification(member_id, title, content, priority='important'):
-                success_count += 1
+        # 队员通知交给后台任务执行，避免队员较多时阻塞请求
+        job_id = enqueue_job(
+            'teams.notify_members',
+            {'member_ids': member_ids, 'title': title, 'content': content},
+            created_by=current_user_id,
+        )
         return jsonify(
             {
                 'success': True,
-                'message': f'队伍信息上报成功，已通知 {success_count}/{len(member_ids)} 位队员',
+                'message': f'队伍信息上报成功，正在通知 {len(member_ids)} 位队员',
                 'submitted_at': submitted_at_iso,
                 'data': {
                     'submitted_at': submitted_at_iso,
-                    'notified_members': success_count,
+                    'notified_members': 0,
                     'total_members': len(member_ids),
+                    'job_id': job_id,
+                    'status_url': f'/api/jobs/{job_id}',
                 },
             }
         )
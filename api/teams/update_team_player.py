@@ -3,6 +3,7 @@ import json
 
 from database import DatabaseManager
 from utils.decorators import log_action, handle_db_errors
+from utils.helpers import id_card_gender_conflict
 
 from . import teams_bp
 
@@ -53,6 +54,11 @@ def api_update_team_player(team_id, player_id):
         else:
             candidate_id_card = (player.get('id_card') or '').strip() or None
 
+        # 性别以身份证号为准：本次明确提交的性别与（新的或已保存的）身份证号不一致时拒绝
+        if 'gender' in data and id_card_gender_conflict(candidate_id_card, data.get('gender')):
+            cursor.close()
+            return jsonify({'success': False, 'message': '性别与身份证号不符'}), 400
+
         candidate_phone = None
         if 'phone' in data and data.get('phone'):
             candidate_phone = str(data.get('phone')).strip()
@@ -163,6 +169,8 @@ def api_update_team_player(team_id, player_id):
             WHERE team_id = %s AND player_id = %s
         """
         cursor.execute(sql, tuple(params))
+        if 'id_card' in data or 'gender' in data:
+            db_manager.refresh_player_demographics_with_conn(conn, [player_id])
         conn.commit()
 
         updated_fields = [field.split('=')[0].strip() for field in fields]
@@ -3,6 +3,9 @@ from werkzeug.utils import secure_filename
 import os
 import sys
 import json
+import logging
+import uuid
+import hmac
 from datetime import datetime
 import time
 from user_manager import user_manager
@@ -20,13 +23,19 @@ load_dotenv()
 
 from config import config as config_map
 from models import UserRole, UserStatus
-from database import DatabaseManager
+from database import DatabaseManager, release_request_connection, get_request_db_metrics
+from utils.query_stats import get_request_query_stats, server_timing_header, check_repeated_queries
+from utils.metrics import observe_request, render_latest
+from utils.logging_setup import setup_logging
 #测试
 from api.account import auth_bp, users_bp
 from api.competition import events_bp, teams_bp, players_bp, participants_bp
 from api.communication import announcements_bp, notifications_bp
 from api.maintenance import maintenance_bp
 from api.dashboard import dashboard_bp
+from api.jobs import jobs_bp
+from utils.jobs import start_embedded_worker
+from utils.server_session import init_server_session, server_sessions_enabled, verify_server_session_store
 
 
 def create_app():
@@ -34,11 +43,17 @@ def create_app():
     env_name = os.environ.get('APP_ENV', 'default').lower()
     app.config.from_object(config_map.get(env_name, config_map['default']))
 
+    # 日志经内存队列由后台线程写出，须在首次访问 app.logger 之前完成
+    setup_logging(app.config.get('LOG_LEVEL'))
+
     if env_name == 'production' and not app.config.get('SECRET_KEY'):
         raise RuntimeError('SECRET_KEY environment variable is required in production')
 
     app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1)
 
+    # SESSION_BACKEND=redis/mysql 时改用服务端会话（Cookie 只保存会话 ID）
+    init_server_session(app)
+
     # Jinja2 模板空白压缩
     app.jinja_env.trim_blocks = True
     app.jinja_env.lstrip_blocks = True
@@ -55,25 +70,78 @@ def create_app():
     @app.before_request
     def start_request_timer():
         g.request_start_time = time.perf_counter()
+        g.request_id = (request.headers.get('X-Request-ID') or '')[:64] or uuid.uuid4().hex
 
     @app.after_request
     def log_request_time(response):
         start_time = getattr(g, 'request_start_time', None)
         if start_time is not None:
             duration_ms = (time.perf_counter() - start_time) * 1000
-            app.logger.info(
+            db_metrics = get_request_db_metrics() or {}
+            query_stats = get_request_query_stats()
+            app.logger.log(
+                logging.WARNING if response.status_code >= 500 else logging.INFO,
                 "Request %s %s took %.2fms, status %d",
                 request.method,
                 request.path,
                 duration_ms,
                 response.status_code,
+                extra={
+                    'method': request.method,
+                    'path': request.path,
+                    'status': response.status_code,
+                    'duration_ms': round(duration_ms, 2),
+                    'queries': query_stats.count if query_stats else 0,
+                    'db_ms': round(query_stats.total_ms, 2) if query_stats else 0.0,
+                    'rows': query_stats.rows if query_stats else 0,
+                    'db_checkouts': db_metrics.get('checkouts', 0),
+                    'db_reuses': db_metrics.get('reuses', 0),
+                    'pool_wait_ms': round(db_metrics.get('pool_wait_ms', 0.0), 2),
+                    'sample': response.status_code < 400,
+                },
+            )
+            if app.config.get('SERVER_TIMING_ENABLED', True):
+                response.headers['Server-Timing'] = server_timing_header(
+                    query_stats, duration_ms, db_metrics.get('pool_wait_ms'),
+                )
+            if app.config.get('METRICS_ENABLED', True):
+                observe_request(
+                    request.endpoint, request.method, response.status_code, duration_ms / 1000.0, query_stats,
+                )
+            check_repeated_queries(
+                query_stats,
+                app.config.get('QUERY_REPEAT_THRESHOLD', 10),
+                raise_error=app.config.get('TESTING', False),
+                label=f"{request.method} {request.path}",
             )
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
         path = request.path or ''
         if path.startswith('/static/'):
             response.headers['Cache-Control'] = 'public, max-age=604800'
         return response
 
-    # 应用启动时进行一次数据库结构检查与迁移（只增量修复，不重建）
+    def metrics():
+        """Prometheus 指标（合并所有 worker 的快照）"""
+        token = app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '')
+            if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+                return jsonify({'success': False, 'message': '未授权'}), 401
+        elif request.remote_addr not in ('127.0.0.1', '::1'):
+            # 未配置令牌时只允许本机抓取，避免路由、耗时等内部信息对外暴露
+            return jsonify({'success': False, 'message': '未配置 METRICS_TOKEN，仅允许本机访问'}), 403
+        body, content_type = render_latest()
+        return app.response_class(body, content_type=content_type)
+
+    if app.config.get('METRICS_ENABLED', True):
+        app.add_url_rule('/metrics', 'metrics', metrics)
+
+    # 请求级数据库连接在请求结束时统一归还连接池
+    app.teardown_appcontext(release_request_connection)
+
+    # 应用启动时检查数据库结构版本，只执行尚未执行的迁移（只增量修复，不重建）
     try:
         db_manager = DatabaseManager()
         db_manager.init_database(force_recreate=False)
@@ -91,6 +159,9 @@ def create_app():
             except Exception as retry_e:
                 app.logger.error(f"数据库重试初始化失败: {retry_e}")
 
+    # SESSION_BACKEND=mysql 而会话表缺失时每次保存会话都会失败（无人能登录），此时拒绝启动
+    verify_server_session_store(app)
+
     @app.before_request
     def check_user_status():
         path = request.path or ''
@@ -111,100 +182,44 @@ def create_app():
         if not session.get('logged_in'):
             return
 
-        current_user_id = session.get('user_id')
-        current_session_token = session.get('session_token')
-
-        # SSO + 用户状态统一使用同一个时间间隔控制，避免每个请求都查 DB
-        now_ts = time.time()
-        last_check = session.get('_combined_check_ts')
-        check_interval = app.config.get('USER_STATUS_CHECK_INTERVAL', 10)
-        if isinstance(last_check, (int, float)) and now_ts - last_check < check_interval:
-            return
+        def force_logout(message, flash_message=None, **extra):
+            session.clear()
+            if path.startswith('/api/'):
+                return jsonify({'success': False, 'message': message, 'force_logout': True, **extra})
+            flash(flash_message or message, 'error')
+            return redirect(url_for('login'))
 
-        if current_user_id:
+        # 校验过程只读会话，不写入任何字段：签名 Cookie 会话不会因此重新下发，服务端会话不会因此写存储
+        current_user_id = session.get('user_id')
+        if current_user_id and not server_sessions_enabled():
+            # 签名 Cookie 会话无法在服务端撤销，需比对单点登录会话标识（进程内缓存，变更时经失效总线失效）；
+            # 服务端会话在登录/冻结时已直接删除其他会话，无需比对
+            current_session_token = session.get('session_token')
             try:
-                db_manager = DatabaseManager()
-                db_token = db_manager.get_user_session_token(current_user_id)
-
-                if not current_session_token:
-                    session.clear()
-                    if path.startswith('/api/'):
-                        return jsonify({
-                            'success': False,
-                            'message': '会话已失效，请重新登录。',
-                            'force_logout': True,
-                        })
-                    flash('会话已失效，请重新登录。', 'error')
-                    return redirect(url_for('login'))
-
-                if not db_token:
-                    session.clear()
-                    if path.startswith('/api/'):
-                        return jsonify({
-                            'success': False,
-                            'message': '会话已失效，请重新登录。',
-                            'force_logout': True,
-                        })
-                    flash('会话已失效，请重新登录。', 'error')
-                    return redirect(url_for('login'))
-
-                if db_token != current_session_token:
-                    session.clear()
-                    if path.startswith('/api/'):
-                        return jsonify({
-                            'success': False,
-                            'message': '您的账号已在别处登录，请重新登录。',
-                            'force_logout': True,
-                        })
-                    flash('您的账号已在别处登录，请重新登录。', 'error')
-                    return redirect(url_for('login'))
+                db_token = DatabaseManager().get_user_session_token(current_user_id)
             except Exception:
-                session.clear()
-                if path.startswith('/api/'):
-                    return jsonify({
-                        'success': False,
-                        'message': '会话校验失败，请重新登录。',
-                        'force_logout': True,
-                    })
-                flash('会话校验失败，请重新登录。', 'error')
-                return redirect(url_for('login'))
+                return force_logout('会话校验失败，请重新登录。')
+            if not current_session_token or not db_token:
+                return force_logout('会话已失效，请重新登录。')
+            if db_token != current_session_token:
+                return force_logout('您的账号已在别处登录，请重新登录。')
 
         username = session.get('username')
         if not username:
-            session['_combined_check_ts'] = now_ts
             return
 
         try:
             user = user_manager.get_user(username)
-
-            if user and not user.can_login():
-                session.clear()
-                if path.startswith('/api/'):
-                    return jsonify({
-                        'success': False,
-                        'message': '账号状态异常或被冻结，已登出，请联系管理员。',
-                        'status': user.status.value,
-                        'status_display': user.get_status_display(),
-                        'force_logout': True,
-                    })
-                else:
-                    flash('账号状态异常或被冻结，请联系管理员。', 'error')
-                    return redirect(url_for('login'))
-
-            if user and user.can_login():
-                session['_combined_check_ts'] = now_ts
-
         except Exception:
-            session.clear()
-            if path.startswith('/api/'):
-                return jsonify({
-                    'success': False,
-                    'message': '会话校验失败，请重新登录。',
-                    'force_logout': True,
-                })
-            else:
-                flash('会话校验失败，请重新登录。', 'error')
-                return redirect(url_for('login'))
+            return force_logout('会话校验失败，请重新登录。')
+
+        if user and not user.can_login():
+            return force_logout(
+                '账号状态异常或被冻结，已登出，请联系管理员。',
+                flash_message='账号状态异常或被冻结，请联系管理员。',
+                status=user.status.value,
+                status_display=user.get_status_display(),
+            )
 
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(events_bp, url_prefix='/api/events')
@@ -216,11 +231,16 @@ def create_app():
     app.register_blueprint(announcements_bp, url_prefix='/api')
     app.register_blueprint(maintenance_bp, url_prefix='/api')
     app.register_blueprint(dashboard_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
 
     from api.competition import categories_bp
 
     app.register_blueprint(categories_bp, url_prefix='/api/categories')
 
+    # 进程内嵌的后台任务 worker；也可以关闭后单独运行 worker.py
+    if app.config.get('JOB_EMBEDDED_WORKER') and not app.config.get('TESTING'):
+        start_embedded_worker()
+
     return app
 
 
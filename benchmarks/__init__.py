@@ -0,0 +1,4 @@
+"""性能基准测试脚本集合（不依赖真实数据库，可直接以模块方式运行）。
+
+benchmarks.load 为需要真实 MySQL 库的端到端压测套件。
+"""
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+验证码生成吞吐基准测试
+
+对比三条路径：
+- legacy：每次生成都重新探测并加载字体（旧实现的行为，通过清空字体缓存模拟）；
+- cached：字体只加载一次，请求线程内直接绘制并编码 PNG；
+- pool：从预生成池出队（接口实际走的路径），池由后台线程补充。
+
+用法:
+    python -m benchmarks.bench_captcha --count 500 --pool-size 200
+"""
+
+import argparse
+import time
+
+from utils.captcha import CaptchaGenerator, CaptchaPool, MemoryCaptchaStore, _load_font
+
+
+def _measure(label, func, count):
+    timings = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    print(
+        f"{label:<8} {count / elapsed:10.0f} 张/秒   median {timings[len(timings) // 2]:8.3f} ms   "
+        f"p99 {timings[int(len(timings) * 0.99) - 1]:8.3f} ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='验证码生成吞吐基准测试')
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--pool-size', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    generator = CaptchaGenerator()
+
+    def legacy():
+        _load_font.cache_clear()
+        generator.generate()
+
+    _measure('legacy', legacy, args.count)
+    _measure('cached', generator.generate, args.count)
+
+    # 预先填满池，测量的是出队延迟；取用速度超过补充速度时会退化为当场生成
+    pool = CaptchaPool(generator, MemoryCaptchaStore(), size=args.pool_size)
+    pool.refill()
+    _measure('pool', pool.get, min(args.count, args.pool_size))
+    print(f"池统计: {pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+赛事成绩排名基准测试
+
+在合成赛事上对比三条路径的耗时与查询次数：
+- legacy：旧的「每个参赛者一次 SELECT」再在接口层逐个计算平均分；
+- rebuild：ScoreDbMixin.rebuild_leaderboard，按 event_id 一次读取全部成绩并集合式计算平均分，
+  写入 leaderboard 物化表（评分提交时的增量刷新只重算单个参赛者，这里给出整场的上限）；
+- leaderboard：ScoreDbMixin.get_event_leaderboard，成绩接口实际走的读路径，一次查询。
+
+用法:
+    python -m benchmarks.bench_event_results --participants 2000 --judges 7 --rtt-ms 0.5
+
+数据库以内存中的假连接模拟，每次 execute 额外等待 --rtt-ms 毫秒以模拟网络往返。
+排名由数据库的 RANK() 窗口函数计算，假连接在返回排行榜时按同样规则在内存中排名。
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from config import Config
+from db_modules.db_scores import LEADERBOARD_ALL_ROUNDS, ScoreDbMixin
+from utils.helpers import calculate_average_score
+
+
+class _FakeCursor:
+    def __init__(self, db):
+        self._db = db
+        self._rows = []
+
+    def _round_trip(self):
+        self._db.query_count += 1
+        if self._db.rtt_s:
+            time.sleep(self._db.rtt_s)
+
+    def execute(self, operation, params=None, multi=False):
+        self._round_trip()
+        if 'WHERE participant_id = %s' in operation:
+            self._rows = list(self._db.scores_by_participant.get(params[0], ()))
+        elif 'FROM score_modification_logs' in operation:
+            self._rows = []
+        elif 'DELETE FROM leaderboard' in operation:
+            self._db.leaderboard = []
+            self._rows = []
+        elif 'FROM leaderboard' in operation:
+            self._rows = self._db.ranked_leaderboard(params[-1])
+        else:
+            self._rows = list(self._db.all_rows)
+
+    def executemany(self, operation, seq_params):
+        self._round_trip()
+        self._db.leaderboard.extend(dict(entry) for entry in seq_params)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class _FakeConnection:
+    def __init__(self, db):
+        self._db = db
+
+    def cursor(self, *args, **kwargs):
+        return _FakeCursor(self._db)
+
+    def commit(self):
+        pass
+
+
+class _FakeConnectionContext:
+    def __init__(self, db):
+        self._db = db
+
+    def __enter__(self):
+        return _FakeConnection(self._db)
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class SyntheticEventDb(ScoreDbMixin):
+    """以合成数据实现 get_connection 的假数据库（单项目，event_item_id = 1）。"""
+
+    def __init__(self, participants, judges, rounds=1, rtt_ms=0.0, seed=42):
+        rng = random.Random(seed)
+        self.rtt_s = rtt_ms / 1000.0
+        self.query_count = 0
+        self.participant_ids = list(range(1, participants + 1))
+        self.scores_by_participant = {}
+        self.all_rows = []
+        self.leaderboard = []
+
+        for pid in self.participant_ids:
+            rows = []
+            for round_number in range(1, rounds + 1):
+                for judge_id in range(1, judges + 1):
+                    rows.append({
+                        'participant_id': pid,
+                        'total_score': Decimal(f'{rng.uniform(6.0, 9.9):.2f}'),
+                        'judge_id': judge_id,
+                        'round_number': round_number,
+                        'event_item_id': 1,
+                        'entry_id': pid,
+                    })
+            self.scores_by_participant[pid] = rows
+            self.all_rows.extend(rows)
+
+    def get_connection(self):
+        return _FakeConnectionContext(self)
+
+    def ranked_leaderboard(self, round_number):
+        """模拟 get_event_leaderboard 中的 RANK() OVER (PARTITION BY 项目, 轮次 ORDER BY 平均分 DESC)"""
+        rows = [dict(row) for row in self.leaderboard if row['round_number'] == round_number]
+        rows.sort(key=lambda row: (row['event_item_id'], row['average_score'] is None, -(row['average_score'] or 0)))
+        item_id = position = rank = last_score = None
+        for row in rows:
+            if row['event_item_id'] != item_id:
+                item_id, position, last_score = row['event_item_id'], 0, None
+            position += 1
+            if row['average_score'] is None:
+                row['rank_in_round'] = None
+                continue
+            if row['average_score'] != last_score:
+                rank, last_score = position, row['average_score']
+            row['rank_in_round'] = rank
+        return rows
+
+
+def legacy_event_results(db, event_id, scoring_config):
+    """旧实现：逐个参赛者查询成绩，再在接口层逐个计算平均分。"""
+    db.query_count += 1  # 参赛者列表
+    results = []
+    with db.get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        for participant_id in db.participant_ids:
+            cursor.execute(
+                """
+                SELECT total_score, judge_id, round_number
+                FROM scores
+                WHERE participant_id = %s
+                ORDER BY round_number, judge_id
+                """,
+                (participant_id,),
+            )
+            scores_list = [s['total_score'] for s in cursor.fetchall()]
+            results.append({
+                'participant_id': participant_id,
+                'score_count': len(scores_list),
+                'average_score': calculate_average_score(
+                    scores_list,
+                    drop_highest=scoring_config.get('drop_highest', True),
+                    drop_lowest=scoring_config.get('drop_lowest', True),
+                ) if scores_list else None,
+            })
+    return results
+
+
+def _measure(label, func, db, repeat):
+    timings = []
+    queries = 0
+    result = None
+    for _ in range(repeat):
+        db.query_count = 0
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+        queries = db.query_count
+    timings.sort()
+    print(
+        f"{label:<12} best {timings[0]:9.2f} ms   median {timings[len(timings) // 2]:9.2f} ms   "
+        f"queries {queries}"
+    )
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='赛事成绩排名基准测试')
+    parser.add_argument('--participants', type=int, default=2000)
+    parser.add_argument('--judges', type=int, default=7)
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--rtt-ms', type=float, default=0.5, help='模拟的每次查询网络往返耗时')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    db = SyntheticEventDb(args.participants, args.judges, args.rounds, args.rtt_ms)
+    scoring_config = Config.SCORING_CONFIG
+
+    print(
+        f"合成赛事: {args.participants} 名参赛者 x {args.judges} 名裁判 x {args.rounds} 轮, "
+        f"模拟往返 {args.rtt_ms} ms"
+    )
+    legacy = _measure('legacy', lambda: legacy_event_results(db, 1, scoring_config), db, args.repeat)
+    _measure('rebuild', lambda: db.rebuild_leaderboard(1), db, args.repeat)
+    board = _measure(
+        'leaderboard', lambda: db.get_event_leaderboard(1, round_number=LEADERBOARD_ALL_ROUNDS), db, args.repeat,
+    )
+
+    averages = {row['participant_id']: row['average_score'] for row in board}
+    mismatches = sum(
+        1 for old in legacy
+        if (float(old['average_score']) if old['average_score'] is not None else None)
+        != averages.get(old['participant_id'])
+    )
+    print(f"结果一致性: {len(legacy) - mismatches}/{len(legacy)} 条平均分一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热点纯函数微基准
+
+覆盖在大列表上逐行调用的 CPU 密集函数，每个函数在 10 / 1k / 100k 规模的合成输入上计时：
+
+- utils.helpers.calculate_average_score（每名参赛者 5~7 个裁判分）
+- utils.helpers.derive_player_demographics（身份证号推导出生日期/性别/年龄组，队员列表与参赛者创建共用）
+- api.teams.export_team_info._format_selected_events（导出时逐个队员格式化所报项目）
+- utils.helpers.verify_password（PBKDF2，代价高，只测 10 次）
+- utils.captcha.CaptchaGenerator.generate（需要 Pillow）
+
+结果以每个元素的耗时（ns/项，取多次重复的中位数）输出。--save 保存 JSON 基线，
+--compare 与基线对比，任一项变慢超过 --threshold 百分比时退出码为 1。
+
+用法:
+    python -m benchmarks.bench_hot_functions
+    python -m benchmarks.bench_hot_functions --save benchmarks/baselines/hot_functions.json
+    python -m benchmarks.bench_hot_functions --compare benchmarks/baselines/hot_functions.json --threshold 15
+    python -m benchmarks.bench_hot_functions --only average_score --scales 1000
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+from datetime import date
+from decimal import Decimal
+
+DEFAULT_SCALES = (10, 1000, 100000)
+
+_ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CHECK = '10X98765432'
+
+
+def _id_cards(n, rng):
+    """约 90% 合法 18 位身份证号，其余为 15 位旧号、错误日期和空值"""
+    cards = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.9:
+            birth = date(rng.randint(1950, 2018), rng.randint(1, 12), rng.randint(1, 28))
+            body = f"{rng.choice(['110101', '310104', '440305', '510107'])}{birth:%Y%m%d}{rng.randint(100, 999)}"
+            cards.append(body + _ID_CHECK[sum(int(d) * w for d, w in zip(body, _ID_WEIGHTS)) % 11])
+        elif roll < 0.95:
+            cards.append(f"{rng.randint(10 ** 14, 10 ** 15 - 1)}")
+        elif roll < 0.98:
+            cards.append(f"11010119991340{rng.randint(1000, 9999)}")
+        else:
+            cards.append('')
+    return cards
+
+
+class Case:
+    """一个基准项：setup(n, rng) 构造输入（缺少依赖时抛 ImportError 跳过），run(data) 处理全部 n 项"""
+
+    def __init__(self, name, setup, run, scales=DEFAULT_SCALES):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.scales = scales
+
+
+def _setup_average_score(n, rng):
+    from utils.helpers import calculate_average_score
+    rows = []
+    for _ in range(n):
+        judges = rng.choice([5, 5, 7, 7, 7, 6])
+        scores = [Decimal(f'{rng.gauss(8.5, 0.35):.2f}') for _ in range(judges)]
+        if rng.random() < 0.02:
+            scores[0] = None
+        rows.append(scores)
+    return calculate_average_score, rows
+
+
+def _run_average_score(data):
+    func, rows = data
+    for scores in rows:
+        func(scores, True, True)
+
+
+def _setup_player_demographics(n, rng):
+    from utils.helpers import derive_player_demographics
+    return derive_player_demographics, _id_cards(n, rng)
+
+
+def _run_player_demographics(data):
+    func, cards = data
+    for card in cards:
+        func(card, '男')
+
+
+def _setup_selected_events(n, rng):
+    from api.teams.export_team_info import _format_selected_events
+    names = ['长拳', '南拳', '太极拳', '剑术', '刀术', '枪术', '棍术', '太极剑']
+    rows = []
+    for _ in range(n):
+        picked = rng.sample(names, rng.randint(1, 3))
+        roll = rng.random()
+        if roll < 0.5:
+            rows.append((json.dumps(picked, ensure_ascii=False), None))
+        elif roll < 0.6:
+            rows.append((str(picked), None))
+        elif roll < 0.7:
+            rows.append((picked, None))
+        else:
+            rows.append((None, '、'.join(picked[:-1]) + ('和' + picked[-1] if len(picked) > 1 else picked[-1])))
+    return _format_selected_events, rows
+
+
+def _run_selected_events(data):
+    func, rows = data
+    for selected, competition in rows:
+        func(selected, competition)
+
+
+def _setup_verify_password(n, rng):
+    from utils.helpers import generate_password_hash, verify_password
+    pairs = []
+    for i in range(n):
+        password = f"pass-{rng.randint(0, 10 ** 9)}-{i}"
+        pairs.append((password, generate_password_hash(password)))
+    return verify_password, pairs
+
+
+def _run_verify_password(data):
+    func, pairs = data
+    for password, password_hash in pairs:
+        func(password, password_hash)
+
+
+def _setup_captcha(n, rng):
+    from utils.captcha import CaptchaGenerator
+    return CaptchaGenerator(), n
+
+
+def _run_captcha(data):
+    generator, n = data
+    for _ in range(n):
+        generator.generate()
+
+
+CASES = [
+    Case('average_score', _setup_average_score, _run_average_score),
+    Case('player_demographics', _setup_player_demographics, _run_player_demographics),
+    Case('format_selected_events', _setup_selected_events, _run_selected_events),
+    Case('verify_password', _setup_verify_password, _run_verify_password, scales=(10,)),
+    Case('captcha_generate', _setup_captcha, _run_captcha, scales=(10, 1000)),
+]
+
+
+def _measure(case, n, repeat, min_sample_s, seed):
+    data = case.setup(n, random.Random(seed))
+    case.run(data)  # 预热（导入、缓存、JIT 化的正则等）
+
+    # 小规模输入一次太快，循环多次使单个样本不少于 min_sample_s
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            case.run(data)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_s or loops >= 1 << 20:
+            break
+        loops *= max(2, int(min_sample_s / max(elapsed, 1e-9)))
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            case.run(data)
+        samples.append((time.perf_counter() - start) / loops)
+    samples.sort()
+    median = samples[len(samples) // 2]
+    return {
+        'n': n,
+        'median_ms': round(median * 1000, 4),
+        'best_ms': round(samples[0] * 1000, 4),
+        'per_item_ns': round(median / n * 1e9, 1),
+        'repeat': repeat,
+        'loops': loops,
+    }
+
+
+def run_cases(cases, scales=None, repeat=5, min_sample_s=0.05, seed=42):
+    results, skipped = {}, {}
+    for case in cases:
+        # --scales 只在该项自身允许的规模内生效，避免把 PBKDF2、验证码等高代价项放大到 10 万次
+        for n in [n for n in scales if n <= max(case.scales)] if scales else case.scales:
+            key = f"{case.name}[{n}]"
+            try:
+                results[key] = _measure(case, n, repeat, min_sample_s, seed)
+            except ImportError as e:
+                skipped[case.name] = str(e)
+                break
+            row = results[key]
+            print(
+                f"{key:<36} median {row['median_ms']:>12.4f} ms   best {row['best_ms']:>12.4f} ms   "
+                f"{row['per_item_ns']:>12.1f} ns/项"
+            )
+    for name, reason in skipped.items():
+        print(f"{name:<36} 跳过（缺少依赖: {reason}）")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """返回 [(项, 基线 ns/项, 当前 ns/项, 变化百分比)]，只含变慢超过 threshold% 的项"""
+    slower = []
+    for key, base in baseline.get('results', {}).items():
+        current = results.get(key)
+        if current is None or not base.get('per_item_ns'):
+            continue
+        change = (current['per_item_ns'] / base['per_item_ns'] - 1) * 100
+        if change > threshold:
+            slower.append((key, base['per_item_ns'], current['per_item_ns'], change))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='热点纯函数微基准')
+    parser.add_argument('--only', action='append', choices=[c.name for c in CASES], help='只运行指定项，可重复')
+    parser.add_argument('--scales', type=int, nargs='+', help='覆盖输入规模，例如 --scales 1000')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-sample-ms', type=float, default=50.0, help='单个样本的最短耗时')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--save', metavar='PATH', help='把结果保存为 JSON 基线')
+    parser.add_argument('--compare', metavar='PATH', help='与 JSON 基线对比')
+    parser.add_argument('--threshold', type=float, default=10.0, help='判定变慢的百分比')
+    args = parser.parse_args(argv)
+
+    cases = [c for c in CASES if not args.only or c.name in args.only]
+    results = run_cases(cases, args.scales, args.repeat, args.min_sample_ms / 1000.0, args.seed)
+
+    meta = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"基线已保存: {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        base_meta = baseline.get('meta', {})
+        if (base_meta.get('python'), base_meta.get('machine')) != (meta['python'], meta['machine']):
+            print(
+                f"注意: 基线环境 {base_meta.get('python')}/{base_meta.get('machine')} 与当前 "
+                f"{meta['python']}/{meta['machine']} 不同，结果仅供参考"
+            )
+        slower = compare(results, baseline, args.threshold)
+        for key, base_ns, current_ns, change in slower:
+            print(f"变慢: {key:<36} {base_ns:>12.1f} -> {current_ns:>12.1f} ns/项 (+{change:.1f}%)")
+        if slower:
+            print(f"{len(slower)} 项变慢超过 {args.threshold}%")
+            return 1
+        print(f"没有变慢超过 {args.threshold}% 的项")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
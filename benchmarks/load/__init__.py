@@ -0,0 +1,7 @@
+"""压测套件：合成赛事数据生成（datagen）、流量场景（scenarios）与场景驱动（run）。
+
+与 benchmarks 下其他脚本不同，压测需要一个可写的 MySQL 库（库名含 bench / load）：
+    DB_NAME=wushu_bench python -m benchmarks.load.datagen
+    DB_NAME=wushu_bench python -m benchmarks.load.run --save-baseline
+    DB_NAME=wushu_bench python -m benchmarks.load.run --compare
+"""
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成赛事数据生成器
+
+按 models.DATABASE_SCHEMA 建表（DatabaseManager.init_database），再批量写入：
+用户（管理员、裁判、领队、选手）、赛事、项目、队伍、队员（team_players）、参赛者、
+报名条目（entries / entry_members）和评分（scores），最后重建排行榜物化表。
+生成结果（账号、赛事/队伍/参赛者 ID）写入清单文件，供场景驱动读取。
+
+分布参照实际赛事：每个赛事的队伍数和每队人数按对数正态分布，多数队伍 5~20 人，
+少数大俱乐部上百人；每名选手报 1~3 个项目；裁判打分围绕 8.5 分正态分布。
+
+用法（只写入名称含 bench / load 的库，其余库需加 --force）:
+    DB_NAME=wushu_bench python -m benchmarks.load.datagen --events 3 --teams 60 --players 12
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from config import Config
+from database import DatabaseManager
+from utils.helpers import generate_password_hash, player_age_group
+
+DEFAULT_MANIFEST = 'load_manifest.json'
+DEFAULT_PASSWORD = 'LoadTest#2024'
+
+_ITEM_NAMES = ['长拳', '南拳', '太极拳', '剑术', '刀术', '枪术', '棍术', '太极剑', '对练', '集体项目']
+_SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗'
+_GIVEN = '伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英'
+_ID_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CHECK = '10X98765432'
+_BATCH_SIZE = 1000
+
+
+def random_id_card(rng, birth, male):
+    """生成校验位正确的 18 位身份证号"""
+    seq = rng.randrange(0, 50) * 2 + (1 if male else 0)
+    body = f"{rng.choice(['110101', '310104', '440305', '510107'])}{birth:%Y%m%d}{rng.randrange(10, 99)}{seq % 10}"
+    total = sum(int(d) * w for d, w in zip(body, _ID_WEIGHTS))
+    return body + _ID_CHECK[total % 11]
+
+
+def _lognormal_int(rng, median, sigma, low, high):
+    return max(low, min(high, int(round(rng.lognormvariate(math.log(median), sigma)))))
+
+
+def _next_id(cursor, table, pk):
+    cursor.execute(f"SELECT COALESCE(MAX({pk}), 0) + 1 FROM {table}")
+    return int(cursor.fetchone()[0])
+
+
+def _insert_many(cursor, table, columns, rows):
+    if not rows:
+        return
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), _BATCH_SIZE):
+        cursor.executemany(sql, rows[start:start + _BATCH_SIZE])
+
+
+class LoadDataGenerator:
+    """生成一套合成赛事数据，所有用户名、编号带上 tag，可在同一库中重复生成"""
+
+    def __init__(self, db_manager, seed=42, tag=None, password=DEFAULT_PASSWORD):
+        self.db = db_manager
+        self.rng = random.Random(seed)
+        self.tag = tag or f"lt{seed}_{int(time.time()) % 100000}"
+        self.password = password
+        self._password_hash = generate_password_hash(password)
+
+    def generate(self, events=3, teams_per_event=60, players_per_team=12, judges=7, rounds=1):
+        rng = self.rng
+        manifest = {'tag': self.tag, 'password': self.password, 'events': [], 'judges': []}
+        counts = dict.fromkeys(['users', 'teams', 'team_players', 'participants', 'entries', 'scores'], 0)
+
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            next_user = _next_id(cursor, 'users', 'user_id')
+            next_event = _next_id(cursor, 'events', 'event_id')
+            next_item = _next_id(cursor, 'event_items', 'event_item_id')
+            next_team = _next_id(cursor, 'teams', 'team_id')
+            next_participant = _next_id(cursor, 'participants', 'participant_id')
+            next_entry = _next_id(cursor, 'entries', 'entry_id')
+
+            users = []
+
+            def add_user(role, real_name, gender=None, id_card=None, birth=None):
+                nonlocal next_user
+                user_id = next_user
+                next_user += 1
+                username = f"{self.tag}_{role}_{user_id}"
+                users.append((
+                    user_id, username, real_name, real_name, f"{username}@load.test",
+                    f"139{user_id % 100000000:08d}", id_card, gender, birth, role, True, 'normal', self._password_hash,
+                ))
+                return user_id, username
+
+            admin_id, admin_name = add_user('admin', '压测管理员')
+            manifest['admin'] = {'user_id': admin_id, 'username': admin_name}
+            for j in range(judges):
+                judge_id, judge_name = add_user('judge', f'裁判{j + 1}')
+                manifest['judges'].append({'user_id': judge_id, 'username': judge_name})
+
+            event_rows, item_rows, team_rows, player_rows = [], [], [], []
+            participant_rows, entry_rows, member_rows, score_rows = [], [], [], []
+            id_cards = set()
+            now = datetime.now().replace(microsecond=0)
+
+            for e in range(events):
+                event_id = next_event
+                next_event += 1
+                event_rows.append((
+                    event_id, f"{self.tag} 压测赛事 {e + 1}", now + timedelta(days=30), now + timedelta(days=32),
+                    '压测场馆', 100000, now - timedelta(days=10), now + timedelta(days=20), 'published', admin_id,
+                ))
+
+                items = []
+                for order, name in enumerate(_ITEM_NAMES[:rng.randint(6, len(_ITEM_NAMES))]):
+                    item_type = 'team' if name == '集体项目' else ('pair' if name == '对练' else 'individual')
+                    items.append((next_item, item_type))
+                    item_rows.append((next_item, event_id, name, f"I{order + 1:02d}", item_type, rounds, order))
+                    next_item += 1
+                # 个人项目远多于对练 / 集体项目
+                item_weights = [8 if t == 'individual' else 1 for _, t in items]
+
+                event_manifest = {'event_id': event_id, 'teams': [], 'participants': []}
+                member_no = 0
+                for t in range(_lognormal_int(rng, teams_per_event, 0.3, 1, teams_per_event * 4)):
+                    team_id = next_team
+                    next_team += 1
+                    leader_id, leader_name = add_user('user', f'领队{team_id}')
+                    team_rows.append((
+                        team_id, event_id, f"{self.tag} 代表队 {team_id}", '俱乐部', leader_id, f'领队{team_id}',
+                        f"138{team_id % 100000000:08d}", 'active', leader_id,
+                    ))
+                    event_manifest['teams'].append({'team_id': team_id, 'leader': leader_name})
+
+                    for _ in range(_lognormal_int(rng, players_per_team, 0.6, 1, players_per_team * 10)):
+                        male = rng.random() < 0.55
+                        age = rng.choices([rng.randint(7, 12), rng.randint(13, 17), rng.randint(18, 35), rng.randint(36, 65)],
+                                          weights=[35, 30, 25, 10])[0]
+                        birth = date(now.year - age, rng.randint(1, 12), rng.randint(1, 28))
+                        id_card = random_id_card(rng, birth, male)
+                        while id_card in id_cards:
+                            id_card = random_id_card(rng, birth, male)
+                        id_cards.add(id_card)
+                        name = rng.choice(_SURNAMES) + ''.join(rng.choice(_GIVEN) for _ in range(rng.randint(1, 2)))
+                        gender = '男' if male else '女'
+                        user_id, _ = add_user('user', name, 'male' if male else 'female', id_card, birth)
+
+                        participant_id = next_participant
+                        next_participant += 1
+                        member_no += 1
+                        k = rng.choices([1, 2, 3], weights=[50, 35, 15])[0]
+                        chosen = sorted(set(rng.choices(items, weights=item_weights, k=k)))
+                        participant_rows.append((
+                            participant_id, event_id, user_id, f"{self.tag}-P{participant_id}", member_no,
+                            _ITEM_NAMES[0], gender, player_age_group(age), 'registered',
+                        ))
+                        player_rows.append((
+                            event_id, team_id, user_id, participant_id, name, gender, age, birth, player_age_group(age),
+                            f"137{user_id % 100000000:08d}", id_card, json.dumps([i for i, _ in chosen]), 'approved',
+                        ))
+                        event_manifest['participants'].append(participant_id)
+
+                        for item_id, item_type in chosen:
+                            entry_id = next_entry
+                            next_entry += 1
+                            entry_rows.append((
+                                entry_id, event_id, item_id, team_id, item_type, f"{self.tag}-E{entry_id}",
+                                'registered', leader_id,
+                            ))
+                            member_rows.append((entry_id, user_id, 'main', 1))
+                            # 评分在 scores 中按参赛者 + 裁判 + 轮次唯一，只为第一个项目打分
+                            if item_id != chosen[0][0]:
+                                continue
+                            skill = rng.gauss(8.5, 0.4)
+                            for round_number in range(1, rounds + 1):
+                                for judge in manifest['judges']:
+                                    technique = max(0.0, min(5.0, rng.gauss(skill / 2, 0.15)))
+                                    performance = max(0.0, min(5.0, rng.gauss(skill / 2, 0.15)))
+                                    deduction = rng.choice([0.0] * 8 + [0.1, 0.3])
+                                    score_rows.append((
+                                        participant_id, judge['user_id'], round_number, round(technique, 2),
+                                        round(performance, 2), deduction, event_id, item_id, entry_id,
+                                    ))
+                manifest['events'].append(event_manifest)
+
+            _insert_many(cursor, 'users', (
+                'user_id', 'username', 'real_name', 'nickname', 'email', 'phone', 'id_card', 'gender', 'birthdate',
+                'role', 'is_active', 'status', 'password_hash',
+            ), users)
+            _insert_many(cursor, 'events', (
+                'event_id', 'name', 'start_date', 'end_date', 'location', 'max_participants',
+                'registration_start_time', 'registration_deadline', 'status', 'created_by',
+            ), event_rows)
+            _insert_many(cursor, 'event_items', (
+                'event_item_id', 'event_id', 'name', 'code', 'type', 'rounds', 'sort_order',
+            ), item_rows)
+            _insert_many(cursor, 'teams', (
+                'team_id', 'event_id', 'team_name', 'team_type', 'leader_id', 'leader_name', 'leader_phone',
+                'status', 'created_by',
+            ), team_rows)
+            _insert_many(cursor, 'participants', (
+                'participant_id', 'event_id', 'user_id', 'registration_number', 'event_member_no', 'category',
+                'gender', 'age_group', 'status',
+            ), participant_rows)
+            _insert_many(cursor, 'team_players', (
+                'event_id', 'team_id', 'user_id', 'participant_id', 'name', 'gender', 'age', 'birth_date',
+                'age_group', 'phone', 'id_card', 'selected_events', 'status',
+            ), player_rows)
+            _insert_many(cursor, 'entries', (
+                'entry_id', 'event_id', 'event_item_id', 'team_id', 'entry_type', 'registration_number',
+                'status', 'created_by',
+            ), entry_rows)
+            _insert_many(cursor, 'entry_members', ('entry_id', 'user_id', 'role', 'order_in_entry'), member_rows)
+            _insert_many(cursor, 'scores', (
+                'participant_id', 'judge_id', 'round_number', 'technique_score', 'performance_score', 'deduction',
+                'event_id', 'event_item_id', 'entry_id',
+            ), score_rows)
+            conn.commit()
+            cursor.close()
+
+        for event_manifest in manifest['events']:
+            self.db.rebuild_leaderboard(event_manifest['event_id'])
+
+        counts.update(
+            users=len(users), teams=len(team_rows), team_players=len(player_rows),
+            participants=len(participant_rows), entries=len(entry_rows), scores=len(score_rows),
+        )
+        manifest['counts'] = counts
+        return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='生成压测用的合成赛事数据')
+    parser.add_argument('--events', type=int, default=3)
+    parser.add_argument('--teams', type=int, default=60, help='每个赛事的队伍数（中位数）')
+    parser.add_argument('--players', type=int, default=12, help='每队人数（中位数）')
+    parser.add_argument('--judges', type=int, default=7)
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST, help='生成结果清单的输出路径')
+    parser.add_argument('--force', action='store_true', help='允许写入名称不含 bench / load 的数据库')
+    args = parser.parse_args(argv)
+
+    db_name = Config.DB_NAME or ''
+    if not args.force and 'bench' not in db_name and 'load' not in db_name:
+        parser.error(f"当前数据库为 {db_name}，为避免写入业务库，请使用名称含 bench / load 的库或加 --force")
+
+    db = DatabaseManager()
+    db.init_database(force_recreate=False)
+
+    start = time.perf_counter()
+    manifest = LoadDataGenerator(db, seed=args.seed).generate(
+        events=args.events,
+        teams_per_event=args.teams,
+        players_per_team=args.players,
+        judges=args.judges,
+        rounds=args.rounds,
+    )
+    with open(args.manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    counts = ', '.join(f"{k} {v}" for k, v in manifest['counts'].items())
+    print(f"已写入 {db_name}（{time.perf_counter() - start:.1f} s）: {counts}")
+    print(f"清单: {args.manifest}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测场景驱动
+
+按场景的流量组合由多个虚拟用户并发发起请求，统计每类请求的 p50 / p95 / p99 耗时、错误率
+和每请求 SQL 条数（取自 Server-Timing 响应头的 db 指标，进程内调用则直接统计）。
+
+两种运行方式：
+- 默认在本进程内通过 Flask test client 调用应用（不经过网络，最能反映应用本身的开销）；
+- --base-url 指向本地 gunicorn 等真实服务，经 HTTP 调用（服务端需设置 RATE_LIMIT_ENABLED=false）。
+
+基线：--save-baseline 把结果写入 baselines/<场景>.json；--compare 与基线比较，
+p95 变慢超过 --tolerance、每请求 SQL 条数增加或错误率上升时以退出码 1 结束，
+缺少所选场景的基线时以退出码 2 结束，可直接用于 CI。
+
+用法:
+    DB_NAME=wushu_bench python -m benchmarks.load.datagen
+    DB_NAME=wushu_bench python -m benchmarks.load.run --scenario live_scoring --users 20 --duration 30
+    DB_NAME=wushu_bench python -m benchmarks.load.run --scenario live_scoring --compare
+"""
+
+import os
+
+# 必须在导入任何项目模块之前设置：config.Config 在导入时读取环境变量，
+# 而 scenarios -> datagen 会先于应用导入 config。压测账号集中登录，关闭限流；本进程不启动内嵌任务 worker
+os.environ['RATE_LIMIT_ENABLED'] = 'false'
+os.environ['JOB_EMBEDDED_WORKER'] = 'false'
+os.environ.setdefault('SERVER_TIMING_ENABLED', 'true')
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+_QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def _parse_queries(server_timing):
+    if not server_timing:
+        return None
+    match = _QUERIES_RE.search(server_timing)
+    return int(match.group(1)) if match else None
+
+
+def _cookie_header(set_cookie_values):
+    pairs = [value.split(';', 1)[0].strip() for value in set_cookie_values if value]
+    return '; '.join(p for p in pairs if '=' in p and not p.endswith('='))
+
+
+class AppTransport:
+    """进程内调用：Flask test client（不自动维护 Cookie，由驱动显式传入）"""
+
+    mode = 'app'
+
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client(use_cookies=False)
+
+    def clone(self):
+        return AppTransport(self.app)
+
+    def login(self, username, password):
+        response = self.client.post('/api/auth/login', json={'username': username, 'password': password})
+        if response.status_code != 200:
+            raise RuntimeError(f"登录失败 {username}: {response.status_code} {response.get_data(as_text=True)[:200]}")
+        return _cookie_header(response.headers.getlist('Set-Cookie'))
+
+    def request(self, method, path, payload, cookie):
+        headers = {'Cookie': cookie} if cookie else {}
+        response = self.client.open(path, method=method, json=payload, headers=headers)
+        response.get_data()
+        return response.status_code, _parse_queries(response.headers.get('Server-Timing'))
+
+
+class HttpTransport:
+    """经 HTTP 调用已启动的服务（每个虚拟用户一个 requests.Session，复用连接）"""
+
+    mode = 'http'
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def clone(self):
+        return HttpTransport(self.base_url, self.timeout)
+
+    def login(self, username, password):
+        response = self.session.post(
+            f"{self.base_url}/api/auth/login", json={'username': username, 'password': password}, timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"登录失败 {username}: {response.status_code} {response.text[:200]}")
+        return '; '.join(f"{k}={v}" for k, v in response.cookies.items())
+
+    def request(self, method, path, payload, cookie):
+        headers = {'Cookie': cookie} if cookie else {}
+        response = self.session.request(
+            method, f"{self.base_url}{path}", json=payload, headers=headers, timeout=self.timeout,
+            allow_redirects=False,
+        )
+        return response.status_code, _parse_queries(response.headers.get('Server-Timing'))
+
+
+class StepStats:
+    __slots__ = ('latencies', 'queries', 'errors', 'statuses')
+
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.errors = 0
+        self.statuses = {}
+
+    def add(self, latency_ms, status, queries):
+        self.latencies.append(latency_ms)
+        if queries is not None:
+            self.queries.append(queries)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 'exception' or (isinstance(status, int) and status >= 400):
+            self.errors += 1
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.queries.extend(other.queries)
+        self.errors += other.errors
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(stats):
+    values = sorted(stats.latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'errors': stats.errors,
+        'error_rate': round(stats.errors / count, 4) if count else 0.0,
+        'p50_ms': round(percentile(values, 50), 2),
+        'p95_ms': round(percentile(values, 95), 2),
+        'p99_ms': round(percentile(values, 99), 2),
+        'max_ms': round(values[-1], 2) if values else 0.0,
+        'queries_per_request': round(sum(stats.queries) / len(stats.queries), 2) if stats.queries else None,
+        'statuses': {str(k): v for k, v in sorted(stats.statuses.items(), key=lambda item: str(item[0]))},
+    }
+
+
+def _run_virtual_user(scenario, manifest, vu, transport, cookie, db, deadline, warmup_until, think_s, seed, results):
+    from utils.query_stats import capture_queries
+
+    rng = random.Random(seed)
+    local = {}
+    while time.perf_counter() < deadline:
+        step = scenario.pick(rng)
+        action = step.build(manifest, vu, rng)
+        start = time.perf_counter()
+        try:
+            if callable(action):
+                with capture_queries() as captured:
+                    action(db)
+                status, queries = 200, captured.stats.count
+            else:
+                method, path, payload = action
+                status, queries = transport.request(method, path, payload, cookie)
+        except Exception:
+            status, queries = 'exception', None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if start >= warmup_until:
+            local.setdefault(step.name, StepStats()).add(elapsed_ms, status, queries)
+        if think_s:
+            time.sleep(think_s * rng.uniform(0.5, 1.5))
+    results.append(local)
+
+
+def run_scenario(scenario, manifest, transport, users, duration, warmup=0.0, think_ms=0.0, seed=1):
+    """运行一个场景，返回报告字典"""
+    from database import DatabaseManager
+
+    virtual_users = scenario.virtual_users(manifest, users, seed=seed)
+    cookies = {}
+    for vu in virtual_users:
+        if vu.username not in cookies:
+            cookies[vu.username] = transport.login(vu.username, manifest['password'])
+
+    db = DatabaseManager()
+    results = []
+    start = time.perf_counter()
+    warmup_until = start + warmup
+    deadline = warmup_until + duration
+    threads = [
+        threading.Thread(
+            target=_run_virtual_user,
+            args=(scenario, manifest, vu, transport.clone(), cookies[vu.username], db,
+                  deadline, warmup_until, think_ms / 1000.0, seed * 1000 + index, results),
+            daemon=True,
+        )
+        for index, vu in enumerate(virtual_users)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    merged = {}
+    overall = StepStats()
+    for local in results:
+        for name, stats in local.items():
+            merged.setdefault(name, StepStats()).merge(stats)
+            overall.merge(stats)
+
+    summary = summarize(overall)
+    return {
+        'scenario': scenario.name,
+        'mode': transport.mode,
+        'users': users,
+        'duration_s': duration,
+        'throughput_rps': round(summary['count'] / duration, 1) if duration else 0.0,
+        'overall': summary,
+        'steps': {name: summarize(stats) for name, stats in sorted(merged.items())},
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance=0.2, min_delta_ms=2.0):
+    """返回回归描述列表：p95 变慢超过 tolerance（且超过 min_delta_ms）、SQL 条数增加、错误率上升"""
+    regressions = []
+    for name, base in baseline.get('steps', {}).items():
+        current = report['steps'].get(name)
+        if current is None or not current['count']:
+            continue
+        if (current['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+                and current['p95_ms'] - base['p95_ms'] > min_delta_ms):
+            regressions.append(
+                f"{name}: p95 {base['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms "
+                f"(+{(current['p95_ms'] / base['p95_ms'] - 1) * 100 if base['p95_ms'] else 0:.0f}%)"
+            )
+        base_queries = base.get('queries_per_request')
+        if base_queries is not None and current['queries_per_request'] is not None:
+            if current['queries_per_request'] > base_queries + max(0.5, base_queries * 0.1):
+                regressions.append(
+                    f"{name}: 每请求 SQL {base_queries} -> {current['queries_per_request']}"
+                )
+        if current['error_rate'] > base.get('error_rate', 0.0) + 0.01:
+            regressions.append(f"{name}: 错误率 {base.get('error_rate', 0.0):.2%} -> {current['error_rate']:.2%}")
+    return regressions
+
+
+def print_report(report):
+    print(
+        f"场景 {report['scenario']}（{report['mode']}）: {report['users']} 个虚拟用户, {report['duration_s']} s, "
+        f"{report['overall']['count']} 次请求, {report['throughput_rps']} req/s, "
+        f"错误率 {report['overall']['error_rate']:.2%}"
+    )
+    print(f"{'步骤':<24}{'次数':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'SQL/请求':>10}{'错误':>8}")
+    for name, step in list(report['steps'].items()) + [('(overall)', report['overall'])]:
+        queries = '-' if step['queries_per_request'] is None else f"{step['queries_per_request']:.1f}"
+        print(
+            f"{name:<24}{step['count']:>8}{step['p50_ms']:>10.2f}{step['p95_ms']:>10.2f}"
+            f"{step['p99_ms']:>10.2f}{queries:>10}{step['errors']:>8}"
+        )
+
+
+def _create_app():
+    from app import app
+    return app
+
+
+def main(argv=None):
+    from benchmarks.load.scenarios import SCENARIOS
+
+    parser = argparse.ArgumentParser(description='武术赛事管理系统压测场景驱动')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', dest='scenarios',
+                        help='要运行的场景，可重复；默认运行全部')
+    parser.add_argument('--manifest', default='load_manifest.json', help='datagen 生成的清单')
+    parser.add_argument('--base-url', help='经 HTTP 压测已启动的服务，例如 http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=10, help='并发虚拟用户数')
+    parser.add_argument('--duration', type=float, default=30.0, help='每个场景的统计时长（秒）')
+    parser.add_argument('--warmup', type=float, default=3.0, help='预热时长（秒），不计入统计')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='虚拟用户两次请求之间的平均间隔')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline-dir', default=BASELINE_DIR)
+    parser.add_argument('--save-baseline', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--compare', action='store_true', help='与基线比较，出现回归时退出码为 1')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='p95 允许变慢的比例')
+    parser.add_argument('--report', help='把完整结果写入 JSON 文件')
+    args = parser.parse_args(argv)
+
+    scenario_names = args.scenarios or sorted(SCENARIOS)
+    if args.compare and not args.save_baseline:
+        # 缺少基线时直接失败，不能让 CI 在没有比较的情况下通过
+        missing = [
+            name for name in scenario_names
+            if not os.path.exists(os.path.join(args.baseline_dir, f"{name}.json"))
+        ]
+        if missing:
+            for name in missing:
+                print(f"没有基线 {os.path.join(args.baseline_dir, f'{name}.json')}，请先用 --save-baseline 生成")
+            return 2
+
+    with open(args.manifest, encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    transport = HttpTransport(args.base_url) if args.base_url else AppTransport(_create_app())
+
+    reports, regressions = [], []
+    for name in scenario_names:
+        report = run_scenario(
+            SCENARIOS[name], manifest, transport, args.users, args.duration,
+            warmup=args.warmup, think_ms=args.think_ms, seed=args.seed,
+        )
+        reports.append(report)
+        print_report(report)
+
+        baseline_path = os.path.join(args.baseline_dir, f"{name}.json")
+        if args.compare and os.path.exists(baseline_path):
+            with open(baseline_path, encoding='utf-8') as f:
+                found = compare_with_baseline(report, json.load(f), args.tolerance)
+            for line in found:
+                print(f"  回归: {line}")
+            regressions.extend(found)
+        if args.save_baseline:
+            os.makedirs(args.baseline_dir, exist_ok=True)
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"  基线已保存: {baseline_path}")
+        print()
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能回归")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
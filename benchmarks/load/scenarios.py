@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测场景：按实际观察到的流量组合加权抽取请求
+
+每个场景给出虚拟用户使用的账号（role）和加权步骤列表；步骤函数接收 (manifest, vu, rng)，
+返回 HTTP 请求 (method, path, json) 或一个直接在驱动进程内执行的可调用对象（例如评分写入，
+评分接口未注册为 HTTP 路由，直接调用 DatabaseManager，与 Web 进程共用同一数据库）。
+"""
+
+import random
+from datetime import date
+
+from benchmarks.load.datagen import random_id_card
+from models import Score
+
+
+class VirtualUser:
+    """一个虚拟用户的身份与随机选中的赛事/队伍"""
+
+    def __init__(self, username, event, team=None, user_id=None):
+        self.username = username
+        self.event = event
+        self.team = team
+        self.user_id = user_id
+        self.players_added = 0
+
+
+class Step:
+    def __init__(self, name, weight, build):
+        self.name = name
+        self.weight = weight
+        self.build = build
+
+
+class Scenario:
+    """场景：name、账号角色、步骤及其权重"""
+
+    def __init__(self, name, description, role, steps):
+        self.name = name
+        self.description = description
+        self.role = role
+        self.steps = steps
+        self._weights = [s.weight for s in steps]
+
+    def pick(self, rng):
+        return rng.choices(self.steps, weights=self._weights)[0]
+
+    def virtual_users(self, manifest, count, seed=0):
+        """按角色从清单中分配账号：leader 每人一个队伍账号；judge / admin 轮流使用清单中的账号
+
+        同一账号重复登录会挤掉前一个会话，驱动对每个账号只登录一次，共用该账号的虚拟用户共享 Cookie。
+        """
+        rng = random.Random(seed)
+        users = []
+        for index in range(count):
+            event = manifest['events'][index % len(manifest['events'])]
+            if self.role == 'leader':
+                team = event['teams'][(index // len(manifest['events'])) % len(event['teams'])]
+                users.append(VirtualUser(team['leader'], event, team))
+            elif self.role == 'judge':
+                judge = manifest['judges'][index % len(manifest['judges'])]
+                users.append(VirtualUser(judge['username'], event, rng.choice(event['teams']), judge['user_id']))
+            else:
+                users.append(VirtualUser(manifest['admin']['username'], event, rng.choice(event['teams'])))
+        return users
+
+
+def _new_player(manifest, vu, rng):
+    """报名高峰：领队为自己的队伍新增一名选手"""
+    vu.players_added += 1
+    birth = date(2010 + rng.randint(0, 8), rng.randint(1, 12), rng.randint(1, 28))
+    return 'POST', f"/api/team/{vu.team['team_id']}/players", {
+        'event_id': vu.event['event_id'],
+        'real_name': f"新增选手{vu.players_added}",
+        'id_card': random_id_card(rng, birth, rng.random() < 0.5),
+        'phone': f"136{rng.randint(0, 99999999):08d}",
+        'competition_event': '长拳',
+    }
+
+
+def _submit_score(manifest, vu, rng):
+    """现场评分：裁判为随机参赛者提交（或修改）本轮分数"""
+    participant_id = rng.choice(vu.event['participants'])
+    technique = round(rng.uniform(3.8, 4.8), 2)
+    performance = round(rng.uniform(3.8, 4.8), 2)
+
+    def call(db):
+        return db.create_or_update_score(Score(
+            participant_id=participant_id,
+            judge_id=vu.user_id,
+            round_number=1,
+            technique_score=technique,
+            performance_score=performance,
+            deduction=0.0,
+        ))
+
+    return call
+
+
+REGISTRATION_SPIKE = Scenario(
+    'registration_spike',
+    '报名开放高峰：领队浏览赛事、查看/维护本队名单、新增选手',
+    'leader',
+    [
+        Step('events.list', 30, lambda m, vu, rng: ('GET', '/api/events/', None)),
+        Step('events.detail', 15, lambda m, vu, rng: ('GET', f"/api/events/{vu.event['event_id']}", None)),
+        Step('teams.my_team', 15, lambda m, vu, rng: ('GET', f"/api/events/{vu.event['event_id']}/my-team", None)),
+        Step('teams.players', 20, lambda m, vu, rng: ('GET', f"/api/team/{vu.team['team_id']}/players", None)),
+        Step('teams.add_player', 15, _new_player),
+        Step('auth.captcha', 5, lambda m, vu, rng: ('GET', '/api/auth/captcha', None)),
+    ],
+)
+
+LIVE_SCORING = Scenario(
+    'live_scoring',
+    '比赛进行中：裁判持续评分，同时大量轮询成绩',
+    'judge',
+    [
+        Step('events.results', 60, lambda m, vu, rng: ('GET', f"/api/events/{vu.event['event_id']}/results", None)),
+        Step('events.participants', 10, lambda m, vu, rng: (
+            'GET', f"/api/events/{vu.event['event_id']}/participants", None,
+        )),
+        Step('scores.submit', 30, _submit_score),
+    ],
+)
+
+ADMIN_EXPORT = Scenario(
+    'admin_export',
+    '赛前导出：管理员批量导出队伍信息和参赛者名单',
+    'admin',
+    [
+        Step('teams.export_event', 40, lambda m, vu, rng: (
+            'GET', f"/api/events/{vu.event['event_id']}/teams/export", None,
+        )),
+        Step('teams.export_team', 40, lambda m, vu, rng: ('GET', f"/api/team/{vu.team['team_id']}/export", None)),
+        Step('participants.list', 20, lambda m, vu, rng: (
+            'GET', f"/api/participants/list?event_id={vu.event['event_id']}", None,
+        )),
+    ],
+)
+
+SCENARIOS = {s.name: s for s in (REGISTRATION_SPIKE, LIVE_SCORING, ADMIN_EXPORT)}
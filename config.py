@@ -26,6 +26,14 @@ class Config:
     # 数据库连接池配置
     DB_POOL_NAME = os.environ.get('DB_POOL_NAME') or 'wushu_pool'
     DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE') or 10)
+    # 连接池满时允许额外创建的临时连接数（归还时若无人等待即关闭）
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW') or 10)
+    # 连接池耗尽时排队等待的最长时间（秒），超时抛出 PoolError
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT') or 10)
+    # 连接最长存活时间（秒），超过后在下次取出时重建，避免被 MySQL wait_timeout 断开
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE') or 1800)
+    # 连接空闲超过该时间（秒）后，取出前先 ping 一次确认可用
+    DB_POOL_PRE_PING_IDLE = int(os.environ.get('DB_POOL_PRE_PING_IDLE') or 30)
     
     # 服务器配置
     HOST = os.environ.get('HOST') or '0.0.0.0'
@@ -37,11 +45,23 @@ class Config:
     SESSION_COOKIE_SECURE = False  # 生产环境应设为 True
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    # 会话存储：cookie（默认，签名 Cookie）/ redis / mysql / auto（设置了 REDIS_URL 时用 Redis）
+    SESSION_BACKEND = os.environ.get('SESSION_BACKEND') or 'cookie'
+    SESSION_KEY_PREFIX = os.environ.get('SESSION_KEY_PREFIX') or 'wushu:session:'
+    # 服务端会话未被修改时，最多每隔多少秒续期一次（其余请求不写存储、不下发 Cookie）
+    SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL') or 300)
     
     # 文件上传配置
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx'}
+    # 公告附件按内容 SHA-256 存放的目录（多实例部署时需为共享存储）
+    ATTACHMENT_STORE_DIR = os.environ.get('ATTACHMENT_STORE_DIR') or os.path.join(UPLOAD_FOLDER, 'attachments')
+    # 附件下载交给前端 Web 服务器发送：'' 不启用 / 'x-accel'（nginx）/ 'x-sendfile'（Apache、lighttpd）
+    ATTACHMENT_OFFLOAD = (os.environ.get('ATTACHMENT_OFFLOAD') or '').lower()
+    # X-Accel-Redirect 使用的 nginx internal location，需 alias 到 ATTACHMENT_STORE_DIR
+    ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX') or '/protected-attachments/'
+    ATTACHMENT_CACHE_MAX_AGE = int(os.environ.get('ATTACHMENT_CACHE_MAX_AGE') or 86400)
     
     # 分页配置
     ITEMS_PER_PAGE = 20
@@ -56,6 +76,12 @@ class Config:
     # 日志配置
     LOG_LEVEL = os.environ.get('LOG_LEVEL') or 'INFO'
     LOG_FILE = os.environ.get('LOG_FILE') or 'wushu_system.log'
+    # json：每行一个 JSON（含 request_id / user_id / endpoint / duration_ms）；text：可读文本
+    LOG_FORMAT = os.environ.get('LOG_FORMAT') or 'json'
+    # 高频成功日志（请求完成、操作成功）的采样比例，1.0 全部保留；WARNING 及以上不采样
+    LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE') or 1.0)
+    # 异步日志队列长度，写入跟不上时丢弃新记录而不阻塞请求
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE') or 10000)
 
     # 短信/阿里云号码认证服务配置
     SMS_PROVIDER = os.environ.get('SMS_PROVIDER') or 'aliyun'
@@ -78,8 +104,91 @@ class Config:
     SYSTEM_VERSION = '1.0.0'
     SYSTEM_AUTHOR = '武术赛事管理团队'
 
+    # 响应缓存配置：auto 在设置了 REDIS_URL 时使用 Redis，否则使用进程内 LRU
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'auto'
+    CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX') or 'wushu:cache:'
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES') or 1024)
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES') or 64 * 1024 * 1024)
+    # Redis 读写 / 建连超时（秒），限流、验证码、计数器、会话与失效通知共用；
+    # Redis 卡住时请求线程最多等待这么久，随后走各模块的回退分支
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT') or 0.5)
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT') or 1.0)
+    # 缓存 Redis 的读写 / 建连超时（秒），Redis 卡住时请求线程最多等待这么久后回退到进程内缓存
+    CACHE_REDIS_SOCKET_TIMEOUT = float(os.environ.get('CACHE_REDIS_SOCKET_TIMEOUT') or REDIS_SOCKET_TIMEOUT)
+    CACHE_REDIS_CONNECT_TIMEOUT = float(os.environ.get('CACHE_REDIS_CONNECT_TIMEOUT') or REDIS_CONNECT_TIMEOUT)
+    # Web worker 进程数（与 gunicorn 读取的 WEB_CONCURRENCY 一致），用于提示进程内缓存无法跨进程失效
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+    # 密码哈希：PBKDF2-SHA256 迭代次数（调整后旧哈希仍可验证，登录成功时自动按新代价重算）
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS') or 100000)
+    # 密码校验线程数（默认 CPU 核数）与允许的在途请求数（超出立即返回 503）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or 0) or None
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING') or 0) or None
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT') or 5.0)
+
+    # 用户 / 单点登录会话标识的进程内缓存有效期（秒）；变更时经失效总线通知所有进程立即失效
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL') or 300)
+    SESSION_TOKEN_CACHE_TTL = int(os.environ.get('SESSION_TOKEN_CACHE_TTL') or 300)
+    # 失效总线：auto 在设置了 REDIS_URL 时用 pub/sub，否则轮询 cache_versions 表；none 只失效本进程（有效期限制为 5 秒）
+    CACHE_INVALIDATION_BACKEND = os.environ.get('CACHE_INVALIDATION_BACKEND') or 'auto'
+    CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL') or 'wushu:invalidate'
+    CACHE_INVALIDATION_POLL_INTERVAL = float(os.environ.get('CACHE_INVALIDATION_POLL_INTERVAL') or 1.0)
+
+    # 名单批量导入（队员/随行人员）单个文件的最大行数
+    ROSTER_IMPORT_MAX_ROWS = int(os.environ.get('ROSTER_IMPORT_MAX_ROWS') or 2000)
+
+    # 计数器写回聚合（浏览次数等）：auto 在设置了 REDIS_URL 时用 Redis 共享缓冲，否则每个进程各自缓冲
+    COUNTER_BACKEND = os.environ.get('COUNTER_BACKEND') or 'auto'
+    COUNTER_KEY_PREFIX = os.environ.get('COUNTER_KEY_PREFIX') or 'wushu:counters:'
+    COUNTER_FLUSH_INTERVAL = float(os.environ.get('COUNTER_FLUSH_INTERVAL') or 5.0)
+    # 本进程累加次数达到该值时提前写回
+    COUNTER_FLUSH_THRESHOLD = int(os.environ.get('COUNTER_FLUSH_THRESHOLD') or 500)
+    COUNTER_FLUSH_BATCH_SIZE = int(os.environ.get('COUNTER_FLUSH_BATCH_SIZE') or 500)
+
+    # 接口限流（令牌桶）：auto 在设置了 REDIS_URL 时多进程共享桶，否则每个进程各自计数
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND') or 'auto'
+    RATE_LIMIT_KEY_PREFIX = os.environ.get('RATE_LIMIT_KEY_PREFIX') or 'wushu:ratelimit:'
+    # 进程内令牌桶的分片数与最多保留的桶数（超出时淘汰最久未访问的桶）
+    RATE_LIMIT_MEMORY_SHARDS = int(os.environ.get('RATE_LIMIT_MEMORY_SHARDS') or 16)
+    RATE_LIMIT_MEMORY_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MEMORY_MAX_KEYS') or 100000)
+
+    # 验证码预生成池：后台线程在余量低于 LOW_WATERMARK 时补足到 POOL_SIZE；auto 在设置了 REDIS_URL 时多进程共享
+    CAPTCHA_POOL_BACKEND = os.environ.get('CAPTCHA_POOL_BACKEND') or 'auto'
+    CAPTCHA_POOL_KEY = os.environ.get('CAPTCHA_POOL_KEY') or 'wushu:captcha:pool'
+    CAPTCHA_POOL_SIZE = int(os.environ.get('CAPTCHA_POOL_SIZE') or 200)
+    CAPTCHA_POOL_LOW_WATERMARK = int(os.environ.get('CAPTCHA_POOL_LOW_WATERMARK') or 100)
+
+    # 通知分发：每次 INSERT ... SELECT 覆盖的 user_id 区间大小（每块单独提交）
+    NOTIFICATION_FANOUT_BATCH_SIZE = int(os.environ.get('NOTIFICATION_FANOUT_BATCH_SIZE') or 1000)
+
+    # 后台任务队列配置
+    JOB_EMBEDDED_WORKER = os.environ.get('JOB_EMBEDDED_WORKER', 'true').lower() in ['true', 'on', '1']
+    JOB_EMBEDDED_WORKER_THREADS = int(os.environ.get('JOB_EMBEDDED_WORKER_THREADS') or 2)
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS') or 4)
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL') or 2.0)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS') or 3)
+    JOB_RETRY_BACKOFF_SECONDS = int(os.environ.get('JOB_RETRY_BACKOFF_SECONDS') or 10)
+    JOB_RETRY_BACKOFF_MAX_SECONDS = int(os.environ.get('JOB_RETRY_BACKOFF_MAX_SECONDS') or 600)
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS') or 900)
+    # 长时间运行的任务（如数据库备份）汇报心跳的间隔（秒），需明显小于 JOB_STALE_SECONDS
+    JOB_HEARTBEAT_SECONDS = int(os.environ.get('JOB_HEARTBEAT_SECONDS') or 60)
+    BACKUP_TIMEOUT_SECONDS = int(os.environ.get('BACKUP_TIMEOUT_SECONDS') or 1800)
+
     SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS') or 50)
-    USER_STATUS_CHECK_INTERVAL = int(os.environ.get('USER_STATUS_CHECK_INTERVAL') or 30)
+    # 同一语句（按规范化指纹）在一个请求内执行超过该次数视为 N+1：记录警告，TESTING 模式下直接报错；0 关闭
+    QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD') or 10)
+    # 响应中附带 Server-Timing 头（SQL 条数/耗时、等待连接池耗时、请求总耗时）
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() in ['true', 'on', '1']
+
+    # Prometheus 指标：/metrics 端点；METRICS_DIR 为各 worker 快照目录（gunicorn 多进程时需共享同一目录）
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ['true', 'on', '1']
+    METRICS_DIR = os.environ.get('METRICS_DIR') or os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL') or 5.0)
+    # 已退出 worker 的快照保留时长（秒），过期后其累计值不再计入
+    METRICS_RETENTION_SECONDS = int(os.environ.get('METRICS_RETENTION_SECONDS') or 86400)
+    # 设置后 /metrics 需要 Authorization: Bearer <token>；未设置时只允许本机（127.0.0.1 / ::1）访问
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
     
     # 用户角色权限配置（按权限级别排序）
     ROLE_PERMISSIONS = {
@@ -151,16 +260,9 @@ class Config:
         # 确保上传目录存在
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
         
-        # 设置日志
-        import logging
-        logging.basicConfig(
-            level=getattr(logging, Config.LOG_LEVEL),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(Config.LOG_FILE, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        # 设置日志（队列异步输出，写文件不占用请求线程）
+        from utils.logging_setup import setup_logging
+        setup_logging(Config.LOG_LEVEL)
 
 class DevelopmentConfig(Config):
     """开发环境配置"""
@@ -8,8 +8,11 @@ import mysql.connector
 from mysql.connector import Error, pooling
 from contextlib import contextmanager
 import logging
+import threading
 import time
 
+from flask import g, has_request_context
+
 from config import Config
 from models import DATABASE_SCHEMA
 from utils.helpers import generate_password_hash
@@ -19,16 +22,19 @@ from db_modules.db_participants import ParticipantDbMixin
 from db_modules.db_scores import ScoreDbMixin
 from db_modules.db_event_items import EventItemDbMixin
 from db_modules.db_entries import EntryDbMixin
+from db_modules.connection_pool import ConnectionPool
+from utils.query_stats import record_query, record_rows
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class TimedCursorWrapper:
+    """记录慢查询，并把每条语句的耗时和取回行数计入请求级统计（utils.query_stats）"""
+
     def __init__(self, cursor, slow_threshold_ms=50):
         self._cursor = cursor
         self._slow_threshold_ms = slow_threshold_ms
+        self._fingerprint = None
 
     def execute(self, operation, params=None, multi=False):
         start = time.perf_counter()
@@ -36,6 +42,7 @@ class TimedCursorWrapper:
             return self._cursor.execute(operation, params, multi)
         finally:
             duration_ms = (time.perf_counter() - start) * 1000
+            self._fingerprint = record_query(operation, duration_ms)
             if duration_ms >= self._slow_threshold_ms:
                 logger.warning(
                     "Slow query took %.1f ms: %s; params=%s",
@@ -50,6 +57,7 @@ class TimedCursorWrapper:
             return self._cursor.executemany(operation, seq_params)
         finally:
             duration_ms = (time.perf_counter() - start) * 1000
+            self._fingerprint = record_query(operation, duration_ms)
             if duration_ms >= self._slow_threshold_ms:
                 logger.warning(
                     "Slow query (executemany) took %.1f ms: %s; params_count=%d",
@@ -58,33 +66,201 @@ class TimedCursorWrapper:
                     len(seq_params) if seq_params is not None else 0,
                 )
 
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            record_rows(self._fingerprint, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        record_rows(self._fingerprint, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        record_rows(self._fingerprint, len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
     def __getattr__(self, item):
         return getattr(self._cursor, item)
 
 
 _connection_pool = None
+_connection_pool_lock = threading.Lock()
 
 def _get_connection_pool(config):
-    """获取全局数据库连接池"""
+    """获取全局数据库连接池（每个进程一个，连接按需建立）"""
     global _connection_pool
     if _connection_pool is None:
-        try:
-            pool_config = config.copy()
-            # 移除连接池配置参数，避免传递给连接池构造函数
-            pool_size = pool_config.pop('pool_size', 5)
-            pool_name = pool_config.pop('pool_name', getattr(Config, 'DB_POOL_NAME', 'wushu_pool'))
-            
-            _connection_pool = pooling.MySQLConnectionPool(
-                pool_name=pool_name,
-                pool_size=pool_size,
-                **pool_config
-            )
-            logger.info(f"数据库连接池创建成功，池大小: {pool_size}")
-        except Error as e:
-            logger.error(f"创建数据库连接池失败，将回退到直连模式: {e}")
-            _connection_pool = None
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = ConnectionPool(
+                    config,
+                    pool_size=getattr(Config, 'DB_POOL_SIZE', 10),
+                    max_overflow=getattr(Config, 'DB_POOL_MAX_OVERFLOW', 10),
+                    timeout=getattr(Config, 'DB_POOL_TIMEOUT', 10),
+                    recycle=getattr(Config, 'DB_POOL_RECYCLE', 1800),
+                    pre_ping_idle=getattr(Config, 'DB_POOL_PRE_PING_IDLE', 30),
+                    name=getattr(Config, 'DB_POOL_NAME', 'wushu_pool'),
+                )
+                logger.info(
+                    f"数据库连接池创建成功，池大小: {_connection_pool.pool_size}，"
+                    f"临时连接上限: {_connection_pool.max_overflow}"
+                )
     return _connection_pool
 
+# 进程级连接统计：取连接次数、请求内复用次数、等待连接池的累计耗时
+_connection_metrics = {
+    'checkouts': 0,
+    'reuses': 0,
+    'pool_wait_ms_total': 0.0,
+    'pool_wait_ms_max': 0.0,
+}
+_connection_metrics_lock = threading.Lock()
+
+
+def _request_db_metrics():
+    if not has_request_context():
+        return None
+    metrics = g.get('_db_metrics')
+    if metrics is None:
+        metrics = {'checkouts': 0, 'reuses': 0, 'pool_wait_ms': 0.0}
+        g._db_metrics = metrics
+    return metrics
+
+
+def _record_checkout(wait_ms):
+    with _connection_metrics_lock:
+        _connection_metrics['checkouts'] += 1
+        _connection_metrics['pool_wait_ms_total'] += wait_ms
+        if wait_ms > _connection_metrics['pool_wait_ms_max']:
+            _connection_metrics['pool_wait_ms_max'] = wait_ms
+    metrics = _request_db_metrics()
+    if metrics is not None:
+        metrics['checkouts'] += 1
+        metrics['pool_wait_ms'] += wait_ms
+
+
+def _record_reuse():
+    with _connection_metrics_lock:
+        _connection_metrics['reuses'] += 1
+    metrics = _request_db_metrics()
+    if metrics is not None:
+        metrics['reuses'] += 1
+
+
+def get_connection_metrics():
+    """返回本进程的连接统计快照（含连接池状态）"""
+    with _connection_metrics_lock:
+        metrics = dict(_connection_metrics)
+    if _connection_pool is not None:
+        metrics['pool'] = _connection_pool.stats()
+    return metrics
+
+
+def get_request_db_metrics():
+    """返回当前请求的连接统计（checkouts / reuses / pool_wait_ms），请求外返回 None"""
+    if not has_request_context():
+        return None
+    return g.get('_db_metrics')
+
+
+def _close_quietly(connection):
+    """丢弃已损坏的连接（不再放回连接池）"""
+    try:
+        invalidate = getattr(connection, 'invalidate', None)
+        if invalidate is not None:
+            invalidate()
+        else:
+            connection.close()
+    except Exception:
+        pass
+
+
+class _RequestConnectionState:
+    """绑定到 flask.g 的请求级连接及嵌套深度"""
+
+    __slots__ = ('connection', 'depth')
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.depth = 0
+
+
+class _ConnectionProxy:
+    """请求级连接的代理
+
+    最外层：commit/rollback 直接作用于连接；
+    嵌套层：commit 为空操作（由外层统一提交），rollback 回滚到本层保存点。
+    close 为空操作，连接在请求结束时统一归还。
+    """
+
+    def __init__(self, connection, savepoint=None):
+        self._connection = connection
+        self._savepoint = savepoint
+
+    def commit(self):
+        if self._savepoint is None:
+            self._connection.commit()
+
+    def rollback(self):
+        if self._savepoint is None:
+            self._connection.rollback()
+        else:
+            self._connection.cmd_query(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __getattr__(self, item):
+        return getattr(self._connection, item)
+
+
+def release_request_connection(exception=None):
+    """teardown_appcontext 回调：回滚未提交的修改并将请求级连接归还连接池"""
+    state = g.pop('_db_request_connection', None)
+    if state is None:
+        return
+    connection = state.connection
+    try:
+        # 未读结果与未提交事务由连接池归还时统一清理
+        connection.close()
+    except Error as e:
+        logger.warning(f"归还请求级数据库连接失败: {e}")
+        _close_quietly(connection)
+
+
+# 版本化结构迁移：(版本号, 说明, DatabaseManager 上的迁移方法名)，方法签名为 method(cursor)。
+# 只能在末尾追加新版本，已发布的版本号和方法不要修改；迁移需可重复执行（部分旧库已手工补过列）。
+SCHEMA_MIGRATIONS = (
+    (1, '历史结构增量修复（补齐列、索引与枚举取值）', '_migrate_database'),
+    (2, '根据已有成绩回填 leaderboard 排行榜', '_migration_backfill_leaderboard'),
+    (3, 'users 表增加 created_at 索引（用户列表游标分页）', '_migration_users_created_at_index'),
+    (4, 'team_players 增加出生日期/年龄组列与筛选索引，并提交回填任务', '_migration_team_players_demographics'),
+    (5, 'announcements 增加 file_sha256 列，并提交附件 BLOB 迁出任务', '_migration_announcement_attachments'),
+    (6, '创建 cache_versions 跨进程缓存失效通知表', '_migration_cache_versions'),
+    (7, '创建 user_sessions 服务端会话表', '_migration_user_sessions'),
+    (8, 'leaderboard 删除排名索引，按报名条目回填成绩项目并重建排行榜', '_migration_leaderboard_item_partition'),
+    (9, 'users.created_at 回填空值并改为 NOT NULL（用户列表游标分页键）', '_migration_users_created_at_not_null'),
+)
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+_SCHEMA_LOCK_NAME = 'wushu_schema_migrations'
+_SCHEMA_LOCK_TIMEOUT = 300
+
+_manager_lock = threading.Lock()
+
+
 class DatabaseManager(
     UserDbMixin,
     EventDbMixin,
@@ -93,9 +269,26 @@ class DatabaseManager(
     EventItemDbMixin,
     EntryDbMixin,
 ):
-    """数据库管理器"""
-    
+    """数据库管理器
+
+    进程内单例：各模块直接调用 DatabaseManager() 拿到的都是同一个实例，
+    连接池与配置只初始化一次。
+    """
+
+    def __new__(cls):
+        instance = cls.__dict__.get('_instance')
+        if instance is None:
+            with _manager_lock:
+                instance = cls.__dict__.get('_instance')
+                if instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
+        return instance
+
     def __init__(self):
+        if self._initialized:
+            return
         self.config = {
             'host': Config.DB_HOST,
             'port': Config.DB_PORT,
@@ -106,126 +299,329 @@ class DatabaseManager(
             'collation': 'utf8mb4_unicode_ci',
             'autocommit': False,
             'raise_on_warnings': False,
-            'pool_size': 10,
-            'pool_reset_session': True,
             'connection_timeout': 15
         }
         self.pool = _get_connection_pool(self.config)
+        self._initialized = True
+
+    def _checkout_connection(self):
+        """从连接池取出一个连接（连接池耗尽时排队等待），并包装慢查询计时游标"""
+        wait_start = time.perf_counter()
+        try:
+            if self.pool:
+                connection = self.pool.get_connection()
+            else:
+                connection = mysql.connector.connect(**self.config)
+        except pooling.PoolError as e:
+            logger.error(f"获取数据库连接超时: {e}")
+            raise
+        except Error as e:
+            logger.error(f"数据库连接错误: {e}")
+            raise
+        _record_checkout((time.perf_counter() - wait_start) * 1000)
+
+        slow_threshold_ms = getattr(Config, 'SLOW_QUERY_THRESHOLD_MS', 50)
+        original_cursor = connection.cursor
+
+        def timed_cursor(*args, **kwargs):
+            base_cursor = original_cursor(*args, **kwargs)
+            return TimedCursorWrapper(base_cursor, slow_threshold_ms=slow_threshold_ms)
+
+        connection.cursor = timed_cursor
+        return connection
 
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器，带连接池耗尽重试"""
-        connection = None
-        max_retries = 2
-        for attempt in range(max_retries + 1):
+        """获取数据库连接的上下文管理器
+
+        在 Flask 请求内，同一请求的所有调用复用同一个连接（绑定到 flask.g，
+        请求结束时由 release_request_connection 归还连接池）；嵌套调用使用 SAVEPOINT，
+        内层 commit 延迟到外层提交，内层出错只回滚到自己的保存点。
+        请求之外（后台线程、脚本）保持每次调用独立取连接的行为。
+        """
+        if not has_request_context():
+            connection = self._checkout_connection()
             try:
-                if hasattr(self, 'pool') and self.pool:
-                    connection = self.pool.get_connection()
-                else:
-                    connection = mysql.connector.connect(**self.config)
-                break
-            except pooling.PoolError as e:
-                if attempt < max_retries:
-                    logger.warning(f"连接池耗尽，第{attempt + 1}次重试 (共{max_retries}次)...")
-                    time.sleep(0.3 * (attempt + 1))
-                    continue
-                logger.error(f"连接池耗尽，所有重试均失败: {e}")
-                raise
+                yield connection
             except Error as e:
-                logger.error(f"数据库连接错误: {e}")
+                logger.error(f"数据库操作错误: {e}")
+                if connection:
+                    connection.rollback()
                 raise
+            finally:
+                connection.close()
+            return
+
+        state = g.get('_db_request_connection')
+        if state is None:
+            state = _RequestConnectionState(self._checkout_connection())
+            g._db_request_connection = state
+        else:
+            _record_reuse()
+
+        state.depth += 1
+        savepoint = None
+        if state.depth > 1:
+            savepoint = f"sp_{state.depth}"
+            state.connection.cmd_query(f"SAVEPOINT {savepoint}")
+
+        proxy = _ConnectionProxy(state.connection, savepoint)
         try:
-            slow_threshold_ms = getattr(Config, 'SLOW_QUERY_THRESHOLD_MS', 50)
-
-            original_cursor = connection.cursor
-
-            def timed_cursor(*args, **kwargs):
-                base_cursor = original_cursor(*args, **kwargs)
-                return TimedCursorWrapper(base_cursor, slow_threshold_ms=slow_threshold_ms)
-
-            connection.cursor = timed_cursor
-
-            yield connection
-        except Error as e:
-            logger.error(f"数据库操作错误: {e}")
-            if connection:
-                connection.rollback()
+            yield proxy
+            if savepoint:
+                state.connection.cmd_query(f"RELEASE SAVEPOINT {savepoint}")
+        except Exception as e:
+            if isinstance(e, Error):
+                logger.error(f"数据库操作错误: {e}")
+            try:
+                if savepoint:
+                    state.connection.cmd_query(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                else:
+                    state.connection.rollback()
+            except Error:
+                # 连接已损坏：丢弃，本请求后续调用重新取连接
+                g.pop('_db_request_connection', None)
+                _close_quietly(state.connection)
             raise
         finally:
-            if connection and connection.is_connected():
-                connection.close()
+            state.depth -= 1
+            if state.depth == 0 and g.get('_db_request_connection') is state:
+                # 与原先每次归还连接的语义一致：未读完的结果集和最外层未提交的修改
+                # 都不会泄漏到本请求后续的调用
+                try:
+                    if state.connection.unread_result:
+                        state.connection.consume_results()
+                    if state.connection.in_transaction:
+                        state.connection.rollback()
+                except Error:
+                    g.pop('_db_request_connection', None)
+                    _close_quietly(state.connection)
 
     def init_database(self, force_recreate=False):
         """初始化数据库和表
-        
+
+        正常启动只读取一次 schema_migrations 的版本号，已是最新版本时直接返回；
+        只有首次部署或有待执行的迁移时才建表并按版本顺序执行迁移。
+
         Args:
             force_recreate (bool): 是否强制重建表（删除现有表）
         """
+        if not force_recreate:
+            try:
+                current_version = self.get_schema_version()
+            except Error as e:
+                # 数据库或版本表不存在（首次部署 / 旧库升级），走完整初始化流程
+                logger.info(f"未读取到数据库结构版本，执行完整初始化: {e}")
+            else:
+                if current_version >= LATEST_SCHEMA_VERSION:
+                    logger.info(f"数据库结构已是最新版本 v{current_version}")
+                    return
+
         try:
-            # 首先连接到MySQL服务器（不指定数据库）
-            temp_config = self.config.copy()
-            temp_config.pop('database', None)
-            
-            with mysql.connector.connect(**temp_config) as connection:
-                cursor = connection.cursor()
-                
-                # 创建数据库（如果不存在）- 静默模式
-                try:
-                    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
-                except Error as e:
-                    # 忽略错误码1007（数据库已存在）
-                    if '1007' not in str(e):
-                        logger.warning(f"创建数据库时出现警告: {e}")
-                    # 继续执行，因为数据库可能已经存在
-                
-            # 连接到指定数据库并创建表
+            self._ensure_database_exists()
+
             with self.get_connection() as connection:
                 cursor = connection.cursor()
-                
-                if force_recreate:
-                    # 强制重建：删除现有表
-                    logger.info("强制重建模式：删除现有表...")
-                    for table_name in reversed(list(DATABASE_SCHEMA.keys())):
-                        try:
-                            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-                            logger.info(f"删除表 {table_name}")
-                        except Error as e:
-                            logger.warning(f"删除表 {table_name} 失败: {e}")
-                else:
-                    # 检查并添加缺失的列
-                    self._migrate_database(cursor)
-                
-                # 创建所有表
-                for table_name, schema in DATABASE_SCHEMA.items():
-                    try:
-                        if force_recreate:
-                            # 强制重建模式：直接创建表
-                            schema_without_if_not_exists = schema.replace("CREATE TABLE IF NOT EXISTS", "CREATE TABLE")
-                            cursor.execute(schema_without_if_not_exists)
-                            logger.info(f"创建表 {table_name}")
-                        else:
-                            # 正常模式：如果不存在则创建（静默）
-                            cursor.execute(schema)
-                    except Error as e:
-                        # 如果表已存在，静默忽略
-                        if not force_recreate and ("already exists" in str(e).lower() or ("table" in str(e).lower() and "exists" in str(e).lower())):
-                            pass
-                        else:
-                            logger.error(f"创建表 {table_name} 失败: {e}")
-                            raise
-                
-                connection.commit()
-                
-                # 创建默认超级管理员账户
-                self._create_default_admin(cursor)
-                connection.commit()
-                
+
+                # 多个 worker 同时启动时，只允许一个执行建表和迁移，其余等待后复查版本
+                cursor.execute("SELECT GET_LOCK(%s, %s)", (_SCHEMA_LOCK_NAME, _SCHEMA_LOCK_TIMEOUT))
+                locked = cursor.fetchone()[0] == 1
+                if not locked:
+                    raise Error(msg=f"等待数据库迁移锁超时（{_SCHEMA_LOCK_TIMEOUT}秒）")
+                try:
+                    self._create_tables(cursor, force_recreate)
+                    connection.commit()
+
+                    self._apply_pending_migrations(connection, cursor)
+
+                    # 创建默认超级管理员账户
+                    self._create_default_admin(cursor)
+                    connection.commit()
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (_SCHEMA_LOCK_NAME,))
+                    cursor.fetchall()
+
         except Error as e:
             logger.error(f"数据库初始化失败: {e}")
             raise
 
+    def get_schema_version(self):
+        """读取当前数据库结构版本（schema_migrations 中的最大版本号）"""
+        with self.get_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT MAX(version) FROM schema_migrations")
+            row = cursor.fetchone()
+            return (row[0] if row else None) or 0
+
+    def _ensure_database_exists(self):
+        """连接到MySQL服务器（不指定数据库）并创建数据库（如果不存在）"""
+        temp_config = self.config.copy()
+        temp_config.pop('database', None)
+
+        with mysql.connector.connect(**temp_config) as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']} CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+            except Error as e:
+                # 忽略错误码1007（数据库已存在）
+                if '1007' not in str(e):
+                    logger.warning(f"创建数据库时出现警告: {e}")
+
+    def _create_tables(self, cursor, force_recreate=False):
+        """按 DATABASE_SCHEMA 创建所有表（正常模式下已存在的表保持不变）"""
+        if force_recreate:
+            # 强制重建：删除现有表
+            logger.info("强制重建模式：删除现有表...")
+            for table_name in reversed(list(DATABASE_SCHEMA.keys())):
+                try:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    logger.info(f"删除表 {table_name}")
+                except Error as e:
+                    logger.warning(f"删除表 {table_name} 失败: {e}")
+
+        for table_name, schema in DATABASE_SCHEMA.items():
+            try:
+                if force_recreate:
+                    # 强制重建模式：直接创建表
+                    schema_without_if_not_exists = schema.replace("CREATE TABLE IF NOT EXISTS", "CREATE TABLE")
+                    cursor.execute(schema_without_if_not_exists)
+                    logger.info(f"创建表 {table_name}")
+                else:
+                    # 正常模式：如果不存在则创建（静默）
+                    cursor.execute(schema)
+            except Error as e:
+                # 如果表已存在，静默忽略
+                if not force_recreate and ("already exists" in str(e).lower() or ("table" in str(e).lower() and "exists" in str(e).lower())):
+                    pass
+                else:
+                    logger.error(f"创建表 {table_name} 失败: {e}")
+                    raise
+
+    def _apply_pending_migrations(self, connection, cursor):
+        """按版本顺序执行尚未执行的迁移，每个版本执行完立即记录并提交"""
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+
+        for version, name, method_name in SCHEMA_MIGRATIONS:
+            if version in applied:
+                continue
+            logger.info(f"执行数据库迁移 v{version}: {name}")
+            start = time.perf_counter()
+            getattr(self, method_name)(cursor)
+            duration_ms = int((time.perf_counter() - start) * 1000)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+                (version, name, duration_ms),
+            )
+            connection.commit()
+            logger.info(f"数据库迁移 v{version} 完成，耗时 {duration_ms} ms")
+
+    def _migration_backfill_leaderboard(self, cursor):
+        """迁移 v2：根据已有成绩回填 leaderboard 排行榜物化表"""
+        count = self.rebuild_leaderboard()
+        logger.info(f"leaderboard 回填完成，共 {count} 行")
+
+    def _migration_users_created_at_index(self, cursor):
+        """迁移 v3：users(created_at) 索引，InnoDB 二级索引自带主键，即覆盖 (created_at, user_id)"""
+        cursor.execute("SHOW INDEX FROM users WHERE Key_name = 'idx_created_at'")
+        if not cursor.fetchall():
+            cursor.execute("ALTER TABLE users ADD INDEX idx_created_at (created_at)")
+            logger.info("添加了idx_created_at索引到users表")
+
+    def _migration_team_players_demographics(self, cursor):
+        """迁移 v4：team_players 持久化 birth_date / age_group，参赛者列表按性别、年龄组在 SQL 中筛选"""
+        cursor.execute("SHOW COLUMNS FROM team_players")
+        existing = {row[0] for row in cursor.fetchall()}
+        alters = []
+        if 'birth_date' not in existing:
+            alters.append("ADD COLUMN birth_date DATE NULL COMMENT '出生日期（由身份证号推导）' AFTER age")
+        if 'age_group' not in existing:
+            alters.append("ADD COLUMN age_group VARCHAR(20) NULL COMMENT '年龄组（由出生日期推导，每日刷新）' AFTER birth_date")
+        cursor.execute("SHOW INDEX FROM team_players WHERE Key_name = 'idx_event_gender_age_group'")
+        if not cursor.fetchall():
+            alters.append("ADD INDEX idx_event_gender_age_group (event_id, gender, age_group)")
+        if alters:
+            cursor.execute("ALTER TABLE team_players " + ", ".join(alters))
+            logger.info("team_players 表增加了 birth_date / age_group 列及筛选索引")
+
+        # 历史数据量可能较大，回填交给后台任务分批执行
+        from utils.jobs import enqueue_job
+        enqueue_job('players.backfill_demographics', max_attempts=3)
+
+    def _migration_announcement_attachments(self, cursor):
+        """迁移 v5：公告附件改为内容寻址文件存储，数据库只保存 SHA-256"""
+        cursor.execute("SHOW COLUMNS FROM announcements")
+        existing = {row[0] for row in cursor.fetchall()}
+        alters = []
+        if 'file_sha256' not in existing:
+            alters.append("ADD COLUMN file_sha256 CHAR(64) NULL COMMENT '附件内容 SHA-256（文件存放在附件存储目录）' AFTER file_type")
+        cursor.execute("SHOW INDEX FROM announcements WHERE Key_name = 'idx_file_sha256'")
+        if not cursor.fetchall():
+            alters.append("ADD INDEX idx_file_sha256 (file_sha256)")
+        if alters:
+            cursor.execute("ALTER TABLE announcements " + ", ".join(alters))
+            logger.info("announcements 表增加了 file_sha256 列")
+
+        # 旧版本把附件存在 file_content BLOB 列中，逐条迁出到附件存储
+        if 'file_content' in existing:
+            from utils.jobs import enqueue_job
+            enqueue_job('announcements.migrate_attachments', max_attempts=3)
+
+    def _migration_cache_versions(self, cursor):
+        """迁移 v6：cache_versions 表（未配置 Redis 时失效总线的 MySQL 传输层）
+
+        新库由 DATABASE_SCHEMA 建表；已是 v5 的旧库启动时跳过建表，只能由迁移补上。
+        """
+        cursor.execute(DATABASE_SCHEMA['cache_versions'])
+        logger.info("创建了 cache_versions 表")
+
+    def _migration_user_sessions(self, cursor):
+        """迁移 v7：user_sessions 表（SESSION_BACKEND=mysql 的会话存储）"""
+        cursor.execute(DATABASE_SCHEMA['user_sessions'])
+        logger.info("创建了 user_sessions 表")
+
+    def _migration_leaderboard_item_partition(self, cursor):
+        """迁移 v8：排名改为读取时计算后 rank_in_round 不再写入，其索引只增加写入开销；
+        评分此前未写入 scores.event_item_id，排行榜记录都落在项目 0，按报名条目回填后重建"""
+        cursor.execute("SHOW INDEX FROM leaderboard WHERE Key_name = 'idx_leaderboard_rank'")
+        if cursor.fetchall():
+            cursor.execute("ALTER TABLE leaderboard DROP INDEX idx_leaderboard_rank")
+            logger.info("删除了 leaderboard 表的 idx_leaderboard_rank 索引")
+
+        cursor.execute(
+            """
+            UPDATE scores s
+            JOIN entries e ON e.entry_id = s.entry_id
+            SET s.event_item_id = e.event_item_id
+            WHERE s.event_item_id IS NULL
+            """
+        )
+        logger.info(f"按报名条目回填了 {cursor.rowcount} 条成绩的项目")
+        # rebuild_leaderboard 使用另一个连接读取成绩，先提交回填
+        cursor.execute("COMMIT")
+        count = self.rebuild_leaderboard()
+        logger.info(f"leaderboard 重建完成，共 {count} 行")
+
+    def _migration_users_created_at_not_null(self, cursor):
+        """迁移 v9：(created_at, user_id) 游标分页无法越过 created_at 为 NULL 的行（比较恒不成立，
+        且游标拒绝空键值），回填后改为 NOT NULL，仍可使用 idx_created_at"""
+        # updated_at 带 ON UPDATE，显式赋值为原值以免被改成当前时间
+        cursor.execute(
+            """
+            UPDATE users
+            SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP), updated_at = updated_at
+            WHERE created_at IS NULL
+            """
+        )
+        if cursor.rowcount:
+            logger.info(f"回填了 {cursor.rowcount} 个用户的 created_at")
+        cursor.execute(
+            "ALTER TABLE users MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP "
+            "COMMENT '注册时间（用户列表游标分页键，不可为空）'"
+        )
+
     def _migrate_database(self, cursor):
-        """迁移数据库结构"""
+        """迁移 v1：历史上逐步追加的列、索引与枚举取值（按需探测后补齐）"""
         try:
             # 确保users表存在password列（过渡期保留明文密码）
             cursor.execute("SHOW COLUMNS FROM users LIKE 'password'")
@@ -394,6 +790,27 @@ class DatabaseManager(
                 else:
                     logger.warning(f"participants表迁移失败: {participants_error}")
 
+            # notifications表：支持按赛事发送及异步分发进度
+            if self._table_exists(cursor, 'notifications'):
+                try:
+                    cursor.execute("SHOW COLUMNS FROM notifications LIKE 'recipient_type'")
+                    row = cursor.fetchone()
+                    if row and 'event' not in str(row[1]):
+                        cursor.execute("ALTER TABLE notifications MODIFY COLUMN recipient_type ENUM('all', 'role', 'event') DEFAULT 'all'")
+                        logger.info("notifications.recipient_type 增加了 event 取值")
+
+                    cursor.execute("SHOW COLUMNS FROM notifications LIKE 'delivery_status'")
+                    if not cursor.fetchone():
+                        cursor.execute("ALTER TABLE notifications ADD COLUMN delivery_status ENUM('pending', 'sending', 'completed', 'failed') DEFAULT 'completed' COMMENT '收件人分发状态' AFTER priority")
+                        logger.info("添加了delivery_status列到notifications表")
+
+                    cursor.execute("SHOW COLUMNS FROM notifications LIKE 'recipient_count'")
+                    if not cursor.fetchone():
+                        cursor.execute("ALTER TABLE notifications ADD COLUMN recipient_count INT DEFAULT 0 COMMENT '已分发收件人数' AFTER delivery_status")
+                        logger.info("添加了recipient_count列到notifications表")
+                except Error as notifications_error:
+                    logger.warning(f"notifications表迁移失败: {notifications_error}")
+
             if hasattr(self, '_ensure_event_columns'):
                 try:
                     self._ensure_event_columns(cursor)
@@ -492,6 +909,8 @@ class DatabaseManager(
             ("entry_schedules", "ALTER TABLE entry_schedules COMMENT = '比赛编排表（新结构，按项目+报名条目记录比赛编排信息）'"),
             ("schedule_adjustment_logs", "ALTER TABLE schedule_adjustment_logs COMMENT = '编排调整历史表（新结构，按项目+报名条目记录编排调整历史）'"),
             ("score_modification_logs", "ALTER TABLE score_modification_logs COMMENT = '成绩修改历史表（新结构，按成绩+报名条目记录成绩修改历史）'"),
+            ("leaderboard", "ALTER TABLE leaderboard COMMENT = '成绩排行榜物化表（随评分提交增量维护，可由 scores 重建）'"),
+            ("jobs", "ALTER TABLE jobs COMMENT = '后台任务队列表（通知分发、导出、维护等耗时任务）'"),
             ("payment_records", "ALTER TABLE payment_records COMMENT = '支付记录表（新结构，按赛事+队伍+报名条目记录支付信息）'"),
             ("teams", "ALTER TABLE teams COMMENT = '队伍表（代表队/俱乐部信息及报名主体）'"),
             ("team_applications", "ALTER TABLE team_applications COMMENT = '队伍报名申请旧表（队员、工作人员及费用申请记录，逐步由 entries 体系替代）'"),
@@ -0,0 +1,296 @@
+"""
+武术赛事管理系统 - MySQL 连接池
+
+替代 mysql-connector 自带的 MySQLConnectionPool：
+- 常驻连接数取自 Config.DB_POOL_SIZE，满载时可额外创建有限数量的临时连接（overflow）；
+- 连接耗尽时按先来先到排队等待，超时抛出 PoolError，而不是 sleep 后盲目重试；
+- 取出前对空闲过久的连接先 ping，超过存活时间的连接直接重建；
+- 统计使用中/空闲/排队数以及等待耗时分位数，供健康检查接口展示。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.pooling import PoolError
+
+
+logger = logging.getLogger(__name__)
+
+# 等待耗时分位数基于最近这么多次取连接
+_WAIT_SAMPLE_SIZE = 2048
+
+
+class _PoolEntry:
+    """池中的一个物理连接"""
+
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class _Waiter:
+    """排队等待连接的调用方；归还连接时直接移交给队首的等待者"""
+
+    __slots__ = ('event', 'entry', 'may_create')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.may_create = False
+
+
+class PooledConnection:
+    """从连接池取出的连接
+
+    行为与普通连接一致（属性透传给底层连接），close() 会把连接归还连接池；
+    invalidate() 用于连接已损坏的情况，直接关闭并从池中移除。
+    """
+
+    def __init__(self, pool, entry):
+        self._pool = pool
+        self._entry = entry
+
+    def close(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry)
+
+    def invalidate(self):
+        entry, self._entry = self._entry, None
+        if entry is not None:
+            self._pool._release(entry, discard=True)
+
+    def __getattr__(self, item):
+        entry = self.__dict__.get('_entry')
+        if entry is None:
+            raise Error(msg="连接已归还连接池，不能继续使用")
+        return getattr(entry.connection, item)
+
+
+class ConnectionPool:
+    """线程安全的 MySQL 连接池
+
+    Args:
+        connect_kwargs: 传给 mysql.connector.connect 的参数
+        pool_size: 常驻连接数
+        max_overflow: 允许额外创建的临时连接数
+        timeout: 连接耗尽时的最长等待时间（秒）
+        recycle: 连接最长存活时间（秒），<=0 表示不回收
+        pre_ping_idle: 空闲超过该时间（秒）的连接在取出前先 ping，<0 表示不 ping
+        name: 连接池名称（仅用于日志和统计）
+    """
+
+    def __init__(self, connect_kwargs, pool_size=10, max_overflow=10, timeout=10.0,
+                 recycle=1800, pre_ping_idle=30, name='wushu_pool'):
+        self.connect_kwargs = dict(connect_kwargs)
+        self.pool_size = max(1, int(pool_size))
+        self.max_overflow = max(0, int(max_overflow))
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping_idle = pre_ping_idle
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._idle = deque()       # 空闲连接，后进先出，优先复用最热的连接
+        self._waiters = deque()    # 排队等待者，先进先出
+        self._total = 0            # 已创建（含使用中与空闲）的连接数
+        self._in_use = 0
+        self._wait_samples = deque(maxlen=_WAIT_SAMPLE_SIZE)
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'discarded': 0,
+            'peak_in_use': 0,
+            'peak_waiters': 0,
+        }
+
+    # ---------------- 取连接 ----------------
+
+    def get_connection(self, timeout=None):
+        """取出一个连接；连接耗尽时排队等待，超时抛出 PoolError"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        waiter = None
+        entry = None
+        may_create = False
+
+        with self._lock:
+            if self._idle and not self._waiters:
+                entry = self._idle.pop()
+            elif self._total < self.pool_size + self.max_overflow:
+                self._total += 1
+                may_create = True
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self._stats['waits'] += 1
+                self._stats['peak_waiters'] = max(self._stats['peak_waiters'], len(self._waiters))
+
+        if waiter is not None:
+            waiter.event.wait(timeout)
+            with self._lock:
+                if waiter.entry is None and not waiter.may_create:
+                    # 超时：移出队列（此时不会再有人移交连接给它）
+                    self._waiters.remove(waiter)
+                    self._stats['timeouts'] += 1
+                    waited_ms = (time.perf_counter() - start) * 1000
+                    self._wait_samples.append(waited_ms)
+                    raise PoolError(
+                        f"连接池 {self.name} 已耗尽，等待 {waited_ms:.0f} ms 后超时"
+                        f"（使用中 {self._in_use}，排队 {len(self._waiters)}）"
+                    )
+                entry = waiter.entry
+                may_create = waiter.may_create
+
+        try:
+            if may_create:
+                entry = self._connect()
+            else:
+                entry = self._validate(entry)
+        except Exception:
+            with self._lock:
+                self._total -= 1
+                self._wake_creator()
+            raise
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+            self._wait_samples.append(wait_ms)
+        return PooledConnection(self, entry)
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self.connect_kwargs)
+        with self._lock:
+            self._stats['connects'] += 1
+        return _PoolEntry(connection)
+
+    def _validate(self, entry):
+        """回收超龄连接、ping 空闲过久的连接；不可用时重建"""
+        now = time.monotonic()
+        if self.recycle and self.recycle > 0 and now - entry.created_at > self.recycle:
+            self._close_entry(entry)
+            with self._lock:
+                self._stats['recycled'] += 1
+            return self._connect()
+
+        if self.pre_ping_idle is not None and self.pre_ping_idle >= 0 \
+                and now - entry.last_used > self.pre_ping_idle:
+            try:
+                entry.connection.ping(reconnect=False)
+            except Error as e:
+                logger.warning(f"连接池 {self.name} 的空闲连接已失效，重新建立连接: {e}")
+                self._close_entry(entry)
+                with self._lock:
+                    self._stats['ping_failures'] += 1
+                return self._connect()
+        return entry
+
+    # ---------------- 归还连接 ----------------
+
+    def _release(self, entry, discard=False):
+        connection = entry.connection
+        if not discard:
+            try:
+                if connection.unread_result:
+                    connection.consume_results()
+                if connection.in_transaction:
+                    connection.rollback()
+            except Error as e:
+                logger.warning(f"归还连接时清理会话失败，丢弃该连接: {e}")
+                discard = True
+
+        entry.last_used = time.monotonic()
+        close_entry = False
+        with self._lock:
+            self._in_use -= 1
+            if discard:
+                self._total -= 1
+                self._stats['discarded'] += 1
+                close_entry = True
+                self._wake_creator()
+            elif self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.entry = entry
+                waiter.event.set()
+            elif self._total > self.pool_size:
+                # 临时连接：无人等待时直接关闭，使连接数回落到常驻规模
+                self._total -= 1
+                close_entry = True
+            else:
+                self._idle.append(entry)
+
+        if close_entry:
+            self._close_entry(entry)
+
+    def _wake_creator(self):
+        """连接数减少后，允许队首等待者新建连接（需持有锁）"""
+        if self._waiters and self._total < self.pool_size + self.max_overflow:
+            waiter = self._waiters.popleft()
+            self._total += 1
+            waiter.may_create = True
+            waiter.event.set()
+
+    @staticmethod
+    def _close_entry(entry):
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    # ---------------- 统计 ----------------
+
+    def stats(self):
+        """返回连接池状态快照（本进程）"""
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'name': self.name,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'timeout_seconds': self.timeout,
+                'total': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'overflow': max(0, self._total - self.pool_size),
+                'waiters': len(self._waiters),
+            })
+        snapshot['wait_ms'] = {
+            'p50': _percentile(samples, 50),
+            'p95': _percentile(samples, 95),
+            'p99': _percentile(samples, 99),
+            'max': round(samples[-1], 2) if samples else 0.0,
+            'samples': len(samples),
+        }
+        return snapshot
+
+    def dispose(self):
+        """关闭所有空闲连接（使用中的连接归还时按正常逻辑处理）"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+        for entry in idle:
+            self._close_entry(entry)
+
+
+def _percentile(sorted_samples, percent):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(round(percent / 100 * (len(sorted_samples) - 1))))
+    return round(sorted_samples[index], 2)
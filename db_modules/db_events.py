@@ -4,6 +4,7 @@ import time
 from mysql.connector import Error
 
 from models import Event
+from utils.pagination import keyset_condition, estimate_row_count
 
 
 logger = logging.getLogger(__name__)
@@ -13,7 +14,9 @@ _EVENT_PARTICIPANTS_CACHE_TTL = 10
 _event_count_cache = {}
 _EVENT_COUNT_CACHE_TTL = 10
 
-_event_columns_ensured = False
+# 可用于游标分页的排序列：必须是 NOT NULL 列，created_at / updated_at 可为 NULL，
+# 为 NULL 的行在 "< 游标值" 比较中永远不成立，会从分页中漏掉，因此只能用于页码分页
+EVENT_KEYSET_ORDER_FIELDS = ('start_date', 'end_date', 'name')
 
 
 class EventDbMixin:
@@ -25,62 +28,35 @@ class EventDbMixin:
 
     # ==================== 赛事相关操作 ====================
     
+    # events 表历史上陆续追加的列：列名 -> 列定义
+    _EVENT_EXTRA_COLUMNS = (
+        ('contact_phone', "VARCHAR(20) DEFAULT NULL"),
+        ('organizer', "VARCHAR(255) DEFAULT NULL"),
+        ('co_organizer', "VARCHAR(255) DEFAULT NULL"),
+        ('code', "VARCHAR(50) DEFAULT NULL"),
+        ('logo_url', "VARCHAR(500) DEFAULT NULL"),
+        ('is_public', "BOOLEAN DEFAULT TRUE"),
+        ('max_teams', "INT DEFAULT NULL"),
+        ('deleted_at', "TIMESTAMP NULL"),
+        # 赛事费用字段（有些历史库可能缺列）
+        ('individual_fee', "DECIMAL(10,2) DEFAULT 0.00"),
+        ('pair_practice_fee', "DECIMAL(10,2) DEFAULT 0.00"),
+        ('team_competition_fee', "DECIMAL(10,2) DEFAULT 0.00"),
+    )
+
     def _ensure_event_columns(self, cursor):
-        """确保events表包含新的列"""
+        """确保events表包含新的列（由 schema 迁移调用，一次 SHOW COLUMNS 取全部列名）"""
         try:
-            # 检查contact_phone列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'contact_phone'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN contact_phone VARCHAR(20) DEFAULT NULL")
-            
-            # 检查organizer列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'organizer'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN organizer VARCHAR(255) DEFAULT NULL")
-            
-            # 检查co_organizer列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'co_organizer'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN co_organizer VARCHAR(255) DEFAULT NULL")
-            
-            # 检查code列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'code'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN code VARCHAR(50) DEFAULT NULL")
-
-            # 检查logo_url列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'logo_url'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN logo_url VARCHAR(500) DEFAULT NULL")
-
-            # 检查is_public列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'is_public'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN is_public BOOLEAN DEFAULT TRUE")
-
-            # 检查max_teams列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'max_teams'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN max_teams INT DEFAULT NULL")
-
-            # 检查deleted_at列是否存在
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'deleted_at'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN deleted_at TIMESTAMP NULL")
-
-            # 赛事费用字段（有些历史库可能缺列）
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'individual_fee'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN individual_fee DECIMAL(10,2) DEFAULT 0.00")
-
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'pair_practice_fee'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN pair_practice_fee DECIMAL(10,2) DEFAULT 0.00")
-
-            cursor.execute("SHOW COLUMNS FROM events LIKE 'team_competition_fee'")
-            if not cursor.fetchone():
-                cursor.execute("ALTER TABLE events ADD COLUMN team_competition_fee DECIMAL(10,2) DEFAULT 0.00")
-                
+            cursor.execute("SHOW COLUMNS FROM events")
+            existing = {row[0] for row in cursor.fetchall()}
+            missing = [(name, definition) for name, definition in self._EVENT_EXTRA_COLUMNS
+                       if name not in existing]
+            if missing:
+                cursor.execute(
+                    "ALTER TABLE events "
+                    + ", ".join(f"ADD COLUMN {name} {definition}" for name, definition in missing)
+                )
+                logger.info(f"events表补充列: {', '.join(name for name, _ in missing)}")
         except Error as e:
             logger.warning(f"检查/添加events表列时出错: {e}")
     
@@ -184,34 +160,48 @@ class EventDbMixin:
 
     def get_events_with_count(self, status=None, keyword=None, date_from=None, date_to=None,
                               location=None, created_by=None, min_participants=None, max_participants=None,
-                              order_by='start_date', order_dir='DESC', limit=None, offset=None):
-        """在同一连接中同时获取赛事列表和总数，减少连接开销"""
+                              order_by='start_date', order_dir='DESC', limit=None, offset=None,
+                              after=None, total_mode='exact'):
+        """在同一连接中同时获取赛事列表和总数，减少连接开销
+
+        Args:
+            after: 游标分页时上一页最后一行的 (排序列值, event_id)，传入后忽略 offset
+            total_mode: exact 精确计数 / approx 执行计划估算 / none 不计数（total 返回 None）
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
 
-                global _event_columns_ensured
-                if not _event_columns_ensured:
-                    self._ensure_event_columns(cursor)
-                    _event_columns_ensured = True
-
                 where_sql, params = self._build_event_where(
                     status=status, keyword=keyword, date_from=date_from, date_to=date_to,
                     location=location, created_by=created_by,
                     min_participants=min_participants, max_participants=max_participants)
 
                 allowed_order_fields = ['start_date', 'end_date', 'created_at', 'updated_at', 'name', 'max_participants']
-                if order_by in allowed_order_fields and order_dir in ['ASC', 'DESC']:
-                    order_clause = f" ORDER BY {order_by} {order_dir}"
-                else:
-                    order_clause = " ORDER BY start_date DESC"
-
-                list_sql = "SELECT SQL_CALC_FOUND_ROWS * FROM events" + where_sql + order_clause
+                if order_by not in allowed_order_fields or order_dir not in ['ASC', 'DESC']:
+                    order_by, order_dir = 'start_date', 'DESC'
+                # event_id 作为次排序键保证顺序稳定，游标分页依赖这一点
+                order_clause = f" ORDER BY {order_by} {order_dir}, event_id {order_dir}"
+
+                total = None
+                if total_mode == 'exact':
+                    cursor.execute("SELECT COUNT(*) AS cnt FROM events" + where_sql, params)
+                    total = cursor.fetchone()['cnt']
+                elif total_mode == 'approx':
+                    total = estimate_row_count(cursor, "FROM events" + where_sql, params)
+
+                list_where_sql = where_sql
                 list_params = list(params)
+                if after is not None:
+                    condition, condition_params = keyset_condition((order_by, 'event_id'), after, order_dir)
+                    list_where_sql += (" AND " if where_sql else " WHERE ") + condition
+                    list_params.extend(condition_params)
+
+                list_sql = "SELECT * FROM events" + list_where_sql + order_clause
                 if limit:
                     list_sql += " LIMIT %s"
                     list_params.append(limit)
-                    if offset:
+                    if offset and after is None:
                         list_sql += " OFFSET %s"
                         list_params.append(offset)
 
@@ -238,9 +228,6 @@ class EventDbMixin:
                         co_organizer=row.get('co_organizer')
                     ))
 
-                cursor.execute("SELECT FOUND_ROWS() AS cnt")
-                total = cursor.fetchone()['cnt']
-
                 # 批量获取参赛人数（单次查询合并两张表）
                 event_ids = [e.event_id for e in events]
                 participants_counts = {}
@@ -270,11 +257,6 @@ class EventDbMixin:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
 
-                global _event_columns_ensured
-                if not _event_columns_ensured:
-                    self._ensure_event_columns(cursor)
-                    _event_columns_ensured = True
-
                 where_sql, params = self._build_event_where(
                     status=status, keyword=keyword, date_from=date_from, date_to=date_to,
                     location=location, created_by=created_by,
@@ -1,14 +1,21 @@
+import json
 import logging
-from datetime import datetime as _dt
 
 from mysql.connector import Error
 
 from models import Participant
+from utils.helpers import PLAYER_AGE_GROUPS, derive_player_demographics
 
 
 logger = logging.getLogger(__name__)
 
 
+def _participant_demographics(id_card):
+    """由身份证号推导 (性别, 年龄组)，无法解析时返回 (None, None)；规则与队员列表一致"""
+    _, gender_value, age_group_value = derive_player_demographics(id_card)
+    return gender_value, age_group_value
+
+
 class ParticipantDbMixin:
     """参赛者相关数据库操作 mixin。
 
@@ -201,37 +208,7 @@ class ParticipantDbMixin:
                 participant.event_member_no = next_no
 
                 # 根据身份证号计算性别和年龄组（如果可能），写入持久化字段
-                gender_value = None
-                age_group_value = None
-                id_card = participant.registration_number or ""
-                if len(id_card) == 18:
-                    try:
-                        gender_digit = int(id_card[-2])
-                        gender_value = "男" if gender_digit % 2 == 1 else "女"
-
-                        birth_year = int(id_card[6:10])
-                        birth_month = int(id_card[10:12])
-                        birth_day = int(id_card[12:14])
-
-                        today = _dt.now()
-                        age = today.year - birth_year
-                        if (today.month, today.day) < (birth_month, birth_day):
-                            age -= 1
-
-                        if age is not None:
-                            if age < 12:
-                                age_group_value = "儿童组"
-                            elif 12 <= age <= 17:
-                                age_group_value = "少年组"
-                            elif 18 <= age <= 39:
-                                age_group_value = "青年组"
-                            elif 40 <= age <= 59:
-                                age_group_value = "中年组"
-                            elif age >= 60:
-                                age_group_value = "老年组"
-                    except Exception:  # noqa: BLE001
-                        gender_value = None
-                        age_group_value = None
+                gender_value, age_group_value = _participant_demographics(participant.registration_number)
 
                 cursor.execute(
                     """
@@ -397,3 +374,249 @@ class ParticipantDbMixin:
         except Error as e:  # noqa: BLE001
             logger.error(f"获取参赛者列表失败: {e}")
             raise
+
+    # ==================== 队员出生日期 / 性别 / 年龄组 ====================
+
+    def refresh_player_demographics_with_conn(self, conn, player_ids):
+        """根据身份证号重新计算 team_players 的 birth_date / gender / age_group（写入时调用）
+
+        在调用方的连接与事务中执行，不提交。
+        """
+        player_ids = [pid for pid in player_ids if pid]
+        if not player_ids:
+            return 0
+        cursor = conn.cursor(dictionary=True)
+        placeholders = ','.join(['%s'] * len(player_ids))
+        cursor.execute(
+            f"SELECT player_id, id_card, gender FROM team_players WHERE player_id IN ({placeholders})",
+            tuple(player_ids),
+        )
+        updates = []
+        for row in cursor.fetchall():
+            birth_date, gender, age_group = derive_player_demographics(row['id_card'], row['gender'])
+            updates.append((birth_date, gender, age_group, row['player_id']))
+        if updates:
+            cursor.executemany(
+                "UPDATE team_players SET birth_date = %s, gender = %s, age_group = %s WHERE player_id = %s",
+                updates,
+            )
+        return len(updates)
+
+    def backfill_player_demographics(self, batch_size=1000, progress_callback=None):
+        """按 player_id 分批为所有队员回填 birth_date / gender / age_group，返回处理行数"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(player_id), 0) FROM team_players")
+            total, max_id = cursor.fetchone()
+
+        processed = 0
+        last_id = 0
+        while last_id < max_id:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT player_id FROM team_players WHERE player_id > %s ORDER BY player_id LIMIT %s",
+                    (last_id, batch_size),
+                )
+                ids = [row[0] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                processed += self.refresh_player_demographics_with_conn(conn, ids)
+                conn.commit()
+            last_id = ids[-1]
+            if progress_callback and total:
+                progress_callback(processed, total)
+
+        logger.info(f"队员出生日期/性别/年龄组回填完成，共 {processed} 行")
+        return processed
+
+    def refresh_player_age_groups(self):
+        """按出生日期重算年龄组（年龄随日期增长，需定期执行），只写入发生变化的行"""
+        age_group_sql = _age_group_case_sql('birth_date')
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""
+                UPDATE team_players
+                SET age_group = {age_group_sql}
+                WHERE birth_date IS NOT NULL
+                  AND NOT (age_group <=> {age_group_sql})
+                """
+            )
+            updated = cursor.rowcount
+            conn.commit()
+        if updated:
+            logger.info(f"年龄组随年龄变化更新了 {updated} 名队员")
+        return updated
+
+
+    # ==================== 名单批量导入 ====================
+
+    def bulk_upsert_team_players_with_conn(self, conn, event_id, team_id, rows, chunk_size=200):
+        """按 uniq_player_identity (event_id, team_id, id_card) 批量插入或更新队员
+
+        rows 为 utils.roster_import 解析出的规范化行（可含 user_id）。
+        在调用方的连接与事务中执行，不提交；返回 (新增数, 更新数)。
+        """
+        columns = (
+            'event_id', 'team_id', 'user_id', 'name', 'gender', 'age', 'birth_date', 'age_group',
+            'phone', 'id_card', 'competition_event', 'level', 'registration_number', 'status',
+        )
+        # 已存在的队员只更新名单中的字段，不改动审核状态和关联账号
+        updates = (
+            'name', 'gender', 'age', 'birth_date', 'age_group', 'phone', 'competition_event', 'level',
+        )
+        values = [
+            (
+                event_id, team_id, row.get('user_id'), row['name'], row.get('gender'), row.get('age'),
+                row.get('birth_date'), row.get('age_group'), row.get('phone') or None, row['id_card'],
+                row.get('competition_event') or None, row.get('level') or None, row['id_card'], 'registered',
+            )
+            for row in rows
+        ]
+        return self._bulk_upsert_with_conn(conn, 'team_players', columns, updates, values, chunk_size)
+
+    def bulk_ensure_participants_with_conn(self, conn, event_id, team_id, rows, chunk_size=200):
+        """为批量导入的队员补齐 participants / event_participants 记录（单条添加走 ensure_participant_with_conn）
+
+        只处理已关联账号（user_id 非空）的行；已有参赛记录的保持不变，
+        报名号（身份证号）已被其他参赛记录占用的跳过。
+        在调用方的连接与事务中执行，不提交；返回 (新建数, 已存在数, 跳过数)。
+        """
+        by_user = {}
+        for row in rows:
+            if row.get('user_id'):
+                by_user.setdefault(row['user_id'], row)
+        if not by_user:
+            return 0, 0, 0
+
+        user_ids = list(by_user)
+        reg_numbers = [row['id_card'] for row in by_user.values()]
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT event_id, user_id, registration_number
+                FROM participants
+                WHERE (event_id = %s AND user_id IN ({', '.join(['%s'] * len(user_ids))}))
+                   OR registration_number IN ({', '.join(['%s'] * len(reg_numbers))})
+                """,
+                (event_id, *user_ids, *reg_numbers),
+            )
+            existing_users = set()
+            taken_numbers = set()
+            for row_event_id, user_id, registration_number in cursor.fetchall():
+                if row_event_id == event_id and user_id in by_user:
+                    existing_users.add(user_id)
+                else:
+                    taken_numbers.add(registration_number)
+
+            values = []
+            skipped = 0
+            for user_id, row in by_user.items():
+                if user_id in existing_users:
+                    continue
+                if row['id_card'] in taken_numbers:
+                    skipped += 1
+                    continue
+                values.append((
+                    event_id, user_id, row['id_card'], row.get('competition_event') or '个人项目',
+                    row.get('gender'), row.get('age_group'), 'registered',
+                ))
+
+            row_sql = "(%s, %s, %s, %s, %s, %s, %s, NOW())"
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start:start + chunk_size]
+                cursor.execute(
+                    "INSERT INTO participants (event_id, user_id, registration_number, category, "
+                    "gender, age_group, status, registered_at) "
+                    f"VALUES {', '.join([row_sql] * len(chunk))}",
+                    tuple(v for row in chunk for v in row),
+                )
+
+            # 双写 event_participants：(event_id, user_id, role) 已存在的保持不变
+            ep_sql = "(%s, %s, %s, 'athlete', 'registered', NOW())"
+            for start in range(0, len(user_ids), chunk_size):
+                chunk = user_ids[start:start + chunk_size]
+                cursor.execute(
+                    "INSERT INTO event_participants (event_id, user_id, team_id, role, status, registered_at) "
+                    f"VALUES {', '.join([ep_sql] * len(chunk))} "
+                    "ON DUPLICATE KEY UPDATE event_participant_id = event_participant_id",
+                    tuple(v for user_id in chunk for v in (event_id, user_id, team_id)),
+                )
+        finally:
+            cursor.close()
+
+        if skipped:
+            logger.warning(f"赛事 {event_id} 队伍 {team_id} 导入时 {skipped} 名队员的报名号已被其他参赛记录占用，未生成参赛记录")
+        return len(values), len(existing_users), skipped
+
+    def bulk_upsert_team_staff_with_conn(self, conn, event_id, team_id, rows, created_by=None, chunk_size=200):
+        """按 uniq_staff_identity (event_id, team_id, id_card) 批量插入或更新随行人员
+
+        在调用方的连接与事务中执行，不提交；返回 (新增数, 更新数)。
+        """
+        columns = (
+            'event_id', 'team_id', 'user_id', 'name', 'gender', 'age', 'position', 'phone', 'id_card',
+            'status', 'source', 'extra_data', 'created_by',
+        )
+        updates = ('name', 'gender', 'age', 'position', 'phone', 'status', 'extra_data')
+        values = [
+            (
+                event_id, team_id, row.get('user_id'), row['name'], row.get('gender'), row.get('age'),
+                row['position'], row.get('phone') or None, row['id_card'], 'active', 'direct',
+                json.dumps({'certificate': row['certificate']}, ensure_ascii=False)
+                if row.get('certificate') else None,
+                created_by,
+            )
+            for row in rows
+        ]
+        return self._bulk_upsert_with_conn(conn, 'team_staff', columns, updates, values, chunk_size)
+
+    @staticmethod
+    def _bulk_upsert_with_conn(conn, table, columns, updates, values, chunk_size):
+        """分块执行多行 INSERT ... ON DUPLICATE KEY UPDATE，返回 (新增数, 更新数)"""
+        if not values:
+            return 0, 0
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        update_sql = ', '.join(f"{col} = VALUES({col})" for col in updates)
+        event_index = columns.index('event_id')
+        team_index = columns.index('team_id')
+        id_card_index = columns.index('id_card')
+        cursor = conn.cursor()
+        inserted = 0
+        updated = 0
+        try:
+            for start in range(0, len(values), chunk_size):
+                chunk = values[start:start + chunk_size]
+                # 受影响行数无法区分"更新"与"未变化"，先查出本块中已存在的身份证号
+                id_cards = [row[id_card_index] for row in chunk]
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {table} "
+                    f"WHERE event_id = %s AND team_id = %s AND id_card IN ({', '.join(['%s'] * len(chunk))})",
+                    (chunk[0][event_index], chunk[0][team_index], *id_cards),
+                )
+                existing = cursor.fetchone()[0]
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES {', '.join([row_sql] * len(chunk))} "
+                    f"ON DUPLICATE KEY UPDATE {update_sql}",
+                    tuple(v for row in chunk for v in row),
+                )
+                inserted += len(chunk) - existing
+                updated += existing
+        finally:
+            cursor.close()
+        return inserted, updated
+
+def _age_group_case_sql(birth_date_column):
+    """生成与 PLAYER_AGE_GROUPS 一致的 SQL 年龄组 CASE 表达式"""
+    age_sql = f"TIMESTAMPDIFF(YEAR, {birth_date_column}, CURDATE())"
+    branches = []
+    default = 'NULL'
+    for upper, name in PLAYER_AGE_GROUPS:
+        if upper is None:
+            default = f"'{name}'"
+        else:
+            branches.append(f"WHEN {age_sql} < {upper} THEN '{name}'")
+    return f"(CASE {' '.join(branches)} ELSE {default} END)"
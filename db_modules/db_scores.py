@@ -1,12 +1,65 @@
 import logging
+import math
+from array import array
 
 from mysql.connector import Error
 
+from config import Config
 from models import Score
 
 
 logger = logging.getLogger(__name__)
 
+# 流式读取赛事成绩时每批拉取的行数
+_RESULTS_FETCH_SIZE = 1000
+
+# 排行榜中表示「全部轮次汇总」的轮次号
+LEADERBOARD_ALL_ROUNDS = 0
+
+# 赛事各项目及其报名人数（报名条目成员对应到本赛事的参赛者，不含退赛/取消资格的条目）
+_EVENT_ITEM_REGISTRATIONS_SQL = """
+    SELECT ei.event_item_id, ei.name, COUNT(DISTINCT p.participant_id)
+    FROM event_items ei
+    LEFT JOIN entries e
+        ON e.event_item_id = ei.event_item_id AND e.status NOT IN ('withdrawn', 'disqualified')
+    LEFT JOIN entry_members em ON em.entry_id = e.entry_id
+    LEFT JOIN participants p ON p.event_id = ei.event_id AND p.user_id = em.user_id
+    WHERE ei.event_id = %s
+    GROUP BY ei.event_item_id, ei.name
+"""
+
+# 按赛事读取全部成绩：走 idx_event_item_round，早期未回填 event_id 的成绩通过 participants 兜底
+_EVENT_SCORES_SQL = """
+    SELECT s.participant_id, s.total_score, s.judge_id, s.round_number,
+           s.event_item_id, s.entry_id
+    FROM scores s
+    WHERE s.event_id = %s
+    UNION ALL
+    SELECT s.participant_id, s.total_score, s.judge_id, s.round_number,
+           s.event_item_id, s.entry_id
+    FROM scores s
+    JOIN participants p ON p.participant_id = s.participant_id
+    WHERE s.event_id IS NULL AND p.event_id = %s
+    ORDER BY participant_id, round_number, judge_id
+"""
+
+# 评分统计：与 _EVENT_SCORES_SQL 相同的读取路径，额外带上技术分/表现分，不需要排序
+_EVENT_SCORE_STATS_SQL = """
+    SELECT s.participant_id, s.judge_id, s.round_number, s.event_item_id,
+           s.technique_score, s.performance_score, s.total_score
+    FROM scores s
+    WHERE s.event_id = %s
+    UNION ALL
+    SELECT s.participant_id, s.judge_id, s.round_number, s.event_item_id,
+           s.technique_score, s.performance_score, s.total_score
+    FROM scores s
+    JOIN participants p ON p.participant_id = s.participant_id
+    WHERE s.event_id IS NULL AND p.event_id = %s
+"""
+
+# 评分统计输出的百分位
+STATISTICS_PERCENTILES = (10, 25, 50, 75, 90)
+
 
 class ScoreDbMixin:
     """评分相关数据库操作 mixin。
@@ -20,7 +73,7 @@ class ScoreDbMixin:
     def create_or_update_score(self, score):
         """创建或更新评分
 
-        - 首次提交：插入一条新的 scores 记录，并尽量补充 event_id。
+        - 首次提交：插入一条新的 scores 记录，并尽量补充 event_id / entry_id / event_item_id。
         - 重复提交（同一参赛者+裁判+轮次）：更新已有记录，并在 score_modification_logs 中记录修改前后分数。
         """
         try:
@@ -32,7 +85,7 @@ class ScoreDbMixin:
                 cursor.execute(
                     """
                     SELECT score_id, technique_score, performance_score, deduction,
-                           total_score, event_id, entry_id, version
+                           total_score, event_id, event_item_id, entry_id, version
                     FROM scores
                     WHERE participant_id = %s AND judge_id = %s AND round_number = %s
                     FOR UPDATE
@@ -41,14 +94,16 @@ class ScoreDbMixin:
                 )
                 existing = cursor.fetchone()
 
-                # 确定 event_id / entry_id / 当前版本号
+                # 确定 event_id / entry_id / event_item_id / 当前版本号
                 event_id = None
                 entry_id = None
+                event_item_id = None
                 current_version = 1
 
                 if existing:
                     event_id = existing.get("event_id")
                     entry_id = existing.get("entry_id")
+                    event_item_id = existing.get("event_item_id")
                     current_version = existing.get("version") or 1
 
                 # 如有需要，从 participants / entries 补充 event_id / entry_id
@@ -80,7 +135,7 @@ class ScoreDbMixin:
                             if registration_number:
                                 cursor.execute(
                                     """
-                                    SELECT entry_id
+                                    SELECT entry_id, event_item_id
                                     FROM entries
                                     WHERE registration_number = %s
                                     LIMIT 1
@@ -89,11 +144,17 @@ class ScoreDbMixin:
                                 )
                                 entry_row = cursor.fetchone()
                                 if entry_row:
-                                    entry_id = (
-                                        entry_row.get("entry_id")
-                                        if isinstance(entry_row, dict)
-                                        else entry_row[0]
-                                    )
+                                    entry_id = entry_row["entry_id"]
+                                    event_item_id = entry_row["event_item_id"]
+
+                # 项目来自报名条目：排行榜按 (项目, 轮次) 分区，缺失时会落入项目 0
+                if event_item_id is None and entry_id is not None:
+                    cursor.execute(
+                        "SELECT event_item_id FROM entries WHERE entry_id = %s", (entry_id,)
+                    )
+                    entry_row = cursor.fetchone()
+                    if entry_row:
+                        event_item_id = entry_row["event_item_id"]
 
                 # 新建成绩
                 if not existing:
@@ -102,8 +163,8 @@ class ScoreDbMixin:
                         INSERT INTO scores (
                             participant_id, judge_id, round_number,
                             technique_score, performance_score, deduction, notes,
-                            event_id, entry_id
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            event_id, event_item_id, entry_id
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                         """,
                         (
                             score.participant_id,
@@ -114,6 +175,7 @@ class ScoreDbMixin:
                             score.deduction,
                             score.notes,
                             event_id,
+                            event_item_id,
                             entry_id,
                         ),
                     )
@@ -138,6 +200,7 @@ class ScoreDbMixin:
                             deduction = %s,
                             notes = %s,
                             event_id = %s,
+                            event_item_id = %s,
                             entry_id = %s,
                             modified_at = CURRENT_TIMESTAMP,
                             modified_by = %s,
@@ -152,6 +215,7 @@ class ScoreDbMixin:
                             score.deduction,
                             score.notes,
                             event_id,
+                            event_item_id,
                             entry_id,
                             score.judge_id,
                             "overwrite_by_submit_score",
@@ -206,6 +270,12 @@ class ScoreDbMixin:
 
                     score.score_id = old["score_id"]
 
+                # 与成绩写入处于同一事务内增量刷新排行榜
+                if event_id is not None:
+                    self._refresh_leaderboard_entry(
+                        cursor, event_id, score.participant_id, score.round_number
+                    )
+
                 conn.commit()
                 return score
 
@@ -251,49 +321,507 @@ class ScoreDbMixin:
             logger.error(f"获取评分失败: {e}")
             raise
 
-    def get_event_results(self, event_id, include_scores=False):
-        """获取赛事成绩排名"""
-        try:
-            # 先通过统一的参赛者读取方法获取参赛者列表（已优先基于 event_participants）
-            participants = self.get_participants_by_event(event_id)
+    # ==================== 排行榜（物化成绩表） ====================
+
+    def _refresh_leaderboard_entry(self, cursor, event_id, participant_id, round_number):
+        """重算单个参赛者在本轮及全部轮次汇总中的排行榜记录。
 
+        只写入该参赛者自己的行（按唯一键 upsert），不触碰同分区的其他行：排名在读取时
+        由 get_event_leaderboard 用窗口函数计算，评分事务不会锁住整个项目/轮次分区。
+        项目取自 scores.event_item_id（create_or_update_score 从报名条目补充）；没有报名条目的
+        旧版参赛者无法确定项目，归入项目 0（「未区分项目」）分区。
+        cursor 需为 dictionary=True 游标，且由调用方负责提交事务。
+        """
+        scoring_config = Config.SCORING_CONFIG
+        target_rounds = [round_number]
+        if round_number != LEADERBOARD_ALL_ROUNDS:
+            target_rounds.append(LEADERBOARD_ALL_ROUNDS)
+
+        for target_round in target_rounds:
+            if target_round == LEADERBOARD_ALL_ROUNDS:
+                log_filter, score_filter = "", ""
+                params = (participant_id, participant_id)
+            else:
+                log_filter = " AND s2.round_number = %s"
+                score_filter = " AND s.round_number = %s"
+                params = (participant_id, target_round, participant_id, target_round)
+
+            cursor.execute(
+                f"""
+                SELECT COUNT(s.total_score) AS judge_count,
+                       SUM(s.total_score) AS score_sum,
+                       MIN(s.total_score) AS score_min,
+                       MAX(s.total_score) AS score_max,
+                       COALESCE(MAX(s.event_item_id), 0) AS event_item_id,
+                       MAX(s.entry_id) AS entry_id,
+                       (
+                           SELECT COUNT(*)
+                           FROM score_modification_logs l
+                           JOIN scores s2 ON s2.score_id = l.score_id
+                           WHERE s2.participant_id = %s{log_filter}
+                       ) AS modification_count
+                FROM scores s
+                WHERE s.participant_id = %s{score_filter}
+                """,
+                params,
+            )
+            row = cursor.fetchone()
+            entry = _build_leaderboard_entry(
+                event_id,
+                row["event_item_id"],
+                target_round,
+                participant_id,
+                row["entry_id"],
+                float(row["score_sum"]) if row["score_sum"] is not None else 0.0,
+                float(row["score_min"]) if row["score_min"] is not None else None,
+                float(row["score_max"]) if row["score_max"] is not None else None,
+                row["judge_count"] or 0,
+                row["modification_count"] or 0,
+                scoring_config,
+            )
+            cursor.execute(_LEADERBOARD_UPSERT_SQL, entry)
+
+    def rebuild_leaderboard(self, event_id=None):
+        """根据 scores 与 score_modification_logs 重新生成排行榜。
+
+        Args:
+            event_id: 仅重建指定赛事；为 None 时重建所有赛事
+
+        Returns:
+            int: 写入的排行榜记录数
+        """
+        scoring_config = Config.SCORING_CONFIG
+        written = 0
+        try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
 
-                results = []
-                for participant in participants:
+                if event_id is None:
+                    cursor.execute("SELECT event_id FROM events ORDER BY event_id")
+                    event_ids = [row["event_id"] for row in cursor.fetchall()]
+                else:
+                    event_ids = [event_id]
+
+                for current_event_id in event_ids:
                     cursor.execute(
                         """
-                        SELECT total_score, judge_id, round_number
-                        FROM scores
-                        WHERE participant_id = %s
-                        ORDER BY round_number, judge_id
+                        SELECT s.participant_id, s.round_number, COUNT(*) AS modification_count
+                        FROM score_modification_logs l
+                        JOIN scores s ON s.score_id = l.score_id
+                        WHERE l.event_id = %s
+                        GROUP BY s.participant_id, s.round_number
                         """,
-                        (participant.participant_id,),
+                        (current_event_id,),
                     )
+                    modifications = {}
+                    for row in cursor.fetchall():
+                        key = (row["participant_id"], row["round_number"])
+                        modifications[key] = row["modification_count"]
+
+                    accumulators = {}
+                    item_refs = {}
+                    cursor.execute(_EVENT_SCORES_SQL, (current_event_id, current_event_id))
+                    for row in cursor.fetchall():
+                        participant_id = row["participant_id"]
+                        accumulator = accumulators.get(participant_id)
+                        if accumulator is None:
+                            accumulator = accumulators[participant_id] = _ScoreAccumulator()
+                        accumulator.add(row)
+
+                        event_item_id, entry_id = item_refs.get(participant_id, (0, None))
+                        if row["event_item_id"] is not None:
+                            event_item_id = max(event_item_id, row["event_item_id"])
+                        if row["entry_id"] is not None:
+                            entry_id = max(entry_id or 0, row["entry_id"])
+                        item_refs[participant_id] = (event_item_id, entry_id)
+
+                    entries = []
+                    for participant_id, accumulator in accumulators.items():
+                        event_item_id, entry_id = item_refs[participant_id]
+                        participant_modifications = 0
+                        for round_number, (total, low, high, count) in accumulator.rounds.items():
+                            round_modifications = modifications.get((participant_id, round_number), 0)
+                            participant_modifications += round_modifications
+                            entries.append(_build_leaderboard_entry(
+                                current_event_id, event_item_id, round_number,
+                                participant_id, entry_id, total, low, high, count,
+                                round_modifications, scoring_config,
+                            ))
+                        entries.append(_build_leaderboard_entry(
+                            current_event_id, event_item_id, LEADERBOARD_ALL_ROUNDS,
+                            participant_id, entry_id, accumulator.total,
+                            accumulator.low, accumulator.high, accumulator.count,
+                            participant_modifications, scoring_config,
+                        ))
+
+                    cursor.execute("DELETE FROM leaderboard WHERE event_id = %s", (current_event_id,))
+                    if entries:
+                        cursor.executemany(_LEADERBOARD_UPSERT_SQL, entries)
+                    conn.commit()
+                    written += len(entries)
+
+                logger.info(f"排行榜重建完成，共 {len(event_ids)} 个赛事，{written} 条记录")
+                return written
 
-                    scores = cursor.fetchall()
-                    score_count = len(scores)
+        except Error as e:
+            logger.error(f"重建排行榜失败: {e}")
+            raise
 
-                    result = {
-                        'participant_id': participant.participant_id,
-                        'registration_number': participant.registration_number,
-                        'real_name': getattr(participant, 'real_name', None),
-                        'category': participant.category,
-                        'weight_class': participant.weight_class,
-                        'status': participant.status,
-                        'score_count': score_count,
-                        'average_score': None,
-                        'scores_list': [s['total_score'] for s in scores] if scores else [],
-                    }
+    def get_event_leaderboard(self, event_id, event_item_id=None, round_number=LEADERBOARD_ALL_ROUNDS):
+        """读取排行榜
 
-                    if include_scores:
-                        result['detailed_scores'] = scores
+        指定项目时按 uniq_leaderboard_participant (event_id, event_item_id, round_number, ...)
+        前缀范围扫描单个分区；排名在读取时由 RANK() 窗口按项目/轮次分区、平均分降序计算
+        （平均分相同并列，无平均分的不参与排名），窗口与最终排序在内存中完成。
+        评分写入只更新单个参赛者的行，不维护排名列。
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                sql = """
+                    SELECT participant_id, event_item_id, round_number, entry_id,
+                           judge_count, average_score, validity_status,
+                           CASE WHEN average_score IS NULL THEN NULL ELSE RANK() OVER (
+                               PARTITION BY event_item_id, round_number
+                               ORDER BY average_score IS NULL, average_score DESC
+                           ) END AS rank_in_round,
+                           modification_count, updated_at
+                    FROM leaderboard
+                    WHERE event_id = %s
+                """
+                params = [event_id]
+                if event_item_id is not None:
+                    sql += " AND event_item_id = %s"
+                    params.append(event_item_id)
+                sql += " AND round_number = %s"
+                params.append(round_number)
+                sql += " ORDER BY event_item_id, round_number, rank_in_round IS NULL, rank_in_round"
+
+                cursor.execute(sql, tuple(params))
+                rows = cursor.fetchall()
+                for row in rows:
+                    if row["average_score"] is not None:
+                        row["average_score"] = float(row["average_score"])
+                return rows
+
+        except Error as e:
+            logger.error(f"获取排行榜失败: {e}")
+            raise
+
+    def get_event_scoring_statistics(self, event_id, histogram_bins=20, percentiles=STATISTICS_PERCENTILES):
+        """赛事评分统计（整体 + 按项目/轮次 + 按裁判）
 
-                    results.append(result)
+        成绩按 event_id 一次性流式读取（元组游标），在同一次遍历中按 (项目, 轮次) 把总分写入
+        array('d')，并累计技术分/表现分、参赛者与裁判集合；随后对每组排序一次得到
+        最小/最大/均值/标准差/百分位和直方图。查询次数固定为 3 次，与参赛人数无关。
 
-                return results
+        裁判覆盖率的分母是报名人数（整体为赛事参赛者，分组为该项目报名条目中的参赛者），
+        没有报名条目的项目退回到已评分的参赛者。
+
+        Args:
+            event_id: 赛事ID
+            histogram_bins: 直方图分箱数（所有分组共用整体最低分~最高分的同一组边界）
+            percentiles: 输出的百分位（线性插值）
+        """
+        try:
+            groups = {}
+            judges = {}
+            scored_participants = set()
+            technique_sum = performance_sum = 0.0
+            technique_count = performance_count = 0
+
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT participant_id FROM participants WHERE event_id = %s", (event_id,))
+                participant_ids = {row[0] for row in cursor.fetchall()}
+
+                cursor.execute(_EVENT_ITEM_REGISTRATIONS_SQL, (event_id,))
+                item_names, item_registered = {}, {}
+                for item_id, name, registered in cursor.fetchall():
+                    item_names[item_id] = name
+                    item_registered[item_id] = int(registered or 0)
+                cursor.close()
+
+                # 非缓冲游标：逐批读取，避免一次性把整场赛事的成绩拉入内存
+                cursor = conn.cursor(buffered=False)
+                cursor.execute(_EVENT_SCORE_STATS_SQL, (event_id, event_id))
+                while True:
+                    rows = cursor.fetchmany(_RESULTS_FETCH_SIZE)
+                    if not rows:
+                        break
+                    for participant_id, judge_id, round_number, item_id, technique, performance, total in rows:
+                        if total is None or participant_id not in participant_ids:
+                            continue
+                        value = float(total)
+                        key = (item_id, round_number)
+                        group = groups.get(key)
+                        if group is None:
+                            group = groups[key] = _StatisticsGroup()
+                        group.add(value, participant_id, judge_id)
+
+                        judge = judges.get(judge_id)
+                        if judge is None:
+                            judges[judge_id] = [1, value, {participant_id}]
+                        else:
+                            judge[0] += 1
+                            judge[1] += value
+                            judge[2].add(participant_id)
+
+                        scored_participants.add(participant_id)
+                        if technique is not None:
+                            technique_sum += float(technique)
+                            technique_count += 1
+                        if performance is not None:
+                            performance_sum += float(performance)
+                            performance_count += 1
+                cursor.close()
+
+            overall = _StatisticsGroup()
+            for group in groups.values():
+                overall.merge(group)
+            overall_summary = overall.summary(percentiles, registered=len(participant_ids))
+            edges = _histogram_edges(overall_summary['min'], overall_summary['max'], histogram_bins)
+
+            group_results = []
+            for (item_id, round_number), group in sorted(
+                groups.items(), key=lambda item: (item[0][0] is None, item[0][0] or 0, item[0][1] or 0)
+            ):
+                summary = group.summary(percentiles, registered=item_registered.get(item_id) or None)
+                summary.update({
+                    'event_item_id': item_id,
+                    'event_item_name': item_names.get(item_id),
+                    'round_number': round_number,
+                    'histogram': _histogram_counts(group.values, edges),
+                })
+                group_results.append(summary)
+
+            judge_results = [
+                {
+                    'judge_id': judge_id,
+                    'score_count': count,
+                    'participant_count': len(participants),
+                    'mean': round(total / count, 2),
+                }
+                for judge_id, (count, total, participants) in sorted(judges.items())
+            ]
+
+            return {
+                # 与旧版返回字段保持一致
+                'total_participants': len(participant_ids),
+                'scored_participants': len(scored_participants),
+                'unscored_participants': len(participant_ids) - len(scored_participants),
+                'total_scores': overall_summary['score_count'],
+                'average_technique_score': round(technique_sum / technique_count, 2) if technique_count else 0.0,
+                'average_performance_score': round(performance_sum / performance_count, 2) if performance_count else 0.0,
+                'average_total_score': overall_summary['mean'] if overall_summary['score_count'] else 0.0,
+                'highest_score': overall_summary['max'] if overall_summary['score_count'] else 0.0,
+                'lowest_score': overall_summary['min'] if overall_summary['score_count'] else 0.0,
+                # 扩展统计
+                'overall': overall_summary,
+                'histogram': {'edges': edges, 'counts': _histogram_counts(overall.values, edges)},
+                'groups': group_results,
+                'judges': judge_results,
+            }
 
         except Error as e:
-            logger.error(f"获取赛事成绩失败: {e}")
+            logger.error(f"获取评分统计失败: {e}")
             raise
+
+
+def _trimmed_average(total, low, high, count, drop_highest, drop_lowest, decimal_places):
+    """根据累计值计算去最高/最低分平均分，规则与 utils.helpers.calculate_average_score 一致。"""
+    if count == 0:
+        return None
+
+    # 分数少于3个时不去掉最高最低分
+    if count >= 3:
+        if drop_lowest:
+            total -= low
+            count -= 1
+        if drop_highest and count > 1:
+            total -= high
+            count -= 1
+
+    return round(total / count, decimal_places)
+
+
+def _percentile(sorted_values, pct):
+    """线性插值百分位（与 numpy.percentile 默认方式一致），sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _histogram_edges(low, high, bins):
+    """按整体最低/最高分取整后等宽分箱，返回 bins + 1 个边界"""
+    if low is None:
+        return []
+    bins = max(1, int(bins))
+    low = math.floor(low)
+    high = max(math.ceil(high), low + 1)
+    width = (high - low) / bins
+    return [round(low + width * i, 4) for i in range(bins + 1)]
+
+
+def _histogram_counts(values, edges):
+    if not edges:
+        return []
+    bins = len(edges) - 1
+    low = edges[0]
+    width = (edges[-1] - low) / bins
+    counts = [0] * bins
+    for value in values:
+        index = int((value - low) / width)
+        counts[min(max(index, 0), bins - 1)] += 1
+    return counts
+
+
+class _StatisticsGroup:
+    """一组评分（项目+轮次，或整场赛事）的总分数组，以及参赛者/裁判集合"""
+
+    __slots__ = ('values', 'participants', 'judges')
+
+    def __init__(self):
+        self.values = array('d')
+        self.participants = set()
+        self.judges = set()
+
+    def add(self, value, participant_id, judge_id):
+        self.values.append(value)
+        self.participants.add(participant_id)
+        self.judges.add(judge_id)
+
+    def merge(self, other):
+        self.values.extend(other.values)
+        self.participants |= other.participants
+        self.judges |= other.judges
+
+    def summary(self, percentiles, registered=None):
+        """registered 为该组报名人数，作为裁判覆盖率的分母；为 None 时使用已评分的参赛者数"""
+        values = sorted(self.values)
+        count = len(values)
+        participant_count = len(self.participants)
+        judge_count = len(self.judges)
+        # 已评分但不在报名条目中的参赛者（旧数据）同样计入分母，覆盖率不会超过 1
+        registered = max(registered or 0, participant_count)
+        # 裁判覆盖率：实际评分数 / (报名人数 x 裁判数)，未评分的报名者会拉低覆盖率
+        expected = registered * judge_count
+        result = {
+            'score_count': count,
+            'participant_count': participant_count,
+            'registered_count': registered,
+            'judge_count': judge_count,
+            'judge_coverage': round(count / expected, 4) if expected else None,
+            'min': None,
+            'max': None,
+            'mean': None,
+            'stddev': None,
+            'percentiles': {f'p{p}': None for p in percentiles},
+        }
+        if not count:
+            return result
+        mean = math.fsum(values) / count
+        variance = math.fsum((v - mean) * (v - mean) for v in values) / count
+        result.update({
+            'min': values[0],
+            'max': values[-1],
+            'mean': round(mean, 2),
+            'stddev': round(math.sqrt(variance), 3),
+            'percentiles': {f'p{p}': round(_percentile(values, p), 2) for p in percentiles},
+        })
+        return result
+
+
+_LEADERBOARD_UPSERT_SQL = """
+    INSERT INTO leaderboard (
+        event_id, event_item_id, round_number, participant_id, entry_id,
+        judge_count, score_sum, score_min, score_max, average_score,
+        validity_status, modification_count
+    ) VALUES (
+        %(event_id)s, %(event_item_id)s, %(round_number)s, %(participant_id)s, %(entry_id)s,
+        %(judge_count)s, %(score_sum)s, %(score_min)s, %(score_max)s, %(average_score)s,
+        %(validity_status)s, %(modification_count)s
+    )
+    ON DUPLICATE KEY UPDATE
+        entry_id = VALUES(entry_id),
+        judge_count = VALUES(judge_count),
+        score_sum = VALUES(score_sum),
+        score_min = VALUES(score_min),
+        score_max = VALUES(score_max),
+        average_score = VALUES(average_score),
+        validity_status = VALUES(validity_status),
+        modification_count = VALUES(modification_count)
+"""
+
+
+def _build_leaderboard_entry(event_id, event_item_id, round_number, participant_id, entry_id,
+                             total, low, high, count, modification_count, scoring_config):
+    """组装一条排行榜记录（供增量刷新与全量重建共用）"""
+    min_judges = scoring_config.get('min_judges', 3)
+    if count == 0:
+        validity_status = 'no_scores'
+    elif count < min_judges:
+        validity_status = 'insufficient_scores'
+    else:
+        validity_status = 'valid'
+
+    return {
+        'event_id': event_id,
+        'event_item_id': event_item_id or 0,
+        'round_number': round_number,
+        'participant_id': participant_id,
+        'entry_id': entry_id,
+        'judge_count': count,
+        'score_sum': round(total, 2) if count else None,
+        'score_min': low,
+        'score_max': high,
+        'average_score': _trimmed_average(
+            total, low, high, count,
+            scoring_config.get('drop_highest', True),
+            scoring_config.get('drop_lowest', True),
+            scoring_config.get('decimal_places', 2),
+        ),
+        'validity_status': validity_status,
+        'modification_count': modification_count,
+    }
+
+
+class _ScoreAccumulator:
+    """单个参赛者的成绩累加器：记录总和/最高/最低分，避免排序即可得到去极值平均分。"""
+
+    __slots__ = ('rounds', 'total', 'low', 'high', 'count')
+
+    def __init__(self):
+        # round_number -> [total, low, high, count]
+        self.rounds = {}
+        self.total = 0.0
+        self.low = None
+        self.high = None
+        self.count = 0
+
+    def add(self, row):
+        value = row['total_score']
+        if value is None:
+            return
+        value = float(value)
+
+        self.count += 1
+        self.total += value
+        if self.low is None or value < self.low:
+            self.low = value
+        if self.high is None or value > self.high:
+            self.high = value
+
+        stats = self.rounds.get(row['round_number'])
+        if stats is None:
+            self.rounds[row['round_number']] = [value, value, value, 1]
+        else:
+            stats[0] += value
+            if value < stats[1]:
+                stats[1] = value
+            if value > stats[2]:
+                stats[2] = value
+            stats[3] += 1
@@ -1,16 +1,33 @@
 import logging
-import time
 
 from mysql.connector import Error
 
+from config import Config
 from models import User
 from utils.helpers import generate_password_hash
+from utils.invalidation import (
+    InvalidatedCache,
+    publish_invalidation,
+    TOPIC_SESSION_TOKEN,
+    TOPIC_USER,
+)
+from utils.pagination import keyset_condition, estimate_row_count
 
 
 logger = logging.getLogger(__name__)
 
-_session_token_cache = {}
-_SESSION_TOKEN_CACHE_TTL = 5
+# 单点登录会话标识缓存：登录/登出写库后经失效总线通知所有进程，因此可以缓存较长时间
+_session_token_cache = InvalidatedCache(
+    TOPIC_SESSION_TOKEN,
+    getattr(Config, 'SESSION_TOKEN_CACHE_TTL', 300),
+    key_type=int,
+)
+
+
+def _username_of(cursor, user_id):
+    cursor.execute("SELECT username FROM users WHERE user_id = %s", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
 
 
 class UserDbMixin:
@@ -83,52 +100,29 @@ class UserDbMixin:
             raise
 
     def get_user_for_login(self, username_or_phone):
-        """获取用户用于登录验证（支持用户名或手机号登录，包括非活跃用户）"""
+        """获取用于登录验证的唯一候选用户（包括非活跃用户），不存在时返回 None
+
+        先按用户名精确匹配，未命中再按手机号匹配，每次登录最多只需计算一次密码哈希。
+        同一手机号对应多个账号时，优先正常、启用的账号，其次最早注册的账号。
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor(dictionary=True)
-                # 同时查询用户名或手机号匹配的所有用户
-                cursor.execute(
-                    "SELECT * FROM users WHERE username = %s OR phone = %s", 
-                    (username_or_phone, username_or_phone)
-                )
-                rows = cursor.fetchall()
-                
-                if not rows:
-                    return None
-                
-                # 将所有匹配的用户转换为User对象
-                users = []
-                for row in rows:
-                    users.append(User(
-                        user_id=row['user_id'],
-                        username=row['username'],
-                        real_name=row['real_name'],
-                        email=row['email'],
-                        phone=row['phone'],
-                        role=row['role'],
-                        created_at=row['created_at'],
-                        updated_at=row['updated_at'],
-                        is_active=row['is_active'],
-                        status=row.get('status', 'normal'),
-                        nickname=row.get('nickname'),
-                        team_name=row.get('team_name'),
-                        password=row.get('password'),
-                        password_hash=row.get('password_hash'),
-                        session_token=row.get('session_token'),
-                        id_card=row.get('id_card'),
-                        gender=row.get('gender'),
-                        birthdate=row.get('birthdate'),
-                        deleted_at=row.get('deleted_at')
-                    ))
-                
-                # 如果只有一个匹配，直接返回
-                if len(users) == 1:
-                    return users[0]
-                
-                # 如果有多个匹配（用户名与其他用户的手机号重复），返回列表
-                return users
-                
+                cursor.execute("SELECT * FROM users WHERE username = %s LIMIT 1", (username_or_phone,))
+                row = cursor.fetchone()
+                if not row:
+                    cursor.execute(
+                        """
+                        SELECT * FROM users
+                        WHERE phone = %s
+                        ORDER BY (status = 'normal') DESC, is_active DESC, user_id ASC
+                        LIMIT 1
+                        """,
+                        (username_or_phone,),
+                    )
+                    row = cursor.fetchone()
+                return self._row_to_user(row) if row else None
+
         except Error as e:
             logger.error(f"获取用户失败: {e}")
             raise
@@ -222,36 +216,81 @@ class UserDbMixin:
                             created_at DESC
                     """)
                 
-                users = []
-                for row in cursor.fetchall():
-                    users.append(User(
-                        user_id=row['user_id'],
-                        username=row['username'],
-                        real_name=row['real_name'],
-                        email=row['email'],
-                        phone=row['phone'],
-                        role=row['role'],
-                        created_at=row['created_at'],
-                        updated_at=row['updated_at'],
-                        is_active=row['is_active'],
-                        status=row.get('status', 'normal'),
-                        nickname=row.get('nickname'),
-                        team_name=row.get('team_name'),
-                        password=row.get('password'),
-                        password_hash=row.get('password_hash'),
-                        session_token=row.get('session_token'),
-                        id_card=row.get('id_card'),
-                        gender=row.get('gender'),
-                        birthdate=row.get('birthdate'),
-                        deleted_at=row.get('deleted_at')
-                    ))
-                
-                return users
+                return [self._row_to_user(row) for row in cursor.fetchall()]
                 
         except Error as e:
             logger.error(f"获取用户列表失败: {e}")
             raise
 
+    def get_users_page(self, role=None, limit=50, after=None, total_mode='exact'):
+        """按 (created_at, user_id) 倒序的游标分页获取用户（created_at 为 NOT NULL，见迁移 v9）
+
+        Args:
+            after: 上一页最后一行的 (created_at, user_id)，None 表示第一页
+            total_mode: exact 精确计数 / approx 执行计划估算 / none 不计数
+
+        Returns:
+            (total, users)，total_mode 为 none 时 total 为 None
+        """
+        where_clauses = []
+        params = []
+        if role:
+            where_clauses.append("role = %s")
+            params.append(role)
+
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+
+                where_sql = (" WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
+                total = None
+                if total_mode == 'exact':
+                    cursor.execute("SELECT COUNT(*) AS cnt FROM users" + where_sql, params)
+                    total = cursor.fetchone()['cnt']
+                elif total_mode == 'approx':
+                    total = estimate_row_count(cursor, "FROM users" + where_sql, params)
+
+                list_params = list(params)
+                if after is not None:
+                    condition, condition_params = keyset_condition(('created_at', 'user_id'), after, 'DESC')
+                    where_sql += (" AND " if where_sql else " WHERE ") + condition
+                    list_params.extend(condition_params)
+
+                cursor.execute(
+                    "SELECT * FROM users" + where_sql
+                    + " ORDER BY created_at DESC, user_id DESC LIMIT %s",
+                    list_params + [limit],
+                )
+                return total, [self._row_to_user(row) for row in cursor.fetchall()]
+
+        except Error as e:
+            logger.error(f"分页获取用户列表失败: {e}")
+            raise
+
+    @staticmethod
+    def _row_to_user(row):
+        return User(
+            user_id=row['user_id'],
+            username=row['username'],
+            real_name=row['real_name'],
+            email=row['email'],
+            phone=row['phone'],
+            role=row['role'],
+            created_at=row['created_at'],
+            updated_at=row['updated_at'],
+            is_active=row['is_active'],
+            status=row.get('status', 'normal'),
+            nickname=row.get('nickname'),
+            team_name=row.get('team_name'),
+            password=row.get('password'),
+            password_hash=row.get('password_hash'),
+            session_token=row.get('session_token'),
+            id_card=row.get('id_card'),
+            gender=row.get('gender'),
+            birthdate=row.get('birthdate'),
+            deleted_at=row.get('deleted_at')
+        )
+
     def update_user_role(self, username, new_role):
         """更新用户角色"""
         try:
@@ -267,6 +306,7 @@ class UserDbMixin:
                     raise Exception("用户不存在或更新失败")
                 
                 conn.commit()
+                publish_invalidation(TOPIC_USER, username)
                 logger.info(f"用户 {username} 的角色已更新为 {new_role.value}")
                 return True
                 
@@ -289,6 +329,7 @@ class UserDbMixin:
                     raise Exception("用户不存在或更新失败")
                 
                 conn.commit()
+                publish_invalidation(TOPIC_USER, username)
                 logger.info(f"用户 {username} 的角色已更新为 {new_role.value}，状态已更新为 {status}")
                 return True
                 
@@ -319,6 +360,7 @@ class UserDbMixin:
                     raise Exception("用户不存在或更新失败")
                 
                 conn.commit()
+                publish_invalidation(TOPIC_USER, user.username)
                 logger.info(f"用户ID {user.user_id} 的信息已更新")
                 return True
                 
@@ -337,14 +379,34 @@ class UserDbMixin:
                     SET password = %s, password_hash = %s, updated_at = CURRENT_TIMESTAMP 
                     WHERE user_id = %s
                 """, (new_password, password_hash, user_id))
+                updated = cursor.rowcount > 0
+                username = _username_of(cursor, user_id) if updated else None
                 
                 conn.commit()
-                return cursor.rowcount > 0
+                if username:
+                    publish_invalidation(TOPIC_USER, username)
+                return updated
                 
         except Error as e:
             logger.error(f"更新用户密码失败: {e}")
             raise
     
+    def update_user_password_hash(self, user_id, password_hash):
+        """只更新密码哈希（登录成功后按当前算法/代价重新计算哈希时使用）"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE users SET password_hash = %s, updated_at = updated_at WHERE user_id = %s",
+                    (password_hash, user_id),
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+
+        except Error as e:
+            logger.error(f"更新用户密码哈希失败: {e}")
+            raise
+
     def update_user_profile(self, user_id, full_name, nickname, phone):
         """更新用户个人资料"""
         try:
@@ -355,9 +417,13 @@ class UserDbMixin:
                     SET real_name = %s, nickname = %s, phone = %s, updated_at = CURRENT_TIMESTAMP 
                     WHERE user_id = %s
                 """, (full_name, nickname, phone, user_id))
+                updated = cursor.rowcount > 0
+                username = _username_of(cursor, user_id) if updated else None
                 
                 conn.commit()
-                return cursor.rowcount > 0
+                if username:
+                    publish_invalidation(TOPIC_USER, username)
+                return updated
                 
         except Error as e:
             logger.error(f"更新用户资料失败: {e}")
@@ -374,6 +440,7 @@ class UserDbMixin:
                     (new_status, username)
                 )
                 conn.commit()
+                publish_invalidation(TOPIC_USER, username)
                 return cursor.rowcount > 0
                 
         except Error as e:
@@ -390,19 +457,19 @@ class UserDbMixin:
                     (session_token, user_id),
                 )
                 conn.commit()
+                # 其他 worker 立即失效旧标识，旧会话在下一个请求即被挤下线
+                publish_invalidation(TOPIC_SESSION_TOKEN, user_id)
                 return cursor.rowcount > 0
         except Error as e:
             logger.error(f"更新用户session_token失败: {e}")
             raise
 
     def get_user_session_token(self, user_id):
-        """获取用户当前有效的单点登录会话标识（带短期内存缓存）"""
-        now = time.time()
-        entry = _session_token_cache.get(user_id)
-        if entry:
-            expires_at, cached_token = entry
-            if now < expires_at:
-                return cached_token
+        """获取用户当前有效的单点登录会话标识（带进程内缓存，变更时经失效总线失效）"""
+        generation = _session_token_cache.generation()
+        hit, cached_token = _session_token_cache.get(user_id)
+        if hit:
+            return cached_token
 
         try:
             with self.get_connection() as conn:
@@ -413,12 +480,12 @@ class UserDbMixin:
                 )
                 row = cursor.fetchone() or {}
                 token = row.get('session_token')
-                _session_token_cache[user_id] = (now + _SESSION_TOKEN_CACHE_TTL, token)
+                _session_token_cache.set(user_id, token, generation)
                 return token
         except Error as e:
             logger.error(f"获取用户session_token失败: {e}")
             raise
 
     def invalidate_session_token_cache(self, user_id):
-        """登录/登出时主动清除 session_token 缓存"""
-        _session_token_cache.pop(user_id, None)
+        """主动清除所有进程中的 session_token 缓存（update_user_session_token 已自动通知）"""
+        publish_invalidation(TOPIC_SESSION_TOKEN, user_id)
@@ -266,7 +266,7 @@ DATABASE_SCHEMA = {
             gender ENUM('male', 'female', 'other') DEFAULT NULL COMMENT '性别',
             birthdate DATE DEFAULT NULL COMMENT '出生日期',
             role ENUM('super_admin', 'admin', 'judge', 'user') DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '注册时间（用户列表游标分页键，不可为空）',
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
             is_active BOOLEAN DEFAULT TRUE,
             status ENUM('normal', 'abnormal', 'frozen') DEFAULT 'normal',
@@ -276,7 +276,8 @@ DATABASE_SCHEMA = {
             INDEX idx_username (username),
             INDEX idx_role (role),
             INDEX idx_status (status),
-            INDEX idx_phone (phone)
+            INDEX idx_phone (phone),
+            INDEX idx_created_at (created_at)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户表（账号、基本资料、登录状态）';
     ''',
     
@@ -388,9 +389,11 @@ DATABASE_SCHEMA = {
             sender_id INT NOT NULL,
             title VARCHAR(100) NOT NULL,
             content TEXT NOT NULL,
-            recipient_type ENUM('all', 'role') DEFAULT 'all',
+            recipient_type ENUM('all', 'role', 'event') DEFAULT 'all',
             roles VARCHAR(200) COMMENT '角色列表，逗号分隔',
             priority ENUM('normal', 'important', 'urgent') DEFAULT 'normal',
+            delivery_status ENUM('pending', 'sending', 'completed', 'failed') DEFAULT 'completed' COMMENT '收件人分发状态',
+            recipient_count INT DEFAULT 0 COMMENT '已分发收件人数',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (sender_id) REFERENCES users(user_id),
             INDEX idx_created_at (created_at)
@@ -421,6 +424,7 @@ DATABASE_SCHEMA = {
             file_name VARCHAR(255) COMMENT '原始文件名',
             file_size INT COMMENT '文件大小（字节）',
             file_type VARCHAR(50) COMMENT '文件类型',
+            file_sha256 CHAR(64) NULL COMMENT '附件内容 SHA-256（文件存放在附件存储目录）',
             created_by INT NOT NULL COMMENT '创建者用户ID',
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
@@ -429,7 +433,8 @@ DATABASE_SCHEMA = {
             FOREIGN KEY (created_by) REFERENCES users(user_id) ON DELETE CASCADE,
             INDEX idx_created_at (created_at),
             INDEX idx_created_by (created_by),
-            INDEX idx_is_active (is_active)
+            INDEX idx_is_active (is_active),
+            INDEX idx_file_sha256 (file_sha256)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='通知公告表（面向全体或按角色发送的公告）';
     ''',
     
@@ -566,8 +571,10 @@ DATABASE_SCHEMA = {
             user_id INT NULL,
             participant_id INT NULL,
             name VARCHAR(100) NOT NULL,
-            gender VARCHAR(10),
+            gender VARCHAR(10) COMMENT '性别（男/女，优先由身份证号推导）',
             age INT,
+            birth_date DATE NULL COMMENT '出生日期（由身份证号推导）',
+            age_group VARCHAR(20) NULL COMMENT '年龄组（由出生日期推导，每日刷新）',
             phone VARCHAR(20),
             id_card VARCHAR(30),
             competition_event VARCHAR(500),
@@ -587,7 +594,8 @@ DATABASE_SCHEMA = {
             FOREIGN KEY (user_id) REFERENCES users(user_id),
             FOREIGN KEY (participant_id) REFERENCES participants(participant_id),
             UNIQUE KEY uniq_player_identity (event_id, team_id, id_card),
-            INDEX idx_event_team (event_id, team_id)
+            INDEX idx_event_team (event_id, team_id),
+            INDEX idx_event_gender_age_group (event_id, gender, age_group)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='队员旧表（队伍成员与所报项目的旧结构）';
     ''',
 
@@ -807,6 +815,88 @@ DATABASE_SCHEMA = {
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='成绩修改历史表（新结构，按成绩+报名条目记录成绩修改历史）';
     ''',
 
+    'leaderboard': '''
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            leaderboard_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            event_id INT NOT NULL COMMENT '赛事ID',
+            event_item_id INT NOT NULL DEFAULT 0 COMMENT '项目ID（0 表示未区分项目）',
+            round_number INT NOT NULL DEFAULT 0 COMMENT '轮次（0 表示全部轮次汇总）',
+            participant_id INT NOT NULL COMMENT '参赛者ID',
+            entry_id BIGINT NULL COMMENT '报名条目ID',
+            judge_count INT NOT NULL DEFAULT 0 COMMENT '有效评分裁判数',
+            score_sum DECIMAL(8,2) NULL COMMENT '评分总和',
+            score_min DECIMAL(5,2) NULL COMMENT '最低分',
+            score_max DECIMAL(5,2) NULL COMMENT '最高分',
+            average_score DECIMAL(6,2) NULL COMMENT '去最高/最低分后的平均分',
+            validity_status ENUM('no_scores', 'insufficient_scores', 'valid') NOT NULL DEFAULT 'no_scores' COMMENT '成绩有效性',
+            rank_in_round INT NULL COMMENT '排名（已改为读取时按窗口函数计算，保留列兼容旧库）',
+            modification_count INT NOT NULL DEFAULT 0 COMMENT '成绩修改次数',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE,
+            FOREIGN KEY (participant_id) REFERENCES participants(participant_id) ON DELETE CASCADE,
+            UNIQUE KEY uniq_leaderboard_participant (event_id, event_item_id, round_number, participant_id),
+            INDEX idx_participant (participant_id)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='成绩排行榜物化表（随评分提交增量维护）';
+    ''',
+
+    'jobs': '''
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            job_type VARCHAR(64) NOT NULL COMMENT '任务类型',
+            payload LONGTEXT COMMENT '任务参数(JSON)',
+            status ENUM('queued', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'queued' COMMENT '任务状态',
+            priority INT NOT NULL DEFAULT 0 COMMENT '优先级（越大越先执行）',
+            attempts INT NOT NULL DEFAULT 0 COMMENT '已执行次数',
+            max_attempts INT NOT NULL DEFAULT 3 COMMENT '最大执行次数',
+            run_after DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '最早执行时间（用于重试退避）',
+            progress INT NOT NULL DEFAULT 0 COMMENT '进度(0-100)',
+            progress_message VARCHAR(255) NULL COMMENT '进度说明',
+            result LONGTEXT NULL COMMENT '执行结果(JSON)',
+            error TEXT NULL COMMENT '最近一次错误',
+            locked_by VARCHAR(128) NULL COMMENT '执行中的worker标识',
+            locked_at DATETIME NULL COMMENT '领取/心跳时间',
+            created_by INT NULL COMMENT '创建人',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME NULL,
+            finished_at DATETIME NULL,
+            INDEX idx_status_run_after (status, run_after),
+            INDEX idx_type_status (job_type, status),
+            INDEX idx_created_by (created_by)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='后台任务队列表';
+    ''',
+
+    'schema_migrations': '''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY COMMENT '迁移版本号',
+            name VARCHAR(255) NOT NULL COMMENT '迁移说明',
+            duration_ms INT NOT NULL DEFAULT 0 COMMENT '执行耗时(毫秒)',
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '执行时间'
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='数据库结构迁移版本表';
+    ''',
+
+    'cache_versions': '''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            version BIGINT AUTO_INCREMENT PRIMARY KEY COMMENT '通知序号（各进程按序号轮询）',
+            topic VARCHAR(64) NOT NULL COMMENT '缓存主题',
+            cache_key VARCHAR(191) NULL COMMENT '失效的缓存键（NULL 表示整个主题）',
+            origin VARCHAR(64) NULL COMMENT '发布进程标识',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_created_at (created_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='跨进程缓存失效通知表（未配置 Redis 时使用）';
+    ''',
+
+    'user_sessions': '''
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            session_id VARCHAR(64) PRIMARY KEY COMMENT '会话ID（Cookie 中只保存该值）',
+            user_id INT NULL COMMENT '登录用户ID（未登录会话为 NULL）',
+            data MEDIUMTEXT NOT NULL COMMENT '会话内容(JSON)',
+            updated_at DATETIME NOT NULL COMMENT '最近写入/续期时间',
+            expires_at DATETIME NOT NULL COMMENT '过期时间',
+            INDEX idx_user_id (user_id),
+            INDEX idx_expires_at (expires_at)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='服务端会话表（SESSION_BACKEND=mysql 时使用）';
+    ''',
+
     'payment_records': '''
         CREATE TABLE IF NOT EXISTS payment_records (
             payment_id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+根据 scores 与 score_modification_logs 重新生成 leaderboard 排行榜物化表。
+
+用法:
+    python rebuild_leaderboard.py            # 重建所有赛事
+    python rebuild_leaderboard.py 12 15      # 仅重建指定赛事
+"""
+
+import sys
+
+from database import DatabaseManager
+
+
+if __name__ == '__main__':
+    db = DatabaseManager()
+    event_ids = [int(arg) for arg in sys.argv[1:]]
+
+    if event_ids:
+        for event_id in event_ids:
+            count = db.rebuild_leaderboard(event_id)
+            print(f'赛事 {event_id}: 写入 {count} 条排行榜记录')
+    else:
+        count = db.rebuild_leaderboard()
+        print(f'全部赛事: 写入 {count} 条排行榜记录')
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 测试公共配置：查询预算
+
+tests/ 下的测试自动获得 query_budget fixture 和 query_budget 标记。
+
+按代码块断言：
+    def test_event_results(client, query_budget):
+        with query_budget(max_queries=5, max_repeats=1) as captured:
+            client.get('/api/events/1/results')
+        assert captured.stats.rows > 0
+
+按整个测试断言：
+    @pytest.mark.query_budget(max_queries=5, max_repeats=1)
+    def test_event_results(client):
+        client.get('/api/events/1/results')
+
+应用以 TESTING 配置运行时，请求内同一语句超过 QUERY_REPEAT_THRESHOLD 次也会直接报错。
+"""
+
+import pytest
+
+from utils.query_stats import capture_queries
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries=None, max_repeats=None): 限制整个测试执行的 SQL 条数与单条语句重复次数',
+    )
+
+
+@pytest.fixture
+def query_budget():
+    """返回 capture_queries 工厂：with query_budget(max_queries=..., max_repeats=...) as captured"""
+    return capture_queries
+
+
+@pytest.fixture(autouse=True)
+def _query_budget_marker(request):
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is None:
+        yield None
+        return
+    with capture_queries(**marker.kwargs) as captured:
+        yield captured
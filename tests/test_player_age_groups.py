@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+队员年龄组定期重算：SQL CASE 表达式与 PLAYER_AGE_GROUPS 保持一致
+"""
+
+from contextlib import contextmanager
+
+from db_modules.db_participants import ParticipantDbMixin, _age_group_case_sql
+from utils.helpers import PLAYER_AGE_GROUPS
+
+
+def test_case_sql_follows_player_age_groups():
+    sql = _age_group_case_sql('birth_date')
+
+    age_sql = 'TIMESTAMPDIFF(YEAR, birth_date, CURDATE())'
+    bounded = [(upper, name) for upper, name in PLAYER_AGE_GROUPS if upper is not None]
+    for upper, name in bounded:
+        assert f"WHEN {age_sql} < {upper} THEN '{name}'" in sql
+    # 分支顺序与划分顺序一致，最后一组无上限作为 ELSE
+    positions = [sql.index(f"'{name}'") for _, name in bounded]
+    assert positions == sorted(positions)
+    assert sql.endswith(f"ELSE '{PLAYER_AGE_GROUPS[-1][1]}' END)")
+
+
+class _FakeCursor:
+    def __init__(self, executed):
+        self._executed = executed
+        self.rowcount = 3
+
+    def execute(self, operation, params=None):
+        self._executed.append(operation)
+
+
+class _FakeConnection:
+    def __init__(self, executed):
+        self._executed = executed
+        self.committed = False
+
+    def cursor(self):
+        return _FakeCursor(self._executed)
+
+    def commit(self):
+        self.committed = True
+
+
+class _Players(ParticipantDbMixin):
+    def __init__(self):
+        self.executed = []
+        self.conn = _FakeConnection(self.executed)
+
+    @contextmanager
+    def get_connection(self):
+        yield self.conn
+
+
+def test_refresh_player_age_groups_updates_changed_rows_only():
+    players = _Players()
+
+    assert players.refresh_player_age_groups() == 3
+    assert players.conn.committed
+    (sql,) = players.executed
+    assert 'UPDATE team_players' in sql
+    assert f"NOT (age_group <=> {_age_group_case_sql('birth_date')})" in sql
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+查询预算：接口超出 SQL 条数 / 单条语句重复次数预算时测试失败
+
+用一个小型 Flask 应用模拟两种写法的成绩接口：按赛事一次查出全部成绩，以及逐个参赛者查询（N+1）。
+游标经过与生产相同的 TimedCursorWrapper，统计路径与真实请求一致，只是数据库换成内存假连接。
+"""
+
+import pytest
+from flask import Flask, jsonify
+
+from database import TimedCursorWrapper
+from utils.query_stats import QueryBudgetExceeded
+
+PARTICIPANT_IDS = list(range(1, 21))
+
+
+class _FakeCursor:
+    def __init__(self):
+        self._rows = []
+
+    def execute(self, operation, params=None, multi=False):
+        if 'participant_id = %s' in operation:
+            self._rows = [(params[0], 8.5)]
+        elif 'FROM scores' in operation:
+            self._rows = [(pid, 8.5) for pid in PARTICIPANT_IDS]
+        else:
+            self._rows = [(pid,) for pid in PARTICIPANT_IDS]
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def _cursor():
+    return TimedCursorWrapper(_FakeCursor(), slow_threshold_ms=10 ** 6)
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+
+    @app.route('/events/<int:event_id>/results')
+    def results_batched(event_id):
+        cursor = _cursor()
+        cursor.execute("SELECT participant_id FROM participants WHERE event_id = %s", (event_id,))
+        participant_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT participant_id, total_score FROM scores WHERE event_id = %s", (event_id,))
+        scores = dict(cursor.fetchall())
+        return jsonify({pid: scores.get(pid) for pid in participant_ids})
+
+    @app.route('/events/<int:event_id>/results-n-plus-one')
+    def results_n_plus_one(event_id):
+        cursor = _cursor()
+        cursor.execute("SELECT participant_id FROM participants WHERE event_id = %s", (event_id,))
+        results = {}
+        for (pid,) in cursor.fetchall():
+            cursor.execute("SELECT participant_id, total_score FROM scores WHERE participant_id = %s", (pid,))
+            results[pid] = cursor.fetchall()[0][1]
+        return jsonify(results)
+
+    return app.test_client()
+
+
+def test_batched_endpoint_within_budget(client, query_budget):
+    with query_budget(max_queries=2, max_repeats=1) as captured:
+        response = client.get('/events/1/results')
+    assert response.status_code == 200
+    assert captured.stats.count == 2
+    assert captured.stats.rows == 2 * len(PARTICIPANT_IDS)
+
+
+@pytest.mark.query_budget(max_queries=2, max_repeats=1)
+def test_budget_marker_covers_whole_test(client):
+    assert client.get('/events/1/results').status_code == 200
+
+
+def test_n_plus_one_endpoint_exceeds_query_count(client, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match='超过预算 2'):
+        with query_budget(max_queries=2):
+            client.get('/events/1/results-n-plus-one')
+
+
+def test_n_plus_one_endpoint_exceeds_repeat_budget(client, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match='超过单条预算 1'):
+        with query_budget(max_repeats=1):
+            client.get('/events/1/results-n-plus-one')
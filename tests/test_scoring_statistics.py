@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+赛事评分统计：空赛事、单个评分、直方图边界与裁判覆盖率
+
+数据库换成按 SQL 返回固定结果的假连接，只验证 get_event_scoring_statistics 的聚合逻辑。
+"""
+
+from contextlib import contextmanager
+
+import pytest
+
+from db_modules.db_scores import (
+    ScoreDbMixin,
+    _histogram_counts,
+    _histogram_edges,
+    _percentile,
+)
+
+
+class _FakeCursor:
+    def __init__(self, tables):
+        self._tables = tables
+        self._rows = []
+
+    def execute(self, operation, params=None):
+        if 'FROM participants WHERE event_id' in operation:
+            self._rows = [(pid,) for pid in self._tables['participants']]
+        elif 'FROM event_items' in operation:
+            self._rows = list(self._tables['items'])
+        else:
+            self._rows = list(self._tables['scores'])
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, tables):
+        self._tables = tables
+
+    def cursor(self, buffered=True):
+        return _FakeCursor(self._tables)
+
+
+class _Stats(ScoreDbMixin):
+    def __init__(self, participants=(), items=(), scores=()):
+        self._tables = {'participants': list(participants), 'items': list(items), 'scores': list(scores)}
+
+    @contextmanager
+    def get_connection(self):
+        yield _FakeConnection(self._tables)
+
+
+def _score(participant_id, judge_id, total, item_id=1, round_number=1):
+    """(participant_id, judge_id, round_number, event_item_id, technique, performance, total)"""
+    return participant_id, judge_id, round_number, item_id, total - 2, 2, total
+
+
+def test_empty_event():
+    result = _Stats().get_event_scoring_statistics(1)
+
+    assert result['total_participants'] == 0
+    assert result['total_scores'] == 0
+    assert result['average_total_score'] == 0.0
+    assert result['overall']['judge_coverage'] is None
+    assert result['overall']['percentiles'] == {'p10': None, 'p25': None, 'p50': None, 'p75': None, 'p90': None}
+    assert result['histogram'] == {'edges': [], 'counts': []}
+    assert result['groups'] == []
+    assert result['judges'] == []
+
+
+def test_registered_participants_without_scores():
+    result = _Stats(participants=[1, 2], items=[(1, '长拳', 2)]).get_event_scoring_statistics(1)
+
+    assert result['total_participants'] == 2
+    assert result['unscored_participants'] == 2
+    assert result['overall']['registered_count'] == 2
+    assert result['overall']['judge_coverage'] is None
+
+
+def test_single_score():
+    stats = _Stats(participants=[1], items=[(1, '长拳', 1)], scores=[_score(1, 10, 8.5)])
+    result = stats.get_event_scoring_statistics(1)
+
+    overall = result['overall']
+    assert overall['score_count'] == 1
+    assert overall['min'] == overall['max'] == 8.5
+    assert overall['stddev'] == 0.0
+    assert set(overall['percentiles'].values()) == {8.5}
+    assert overall['judge_coverage'] == 1.0
+    assert result['histogram']['edges'][0] == 8
+    assert result['histogram']['edges'][-1] == 9
+    assert sum(result['histogram']['counts']) == 1
+    assert result['groups'][0]['event_item_name'] == '长拳'
+
+
+def test_judge_coverage_counts_unscored_registrations():
+    # 4 名报名者只有 2 名被 2 位裁判全部评分：覆盖率 4 / (4 x 2)
+    scores = [_score(pid, judge, 8.0 + pid / 10) for pid in (1, 2) for judge in (10, 11)]
+    result = _Stats(participants=[1, 2, 3, 4], items=[(1, '长拳', 4)], scores=scores).get_event_scoring_statistics(1)
+
+    assert result['overall']['judge_coverage'] == 0.5
+    assert result['groups'][0]['registered_count'] == 4
+    assert result['groups'][0]['judge_coverage'] == 0.5
+
+
+def test_group_without_entries_falls_back_to_scored_participants():
+    scores = [_score(1, 10, 8.0, item_id=2), _score(1, 11, 8.2, item_id=2)]
+    result = _Stats(participants=[1, 2], items=[(2, '南拳', 0)], scores=scores).get_event_scoring_statistics(1)
+
+    assert result['groups'][0]['registered_count'] == 1
+    assert result['groups'][0]['judge_coverage'] == 1.0
+    assert result['overall']['judge_coverage'] == 0.5
+
+
+def test_scores_of_unregistered_participants_are_ignored():
+    result = _Stats(participants=[1], items=[(1, '长拳', 1)], scores=[_score(1, 10, 8.0), _score(99, 10, 9.9)]) \
+        .get_event_scoring_statistics(1)
+
+    assert result['total_scores'] == 1
+    assert result['highest_score'] == 8.0
+
+
+def test_percentile_interpolates_linearly():
+    assert _percentile([], 50) is None
+    assert _percentile([7.0], 90) == 7.0
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 50) == pytest.approx(2.5)
+    assert _percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+
+
+def test_histogram_edges():
+    assert _histogram_edges(None, None, 10) == []
+    # 最低分与最高分相同：至少保留宽度 1 的区间
+    assert _histogram_edges(9.0, 9.0, 2) == [9, 9.5, 10]
+    assert _histogram_edges(7.3, 9.6, 3) == [7, 8, 9, 10]
+    assert _histogram_edges(8.0, 9.0, 0) == [8, 9]
+
+
+def test_histogram_counts_clamp_boundaries():
+    edges = [7, 8, 9, 10]
+    # 恰在内部边界的值落入右侧分箱，最高边界与越界值归入最后/第一个分箱
+    assert _histogram_counts([7.0, 8.0, 9.0, 10.0], edges) == [1, 1, 2]
+    assert _histogram_counts([6.5, 10.5], edges) == [1, 0, 1]
+    assert _histogram_counts([8.5], []) == []
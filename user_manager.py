@@ -5,34 +5,51 @@
 """
 
 from datetime import datetime
-import time
+import logging
+from config import Config
 from models import User, UserRole, UserStatus
 from database import DatabaseManager
-from utils.helpers import generate_password_hash, verify_password
+from utils.helpers import password_needs_rehash
+from utils.password_hashing import check_password, hash_password, PasswordHashingBusy
+from utils.invalidation import InvalidatedCache, TOPIC_USER
+from utils.server_session import revoke_user_sessions
 import re
 
+logger = logging.getLogger(__name__)
+
 class UserManager:
     """用户管理器 - 使用MySQL数据库存储"""
     
     def __init__(self):
         self.db_manager = DatabaseManager()
-        self._user_cache = {}
-        self._user_cache_ttl = 10
+        # 按用户名缓存用户；状态/角色等变更由 db 层发布失效通知，所有进程立即失效
+        self._user_cache = InvalidatedCache(TOPIC_USER, getattr(Config, 'USER_CACHE_TTL', 300))
     
     def _verify_user_password(self, user, password):
+        """验证密码（在有界哈希执行器中计算），成功且哈希需要升级时顺带重新计算
+
+        执行器繁忙时抛出 PasswordHashingBusy，由登录接口返回 503。
+        """
+        stored_hash = getattr(user, 'password_hash', None)
         matched = False
-        if getattr(user, 'password_hash', None):
-            try:
-                if verify_password(password, user.password_hash):
-                    matched = True
-            except Exception:
-                matched = False
-        if (not matched) and user.password == password:
+        if stored_hash:
+            matched = check_password(password, stored_hash)
+        if (not matched) and user.password and user.password == password:
+            # 过渡期兼容只有明文密码的账号
             matched = True
+            stored_hash = None
+
+        if matched and (not stored_hash or password_needs_rehash(stored_hash)):
             try:
-                self.db_manager.update_user_password(user.user_id, password)
-            except Exception:
+                new_hash = hash_password(password)
+                self.db_manager.update_user_password_hash(user.user_id, new_hash)
+                user.password_hash = new_hash
+                logger.info(f"用户 {user.user_id} 的密码哈希已升级为当前算法与代价")
+            except PasswordHashingBusy:
+                # 升级不是必须的，繁忙时留到下次登录
                 pass
+            except Exception as e:
+                logger.warning(f"用户 {user.user_id} 的密码哈希升级失败: {e}")
         return matched
 
     def init_database(self):
@@ -40,7 +57,7 @@ class UserManager:
         try:
             self.db_manager.init_database()
         except Exception as e:
-            print(f"数据库初始化失败: {e}")
+            logger.error(f"数据库初始化失败: {e}")
     
     
     def register_user(self, username, password, real_name, email, phone, team_name=None):
@@ -80,88 +97,60 @@ class UserManager:
             return False, f"注册失败: {str(e)}"
     
     def authenticate_user(self, username_or_phone, password):
-        """验证用户登录（支持用户名或手机号登录）"""
+        """验证用户登录（支持用户名或手机号登录）
+
+        密码哈希执行器繁忙时抛出 PasswordHashingBusy，由调用方返回 503。
+        """
         try:
-            print(f"\n[调试] 尝试登录: {username_or_phone}")
-            result = self.db_manager.get_user_for_login(username_or_phone)
-            
+            user = self.db_manager.get_user_for_login(username_or_phone)
+
             # 检查用户是否存在
-            if not result:
-                print(f"[调试] 用户不存在: {username_or_phone}")
+            if not user:
+                logger.debug(f"登录失败，用户不存在: {username_or_phone}")
                 return None, "用户不存在"
-            
-            # 处理单个用户或多个用户的情况
-            users_to_check = [result] if not isinstance(result, list) else result
-            
-            print(f"[调试] 找到 {len(users_to_check)} 个匹配的用户")
-            
-            # 遍历所有匹配的用户，找到密码正确的那个
-            matched_user = None
-            for user in users_to_check:
-                print(f"[调试] 检查用户: {user.username} (手机号: {user.phone})")
-                print(f"[调试] 存储的密码: {user.password}")
-                print(f"[调试] 输入的密码: {password}")
-                
-                if self._verify_user_password(user, password):
-                    matched_user = user
-                    print(f"[调试] 密码匹配成功 - 用户: {user.username}")
-                    break
-                else:
-                    print(f"[调试] 密码不匹配 - 用户: {user.username}")
-            
-            # 如果没有找到密码匹配的用户
-            if not matched_user:
-                print(f"[调试] 所有用户密码都不匹配")
+
+            if not self._verify_user_password(user, password):
+                logger.debug(f"登录失败，密码不匹配: user_id={user.user_id}")
                 return None, "账号/手机号或密码错误"
-            
-            # 打印调试信息
-            print(f"[调试] 最终匹配用户: {matched_user.username}")
-            print(f"[调试] 角色: {matched_user.role}")
-            print(f"[调试] 状态: {matched_user.status}")
-            print(f"[调试] 激活状态: {matched_user.is_active}")
-            
+
             # 检查用户状态
-            if matched_user.status != UserStatus.NORMAL:
+            if user.status != UserStatus.NORMAL:
                 status_messages = {
-                    UserStatus.FROZEN: f"您的账户已被冻结（{matched_user.get_status_display()}），无法登录。请联系管理员解冻。",
-                    UserStatus.ABNORMAL: f"您的账户状态异常（{matched_user.get_status_display()}），无法登录。请联系管理员处理。"
+                    UserStatus.FROZEN: f"您的账户已被冻结（{user.get_status_display()}），无法登录。请联系管理员解冻。",
+                    UserStatus.ABNORMAL: f"您的账户状态异常（{user.get_status_display()}），无法登录。请联系管理员处理。"
                 }
-                message = status_messages.get(matched_user.status, f"您的账户状态为\"{matched_user.get_status_display()}\"，无法登录。请联系管理员。")
-                print(f"[调试] 用户状态验证失败: {message}")
-                return None, message
-            
-            if not matched_user.is_active:
-                message = "账户已被禁用，请联系管理员"
-                print(f"[调试] 用户 {matched_user.username} 已被禁用")
+                message = status_messages.get(user.status, f"您的账户状态为\"{user.get_status_display()}\"，无法登录。请联系管理员。")
+                logger.info(f"用户 {user.username} 状态验证失败: {user.status}")
                 return None, message
-            
-            print(f"[调试] 用户 {matched_user.username} 登录成功")
-            return matched_user, "登录成功"
-            
+
+            if not user.is_active:
+                logger.info(f"用户 {user.username} 已被禁用，拒绝登录")
+                return None, "账户已被禁用，请联系管理员"
+
+            return user, "登录成功"
+
+        except PasswordHashingBusy:
+            raise
         except Exception as e:
-            print(f"[调试] 登录异常: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return None, f"认证失败: {str(e)}" 
-    
+            logger.exception(f"登录异常: {e}")
+            return None, f"认证失败: {str(e)}"
+
     def get_user(self, username):
         """获取用户信息"""
         if not username:
             return None
 
-        now = time.time()
-        entry = self._user_cache.get(username)
-        if entry:
-            expires_at, cached_user = entry
-            if now < expires_at:
-                return cached_user
+        generation = self._user_cache.generation()
+        hit, cached_user = self._user_cache.get(username)
+        if hit:
+            return cached_user
 
         try:
             user = self.db_manager.get_user_by_username(username)
-            self._user_cache[username] = (now + self._user_cache_ttl, user)
+            self._user_cache.set(username, user, generation)
             return user
         except Exception as e:
-            print(f"获取用户失败: {e}")
+            logger.error(f"获取用户失败: {e}")
             return None
     
     def get_all_users(self):
@@ -169,9 +158,13 @@ class UserManager:
         try:
             return self.db_manager.get_all_users()
         except Exception as e:
-            print(f"获取用户列表失败: {e}")
+            logger.error(f"获取用户列表失败: {e}")
             return []
     
+    def get_users_page(self, role=None, limit=50, after=None, total_mode='exact'):
+        """游标分页获取用户，返回 (total, users)，见 DatabaseManager.get_users_page"""
+        return self.db_manager.get_users_page(role=role, limit=limit, after=after, total_mode=total_mode)
+    
     def update_user_role(self, username, new_role, operator_username):
         """更新用户角色"""
         try:
@@ -237,6 +230,9 @@ class UserManager:
             
             # 更新用户角色和状态到数据库
             self.db_manager.update_user_role_and_status(username, new_role, is_active, status_type)
+            if not is_active:
+                # 冻结/停用后立即删除该用户的服务端会话（Cookie 会话由请求前的状态检查登出）
+                revoke_user_sessions(target_user.user_id)
             
             # 根据status_type区分状态文本
             if is_active:
@@ -287,11 +283,7 @@ class UserManager:
             # 验证原密码（优先使用哈希，兼容明文）
             valid = False
             if getattr(user, 'password_hash', None):
-                try:
-                    if verify_password(old_password, user.password_hash):
-                        valid = True
-                except Exception:
-                    valid = False
+                valid = check_password(old_password, user.password_hash)
             if (not valid) and user.password == old_password:
                 valid = True
             if not valid:
@@ -385,8 +377,5 @@ class UserManager:
             return False, f"密码重置失败: {str(e)}"
     
 
-# 导入re模块用于密码验证
-import re
-
 # 全局用户管理器实例
 user_manager = UserManager()
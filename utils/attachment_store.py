@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 附件文件存储
+
+附件按内容 SHA-256 存放在本地目录（<root>/ab/cd/<sha256>），相同内容只存一份；
+数据库中只记录哈希值。下载时按块流式返回，支持 ETag / If-None-Match、HTTP Range，
+并可交给 nginx（X-Accel-Redirect）或 Apache/lighttpd（X-Sendfile）直接发送文件。
+"""
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import quote
+
+from flask import send_file, make_response, request
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_SHA256_RE = re.compile(r'^[0-9a-f]{64}$')
+_CHUNK_SIZE = 256 * 1024
+
+# 旧逻辑中按扩展名推断的 MIME 类型，mimetypes 无法识别时使用
+_FALLBACK_MIMETYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xls': 'application/vnd.ms-excel',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class AttachmentStore:
+    """内容寻址的本地附件存储
+
+    Args:
+        root: 存储根目录，需与 nginx internal location 指向同一目录（启用 X-Accel-Redirect 时）
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def relative_path(self, sha256):
+        if not sha256 or not _SHA256_RE.match(sha256):
+            raise ValueError(f"无效的附件哈希: {sha256!r}")
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def path_for(self, sha256):
+        return os.path.join(self.root, self.relative_path(sha256))
+
+    def exists(self, sha256):
+        return os.path.isfile(self.path_for(sha256))
+
+    def save_stream(self, stream):
+        """边读边计算哈希写入临时文件，完成后移动到内容地址，返回 (sha256, size)"""
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            self._commit(tmp_path, sha256)
+            return sha256, size
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save_bytes(self, data):
+        """保存内存中的内容（用于迁移旧 BLOB），返回 (sha256, size)"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not self.exists(sha256):
+            fd, tmp_path = tempfile.mkstemp(dir=self._tmp_dir)
+            try:
+                with os.fdopen(fd, 'wb') as tmp:
+                    tmp.write(data)
+                self._commit(tmp_path, sha256)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return sha256, len(data)
+
+    def _commit(self, tmp_path, sha256):
+        target = self.path_for(sha256)
+        if os.path.isfile(target):
+            # 内容相同的文件已存在，直接复用（去重）
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(tmp_path, 0o644)
+        # 同一文件系统内 rename 是原子操作，并发写入同一内容时后者覆盖前者也无妨
+        os.replace(tmp_path, target)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_attachment_store():
+    """获取全局附件存储（目录取自 Config.ATTACHMENT_STORE_DIR）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = AttachmentStore(
+                    getattr(Config, 'ATTACHMENT_STORE_DIR', None)
+                    or os.path.join(Config.UPLOAD_FOLDER, 'attachments')
+                )
+    return _store
+
+
+def guess_mimetype(file_name, file_type=None):
+    mimetype, _ = mimetypes.guess_type(file_name or '')
+    if mimetype:
+        return mimetype
+    ext = (file_type or os.path.splitext(file_name or '')[1] or '').lower()
+    return _FALLBACK_MIMETYPES.get(ext, 'application/octet-stream')
+
+
+def _content_disposition(download_name):
+    try:
+        download_name.encode('ascii')
+        return f'attachment; filename="{download_name}"'
+    except UnicodeEncodeError:
+        return f"attachment; filename*=UTF-8''{quote(download_name)}"
+
+
+def send_attachment(sha256, download_name, mimetype=None):
+    """返回附件下载响应
+
+    - ETag 即内容哈希，If-None-Match 命中时返回 304；
+    - 默认由 send_file 按块流式发送并处理 Range（206）；
+    - Config.ATTACHMENT_OFFLOAD 为 x-accel / x-sendfile 时只返回头部，由前端 Web 服务器发送文件。
+    """
+    store = get_attachment_store()
+    path = store.path_for(sha256)
+    mimetype = mimetype or guess_mimetype(download_name)
+    max_age = getattr(Config, 'ATTACHMENT_CACHE_MAX_AGE', 86400)
+    offload = (getattr(Config, 'ATTACHMENT_OFFLOAD', '') or '').lower()
+
+    if offload in ('x-accel', 'x-sendfile'):
+        if sha256 in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            response = make_response('')
+            response.mimetype = mimetype
+            if offload == 'x-accel':
+                prefix = getattr(Config, 'ATTACHMENT_ACCEL_PREFIX', '/protected-attachments/')
+                response.headers['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + store.relative_path(sha256)
+            else:
+                response.headers['X-Sendfile'] = path
+            response.headers['Content-Disposition'] = _content_disposition(download_name)
+        response.set_etag(sha256)
+        response.headers['Cache-Control'] = f'private, max-age={max_age}'
+        return response
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=sha256,
+        max_age=max_age,
+    )
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    return response
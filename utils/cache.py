@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 响应缓存后端
+
+提供两种可插拔后端：
+- MemoryCacheBackend：进程内 LRU + TTL，带条目数与内存上限；
+- RedisCacheBackend：基于 REDIS_URL 的共享缓存，所有 gunicorn worker 共用。
+
+两种后端都支持按标签（tag）批量失效，例如写赛事后失效 'events' 标签下的所有列表缓存。
+"""
+
+import os
+import pickle
+import threading
+import time
+import logging
+from collections import OrderedDict
+
+from config import Config
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """缓存后端接口"""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, timeout, tags=()):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def invalidate_tags(self, *tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """进程内 LRU + TTL 缓存
+
+    Args:
+        max_entries: 最大条目数，超出后淘汰最久未使用的条目
+        max_bytes: 估算内存上限（字节），超出后同样按 LRU 淘汰
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, value, size, tags)
+        self._tags = {}  # tag -> set(key)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout, tags=()):
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + timeout, value, size, tuple(tags))
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                self._tags.pop(tag, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[2]
+        for tag in entry[3]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def _evict(self):
+        # 超限时先清理已过期条目，再按 LRU 淘汰直到满足条目数与内存上限
+        if len(self._entries) <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if entry[0] <= now]
+        for key in expired:
+            self._remove(key)
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+
+# 把缓存键加入标签集合，并且只延长（不缩短）集合的过期时间：同一标签下的键过期时间各不相同，
+# 集合若随较短的键先过期，较长的键就无法再被 invalidate_cache_tags 找到
+_REDIS_TAG_ADD_SCRIPT = """
+redis.call('SADD', KEYS[1], ARGV[1])
+local ttl = redis.call('TTL', KEYS[1])
+local timeout = tonumber(ARGV[2])
+if ttl < timeout then
+    redis.call('EXPIRE', KEYS[1], timeout)
+end
+return ttl
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis 共享缓存：值以 pickle 序列化，标签用 Redis 集合记录其下的缓存键。
+
+    内存上限与淘汰交由 Redis 的 maxmemory / maxmemory-policy 控制。
+    """
+
+    def __init__(self, client, key_prefix='cache:'):
+        self._client = client
+        self._prefix = key_prefix
+        self._tag_add = client.register_script(_REDIS_TAG_ADD_SCRIPT)
+
+    def _key(self, key):
+        return f"{self._prefix}{key}"
+
+    def _tag_key(self, tag):
+        return f"{self._prefix}tag:{tag}"
+
+    def get(self, key):
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return None
+        try:
+            return pickle.loads(raw)
+        except Exception as e:
+            logger.warning(f"缓存反序列化失败，丢弃该条目: {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key, value, timeout, tags=()):
+        redis_key = self._key(key)
+        timeout = max(int(timeout), 1)
+        pipe = self._client.pipeline()
+        pipe.setex(redis_key, timeout, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        for tag in tags:
+            self._tag_add(keys=[self._tag_key(tag)], args=[redis_key, timeout], client=pipe)
+        pipe.execute()
+
+    def delete(self, key):
+        self._client.delete(self._key(key))
+
+    def invalidate_tags(self, *tags):
+        for tag in tags:
+            tag_key = self._tag_key(tag)
+            keys = self._client.smembers(tag_key)
+            pipe = self._client.pipeline()
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(tag_key)
+            pipe.execute()
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=f"{self._prefix}*"))
+        if keys:
+            self._client.delete(*keys)
+
+
+class _FallbackCacheBackend(CacheBackend):
+    """Redis 出错时自动退回进程内缓存，避免缓存故障影响业务请求。"""
+
+    def __init__(self, primary, fallback):
+        self._primary = primary
+        self._fallback = fallback
+
+    def _call(self, method, *args, **kwargs):
+        try:
+            return getattr(self._primary, method)(*args, **kwargs)
+        except Exception as e:
+            logger.warning(f"Redis cache {method} failed, fallback to memory: {e}")
+            return getattr(self._fallback, method)(*args, **kwargs)
+
+    def get(self, key):
+        return self._call('get', key)
+
+    def set(self, key, value, timeout, tags=()):
+        return self._call('set', key, value, timeout, tags)
+
+    def delete(self, key):
+        self._fallback.delete(key)
+        return self._call('delete', key)
+
+    def invalidate_tags(self, *tags):
+        self._fallback.invalidate_tags(*tags)
+        return self._call('invalidate_tags', *tags)
+
+    def clear(self):
+        self._fallback.clear()
+        return self._call('clear')
+
+
+def _estimate_size(value):
+    """粗略估算缓存值占用的字节数"""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_estimate_size(item) for item in value) + 64
+    if isinstance(value, dict):
+        return sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items()) + 64
+    return 64
+
+
+def _warn_memory_only(backend):
+    # 进程内缓存的标签失效只作用于本进程，多 worker 时其他进程会继续返回旧数据直到 TTL 过期
+    workers = getattr(Config, 'WEB_CONCURRENCY', 1)
+    if workers > 1:
+        logger.warning(
+            f"Response cache is process-local but WEB_CONCURRENCY={workers}: "
+            f"tag invalidation will not reach other workers, set REDIS_URL to share the cache"
+        )
+    return backend
+
+
+def _create_backend():
+    backend_name = (getattr(Config, 'CACHE_BACKEND', 'auto') or 'auto').lower()
+    memory_backend = MemoryCacheBackend(
+        max_entries=getattr(Config, 'CACHE_MAX_ENTRIES', 1024),
+        max_bytes=getattr(Config, 'CACHE_MAX_BYTES', 64 * 1024 * 1024),
+    )
+    if backend_name == 'memory':
+        return _warn_memory_only(memory_backend)
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        if backend_name == 'redis':
+            logger.warning("CACHE_BACKEND=redis but REDIS_URL is not set, fallback to memory")
+        return _warn_memory_only(memory_backend)
+
+    try:
+        client = create_redis_client(
+            redis_url,
+            socket_timeout=getattr(Config, 'CACHE_REDIS_SOCKET_TIMEOUT', 0.5),
+            connect_timeout=getattr(Config, 'CACHE_REDIS_CONNECT_TIMEOUT', 1.0),
+        )
+    except Exception as e:
+        logger.warning(f"Redis cache init failed, fallback to memory: {e}")
+        return _warn_memory_only(memory_backend)
+
+    redis_backend = RedisCacheBackend(
+        client,
+        key_prefix=getattr(Config, 'CACHE_KEY_PREFIX', 'wushu:cache:'),
+    )
+    return _FallbackCacheBackend(redis_backend, memory_backend)
+
+
+_cache_backend = None
+_cache_backend_lock = threading.Lock()
+
+
+def get_cache():
+    """获取全局缓存后端（首次调用时按配置创建）"""
+    global _cache_backend
+    if _cache_backend is None:
+        with _cache_backend_lock:
+            if _cache_backend is None:
+                _cache_backend = _create_backend()
+    return _cache_backend
+
+
+def invalidate_cache_tags(*tags):
+    """按标签失效缓存；失败只记录日志，不影响写操作本身"""
+    try:
+        get_cache().invalidate_tags(*tags)
+    except Exception as e:
+        logger.warning(f"缓存失效失败 tags={tags}: {e}")
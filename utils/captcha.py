@@ -9,6 +9,35 @@ import string
 from PIL import Image, ImageDraw, ImageFont
 import io
 import os
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+
+from config import Config
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+_FONT_PATHS = [
+    'C:/Windows/Fonts/arial.ttf',
+    'C:/Windows/Fonts/calibri.ttf',
+    '/System/Library/Fonts/Arial.ttf',  # macOS
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux
+]
+
+
+@lru_cache(maxsize=8)
+def _load_font(size):
+    """按字号加载字体，每个进程只探测和解析一次字体文件"""
+    try:
+        for font_path in _FONT_PATHS:
+            if os.path.exists(font_path):
+                return ImageFont.truetype(font_path, size)
+    except Exception as e:
+        logger.warning(f"加载验证码字体失败，使用默认字体: {e}")
+    return ImageFont.load_default()
+
 
 class CaptchaGenerator:
     """验证码生成器"""
@@ -30,27 +59,7 @@ class CaptchaGenerator:
         image = Image.new('RGB', (self.width, self.height), color='white')
         draw = ImageDraw.Draw(image)
         
-        # 尝试加载字体，如果失败则使用默认字体
-        try:
-            # 尝试使用系统字体
-            font_paths = [
-                'C:/Windows/Fonts/arial.ttf',
-                'C:/Windows/Fonts/calibri.ttf',
-                '/System/Library/Fonts/Arial.ttf',  # macOS
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',  # Linux
-            ]
-            
-            font = None
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    font = ImageFont.truetype(font_path, self.font_size)
-                    break
-            
-            if font is None:
-                font = ImageFont.load_default()
-                
-        except Exception:
-            font = ImageFont.load_default()
+        font = _load_font(self.font_size)
         
         # 添加背景噪点
         for _ in range(50):
@@ -89,12 +98,232 @@ class CaptchaGenerator:
         text = self.generate_text()
         image = self.generate_image(text)
         
-        # 将图片转换为字节流
+        # 将图片转换为字节流（验证码图片很小，跳过 optimize 以节省编码时间）
         img_buffer = io.BytesIO()
-        image.save(img_buffer, format='PNG')
-        img_buffer.seek(0)
+        image.save(img_buffer, format='PNG', compress_level=1)
         
         return text, img_buffer.getvalue()
 
+
+class MemoryCaptchaStore:
+    """进程内验证码池（每张只会被取走一次）"""
+
+    def __init__(self):
+        self._items = deque()
+
+    def pop(self):
+        try:
+            return self._items.popleft()
+        except IndexError:
+            return None
+
+    def push_many(self, items, max_size=None):
+        self._items.extend(items)
+        if max_size is not None:
+            while len(self._items) > max_size:
+                self._items.pop()
+
+    def size(self):
+        return len(self._items)
+
+    def acquire_refill_lock(self, ttl):
+        # 进程内池只有本进程的补充线程写入
+        return True
+
+    def release_refill_lock(self):
+        pass
+
+
+class RedisCaptchaStore:
+    """Redis 列表实现的共享验证码池，所有 worker 从同一个列表取用"""
+
+    def __init__(self, client, key='wushu:captcha:pool'):
+        self._client = client
+        self._key = key
+
+    def pop(self):
+        raw = self._client.lpop(self._key)
+        if raw is None:
+            return None
+        text, _, image_data = raw.partition(b':')
+        return text.decode('ascii'), image_data
+
+    def push_many(self, items, max_size=None):
+        pipe = self._client.pipeline(transaction=True)
+        pipe.rpush(self._key, *[text.encode('ascii') + b':' + image_data for text, image_data in items])
+        if max_size is not None:
+            # 多个 worker 并发补充时，超出容量的部分（最后推入的）直接截掉
+            pipe.ltrim(self._key, 0, max_size - 1)
+        pipe.execute()
+
+    def size(self):
+        return self._client.llen(self._key)
+
+    def acquire_refill_lock(self, ttl):
+        """同一时间只允许一个 worker 补充共享池（SET NX，ttl 秒后自动释放）"""
+        return bool(self._client.set(f"{self._key}:refill", os.getpid(), nx=True, ex=max(1, int(ttl))))
+
+    def release_refill_lock(self):
+        self._client.delete(f"{self._key}:refill")
+
+
+class CaptchaPool:
+    """预生成验证码池
+
+    后台线程在池中数量低于 low_watermark 时补足到 size；请求线程只做一次出队。
+    池被取空时（如突发流量超过补充速度）当场生成一张，不会让请求失败。
+    Redis 出错时退回进程内池。
+
+    Args:
+        generator: CaptchaGenerator 实例
+        store: MemoryCaptchaStore / RedisCaptchaStore
+        size: 池容量
+        low_watermark: 触发补充的余量
+        refill_batch: 每批生成后写入池的张数
+    """
+
+    def __init__(self, generator, store, size=200, low_watermark=None, refill_batch=20):
+        self.generator = generator
+        self.store = store
+        self.fallback = store if isinstance(store, MemoryCaptchaStore) else MemoryCaptchaStore()
+        self.size = max(1, int(size))
+        self.low_watermark = self.size // 2 if low_watermark is None else int(low_watermark)
+        self.refill_batch = max(1, int(refill_batch))
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats = {'hits': 0, 'misses': 0, 'generated': 0}
+
+    def get(self):
+        """取一张验证码，返回 (text, png_bytes)"""
+        self._ensure_started()
+        item = None
+        try:
+            item = self.store.pop()
+        except Exception as e:
+            logger.warning(f"Redis captcha pool pop failed, fallback to memory: {e}")
+            item = self.fallback.pop()
+
+        if item is None:
+            self._stats['misses'] += 1
+            item = self.generator.generate()
+        else:
+            self._stats['hits'] += 1
+        self._wakeup.set()
+        return item
+
+    def _current_size(self, store):
+        try:
+            return store.size()
+        except Exception as e:
+            logger.warning(f"Redis captcha pool size failed, fallback to memory: {e}")
+            return None
+
+    def refill(self):
+        """补足池到容量上限，返回本次生成的张数
+
+        共享池由拿到补充锁的一个 worker 补充，其余 worker 本轮跳过；每批写入后截断到 size，
+        即使锁过期出现并发补充，池也不会超过容量。
+        """
+        store = self.store
+        current = self._current_size(store)
+        if current is None:
+            store = self.fallback
+            current = store.size()
+        if current >= self.low_watermark and current > 0:
+            return 0
+
+        try:
+            if not store.acquire_refill_lock(ttl=60):
+                return 0
+        except Exception as e:
+            logger.warning(f"Redis captcha pool lock failed, fallback to memory: {e}")
+            store = self.fallback
+            current = store.size()
+
+        generated = 0
+        try:
+            missing = self.size - current
+            while generated < missing:
+                batch = [self.generator.generate() for _ in range(min(self.refill_batch, missing - generated))]
+                try:
+                    store.push_many(batch, max_size=self.size)
+                except Exception as e:
+                    logger.warning(f"Redis captcha pool push failed, fallback to memory: {e}")
+                    store = self.fallback
+                    store.push_many(batch, max_size=self.size)
+                generated += len(batch)
+        finally:
+            try:
+                store.release_refill_lock()
+            except Exception as e:
+                logger.warning(f"Redis captcha pool unlock failed: {e}")
+        self._stats['generated'] += generated
+        return generated
+
+    def _ensure_started(self):
+        # fork 之后子进程中没有父进程的线程，按 pid 判断是否需要重新启动
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='captcha-refill', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refill()
+            except Exception as e:
+                logger.error(f"验证码池补充失败: {e}")
+            self._wakeup.wait(5.0)
+            self._wakeup.clear()
+
+    def stats(self):
+        snapshot = dict(self._stats)
+        snapshot['size'] = self._current_size(self.store)
+        return snapshot
+
+
+def _create_store():
+    backend_name = (getattr(Config, 'CAPTCHA_POOL_BACKEND', 'auto') or 'auto').lower()
+    if backend_name == 'memory':
+        return MemoryCaptchaStore()
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        if backend_name == 'redis':
+            logger.warning("CAPTCHA_POOL_BACKEND=redis but REDIS_URL is not set, fallback to memory")
+        return MemoryCaptchaStore()
+
+    try:
+        client = create_redis_client(redis_url)
+        return RedisCaptchaStore(client, key=getattr(Config, 'CAPTCHA_POOL_KEY', 'wushu:captcha:pool'))
+    except Exception as e:
+        logger.warning(f"Redis captcha pool init failed, fallback to memory: {e}")
+        return MemoryCaptchaStore()
+
+
 # 全局验证码生成器实例
 captcha_generator = CaptchaGenerator()
+
+_captcha_pool = None
+_captcha_pool_lock = threading.Lock()
+
+
+def get_captcha_pool():
+    """获取全局验证码池（首次调用时按配置创建并启动补充线程）"""
+    global _captcha_pool
+    if _captcha_pool is None:
+        with _captcha_pool_lock:
+            if _captcha_pool is None:
+                _captcha_pool = CaptchaPool(
+                    captcha_generator,
+                    _create_store(),
+                    size=getattr(Config, 'CAPTCHA_POOL_SIZE', 200),
+                    low_watermark=getattr(Config, 'CAPTCHA_POOL_LOW_WATERMARK', None),
+                )
+    return _captcha_pool
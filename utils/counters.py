@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 计数器写回聚合（write-behind）
+
+浏览次数这类热点计数不再每次请求执行 UPDATE ... SET n = n + 1（所有请求在同一行锁上排队），
+而是先累加到缓冲区，由后台线程按时间间隔或累积量批量写回：
+
+    UPDATE announcements
+    SET view_count = view_count + CASE id WHEN 1 THEN 3 WHEN 7 THEN 1 END
+    WHERE id IN (1, 7)
+
+缓冲区有两种后端：
+- MemoryCounterBuffer：进程内字典，每个 worker 各自累加、各自写回；
+- RedisCounterBuffer：设置 REDIS_URL 时使用 Redis 哈希（HINCRBY），所有 worker 共享，
+  任一进程写回时用 Lua 脚本原子地取出并清空。
+
+进程退出时（atexit）会再写回一次，正常关闭不丢计数；写回失败时增量放回缓冲区下次重试。
+
+用法:
+    ANNOUNCEMENT_VIEWS = register_counter('announcements.view_count', 'announcements', 'view_count')
+    increment(ANNOUNCEMENT_VIEWS, announcement_id)
+"""
+
+import atexit
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+
+from config import Config
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+_IDENTIFIER_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# 原子地取出并删除 Redis 哈希中的全部增量
+_REDIS_DRAIN_SCRIPT = """
+local data = redis.call('HGETALL', KEYS[1])
+redis.call('DEL', KEYS[1])
+return data
+"""
+
+
+class CounterSpec:
+    """一个可聚合的计数列：table.column，按 key_column 定位行"""
+
+    __slots__ = ('name', 'table', 'column', 'key_column')
+
+    def __init__(self, name, table, column, key_column='id'):
+        for identifier in (table, column, key_column):
+            if not _IDENTIFIER_RE.match(identifier):
+                raise ValueError(f"无效的计数器标识符: {identifier!r}")
+        self.name = name
+        self.table = table
+        self.column = column
+        self.key_column = key_column
+
+
+class MemoryCounterBuffer:
+    """进程内计数缓冲区"""
+
+    def __init__(self):
+        self._pending = defaultdict(lambda: defaultdict(int))  # name -> key -> delta
+        self._lock = threading.Lock()
+
+    def add(self, name, key, amount):
+        with self._lock:
+            self._pending[name][key] += amount
+
+    def drain(self, name):
+        with self._lock:
+            deltas = self._pending.pop(name, None)
+        return dict(deltas) if deltas else {}
+
+    def restore(self, name, deltas):
+        with self._lock:
+            pending = self._pending[name]
+            for key, amount in deltas.items():
+                pending[key] += amount
+
+
+class RedisCounterBuffer:
+    """Redis 共享计数缓冲区（每个计数器一个哈希：field 为行主键，value 为增量）"""
+
+    def __init__(self, client, key_prefix='wushu:counters:'):
+        self.client = client
+        self.key_prefix = key_prefix
+        self._drain = client.register_script(_REDIS_DRAIN_SCRIPT)
+
+    def _key(self, name):
+        return f"{self.key_prefix}{name}"
+
+    def add(self, name, key, amount):
+        self.client.hincrby(self._key(name), key, amount)
+
+    def drain(self, name):
+        data = self._drain(keys=[self._key(name)])
+        deltas = {}
+        for i in range(0, len(data), 2):
+            field = data[i].decode() if isinstance(data[i], bytes) else data[i]
+            deltas[_parse_key(field)] = int(data[i + 1])
+        return deltas
+
+    def restore(self, name, deltas):
+        pipe = self.client.pipeline()
+        for key, amount in deltas.items():
+            pipe.hincrby(self._key(name), key, amount)
+        pipe.execute()
+
+
+def _parse_key(field):
+    return int(field) if field.lstrip('-').isdigit() else field
+
+
+class CounterAggregator:
+    """计数器注册、累加与批量写回
+
+    Args:
+        buffer: 计数缓冲区（MemoryCounterBuffer / RedisCounterBuffer）
+        flush_interval: 写回间隔（秒）
+        flush_threshold: 本进程累加次数达到该值时提前写回
+        batch_size: 单条 UPDATE 覆盖的最大行数
+    """
+
+    def __init__(self, buffer, flush_interval=5.0, flush_threshold=500, batch_size=500):
+        self.buffer = buffer
+        self.fallback = MemoryCounterBuffer() if not isinstance(buffer, MemoryCounterBuffer) else None
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.batch_size = max(1, int(batch_size))
+        self._specs = {}
+        self._since_flush = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register(self, name, table, column, key_column='id'):
+        spec = CounterSpec(name, table, column, key_column)
+        self._specs[name] = spec
+        return spec
+
+    def increment(self, name, key, amount=1):
+        """累加计数（立即返回，不访问数据库）"""
+        if name not in self._specs:
+            raise KeyError(f"未注册的计数器: {name}")
+        try:
+            self.buffer.add(name, key, amount)
+        except Exception as e:
+            # Redis 不可用时先记在本进程，下次写回时一并处理
+            logger.warning(f"计数器写入共享缓冲区失败，暂存本进程: {e}")
+            self.fallback.add(name, key, amount)
+
+        self._ensure_started()
+        with self._lock:
+            self._since_flush += 1
+            if self._since_flush >= self.flush_threshold:
+                self._wakeup.set()
+
+    # ---------------- 写回 ----------------
+
+    def flush(self):
+        """把所有计数器的增量写回数据库，返回写回的行数"""
+        with self._flush_lock:
+            with self._lock:
+                self._since_flush = 0
+            written = 0
+            for spec in list(self._specs.values()):
+                for buffer in (self.buffer, self.fallback):
+                    if buffer is None:
+                        continue
+                    written += self._flush_one(buffer, spec)
+            return written
+
+    def _flush_one(self, buffer, spec):
+        try:
+            deltas = buffer.drain(spec.name)
+        except Exception as e:
+            logger.warning(f"读取计数缓冲区失败 {spec.name}: {e}")
+            return 0
+        deltas = {key: amount for key, amount in deltas.items() if amount}
+        if not deltas:
+            return 0
+
+        items = list(deltas.items())
+        written = 0
+        from database import DatabaseManager
+        db_manager = DatabaseManager()
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            try:
+                with db_manager.get_connection() as conn:
+                    cursor = conn.cursor()
+                    sql, params = _build_update(spec, batch)
+                    cursor.execute(sql, params)
+                    conn.commit()
+                    cursor.close()
+                written += len(batch)
+            except Exception as e:
+                # 本批及之后未写回的增量放回缓冲区，下次重试
+                logger.error(f"计数器写回失败 {spec.name}: {e}")
+                remaining = dict(items[start:])
+                try:
+                    buffer.restore(spec.name, remaining)
+                except Exception:
+                    # 共享缓冲区也不可用时暂存本进程
+                    self.fallback.restore(spec.name, remaining)
+                break
+        return written
+
+    # ---------------- 后台线程 ----------------
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='counter-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self.shutdown)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"计数器写回线程异常: {e}")
+
+    def shutdown(self):
+        """停止后台线程并做最后一次写回（进程退出时自动调用）"""
+        self._stop_event.set()
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"退出前写回计数器失败: {e}")
+
+
+def _build_update(spec, batch):
+    cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+    placeholders = ', '.join(['%s'] * len(batch))
+    sql = (
+        f"UPDATE {spec.table} "
+        f"SET {spec.column} = COALESCE({spec.column}, 0) + CASE {spec.key_column} {cases} ELSE 0 END "
+        f"WHERE {spec.key_column} IN ({placeholders})"
+    )
+    params = []
+    for key, amount in batch:
+        params.extend((key, amount))
+    params.extend(key for key, _ in batch)
+    return sql, tuple(params)
+
+
+def _create_buffer():
+    backend_name = (getattr(Config, 'COUNTER_BACKEND', 'auto') or 'auto').lower()
+    if backend_name == 'memory':
+        return MemoryCounterBuffer()
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        if backend_name == 'redis':
+            logger.warning("COUNTER_BACKEND=redis but REDIS_URL is not set, fallback to memory")
+        return MemoryCounterBuffer()
+
+    try:
+        client = create_redis_client(redis_url)
+        return RedisCounterBuffer(
+            client,
+            key_prefix=getattr(Config, 'COUNTER_KEY_PREFIX', 'wushu:counters:'),
+        )
+    except Exception as e:
+        logger.warning(f"Redis counter buffer init failed, fallback to memory: {e}")
+        return MemoryCounterBuffer()
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_counter_aggregator():
+    """获取全局计数聚合器（首次调用时按配置创建）"""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = CounterAggregator(
+                    _create_buffer(),
+                    flush_interval=getattr(Config, 'COUNTER_FLUSH_INTERVAL', 5.0),
+                    flush_threshold=getattr(Config, 'COUNTER_FLUSH_THRESHOLD', 500),
+                    batch_size=getattr(Config, 'COUNTER_FLUSH_BATCH_SIZE', 500),
+                )
+    return _aggregator
+
+
+def register_counter(name, table, column, key_column='id'):
+    """注册一个计数列，返回计数器名称（供 increment 使用）"""
+    get_counter_aggregator().register(name, table, column, key_column)
+    return name
+
+
+def increment(name, key, amount=1):
+    """累加计数，由后台线程批量写回数据库"""
+    get_counter_aggregator().increment(name, key, amount)
+
+
+def flush_counters():
+    """立即写回所有计数（供维护接口、测试或关闭流程调用）"""
+    return get_counter_aggregator().flush()
@@ -6,11 +6,15 @@
 
 from functools import wraps
 from flask import session, redirect, url_for, flash, jsonify, request, current_app
+import hashlib
 import logging
 
-logger = logging.getLogger(__name__)
+from config import Config
+from utils.cache import get_cache
+from utils.rate_limit import get_rate_limiter
+from utils.metrics import record_cache_lookup
 
-_simple_cache = {}
+logger = logging.getLogger(__name__)
 
 def login_required(f):
     """登录验证装饰器"""
@@ -125,25 +129,53 @@ def api_key_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def rate_limit(max_requests=100, per_seconds=3600):
-    """请求频率限制装饰器
-    
+def _rate_limit_key(key):
+    """解析限流维度：'ip' 按客户端 IP，'user' 按登录用户（未登录时退回 IP），也可传入无参函数自定义"""
+    if callable(key):
+        return str(key())
+    if key == 'user':
+        user_id = session.get('user_id')
+        if user_id:
+            return f"user:{user_id}"
+    return f"ip:{request.remote_addr}"
+
+
+def rate_limit(max_requests=100, per_seconds=3600, key='ip', scope=None, burst=None):
+    """请求频率限制装饰器（令牌桶）
+
+    平均每 per_seconds 秒允许 max_requests 次请求，令牌按时间匀速补充；
+    超出时返回 429 并带 Retry-After 响应头。
+
     Args:
-        max_requests: 最大请求次数
+        max_requests: 时间窗口内的最大请求次数
         per_seconds: 时间窗口（秒）
+        key: 限流维度，'ip' / 'user' 或返回字符串的无参函数
+        scope: 桶的命名空间，默认取被装饰函数的模块名与函数名，同一 scope 的接口共享额度
+        burst: 桶容量（允许的瞬时突发次数），默认等于 max_requests
     """
+    capacity = burst or max_requests
+    rate = float(max_requests) / per_seconds
+
     def decorator(f):
+        bucket_scope = scope or f"{f.__module__}.{f.__name__}"
+
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # 这里可以实现基于Redis或内存的频率限制
-            # 简单示例，实际应用中需要更完善的实现
-            
-            client_ip = request.remote_addr
-            current_time = int(time.time())
-            
-            # 这里应该使用Redis或其他持久化存储
-            # 暂时跳过频率限制检查
-            
+            if not getattr(Config, 'RATE_LIMIT_ENABLED', True):
+                return f(*args, **kwargs)
+
+            bucket_key = f"{bucket_scope}:{_rate_limit_key(key)}"
+            result = get_rate_limiter().hit(bucket_key, capacity, rate)
+            if not result.allowed:
+                logger.warning(f"请求过于频繁: {bucket_key}，需等待 {result.retry_after:.1f} 秒")
+                response = jsonify({
+                    'success': False,
+                    'message': '请求过于频繁，请稍后再试',
+                    'retry_after': result.retry_after_seconds,
+                })
+                response.status_code = 429
+                response.headers['Retry-After'] = str(result.retry_after_seconds)
+                return response
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -193,7 +225,7 @@ def validate_json(required_fields=None):
     return decorator
 
 def log_action(action_name):
-    """操作日志装饰器
+    """操作日志装饰器（操作结束时记录一条日志，含耗时）
     
     Args:
         action_name: 操作名称
@@ -201,68 +233,81 @@ def log_action(action_name):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            user_id = session.get('user_id')
-            user_name = session.get('user_name', 'Unknown')
-            
-            # 记录操作开始
             start_time = time.perf_counter()
-            logger.info(f"用户 {user_name}(ID:{user_id}) 开始执行操作: {action_name}")
-            
             try:
                 result = f(*args, **kwargs)
-                
-                duration_ms = (time.perf_counter() - start_time) * 1000
-                # 记录操作成功
-                logger.info(
-                    f"用户 {user_name}(ID:{user_id}) 成功完成操作: {action_name}, 耗时: {duration_ms:.1f} ms"
-                )
-                
-                return result
-                
             except Exception as e:
                 duration_ms = (time.perf_counter() - start_time) * 1000
-                # 记录操作失败
                 logger.error(
-                    f"用户 {user_name}(ID:{user_id}) 执行操作失败: {action_name}, 耗时: {duration_ms:.1f} ms, 错误: {str(e)}"
+                    "用户 %s(ID:%s) 执行操作失败: %s, 耗时: %.1f ms, 错误: %s",
+                    session.get('user_name', 'Unknown'), session.get('user_id'), action_name, duration_ms, e,
+                    extra={'action': action_name, 'duration_ms': round(duration_ms, 1), 'outcome': 'error'},
                 )
                 raise
-                
+
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            # 成功日志量大，只记一条并参与采样（LOG_SUCCESS_SAMPLE_RATE）
+            logger.info(
+                "用户 %s(ID:%s) 成功完成操作: %s, 耗时: %.1f ms",
+                session.get('user_name', 'Unknown'), session.get('user_id'), action_name, duration_ms,
+                extra={'action': action_name, 'duration_ms': round(duration_ms, 1), 'outcome': 'success', 'sample': True},
+            )
+            return result
+
         return decorated_function
     return decorator
 
-def cache_result(timeout=300):
+def cache_result(timeout=300, tags=(), vary_by_user=True):
     """结果缓存装饰器
     
+    缓存的是响应快照（状态码、响应头、响应体），后端由 utils.cache 按配置选择
+    进程内 LRU 或 Redis 共享缓存。只缓存 2xx 响应。
+    
     Args:
         timeout: 缓存超时时间（秒）
+        tags: 缓存标签，写操作可通过 invalidate_cache_tags(tag) 立即失效
+        vary_by_user: 是否按当前用户/角色区分缓存
     """
+    if isinstance(tags, str):
+        tags = (tags,)
+
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # 这里可以实现基于Redis或Flask-Caching的缓存
-            # 简单示例，实际应用中需要更完善的实现
-            
             # 生成缓存键
             try:
-                key_base = f"{f.__name__}:{request.path}:{sorted(request.args.items())}"
-                user_id = session.get('user_id')
-                user_role = session.get('user_role')
-                cache_key = f"{key_base}:{user_id}:{user_role}"
+                key_base = f"{f.__module__}.{f.__name__}:{request.path}:{sorted(request.args.items(multi=True))}"
+                if vary_by_user:
+                    key_base = f"{key_base}:{session.get('user_id')}:{session.get('user_role')}"
             except Exception:
-                cache_key = f"{f.__name__}:{hash(str(args) + str(kwargs))}"
-            
-            # 这里应该检查缓存并返回缓存结果
-            # 如果没有缓存，执行函数并缓存结果
-            now = time.time()
-            entry = _simple_cache.get(cache_key)
-            if entry:
-                expires_at, value = entry
-                if now < expires_at:
-                    return value
+                key_base = f"{f.__module__}.{f.__name__}:{args}:{sorted(kwargs.items())}"
+            cache_key = hashlib.sha1(key_base.encode('utf-8')).hexdigest()
+
+            cache = get_cache()
+            try:
+                snapshot = cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"读取缓存失败: {e}")
+                snapshot = None
+            record_cache_lookup('response', snapshot is not None)
+            if snapshot is not None:
+                body, status, headers = snapshot
+                return current_app.response_class(body, status=status, headers=headers)
 
             result = f(*args, **kwargs)
-            _simple_cache[cache_key] = (now + timeout, result)
-            return result
+
+            response = current_app.make_response(result)
+            if 200 <= response.status_code < 300 and not response.is_streamed:
+                snapshot = (
+                    response.get_data(),
+                    response.status_code,
+                    [(k, v) for k, v in response.headers.items() if k.lower() != 'set-cookie'],
+                )
+                try:
+                    cache.set(cache_key, snapshot, timeout, tags)
+                except Exception as e:
+                    logger.warning(f"写入缓存失败: {e}")
+            return response
         return decorated_function
     return decorator
 
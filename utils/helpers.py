@@ -7,6 +7,7 @@
 import os
 import uuid
 import hashlib
+import hmac
 from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 from flask import current_app
@@ -94,6 +95,83 @@ def get_age_group(birth_date):
     else:
         return '老年组(51岁以上)'
 
+# 参赛者列表使用的年龄组划分：(年龄上限（不含）, 组名)，最后一组无上限
+PLAYER_AGE_GROUPS = (
+    (12, '儿童组'),
+    (18, '少年组'),
+    (40, '青年组'),
+    (60, '中年组'),
+    (None, '老年组'),
+)
+
+_GENDER_ALIASES = {
+    'male': '男', 'm': '男', '男': '男',
+    'female': '女', 'f': '女', '女': '女',
+}
+
+def normalize_gender(value):
+    """统一性别写法为 男/女，无法识别时原样返回"""
+    if not value:
+        return None
+    value = str(value).strip()
+    return _GENDER_ALIASES.get(value.lower(), value) or None
+
+def parse_id_card_birth_date(id_card):
+    """从18位身份证号解析出生日期，无效时返回 None"""
+    if not id_card or len(id_card) != 18:
+        return None
+    try:
+        return datetime.strptime(id_card[6:14], '%Y%m%d').date()
+    except ValueError:
+        return None
+
+def parse_id_card_gender(id_card):
+    """从18位身份证号第17位解析性别（奇数男、偶数女）"""
+    if not id_card or len(id_card) != 18:
+        return None
+    try:
+        return '男' if int(id_card[16]) % 2 == 1 else '女'
+    except ValueError:
+        return None
+
+_ID_CARD_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CARD_CHECK_CODES = '10X98765432'
+_ID_CARD_RE = re.compile(r'^\d{17}[\dXx]$')
+
+def validate_id_card(id_card):
+    """校验18位身份证号：格式、出生日期与末位校验码（GB 11643）"""
+    if not id_card or not _ID_CARD_RE.match(id_card):
+        return False
+    if parse_id_card_birth_date(id_card) is None:
+        return False
+    total = sum(int(digit) * weight for digit, weight in zip(id_card[:17], _ID_CARD_WEIGHTS))
+    return _ID_CARD_CHECK_CODES[total % 11] == id_card[17].upper()
+
+def player_age_group(age):
+    """按 PLAYER_AGE_GROUPS 返回年龄组名称"""
+    if age is None or age < 0:
+        return None
+    for upper, name in PLAYER_AGE_GROUPS:
+        if upper is None or age < upper:
+            return name
+    return None
+
+def derive_player_demographics(id_card, gender=None):
+    """由身份证号推导 (出生日期, 性别, 年龄组)；身份证无法解析时性别退回到传入值"""
+    birth_date = parse_id_card_birth_date(id_card)
+    gender_value = parse_id_card_gender(id_card) if birth_date else None
+    gender_value = gender_value or normalize_gender(gender)
+    age_group = player_age_group(calculate_age(birth_date)) if birth_date else None
+    return birth_date, gender_value, age_group
+
+def id_card_gender_conflict(id_card, gender):
+    """明确填写的性别与身份证号推导的性别不一致时返回 True（任一方无法识别时不算冲突）"""
+    explicit = normalize_gender(gender)
+    if explicit not in ('男', '女') or parse_id_card_birth_date(id_card) is None:
+        return False
+    derived = parse_id_card_gender(id_card)
+    return derived is not None and derived != explicit
+
 def format_datetime(dt, format_str='%Y-%m-%d %H:%M:%S'):
     """格式化日期时间"""
     if not dt:
@@ -186,61 +264,92 @@ def validate_phone(phone):
     pattern = r'^1[3-9]\d{9}$'
     return re.match(pattern, phone) is not None
 
-def generate_password_hash(password, salt_length=16):
+PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+# 旧格式（不带算法/迭代次数前缀）固定使用的迭代次数
+LEGACY_PASSWORD_ITERATIONS = 100000
+
+def _password_iterations():
+    from config import Config
+    return int(getattr(Config, 'PASSWORD_HASH_ITERATIONS', LEGACY_PASSWORD_ITERATIONS))
+
+def generate_password_hash(password, salt_length=16, iterations=None):
     """生成密码哈希
 
-    返回 salt+hash 的十六进制字符串（仅包含 ASCII 字符），以避免在 utf8mb4 连接下
-    向 MySQL 发送任意二进制数据导致 1300 Invalid utf8mb4 character string 错误。
+    格式为 pbkdf2_sha256$<迭代次数>$<盐hex>$<哈希hex>，算法与代价随哈希保存，
+    调整 Config.PASSWORD_HASH_ITERATIONS 后旧哈希仍可验证，并在下次登录成功时重新计算。
+    只包含 ASCII 字符，避免在 utf8mb4 连接下向 MySQL 发送任意二进制数据导致 1300 错误。
     """
-    # 生成随机盐
+    iterations = iterations or _password_iterations()
     salt = os.urandom(salt_length)
-    # 使用 PBKDF2 算法生成哈希
-    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    # 拼接盐和哈希后以十六进制字符串形式返回
-    data = salt + password_hash
-    return data.hex()
+    password_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{PASSWORD_HASH_ALGORITHM}${iterations}${salt.hex()}${password_hash.hex()}"
 
 
-def verify_password(password, password_hash):
-    """验证密码
+def _parse_password_hash(password_hash):
+    """解析存储的密码哈希，返回 (迭代次数, 盐, 哈希)；无法解析时返回 None
 
-    支持两种存储格式：
-    1）新格式：salt+hash 的十六进制字符串（或其字节形式，例如从 VARBINARY 读出的 ASCII 字节）；
-    2）旧格式：直接存储的原始二进制 salt+hash（长度约 48 字节）。
+    支持三种存储格式：
+    1）当前格式：pbkdf2_sha256$<迭代次数>$<盐hex>$<哈希hex>；
+    2）旧格式：salt+hash 的十六进制字符串（或从 VARBINARY 读出的 ASCII 字节），固定 100000 次迭代；
+    3）更早的格式：直接存储的原始二进制 salt+hash（长度约 48 字节）。
     """
     if not password_hash:
-        return False
+        return None
 
+    text = None
     raw = None
-
-    # 从数据库读取时，VARBINARY 通常会得到 bytes/bytearray
     if isinstance(password_hash, (bytes, bytearray)):
-        # 优先按十六进制 ASCII 解码（新格式）
         try:
-            hex_str = password_hash.decode('ascii')
-            raw = bytes.fromhex(hex_str)
-        except (UnicodeDecodeError, ValueError):
-            # 无法按十六进制解析时，退回为旧格式的原始二进制
+            text = password_hash.decode('ascii')
+        except UnicodeDecodeError:
+            # 无法按 ASCII 解析时，视为旧格式的原始二进制
             raw = bytes(password_hash)
-
     elif isinstance(password_hash, str):
-        # 字符串：视为十六进制编码
+        text = password_hash
+    else:
+        return None
+
+    if text is not None:
+        if text.startswith(PASSWORD_HASH_ALGORITHM + '$'):
+            try:
+                _, iterations, salt_hex, hash_hex = text.split('$')
+                return int(iterations), bytes.fromhex(salt_hex), bytes.fromhex(hash_hex)
+            except ValueError:
+                return None
         try:
-            raw = bytes.fromhex(password_hash)
+            raw = bytes.fromhex(text)
         except ValueError:
-            return False
-    else:
-        # 其它类型暂不支持
-        return False
+            if isinstance(password_hash, str):
+                return None
+            raw = bytes(password_hash)
 
     # 原始数据至少应包含 16 字节盐 + 32 字节哈希
     if not raw or len(raw) < 16 + 32:
+        return None
+    return LEGACY_PASSWORD_ITERATIONS, raw[:16], raw[16:]
+
+
+def verify_password(password, password_hash):
+    """验证密码（兼容所有历史存储格式）"""
+    parsed = _parse_password_hash(password_hash)
+    if not parsed:
         return False
+    iterations, salt, stored_hash = parsed
+    computed_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return hmac.compare_digest(computed_hash, stored_hash)
+
 
-    salt = raw[:16]
-    stored_hash = raw[16:]
-    computed_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
-    return computed_hash == stored_hash
+def password_needs_rehash(password_hash):
+    """存储的哈希是否为旧格式或迭代次数与当前配置不一致（登录成功后应重新计算）"""
+    if isinstance(password_hash, (bytes, bytearray)):
+        try:
+            password_hash = password_hash.decode('ascii')
+        except UnicodeDecodeError:
+            return True
+    if not isinstance(password_hash, str) or not password_hash.startswith(PASSWORD_HASH_ALGORITHM + '$'):
+        return True
+    parsed = _parse_password_hash(password_hash)
+    return parsed is None or parsed[0] != _password_iterations()
 
 def calculate_average_score(scores, drop_highest=True, drop_lowest=True):
     """计算平均分（可选择去掉最高分和最低分）"""
@@ -309,49 +418,29 @@ def paginate_list(items, page=1, per_page=20):
     }
 
 def export_to_excel(data, filename, sheet_name='Sheet1'):
-    """导出数据到Excel文件"""
+    """导出数据到Excel文件（data 可以是列表或逐行产出字典的迭代器）"""
     try:
-        import openpyxl
-        from openpyxl.styles import Font, Alignment, PatternFill
-        
-        # 创建工作簿
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-        
-        if not data:
+        import xlsxwriter
+        from utils.xlsx_export import write_table
+
+        rows = iter(data or ())
+        first = next(rows, None)
+        if first is None:
             return False
-        
-        # 写入表头
-        headers = list(data[0].keys())
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = Font(bold=True)
-            cell.alignment = Alignment(horizontal='center')
-            cell.fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-        
-        # 写入数据
-        for row, item in enumerate(data, 2):
-            for col, header in enumerate(headers, 1):
-                ws.cell(row=row, column=col, value=item.get(header, ''))
-        
-        # 调整列宽
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # 保存文件
-        wb.save(filename)
+
+        # constant_memory：逐行落盘，列宽在写入时统计，无需再遍历一遍所有单元格
+        workbook = xlsxwriter.Workbook(filename, {'constant_memory': True, 'strings_to_numbers': False})
+        worksheet = workbook.add_worksheet(sheet_name)
+        header_format = workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#CCCCCC'})
+
+        def all_rows():
+            yield first
+            yield from rows
+
+        write_table(worksheet, list(first.keys()), all_rows(), header_format)
+        workbook.close()
         return True
-        
+
     except ImportError:
         return False
     except Exception as e:
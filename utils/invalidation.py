@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 跨进程缓存失效总线
+
+用户、会话标识等缓存放在每个 worker 进程内存里。数据变更时调用 publish(topic, key)：
+本进程的订阅者立即失效对应条目，其他进程通过传输层收到通知后失效。
+
+传输层：
+- redis：Redis pub/sub，毫秒级送达；订阅连接断开重连期间可能漏消息，重连后清空全部订阅的缓存；
+- mysql：每次发布向 cache_versions 表插入一行，各进程后台线程按自增版本号轮询，
+  延迟不超过 CACHE_INVALIDATION_POLL_INTERVAL；
+- none：只失效本进程（单进程部署或调试用），此时缓存有效期会被限制在很短的时间内。
+
+防止"读到旧值后才写入缓存"的竞态：读库前用 generation(topic) 取当前代数，
+写缓存前再比较一次，期间收到过同主题的失效通知就不写入。
+"""
+
+import abc
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from config import Config
+from utils.metrics import record_cache_lookup
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+# 主题：user 以用户名为键（UserManager 的用户缓存），session_token 以 user_id 为键
+TOPIC_USER = 'user'
+TOPIC_SESSION_TOKEN = 'session_token'
+
+# 没有跨进程传输时，缓存有效期不超过该值（秒）
+LOCAL_ONLY_MAX_TTL = 5
+
+# cache_versions 中保留的历史通知时长（秒），超过后由轮询线程顺带清理
+_VERSION_RETENTION_SECONDS = 3600
+_VERSION_CLEANUP_INTERVAL = 600
+# 自增版本号可能乱序提交（小号晚于大号可见），每次轮询回看最近这么多个版本号
+_VERSION_LOOKBACK = 200
+
+
+class InvalidationBus:
+    """缓存失效总线：本地分发 + 可选的跨进程传输"""
+
+    def __init__(self, transport=None):
+        self.transport = transport
+        self._handlers = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        if transport is not None:
+            transport.attach(self)
+
+    @property
+    def distributed(self):
+        return self.transport is not None
+
+    def safe_ttl(self, ttl):
+        """有跨进程失效时可以放心使用长有效期；否则退回短有效期"""
+        return ttl if self.distributed else min(ttl, LOCAL_ONLY_MAX_TTL)
+
+    def subscribe(self, topic, handler):
+        """注册失效回调 handler(key)；key 为 None 表示清空该主题的全部缓存"""
+        with self._lock:
+            self._handlers.setdefault(topic, []).append(handler)
+        self.ensure_started()
+
+    def ensure_started(self):
+        """确保本进程的传输层后台线程在运行（fork 出的子进程首次使用时启动）"""
+        if self.transport is not None:
+            self.transport.start()
+
+    def generation(self, topic):
+        return self._generations.get(topic, 0)
+
+    def publish(self, topic, key):
+        """数据已提交后调用：先失效本进程，再通知其他进程（通知失败只记录日志）"""
+        self.dispatch(topic, key)
+        if self.transport is None:
+            return
+        try:
+            self.transport.publish(topic, key)
+        except Exception as e:
+            logger.warning(f"发布缓存失效通知失败 {topic}:{key}: {e}")
+
+    def dispatch(self, topic, key):
+        with self._lock:
+            self._generations[topic] = self._generations.get(topic, 0) + 1
+            handlers = list(self._handlers.get(topic, ()))
+        for handler in handlers:
+            try:
+                handler(key)
+            except Exception as e:
+                logger.error(f"缓存失效回调异常 {topic}:{key}: {e}")
+
+    def dispatch_all(self):
+        """可能漏收通知时（如订阅连接重连）清空所有订阅的缓存"""
+        with self._lock:
+            topics = list(self._handlers)
+        for topic in topics:
+            self.dispatch(topic, None)
+
+
+class _BackgroundTransport(abc.ABC):
+    """带后台线程的传输层基类，线程在首次订阅时启动，fork 后在子进程中重新启动"""
+
+    thread_name = 'cache-invalidation'
+
+    def __init__(self):
+        self.bus = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._instance_id = uuid.uuid4().hex[:8]
+
+    @property
+    def origin(self):
+        """发送方标识：fork 出的各个子进程 pid 不同，标识也不同"""
+        return f"{os.getpid()}-{self._instance_id}"
+
+    def attach(self, bus):
+        self.bus = bus
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @abc.abstractmethod
+    def _run(self):
+        """后台线程主循环：接收其他进程的通知并交给 self.bus 分发，直到 _stop_event 置位"""
+
+
+class RedisInvalidationTransport(_BackgroundTransport):
+    """Redis pub/sub 传输；消息带发送方标识，本进程发出的通知已在本地分发过，收到时跳过"""
+
+    thread_name = 'cache-invalidation-redis'
+
+    def __init__(self, client, channel='wushu:invalidate'):
+        super().__init__()
+        self._client = client
+        self._channel = channel
+
+    def publish(self, topic, key):
+        message = json.dumps({'o': self.origin, 't': topic, 'k': key})
+        self._client.publish(self._channel, message)
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                # 订阅成功前的变更可能已经错过
+                self.bus.dispatch_all()
+                backoff = 1.0
+                while not self._stop_event.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if not message or message.get('type') != 'message':
+                        continue
+                    payload = json.loads(message['data'])
+                    if payload.get('o') == self.origin:
+                        continue
+                    self.bus.dispatch(payload['t'], payload.get('k'))
+            except Exception as e:
+                logger.warning(f"Redis invalidation subscriber error, reconnect in {backoff:.0f}s: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+class MySQLInvalidationTransport(_BackgroundTransport):
+    """cache_versions 表传输：发布即插入一行，各进程按自增 version 轮询新通知
+
+    Args:
+        connection_factory: 返回数据库连接上下文管理器的函数（DatabaseManager().get_connection）
+        poll_interval: 轮询间隔（秒），即跨进程失效的最大延迟
+    """
+
+    thread_name = 'cache-invalidation-mysql'
+
+    def __init__(self, connection_factory, poll_interval=1.0, batch_size=500):
+        super().__init__()
+        self._connection_factory = connection_factory
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._last_version = None
+        self._seen = deque(maxlen=_VERSION_LOOKBACK * 4)
+        self._seen_set = set()
+        self._last_cleanup = 0.0
+
+    def publish(self, topic, key):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO cache_versions (topic, cache_key, origin) VALUES (%s, %s, %s)",
+                (topic, None if key is None else str(key), self.origin),
+            )
+            conn.commit()
+            cursor.close()
+
+    def poll(self):
+        """读取上次之后的新通知并分发，返回分发条数"""
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            if self._last_version is None:
+                # 启动时从当前最大版本开始，历史通知对新进程没有意义
+                cursor.execute("SELECT COALESCE(MAX(version), 0) FROM cache_versions")
+                self._last_version = cursor.fetchone()[0]
+                conn.commit()
+                cursor.close()
+                # 开始轮询前已缓存的条目可能错过了通知
+                self.bus.dispatch_all()
+                return 0
+
+            cursor.execute(
+                "SELECT version, topic, cache_key, origin FROM cache_versions "
+                "WHERE version > %s ORDER BY version LIMIT %s",
+                (max(0, self._last_version - _VERSION_LOOKBACK), self.batch_size),
+            )
+            rows = cursor.fetchall()
+
+            now = time.time()
+            if now - self._last_cleanup >= _VERSION_CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                cursor.execute(
+                    "DELETE FROM cache_versions WHERE created_at < NOW() - INTERVAL %s SECOND LIMIT 10000",
+                    (_VERSION_RETENTION_SECONDS,),
+                )
+            # 结束本次读事务，否则 REPEATABLE READ 下复用的连接会一直读到旧快照
+            conn.commit()
+            cursor.close()
+
+        origin_self = self.origin
+        dispatched = 0
+        for version, topic, cache_key, origin in rows:
+            if version in self._seen_set:
+                continue
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_set.discard(self._seen[0])
+            self._seen.append(version)
+            self._seen_set.add(version)
+            self._last_version = max(self._last_version, version)
+            dispatched += 1
+            if origin != origin_self:
+                self.bus.dispatch(topic, cache_key)
+        return dispatched
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                # 一批读满说明积压较多，立即继续读下一批
+                if self.poll() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.warning(f"轮询 cache_versions 失败: {e}")
+            self._stop_event.wait(self.poll_interval)
+
+
+class InvalidatedCache:
+    """订阅失效总线上一个主题的进程内 TTL 缓存
+
+    用法：
+        generation = cache.generation()
+        hit, value = cache.get(key)
+        if not hit:
+            value = load_from_db(key)
+            cache.set(key, value, generation)
+
+    Args:
+        topic: 订阅的主题
+        ttl: 有跨进程失效时的有效期（秒）；没有时按 LOCAL_ONLY_MAX_TTL 截短
+        key_type: 缓存键类型，跨进程通知中的键会先转换成该类型
+        max_entries: 最多缓存的条目数，写满时先清理过期条目，仍满则淘汰最早写入的条目
+    """
+
+    def __init__(self, topic, ttl, key_type=str, max_entries=10000):
+        self.topic = topic
+        self.ttl = ttl
+        self.key_type = key_type
+        self.max_entries = max_entries
+        self._data = {}
+        self._bus = None
+        self._lock = threading.Lock()
+
+    def _get_bus(self):
+        if self._bus is None:
+            with self._lock:
+                if self._bus is None:
+                    bus = get_invalidation_bus()
+                    bus.subscribe(self.topic, self._on_invalidate)
+                    self._bus = bus
+        return self._bus
+
+    def generation(self):
+        bus = self._get_bus()
+        bus.ensure_started()
+        return bus.generation(self.topic)
+
+    def get(self, key):
+        """返回 (是否命中, 值)"""
+        entry = self._data.get(key)
+        if entry is not None and time.time() < entry[0]:
+            record_cache_lookup(self.topic, True)
+            return True, entry[1]
+        record_cache_lookup(self.topic, False)
+        return False, None
+
+    def set(self, key, value, generation):
+        bus = self._get_bus()
+        if bus.generation(self.topic) != generation:
+            # 读库期间收到过失效通知，读到的可能是旧值，不缓存
+            return
+        if key not in self._data and len(self._data) >= self.max_entries:
+            self._evict()
+        self._data[key] = (time.time() + bus.safe_ttl(self.ttl), value)
+
+    def _evict(self):
+        now = time.time()
+        for key, entry in list(self._data.items()):
+            if entry[0] <= now:
+                self._data.pop(key, None)
+        while len(self._data) >= self.max_entries:
+            try:
+                self._data.pop(next(iter(self._data)))
+            except (StopIteration, KeyError, RuntimeError):
+                break
+
+    def invalidate(self, key):
+        """只失效本进程中的条目"""
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def _on_invalidate(self, key):
+        if key is None:
+            self._data.clear()
+            return
+        try:
+            self._data.pop(self.key_type(key), None)
+        except (TypeError, ValueError):
+            self._data.clear()
+
+
+def _create_transport():
+    backend_name = (getattr(Config, 'CACHE_INVALIDATION_BACKEND', 'auto') or 'auto').lower()
+    if backend_name == 'none':
+        return None
+
+    redis_url = os.getenv('REDIS_URL')
+    if backend_name in ('auto', 'redis') and redis_url:
+        try:
+            client = create_redis_client(redis_url)
+            return RedisInvalidationTransport(
+                client,
+                channel=getattr(Config, 'CACHE_INVALIDATION_CHANNEL', 'wushu:invalidate'),
+            )
+        except Exception as e:
+            logger.warning(f"Redis invalidation transport init failed, fallback to mysql: {e}")
+    elif backend_name == 'redis':
+        logger.warning("CACHE_INVALIDATION_BACKEND=redis but REDIS_URL is not set, fallback to mysql")
+
+    from database import DatabaseManager
+    return MySQLInvalidationTransport(
+        DatabaseManager().get_connection,
+        poll_interval=getattr(Config, 'CACHE_INVALIDATION_POLL_INTERVAL', 1.0),
+    )
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_invalidation_bus():
+    """获取全局缓存失效总线（首次调用时按配置创建）"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = InvalidationBus(_create_transport())
+    return _bus
+
+
+def publish_invalidation(topic, key):
+    """数据提交后通知所有进程失效缓存，失败只记录日志，不影响写操作本身"""
+    try:
+        get_invalidation_bus().publish(topic, key)
+    except Exception as e:
+        logger.warning(f"缓存失效通知失败 {topic}:{key}: {e}")
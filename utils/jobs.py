@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 后台任务队列
+
+任务持久化在 jobs 表中，由 JobWorker 轮询领取（SELECT ... FOR UPDATE SKIP LOCKED），
+在线程池中执行，失败按指数退避重试。只依赖 MySQL，可独立运行（worker.py），
+也可以随 Web 进程内嵌启动（Config.JOB_EMBEDDED_WORKER）。
+
+用法:
+    @job_handler('maintenance.backup')
+    def run_backup(ctx, payload):
+        ctx.report_progress(50, '正在导出')
+        return {'filename': ...}
+
+    job_id = enqueue_job('maintenance.backup', {'backup_dir': ...}, created_by=user_id)
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def job_handler(job_type):
+    """注册任务处理函数，处理函数签名为 handler(ctx, payload)，返回值会以 JSON 存入 result"""
+    def decorator(func):
+        _handlers[job_type] = func
+        return func
+    return decorator
+
+
+def get_job_handler(job_type):
+    return _handlers.get(job_type)
+
+
+def _get_db_manager():
+    # 延迟导入，避免 utils 包与 database 模块之间的循环引用
+    from database import DatabaseManager
+    return DatabaseManager()
+
+
+def enqueue_job(job_type, payload=None, created_by=None, max_attempts=None, delay_seconds=0, priority=0):
+    """创建任务并返回 job_id"""
+    if max_attempts is None:
+        max_attempts = getattr(Config, 'JOB_MAX_ATTEMPTS', 3)
+
+    db_manager = _get_db_manager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO jobs (job_type, payload, status, priority, max_attempts, run_after, created_by)
+            VALUES (%s, %s, 'queued', %s, %s, NOW() + INTERVAL %s SECOND, %s)
+            """,
+            (
+                job_type,
+                json.dumps(payload or {}, ensure_ascii=False, default=str),
+                priority,
+                max_attempts,
+                int(delay_seconds),
+                created_by,
+            ),
+        )
+        job_id = cursor.lastrowid
+        conn.commit()
+
+    logger.info(f"任务已入队: job_id={job_id}, type={job_type}")
+    return job_id
+
+
+def has_pending_job(job_type, statuses=('queued', 'running')):
+    """是否已有同类型、处于指定状态的任务（用于周期性任务避免重复入队）"""
+    placeholders = ','.join(['%s'] * len(statuses))
+    db_manager = _get_db_manager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT 1 FROM jobs WHERE job_type = %s AND status IN ({placeholders}) LIMIT 1",
+            (job_type,) + tuple(statuses),
+        )
+        return cursor.fetchone() is not None
+
+
+def get_job(job_id):
+    """读取任务状态，不存在时返回 None"""
+    db_manager = _get_db_manager()
+    with db_manager.get_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            """
+            SELECT job_id, job_type, status, progress, progress_message,
+                   attempts, max_attempts, result, error, created_by,
+                   created_at, started_at, finished_at, run_after
+            FROM jobs
+            WHERE job_id = %s
+            """,
+            (job_id,),
+        )
+        job = cursor.fetchone()
+
+    if job and job.get('result'):
+        try:
+            job['result'] = json.loads(job['result'])
+        except (TypeError, ValueError):
+            pass
+    return job
+
+
+class JobContext:
+    """传给任务处理函数的上下文，用于汇报进度"""
+
+    def __init__(self, db_manager, job_id, job_type, attempt, created_by=None):
+        self._db_manager = db_manager
+        self.job_id = job_id
+        self.job_type = job_type
+        self.attempt = attempt
+        self.created_by = created_by
+
+    def report_progress(self, percent, message=None):
+        """更新进度（0-100），同时刷新锁时间，表明任务仍在运行"""
+        percent = max(0, min(100, int(percent)))
+        try:
+            with self._db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    UPDATE jobs
+                    SET progress = %s, progress_message = %s, locked_at = NOW()
+                    WHERE job_id = %s
+                    """,
+                    (percent, message, self.job_id),
+                )
+                conn.commit()
+        except Exception as e:
+            logger.warning(f"更新任务进度失败 job_id={self.job_id}: {e}")
+
+
+class JobWorker:
+    """轮询 jobs 表并在线程池中执行任务
+
+    Args:
+        max_workers: 并发执行的任务数
+        poll_interval: 无任务时的轮询间隔（秒）
+        job_types: 只处理指定类型的任务，None 表示处理所有已注册类型
+    """
+
+    def __init__(self, max_workers=None, poll_interval=None, job_types=None):
+        self.max_workers = max_workers or getattr(Config, 'JOB_WORKER_THREADS', 4)
+        self.poll_interval = poll_interval or getattr(Config, 'JOB_POLL_INTERVAL', 2.0)
+        self.job_types = job_types
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self.db_manager = _get_db_manager()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='job-worker',
+        )
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._last_recovery = 0.0
+
+    def start_in_background(self):
+        """在守护线程中运行轮询循环（供 Web 进程内嵌使用）"""
+        thread = threading.Thread(target=self.run_forever, name='job-poller', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_forever(self):
+        logger.info(f"任务 worker 启动: {self.worker_id}, 线程数 {self.max_workers}")
+        while not self._stop_event.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:
+                logger.error(f"任务轮询失败: {e}")
+                claimed = 0
+            if not claimed:
+                self._stop_event.wait(self.poll_interval)
+        self._executor.shutdown(wait=True)
+        logger.info(f"任务 worker 已停止: {self.worker_id}")
+
+    def run_once(self):
+        """领取并提交一批任务到线程池，返回领取的任务数"""
+        self._recover_stale_jobs()
+
+        with self._running_lock:
+            free_slots = self.max_workers - self._running
+        if free_slots <= 0:
+            return 0
+
+        jobs = self._claim_jobs(free_slots)
+        for job in jobs:
+            with self._running_lock:
+                self._running += 1
+            self._executor.submit(self._execute, job)
+        return len(jobs)
+
+    def _claim_jobs(self, limit):
+        job_types = self.job_types or list(_handlers.keys())
+        if not job_types:
+            return []
+
+        placeholders = ','.join(['%s'] * len(job_types))
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                f"""
+                SELECT job_id, job_type, payload, attempts, max_attempts, created_by
+                FROM jobs
+                WHERE status = 'queued' AND run_after <= NOW()
+                  AND attempts < max_attempts
+                  AND job_type IN ({placeholders})
+                ORDER BY priority DESC, job_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+                """,
+                tuple(job_types) + (limit,),
+            )
+            jobs = cursor.fetchall()
+            if not jobs:
+                conn.commit()
+                return []
+
+            id_placeholders = ','.join(['%s'] * len(jobs))
+            cursor.execute(
+                f"""
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1,
+                    locked_by = %s, locked_at = NOW(),
+                    started_at = COALESCE(started_at, NOW())
+                WHERE job_id IN ({id_placeholders})
+                """,
+                (self.worker_id,) + tuple(job['job_id'] for job in jobs),
+            )
+            conn.commit()
+
+        for job in jobs:
+            job['attempts'] += 1
+        return jobs
+
+    def _recover_stale_jobs(self):
+        """处理锁超时（worker 崩溃或被杀）的运行中任务
+
+        执行次数未用完的重新放回队列；已用完 max_attempts 的（反复导致 worker 崩溃的任务）
+        直接标记为失败，不再无限重试。
+        """
+        now = time.time()
+        stale_seconds = getattr(Config, 'JOB_STALE_SECONDS', 900)
+        if now - self._last_recovery < min(stale_seconds, 60):
+            return
+        self._last_recovery = now
+
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status = 'failed', locked_by = NULL, locked_at = NULL, finished_at = NOW(),
+                    error = CONCAT_WS('\n', '任务执行超时（worker 无心跳），已达到最大执行次数', error)
+                WHERE attempts >= max_attempts
+                  AND (
+                      (status = 'running' AND locked_at < NOW() - INTERVAL %s SECOND)
+                      OR status = 'queued'
+                  )
+                """,
+                (stale_seconds,),
+            )
+            if cursor.rowcount:
+                logger.error(f"{cursor.rowcount} 个超时任务已达到最大执行次数，标记为失败")
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status = 'queued', locked_by = NULL, locked_at = NULL
+                WHERE status = 'running' AND locked_at < NOW() - INTERVAL %s SECOND
+                """,
+                (stale_seconds,),
+            )
+            if cursor.rowcount:
+                logger.warning(f"重新入队 {cursor.rowcount} 个超时任务")
+            conn.commit()
+
+    def _execute(self, job):
+        job_id = job['job_id']
+        try:
+            handler = _handlers.get(job['job_type'])
+            try:
+                if handler is None:
+                    raise RuntimeError(f"未注册的任务类型: {job['job_type']}")
+                payload = json.loads(job['payload']) if job.get('payload') else {}
+                ctx = JobContext(
+                    self.db_manager, job_id, job['job_type'], job['attempts'], job.get('created_by')
+                )
+                result = handler(ctx, payload)
+            except Exception as e:
+                self._mark_failed(job, e)
+            else:
+                self._mark_succeeded(job_id, result)
+        finally:
+            with self._running_lock:
+                self._running -= 1
+
+    def _mark_succeeded(self, job_id, result):
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status = 'succeeded', progress = 100, result = %s, error = NULL,
+                    locked_by = NULL, locked_at = NULL, finished_at = NOW()
+                WHERE job_id = %s
+                """,
+                (json.dumps(result, ensure_ascii=False, default=str) if result is not None else None, job_id),
+            )
+            conn.commit()
+        logger.info(f"任务完成: job_id={job_id}")
+
+    def _mark_failed(self, job, error):
+        job_id = job['job_id']
+        error_text = f"{error}\n{traceback.format_exc()}"[:4000]
+        retry = job['attempts'] < job['max_attempts']
+
+        base = getattr(Config, 'JOB_RETRY_BACKOFF_SECONDS', 10)
+        max_backoff = getattr(Config, 'JOB_RETRY_BACKOFF_MAX_SECONDS', 600)
+        backoff = min(base * (2 ** (job['attempts'] - 1)), max_backoff)
+
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor()
+            if retry:
+                cursor.execute(
+                    """
+                    UPDATE jobs
+                    SET status = 'queued', error = %s, locked_by = NULL, locked_at = NULL,
+                        run_after = NOW() + INTERVAL %s SECOND
+                    WHERE job_id = %s
+                    """,
+                    (error_text, int(backoff), job_id),
+                )
+            else:
+                cursor.execute(
+                    """
+                    UPDATE jobs
+                    SET status = 'failed', error = %s, locked_by = NULL, locked_at = NULL,
+                        finished_at = NOW()
+                    WHERE job_id = %s
+                    """,
+                    (error_text, job_id),
+                )
+            conn.commit()
+
+        if retry:
+            logger.warning(
+                f"任务失败，将在 {backoff} 秒后重试 ({job['attempts']}/{job['max_attempts']}): "
+                f"job_id={job_id}, error={error}"
+            )
+        else:
+            logger.error(f"任务最终失败: job_id={job_id}, error={error}")
+
+
+_embedded_worker = None
+
+
+def start_embedded_worker():
+    """在当前进程内启动后台 worker（每个进程只启动一次）"""
+    global _embedded_worker
+    if _embedded_worker is None:
+        _embedded_worker = JobWorker(
+            max_workers=getattr(Config, 'JOB_EMBEDDED_WORKER_THREADS', 2),
+        )
+        _embedded_worker.start_in_background()
+    return _embedded_worker
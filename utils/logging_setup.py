@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 异步结构化日志
+
+请求线程上的 logger 调用只做两件事：补充请求上下文（request_id / user_id / endpoint），
+再把记录放进内存队列（队列满时丢弃并计数，不阻塞）。格式化和写文件/终端由 QueueListener
+后台线程完成。
+
+- LOG_FORMAT=json（默认）每行一个 JSON 对象，extra 中的字段（duration_ms、status、action 等）原样输出；
+  LOG_FORMAT=text 保持原来的可读格式；
+- 标记了 extra={'sample': True} 的 INFO 及以下记录（高频的成功日志）按 LOG_SUCCESS_SAMPLE_RATE 采样，
+  WARNING 及以上始终保留。
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+
+from config import Config
+
+# LogRecord 的标准属性，其余属性视为 extra 字段输出
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'sample'}
+
+_TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_EXC_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """在请求线程上补充 request_id / user_id / endpoint（listener 线程中已没有请求上下文）"""
+
+    def filter(self, record):
+        try:
+            from flask import g, has_request_context, request, session
+            if has_request_context():
+                if not hasattr(record, 'request_id'):
+                    record.request_id = g.get('request_id')
+                if not hasattr(record, 'user_id'):
+                    record.user_id = session.get('user_id')
+                if not hasattr(record, 'endpoint'):
+                    record.endpoint = request.endpoint
+        except Exception:
+            pass
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """对 extra={'sample': True} 的 INFO 及以下记录按 rate 采样"""
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING or not getattr(record, 'sample', False):
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录而不是阻塞请求线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 只合并消息参数、展开异常堆栈，其余格式化留给 listener 线程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_state = {'handler': None, 'listener': None}
+_setup_lock = threading.Lock()
+
+
+def _build_handlers():
+    if (getattr(Config, 'LOG_FORMAT', 'json') or 'json').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(_TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    log_file = getattr(Config, 'LOG_FILE', None)
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _start_listener(handler):
+    log_queue = queue.Queue(maxsize=getattr(Config, 'LOG_QUEUE_SIZE', 10000))
+    handler.queue = log_queue
+    listener = logging.handlers.QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    listener.start()
+    _state['listener'] = listener
+
+
+def _restart_after_fork():
+    # 父进程的 listener 线程不会随 fork 复制，子进程换一个新队列并重新启动
+    if _state['handler'] is not None:
+        _start_listener(_state['handler'])
+
+
+def _stop_listener():
+    listener = _state['listener']
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        _state['listener'] = None
+
+
+def setup_logging(level=None):
+    """把根 logger 切换为队列异步输出（可重复调用，只初始化一次），返回 QueueHandler"""
+    with _setup_lock:
+        if _state['handler'] is not None:
+            return _state['handler']
+
+        handler = NonBlockingQueueHandler(None)
+        handler.addFilter(SamplingFilter(getattr(Config, 'LOG_SUCCESS_SAMPLE_RATE', 1.0)))
+        handler.addFilter(RequestContextFilter())
+        _start_listener(handler)
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, (level or getattr(Config, 'LOG_LEVEL', 'INFO')).upper(), logging.INFO))
+
+        _state['handler'] = handler
+        atexit.register(_stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_after_fork)
+        return handler
@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - Prometheus 格式指标
+
+每个进程在内存中记录计数器 / 直方图 / 仪表盘（每个指标一把锁，单次记录约 1 微秒），
+后台线程每隔 METRICS_FLUSH_INTERVAL 秒把快照原子写入 METRICS_DIR/<pid>-<启动时间>.json，
+进程退出时再写一次。/metrics 由任意一个 worker 响应：先写出本进程的最新快照，再合并目录下所有文件：
+
+- 计数器、直方图：所有文件求和（已退出进程的累计值保留，保证单调递增）；
+- 仪表盘：只合并仍存活的进程，按指标的 mode 求和或取最大值；
+- 退出超过 METRICS_RETENTION_SECONDS 的进程文件在合并时删除。
+
+连接池、缓存等状态通过 register_collector 注册的回调在写快照时采集。
+"""
+
+import atexit
+import bisect
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _describe(self):
+        return {'type': self.kind, 'help': self.documentation, 'labelnames': list(self.labelnames)}
+
+    def snapshot(self):
+        with self._lock:
+            samples = [[list(labels), value] for labels, value in self._values.items()]
+        description = self._describe()
+        description['samples'] = samples
+        return description
+
+
+class Counter(_Metric):
+    """单调递增计数器；labels 按 labelnames 顺序传入的元组"""
+
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, value, labels=()):
+        """采集回调使用：直接写入其他组件维护的进程内累计值"""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Gauge(_Metric):
+    """仪表盘；mode 决定多进程合并方式：sum（求和）/ max（取最大值）"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), mode='sum'):
+        super().__init__(name, documentation, labelnames)
+        self.mode = mode
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+    def _describe(self):
+        description = super()._describe()
+        description['mode'] = self.mode
+        return description
+
+
+class Histogram(_Metric):
+    """直方图；每组标签保存 [各桶计数（非累计）, 总和, 次数]"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = [[list(labels), [list(v[0]), v[1], v[2]]] for labels, v in self._values.items()]
+        description = self._describe()
+        description['buckets'] = list(self.buckets)
+        description['samples'] = samples
+        return description
+
+
+class MetricsRegistry:
+    """本进程的指标集合，负责写快照和合并所有进程的快照"""
+
+    def __init__(self, directory=None, flush_interval=5.0, retention_seconds=86400):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_seconds
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._file_pid = None
+        self._started_at = None
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), mode='sum'):
+        return self.register(Gauge(name, documentation, labelnames, mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """collector() 在写快照前调用，用于把连接池等状态写入仪表盘/计数器"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    # ---------------- 快照 ----------------
+
+    def snapshot(self):
+        for collector in list(self._collectors):
+            try:
+                collector()
+            except Exception as e:
+                logger.warning(f"指标采集回调失败: {e}")
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: m.snapshot() for m in metrics}
+
+    def _path(self):
+        return os.path.join(self.directory, f"{os.getpid()}-{self._started_at}.json")
+
+    def write_snapshot(self):
+        """原子写入本进程快照（未配置目录时不写文件），返回快照内容"""
+        data = self.snapshot()
+        if not self.directory:
+            return data
+        if self._file_pid != os.getpid():
+            self._file_pid = os.getpid()
+            self._started_at = int(time.time() * 1000)
+        os.makedirs(self.directory, exist_ok=True)
+        payload = json.dumps({'pid': os.getpid(), 'metrics': data}, separators=(',', ':'))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._path())
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        return data
+
+    def ensure_started(self):
+        """启动本进程的快照线程（fork 出的子进程首次记录时启动）"""
+        if self._pid == os.getpid() or not self.directory:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_quietly)
+
+    def reset_after_fork(self):
+        """子进程清空从父进程继承的数值，避免与父进程快照重复计数"""
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file_pid = None
+        self._thread = None
+        for metric in self._metrics.values():
+            metric._lock = threading.Lock()
+            metric._values = {}
+
+    def _flush_quietly(self):
+        try:
+            self.write_snapshot()
+        except Exception as e:
+            logger.warning(f"写入指标快照失败: {e}")
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self._flush_quietly()
+
+    # ---------------- 合并与输出 ----------------
+
+    def _load_snapshots(self, own):
+        snapshots = [(True, own)]
+        if not self.directory:
+            return snapshots
+        own_path = self._path() if self._file_pid == os.getpid() else None
+        now = time.time()
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if path == own_path:
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    content = json.load(f)
+                pid = content.get('pid')
+                # 同一 pid 的旧文件来自此前同号的进程，仪表盘不再计入
+                alive = pid != os.getpid() and _pid_alive(pid)
+                if not alive and now - os.path.getmtime(path) > self.retention_seconds:
+                    os.unlink(path)
+                    continue
+            except (OSError, ValueError) as e:
+                logger.debug(f"跳过无法读取的指标快照 {path}: {e}")
+                continue
+            snapshots.append((alive, content.get('metrics') or {}))
+        return snapshots
+
+    def collect(self):
+        """合并所有进程快照，返回 {指标名: 合并后的描述}"""
+        own = self.write_snapshot() if self.directory else self.snapshot()
+        merged = {}
+        for alive, metrics in self._load_snapshots(own):
+            for name, description in metrics.items():
+                kind = description.get('type')
+                if kind == 'gauge' and not alive:
+                    continue
+                target = merged.get(name)
+                if target is None:
+                    target = merged[name] = {
+                        'type': kind,
+                        'help': description.get('help', ''),
+                        'labelnames': description.get('labelnames', []),
+                        'buckets': description.get('buckets'),
+                        'mode': description.get('mode', 'sum'),
+                        'samples': {},
+                    }
+                _merge_samples(target, description.get('samples', []))
+        return merged
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {_escape_help(metric['help'])}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric['labelnames']
+            for labels, value in sorted(metric['samples'].items()):
+                pairs = list(zip(labelnames, labels))
+                if metric['type'] == 'histogram':
+                    counts, total, count = value
+                    cumulative = 0
+                    for bound, bucket_count in zip(metric['buckets'] + [float('inf')], counts):
+                        cumulative += bucket_count
+                        le = '+Inf' if bound == float('inf') else _format_value(bound)
+                        lines.append(f"{name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(pairs)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(pairs)} {count}")
+                else:
+                    lines.append(f"{name}{_format_labels(pairs)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _merge_samples(target, samples):
+    merged = target['samples']
+    for labels, value in samples:
+        key = tuple(labels)
+        current = merged.get(key)
+        if target['type'] == 'histogram':
+            if current is None or len(current[0]) != len(value[0]):
+                merged[key] = [list(value[0]), value[1], value[2]]
+            else:
+                current[0] = [a + b for a, b in zip(current[0], value[0])]
+                current[1] += value[1]
+                current[2] += value[2]
+        elif current is None:
+            merged[key] = value
+        elif target['type'] == 'gauge' and target['mode'] == 'max':
+            merged[key] = max(current, value)
+        else:
+            merged[key] = current + value
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _escape_help(text):
+    return str(text).replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    body = ','.join(
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(10), chr(92) + "n").replace(chr(34), chr(92) + chr(34))}"'
+        for k, v in pairs
+    )
+    return '{' + body + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return repr(value)
+    return str(value)
+
+
+def _default_directory():
+    configured = getattr(Config, 'METRICS_DIR', None)
+    if configured is not None:
+        return configured
+    return os.path.join(tempfile.gettempdir(), 'wushu-metrics')
+
+
+REGISTRY = MetricsRegistry(
+    directory=_default_directory(),
+    flush_interval=getattr(Config, 'METRICS_FLUSH_INTERVAL', 5.0),
+    retention_seconds=getattr(Config, 'METRICS_RETENTION_SECONDS', 86400),
+)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'HTTP 请求数', ('endpoint', 'method', 'status'),
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'HTTP 请求耗时（秒）', ('endpoint',),
+)
+DB_QUERIES = REGISTRY.counter(
+    'db_queries_total', '请求内执行的 SQL 条数', ('endpoint',),
+)
+DB_QUERY_SECONDS = REGISTRY.counter(
+    'db_query_seconds_total', '请求内 SQL 累计耗时（秒）', ('endpoint',),
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'cache_requests_total', '缓存查询次数（result=hit/miss，命中率 = hit / 总数）', ('cache', 'result'),
+)
+
+
+DB_POOL_CONNECTIONS = REGISTRY.gauge(
+    'db_pool_connections', '连接池连接数（state=in_use/idle/waiters/overflow）', ('state',),
+)
+DB_POOL_WAIT_MAX = REGISTRY.gauge(
+    'db_pool_wait_max_milliseconds', '最近取连接等待耗时的最大值（毫秒）', mode='max',
+)
+DB_POOL_EVENTS = REGISTRY.counter(
+    'db_pool_events_total', '连接池事件数（checkouts/waits/timeouts/connects/recycled/discarded）', ('event',),
+)
+
+_POOL_STATES = ('in_use', 'idle', 'waiters', 'overflow')
+_POOL_EVENTS = ('checkouts', 'waits', 'timeouts', 'connects', 'recycled', 'discarded')
+
+
+def _collect_db_pool():
+    import database
+    pool = database._connection_pool
+    if pool is None:
+        return
+    stats = pool.stats()
+    for state in _POOL_STATES:
+        DB_POOL_CONNECTIONS.set(stats.get(state, 0), (state,))
+    DB_POOL_WAIT_MAX.set(stats.get('wait_ms', {}).get('max', 0.0))
+    for event in _POOL_EVENTS:
+        DB_POOL_EVENTS.set_total(stats.get(event, 0), (event,))
+
+
+REGISTRY.register_collector(_collect_db_pool)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=REGISTRY.reset_after_fork)
+
+
+def observe_request(endpoint, method, status, duration_seconds, query_stats=None):
+    """after_request 中调用：记录一次请求的耗时、状态码和 SQL 统计"""
+    REGISTRY.ensure_started()
+    endpoint = endpoint or 'unmatched'
+    HTTP_REQUESTS.inc((endpoint, method, str(status)))
+    HTTP_LATENCY.observe(duration_seconds, (endpoint,))
+    if query_stats is not None and query_stats.count:
+        DB_QUERIES.inc((endpoint,), query_stats.count)
+        DB_QUERY_SECONDS.inc((endpoint,), query_stats.total_ms / 1000.0)
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_REQUESTS.inc((cache_name, 'hit' if hit else 'miss'))
+
+
+def render_latest():
+    """返回 (Prometheus 文本, Content-Type)"""
+    return REGISTRY.render(), _CONTENT_TYPE
@@ -5,7 +5,9 @@
 用于封装系统通知发送逻辑
 """
 
+from config import Config
 from database import DatabaseManager
+from utils.jobs import job_handler
 from datetime import datetime
 import json
 import logging
@@ -422,13 +424,14 @@ class NotificationService:
             traceback.print_exc()
             return False
     
-    def send_batch_final_confirmation_notifications(self, event_id):
+    def send_batch_final_confirmation_notifications(self, event_id, progress_callback=None):
         """
         批量发送参赛确认通知（用于报名截止时）
         给指定赛事中所有审核通过的参赛者发送正式参赛确认通知
         
         Args:
             event_id: 赛事ID
+            progress_callback: 可选，progress_callback(已处理数, 总数)，用于后台任务汇报进度
         
         Returns:
             dict: 包含成功和失败数量的字典 {'success_count': int, 'failed_count': int, 'total': int}
@@ -475,7 +478,7 @@ class NotificationService:
                 failed_count = 0
                 
                 # 批量发送通知
-                for participant in participants:
+                for index, participant in enumerate(participants, start=1):
                     participant_info = {
                         'team_name': participant.get('team_name'),
                         'leader_name': participant.get('leader_name'),
@@ -495,6 +498,9 @@ class NotificationService:
                         success_count += 1
                     else:
                         failed_count += 1
+                    
+                    if progress_callback:
+                        progress_callback(index, len(participants))
                 
                 total = len(participants)
                 logger.info(f"批量发送参赛确认通知完成 - 赛事ID: {event_id}, 总数: {total}, 成功: {success_count}, 失败: {failed_count}")
@@ -511,6 +517,167 @@ class NotificationService:
             traceback.print_exc()
             return {'success_count': 0, 'failed_count': 0, 'total': 0, 'error': str(e)}
     
+    def fan_out_notification(self, notification_id, sender_id, recipient_type,
+                             roles=None, event_id=None, batch_size=None, progress_callback=None):
+        """
+        将已创建的通知分发到收件人（user_notifications）
+        
+        按 user_id 区间分块执行 INSERT ... SELECT，每块单独提交，避免长事务和逐条插入；
+        INSERT IGNORE 保证中断后重跑不会产生重复记录。进度写回 notifications 表。
+        
+        Args:
+            notification_id: 通知ID
+            sender_id: 发送者ID（不会收到自己的通知）
+            recipient_type: all / role / event
+            roles: recipient_type 为 role 时的角色列表
+            event_id: recipient_type 为 event 时的赛事ID
+            batch_size: 每块覆盖的 user_id 区间大小，默认取 Config.NOTIFICATION_FANOUT_BATCH_SIZE
+            progress_callback: 可选，progress_callback(已分发数, 完成比例 0-1)，每块提交后调用
+        
+        Returns:
+            int: 实际写入的收件记录数
+        """
+        if batch_size is None:
+            batch_size = getattr(Config, 'NOTIFICATION_FANOUT_BATCH_SIZE', 1000)
+        batch_size = max(int(batch_size), 1)
+        delivered = 0
+
+        try:
+            with self.db_manager.get_connection() as conn:
+                cursor = conn.cursor()
+
+                source_sql, source_params = self._recipient_source(
+                    cursor, recipient_type, roles, event_id, sender_id
+                )
+
+                cursor.execute(
+                    "UPDATE notifications SET delivery_status = 'sending' WHERE id = %s",
+                    (notification_id,),
+                )
+                conn.commit()
+
+                if source_sql is not None:
+                    cursor.execute(
+                        f"SELECT MIN(src.user_id), MAX(src.user_id) FROM ({source_sql}) src",
+                        source_params,
+                    )
+                    min_user_id, max_user_id = cursor.fetchone()
+
+                    if min_user_id is not None:
+                        for lower in range(min_user_id, max_user_id + 1, batch_size):
+                            upper = lower + batch_size - 1
+                            cursor.execute(
+                                f"""
+                                INSERT IGNORE INTO user_notifications
+                                (notification_id, user_id, is_read, created_at)
+                                SELECT %s, src.user_id, FALSE, NOW()
+                                FROM ({source_sql}) src
+                                WHERE src.user_id BETWEEN %s AND %s
+                                """,
+                                (notification_id,) + source_params + (lower, upper),
+                            )
+                            delivered += max(cursor.rowcount, 0)
+                            cursor.execute(
+                                "UPDATE notifications SET recipient_count = %s WHERE id = %s",
+                                (delivered, notification_id),
+                            )
+                            conn.commit()
+                            if progress_callback:
+                                span = max_user_id - min_user_id + 1
+                                progress_callback(delivered, min(upper - min_user_id + 1, span) / span)
+
+                cursor.execute(
+                    """
+                    UPDATE notifications
+                    SET delivery_status = 'completed', recipient_count = %s
+                    WHERE id = %s
+                    """,
+                    (delivered, notification_id),
+                )
+                conn.commit()
+
+            logger.info(f"通知 {notification_id} 分发完成，共 {delivered} 个收件人")
+            return delivered
+
+        except Exception as e:
+            logger.error(f"通知 {notification_id} 分发失败（已分发 {delivered} 个）: {str(e)}")
+            try:
+                with self.db_manager.get_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(
+                        "UPDATE notifications SET delivery_status = 'failed' WHERE id = %s",
+                        (notification_id,),
+                    )
+                    conn.commit()
+            except Exception:
+                pass
+            raise
+
+    @staticmethod
+    def _recipient_source(cursor, recipient_type, roles, event_id, sender_id):
+        """返回收件人 user_id 的子查询及其参数；无收件人时返回 (None, ())"""
+        if recipient_type == 'all':
+            return (
+                "SELECT user_id FROM users WHERE user_id != %s",
+                (sender_id,),
+            )
+
+        if recipient_type == 'role':
+            if not roles:
+                return None, ()
+            placeholders = ','.join(['%s'] * len(roles))
+            return (
+                f"SELECT user_id FROM users WHERE role IN ({placeholders}) AND user_id != %s",
+                tuple(roles) + (sender_id,),
+            )
+
+        if recipient_type == 'event':
+            # 优先从 event_participants 中选择该赛事的参赛运动员，新表无数据时回退到旧的 participants 表
+            cursor.execute(
+                """
+                SELECT 1 FROM event_participants
+                WHERE event_id = %s AND role = 'athlete'
+                LIMIT 1
+                """,
+                (event_id,),
+            )
+            if cursor.fetchone():
+                return (
+                    """
+                    SELECT DISTINCT user_id FROM event_participants
+                    WHERE event_id = %s AND user_id != %s AND role = 'athlete'
+                    """,
+                    (event_id, sender_id),
+                )
+            return (
+                """
+                SELECT DISTINCT user_id FROM participants
+                WHERE event_id = %s AND user_id != %s
+                """,
+                (event_id, sender_id),
+            )
+
+        return None, ()
+
+    def get_delivery_status(self, notification_id):
+        """
+        获取通知分发进度
+        
+        Returns:
+            dict: {'notification_id', 'status', 'recipient_count'}，通知不存在时返回 None
+        """
+        with self.db_manager.get_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT id AS notification_id, sender_id, delivery_status AS status, recipient_count
+                FROM notifications
+                WHERE id = %s
+                """,
+                (notification_id,),
+            )
+            return cursor.fetchone()
+
     def get_notification_detail(self, notification_id, user_id):
         """
         获取通知详情（包含附加信息）
@@ -577,3 +744,33 @@ class NotificationService:
 
 # 创建全局通知服务实例
 notification_service = NotificationService()
+
+
+@job_handler('notifications.fan_out')
+def run_notification_fan_out(ctx, payload):
+    """后台任务：将通知分块分发给收件人"""
+    delivered = notification_service.fan_out_notification(
+        payload['notification_id'],
+        payload['sender_id'],
+        payload['recipient_type'],
+        roles=payload.get('roles'),
+        event_id=payload.get('event_id'),
+        progress_callback=lambda count, ratio: ctx.report_progress(
+            ratio * 100, f'已分发 {count} 个收件人'
+        ),
+    )
+    return {'notification_id': payload['notification_id'], 'recipient_count': delivered}
+
+
+@job_handler('notifications.final_confirmation')
+def run_final_confirmation_notifications(ctx, payload):
+    """后台任务：给赛事所有审核通过的参赛者批量发送参赛确认通知"""
+    result = notification_service.send_batch_final_confirmation_notifications(
+        payload['event_id'],
+        progress_callback=lambda done, total: ctx.report_progress(
+            done * 100 // total, f'已处理 {done}/{total} 位参赛者'
+        ),
+    )
+    if result.get('error'):
+        raise RuntimeError(result['error'])
+    return result
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 游标（keyset）分页工具
+
+列表按 (排序列, 主键) 排序，下一页通过 "排序列 < 上一页最后一行的值" 定位，
+不再使用 OFFSET，第 500 页与第 1 页的查询代价相同。
+
+游标对客户端是不透明字符串（base64url 编码的 JSON），内含排序字段、方向和最后一行的键值。
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+
+class InvalidCursorError(ValueError):
+    """分页游标无法解析或与当前排序方式不匹配"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise InvalidCursorError('无效的分页游标')
+    return value
+
+
+def encode_cursor(order_by, order_dir, values):
+    """把排序方式和最后一行的键值编码为不透明游标"""
+    payload = {
+        'o': order_by,
+        'd': order_dir,
+        'k': [_encode_value(v) for v in values],
+    }
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, order_by, order_dir, key_length=2):
+    """解析游标并校验排序方式，返回键值元组；无效时抛出 InvalidCursorError"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = tuple(_decode_value(v) for v in payload['k'])
+    except InvalidCursorError:
+        raise
+    except Exception:
+        raise InvalidCursorError('无效的分页游标')
+
+    if payload.get('o') != order_by or payload.get('d') != order_dir:
+        raise InvalidCursorError('分页游标与当前排序方式不一致，请从第一页重新加载')
+    if len(values) != key_length or any(v is None for v in values):
+        raise InvalidCursorError('无效的分页游标')
+    return values
+
+
+def keyset_condition(columns, values, order_dir='DESC'):
+    """生成 "位于游标之后" 的 WHERE 条件及参数
+
+    (a, b) 降序时展开为 a < %s OR (a = %s AND b < %s)，
+    展开写法可以直接利用 (a, b) 上的组合索引做范围扫描。
+    """
+    op = '<' if order_dir == 'DESC' else '>'
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        parts = [f"{prev} = %s" for prev in columns[:i]] + [f"{column} {op} %s"]
+        clauses.append('(' + ' AND '.join(parts) + ')')
+        params.extend(values[:i])
+        params.append(values[i])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def parse_total_mode(value, default='exact'):
+    """解析 include_total 参数：exact（精确计数）/ approx（执行计划估算）/ none（不计数）"""
+    value = (value or '').strip().lower()
+    if value in ('true', '1', 'exact'):
+        return 'exact'
+    if value in ('approx', 'estimate'):
+        return 'approx'
+    if value in ('false', '0', 'none'):
+        return 'none'
+    return default
+
+
+def estimate_row_count(cursor, from_where_sql, params=()):
+    """用 EXPLAIN 的行数估算代替 COUNT(*)，返回整数（估算值，仅用于展示）"""
+    cursor.execute("EXPLAIN SELECT 1 " + from_where_sql, tuple(params))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+    first = rows[0]
+    estimate = first.get('rows') if isinstance(first, dict) else None
+    if estimate is None and not isinstance(first, dict):
+        columns = [col[0] for col in cursor.description] if cursor.description else []
+        if 'rows' in columns:
+            estimate = first[columns.index('rows')]
+    return int(estimate or 0)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 有界密码哈希执行器
+
+PBKDF2 是刻意设计的慢操作（单次数十毫秒 CPU）。报名开放时集中登录会让所有 worker 都卡在哈希计算上，
+连静态资源和已登录用户的请求也得不到处理。这里把密码验证/哈希放到固定大小的线程池中执行：
+
+- 线程数取 Config.PASSWORD_HASH_WORKERS（hashlib.pbkdf2_hmac 计算时释放 GIL，可真正并行）；
+- 排队数超过 Config.PASSWORD_HASH_MAX_PENDING 时立即抛出 PasswordHashingBusy，由接口返回 503，
+  而不是让请求在队列里越积越多直到超时；
+- 单次等待超过 Config.PASSWORD_HASH_TIMEOUT 同样视为繁忙。
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from config import Config
+from utils.helpers import generate_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashingBusy(Exception):
+    """密码哈希执行器已满，调用方应返回 503 并提示稍后重试"""
+
+    def __init__(self, message='登录人数较多，请稍后重试', retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BoundedHashExecutor:
+    """固定线程数 + 有界排队的执行器
+
+    Args:
+        max_workers: 并发计算的线程数
+        max_pending: 允许的在途任务数（执行中 + 排队），超出即拒绝
+        timeout: 单个任务的最长等待时间（秒）
+    """
+
+    def __init__(self, max_workers, max_pending, timeout):
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'rejected': 0, 'timeouts': 0}
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            logger.warning(f"密码哈希队列已满（{self.max_pending}），拒绝本次请求")
+            raise PasswordHashingBusy()
+
+        with self._lock:
+            self._stats['submitted'] += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        # 无论调用方是否等到结果，任务结束时才释放名额，避免超时后队列被"虚空"占满
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timeouts'] += 1
+            logger.warning(f"密码哈希等待超过 {self.timeout} 秒")
+            raise PasswordHashingBusy()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot.update({'max_workers': self.max_workers, 'max_pending': self.max_pending})
+        return snapshot
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor():
+    """获取全局密码哈希执行器（首次调用时按配置创建）"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(Config, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 2
+                _executor = BoundedHashExecutor(
+                    max_workers=workers,
+                    max_pending=getattr(Config, 'PASSWORD_HASH_MAX_PENDING', None) or workers * 4,
+                    timeout=getattr(Config, 'PASSWORD_HASH_TIMEOUT', 5.0),
+                )
+    return _executor
+
+
+def check_password(password, password_hash):
+    """在有界执行器中验证密码；繁忙时抛出 PasswordHashingBusy"""
+    return get_hash_executor().run(verify_password, password, password_hash)
+
+
+def hash_password(password):
+    """在有界执行器中按当前配置计算密码哈希；繁忙时抛出 PasswordHashingBusy"""
+    return get_hash_executor().run(generate_password_hash, password)
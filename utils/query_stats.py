@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 请求级 SQL 统计与 N+1 检测
+
+TimedCursorWrapper 每执行一条语句调用 record_query，按"语句指纹"（去掉字面量、合并 IN 列表后的
+规范化 SQL）累计次数、耗时和取回行数：
+
+- 请求内统计保存在 flask.g，请求结束时写入日志和 Server-Timing 响应头；
+- 同一指纹在一个请求内执行超过 QUERY_REPEAT_THRESHOLD 次视为 N+1，记录警告，测试模式下直接报错；
+- capture_queries() 在当前线程内额外收集一份统计（请求内外均可），供测试断言查询预算。
+"""
+
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+from flask import g, has_request_context
+
+logger = logging.getLogger(__name__)
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.S)
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES_LIST_RE = re.compile(r'\(\?\+\)(?:\s*,\s*\(\?\+\))+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """规范化 SQL：字面量与占位符替换为 ?，IN 列表与多行 VALUES 合并，空白折叠"""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', errors='replace')
+    text = _STRING_RE.sub('?', sql)
+    text = _COMMENT_RE.sub(' ', text)
+    text = text.replace('%s', '?')
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_LIST_RE.sub('(?+)', text)
+    text = _VALUES_LIST_RE.sub('(?+), ...', text)
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class QueryStats:
+    """一组语句的统计：总次数、总耗时、取回行数，以及按指纹的明细 [次数, 耗时ms, 行数]"""
+
+    __slots__ = ('count', 'total_ms', 'rows', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self.statements = {}
+
+    def record(self, key, duration_ms):
+        self.count += 1
+        self.total_ms += duration_ms
+        entry = self.statements.get(key)
+        if entry is None:
+            self.statements[key] = [1, duration_ms, 0]
+        else:
+            entry[0] += 1
+            entry[1] += duration_ms
+
+    def add_rows(self, key, rows):
+        self.rows += rows
+        entry = self.statements.get(key)
+        if entry is not None:
+            entry[2] += rows
+
+    def repeated(self, threshold):
+        """执行次数超过 threshold 的指纹，按次数降序返回 [(指纹, 次数, 耗时ms, 行数)]"""
+        return sorted(
+            ((key, c, ms, rows) for key, (c, ms, rows) in self.statements.items() if c > threshold),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+
+    def top(self, limit=5):
+        """按耗时降序的前 limit 条指纹"""
+        return sorted(
+            ((key, c, ms, rows) for key, (c, ms, rows) in self.statements.items()),
+            key=lambda item: item[2],
+            reverse=True,
+        )[:limit]
+
+
+class RepeatedQueryError(AssertionError):
+    """同一语句在一个请求内重复执行次数超过阈值（疑似 N+1），仅测试模式抛出"""
+
+
+class QueryBudgetExceeded(AssertionError):
+    """capture_queries 块内的查询次数或单条语句重复次数超出预算"""
+
+
+_local = threading.local()
+
+
+def _active_captures():
+    captures = getattr(_local, 'captures', None)
+    if captures is None:
+        captures = _local.captures = []
+    return captures
+
+
+def get_request_query_stats():
+    """当前请求的统计，请求外返回 None"""
+    if not has_request_context():
+        return None
+    return g.get('_query_stats')
+
+
+def record_query(sql, duration_ms):
+    """记录一次语句执行，返回指纹（供随后记录取回行数）"""
+    key = fingerprint(sql)
+    if has_request_context():
+        stats = g.get('_query_stats')
+        if stats is None:
+            stats = g._query_stats = QueryStats()
+        stats.record(key, duration_ms)
+    for capture in getattr(_local, 'captures', ()):
+        capture.stats.record(key, duration_ms)
+    return key
+
+
+def record_rows(key, rows):
+    if not rows or key is None:
+        return
+    if has_request_context():
+        stats = g.get('_query_stats')
+        if stats is not None:
+            stats.add_rows(key, rows)
+    for capture in getattr(_local, 'captures', ()):
+        capture.stats.add_rows(key, rows)
+
+
+def check_repeated_queries(stats, threshold, raise_error=False, label=''):
+    """检查 N+1：超过阈值的指纹记录警告，raise_error 时抛出 RepeatedQueryError"""
+    if stats is None or threshold is None or threshold <= 0:
+        return []
+    offenders = stats.repeated(threshold)
+    if not offenders:
+        return offenders
+    details = '; '.join(f"{count}x {ms:.1f}ms: {key}" for key, count, ms, _ in offenders[:3])
+    logger.warning(f"疑似 N+1 查询 {label}（同一语句超过 {threshold} 次）: {details}")
+    if raise_error:
+        raise RepeatedQueryError(f"{label} 同一语句执行超过 {threshold} 次: {details}")
+    return offenders
+
+
+def server_timing_header(stats, total_ms=None, pool_wait_ms=None):
+    """生成 Server-Timing 头：db（SQL 总耗时与条数）、db-wait（等待连接池）、total（请求总耗时）"""
+    count = stats.count if stats is not None else 0
+    db_ms = stats.total_ms if stats is not None else 0.0
+    parts = [f'db;dur={db_ms:.1f};desc="{count} queries"']
+    if pool_wait_ms:
+        parts.append(f'db-wait;dur={pool_wait_ms:.1f}')
+    if total_ms is not None:
+        parts.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(parts)
+
+
+class capture_queries:
+    """在当前线程内收集语句统计，可选在退出时检查预算
+
+    用法：
+        with capture_queries(max_queries=5, max_repeats=1) as captured:
+            client.get('/api/events/1/results')
+        captured.stats.count
+
+    Args:
+        max_queries: 块内允许的最大语句条数（None 不限制）
+        max_repeats: 单个指纹允许的最大执行次数（None 不限制）
+    """
+
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.stats = QueryStats()
+        self.elapsed_ms = 0.0
+        self._start = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        _active_captures().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        captures = _active_captures()
+        if self in captures:
+            captures.remove(self)
+        if exc_type is None:
+            self.assert_budget()
+        return False
+
+    def report(self, limit=5):
+        lines = [f"{self.stats.count} 条语句，共 {self.stats.total_ms:.1f} ms，取回 {self.stats.rows} 行"]
+        for key, count, ms, rows in self.stats.top(limit):
+            lines.append(f"  {count:>4}x {ms:8.1f} ms {rows:>6} 行  {key}")
+        return '\n'.join(lines)
+
+    def assert_budget(self):
+        if self.max_queries is not None and self.stats.count > self.max_queries:
+            raise QueryBudgetExceeded(
+                f"查询条数 {self.stats.count} 超过预算 {self.max_queries}\n{self.report()}"
+            )
+        if self.max_repeats is not None:
+            offenders = self.stats.repeated(self.max_repeats)
+            if offenders:
+                key, count, _, _ = offenders[0]
+                raise QueryBudgetExceeded(
+                    f"语句执行 {count} 次，超过单条预算 {self.max_repeats}: {key}\n{self.report()}"
+                )
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 令牌桶限流
+
+每个限流键对应一个容量为 capacity、每秒补充 rate 个令牌的桶，请求消耗一个令牌，桶空时拒绝并给出
+需要等待的秒数（用于 Retry-After）。
+
+- Redis 后端：单个 Lua 脚本完成"补充 + 扣减 + 设置过期"，多进程/多机共享同一个桶，判定是原子的；
+- 内存后端：按键哈希分片，每个分片一把锁和一个 OrderedDict，超过上限时淘汰最久未访问的桶；
+- Redis 出错时自动退回内存后端，限流失效不应导致接口不可用。
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitResult:
+    """一次限流判定的结果"""
+
+    __slots__ = ('allowed', 'remaining', 'retry_after')
+
+    def __init__(self, allowed, remaining, retry_after):
+        self.allowed = allowed
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_seconds(self):
+        """向上取整的等待秒数，至少为 1"""
+        return max(1, int(math.ceil(self.retry_after)))
+
+
+class MemoryRateLimiter:
+    """进程内分片令牌桶
+
+    Args:
+        shards: 分片数，不同键落在不同分片上，减少锁竞争
+        max_keys: 所有分片合计最多保留的桶数
+    """
+
+    def __init__(self, shards=16, max_keys=100000):
+        self._shard_count = max(1, int(shards))
+        self._max_per_shard = max(1, int(max_keys) // self._shard_count)
+        self._shards = [OrderedDict() for _ in range(self._shard_count)]
+        self._locks = [threading.Lock() for _ in range(self._shard_count)]
+
+    def hit(self, key, capacity, rate, cost=1):
+        index = hash(key) % self._shard_count
+        buckets = self._shards[index]
+        now = time.monotonic()
+        with self._locks[index]:
+            bucket = buckets.get(key)
+            if bucket is None:
+                tokens = float(capacity)
+            else:
+                tokens, last = bucket
+                tokens = min(float(capacity), tokens + (now - last) * rate)
+                buckets.move_to_end(key)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            buckets[key] = (tokens, now)
+
+            while len(buckets) > self._max_per_shard:
+                buckets.popitem(last=False)
+        return RateLimitResult(allowed, int(tokens), retry_after)
+
+    def reset(self, key):
+        index = hash(key) % self._shard_count
+        with self._locks[index]:
+            self._shards[index].pop(key, None)
+
+    def size(self):
+        return sum(len(s) for s in self._shards)
+
+
+# KEYS[1] 桶键；ARGV: capacity, rate（令牌/秒）, cost, now（毫秒）
+# 返回 {是否放行, 剩余令牌（取整）, 需等待的毫秒数}
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+end
+local allowed = 0
+local wait_ms = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    wait_ms = math.ceil((cost - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, math.floor(tokens), wait_ms}
+"""
+
+
+class RedisRateLimiter:
+    """Redis 共享令牌桶，判定由 Lua 脚本原子完成"""
+
+    def __init__(self, client, key_prefix='wushu:ratelimit:'):
+        self._client = client
+        self._prefix = key_prefix
+        self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, key, capacity, rate, cost=1):
+        # 使用本机时间而非 Redis TIME：脚本保持确定性，各 worker 间的时钟偏差对秒级窗口影响可忽略
+        now_ms = int(time.time() * 1000)
+        allowed, remaining, wait_ms = self._script(
+            keys=[self._prefix + key],
+            args=[capacity, rate, cost, now_ms],
+        )
+        return RateLimitResult(bool(allowed), int(remaining), int(wait_ms) / 1000.0)
+
+    def reset(self, key):
+        self._client.delete(self._prefix + key)
+
+
+class _FallbackRateLimiter:
+    """Redis 出错时改用进程内令牌桶，避免限流故障影响业务请求。"""
+
+    def __init__(self, primary, fallback):
+        self._primary = primary
+        self._fallback = fallback
+
+    def hit(self, key, capacity, rate, cost=1):
+        try:
+            return self._primary.hit(key, capacity, rate, cost)
+        except Exception as e:
+            logger.warning(f"Redis rate limit failed, fallback to memory: {e}")
+            return self._fallback.hit(key, capacity, rate, cost)
+
+    def reset(self, key):
+        self._fallback.reset(key)
+        try:
+            self._primary.reset(key)
+        except Exception as e:
+            logger.warning(f"Redis rate limit reset failed: {e}")
+
+
+def _create_limiter():
+    backend_name = (getattr(Config, 'RATE_LIMIT_BACKEND', 'auto') or 'auto').lower()
+    memory_limiter = MemoryRateLimiter(
+        shards=getattr(Config, 'RATE_LIMIT_MEMORY_SHARDS', 16),
+        max_keys=getattr(Config, 'RATE_LIMIT_MEMORY_MAX_KEYS', 100000),
+    )
+    if backend_name == 'memory':
+        return memory_limiter
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        if backend_name == 'redis':
+            logger.warning("RATE_LIMIT_BACKEND=redis but REDIS_URL is not set, fallback to memory")
+        return memory_limiter
+
+    try:
+        client = create_redis_client(redis_url)
+        redis_limiter = RedisRateLimiter(
+            client,
+            key_prefix=getattr(Config, 'RATE_LIMIT_KEY_PREFIX', 'wushu:ratelimit:'),
+        )
+    except Exception as e:
+        logger.warning(f"Redis rate limiter init failed, fallback to memory: {e}")
+        return memory_limiter
+
+    return _FallbackRateLimiter(redis_limiter, memory_limiter)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """获取全局限流器（首次调用时按配置创建）"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = _create_limiter()
+    return _limiter
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - Redis 客户端创建
+
+限流、验证码、计数器、会话、缓存及其失效通知都在请求路径上访问 Redis。redis-py 默认不设
+读写 / 建连超时，Redis 卡住时请求线程会一直阻塞，各模块「Redis 出错时回退」的分支永远不会执行。
+所有模块统一通过 create_redis_client 创建客户端，超时取自 REDIS_SOCKET_TIMEOUT /
+REDIS_CONNECT_TIMEOUT。
+"""
+
+from config import Config
+
+
+def create_redis_client(redis_url, socket_timeout=None, connect_timeout=None, **kwargs):
+    """按 REDIS_URL 创建带读写 / 建连超时的 Redis 客户端（未安装 redis 时抛出 ImportError）
+
+    Args:
+        socket_timeout: 单次命令的读写超时（秒），默认 Config.REDIS_SOCKET_TIMEOUT
+        connect_timeout: 建立连接的超时（秒），默认 Config.REDIS_CONNECT_TIMEOUT
+        kwargs: 透传给 redis.from_url，例如 decode_responses=True
+    """
+    import redis
+
+    if socket_timeout is None:
+        socket_timeout = getattr(Config, 'REDIS_SOCKET_TIMEOUT', 0.5)
+    if connect_timeout is None:
+        connect_timeout = getattr(Config, 'REDIS_CONNECT_TIMEOUT', 1.0)
+    return redis.from_url(
+        redis_url,
+        socket_timeout=socket_timeout,
+        socket_connect_timeout=connect_timeout,
+        **kwargs,
+    )
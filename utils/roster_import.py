@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 队员 / 随行人员名单批量导入
+
+流程：
+1. 只读流式读取 xlsx（openpyxl read_only）或 csv，按表头别名映射到字段；
+2. 按列整体校验（姓名、身份证号含校验码、手机号、性别、职务），再做跨列/跨行校验
+   （性别与身份证不符、文件内身份证重复）；
+3. 输出规范化后的有效行和逐行错误报告，入库由调用方在一个事务内批量 upsert。
+
+不依赖 pandas。
+"""
+
+import csv
+import io
+import os
+import re
+
+from utils.helpers import (
+    calculate_age,
+    derive_player_demographics,
+    id_card_gender_conflict,
+    normalize_gender,
+    validate_id_card,
+)
+
+_PHONE_RE = re.compile(r'^1[3-9]\d{9}$')
+
+# 字段 -> 可识别的表头写法
+PLAYER_COLUMNS = {
+    'name': ('姓名', 'name', 'real_name'),
+    'id_card': ('身份证号', '身份证', '身份证号码', 'id_card', 'idcard'),
+    'phone': ('联系电话', '手机号', '手机号码', '电话', 'phone'),
+    'gender': ('性别', 'gender'),
+    'competition_event': ('参赛项目', '项目', 'competition_event'),
+    'level': ('级别', '组别', 'level'),
+}
+PLAYER_REQUIRED = ('name', 'id_card', 'phone')
+
+STAFF_COLUMNS = {
+    'name': ('姓名', 'name'),
+    'position': ('职务', '角色/职务', '角色', 'position'),
+    'id_card': ('身份证号', '身份证', '身份证号码', 'id_card', 'idcard'),
+    'phone': ('联系电话', '手机号', '手机号码', '电话', 'phone'),
+    'gender': ('性别', 'gender'),
+    'certificate': ('证书/资质', '证书', '资质', 'certificate'),
+}
+STAFF_REQUIRED = ('name', 'position', 'id_card')
+
+# 职务中文名与 team_staff.position 取值的对应关系
+STAFF_POSITIONS = {
+    '教练': 'coach',
+    '主教练': 'coach',
+    '领队': 'manager',
+    '医务人员': 'medical',
+    '队医': 'medical',
+    '随行人员': 'staff',
+    '工作人员': 'staff',
+    '其他': 'staff',
+}
+_POSITION_CODES = {'coach', 'head_coach', 'manager', 'medical', 'doctor', 'staff'}
+
+_FIELD_LABELS = {
+    'name': '姓名',
+    'id_card': '身份证号',
+    'phone': '联系电话',
+    'gender': '性别',
+    'position': '职务',
+}
+
+
+class RosterImportError(ValueError):
+    """文件无法读取或缺少必需的列（整份文件无法导入）"""
+
+
+class RosterParseResult:
+    """解析结果：rows 为校验通过的行（含 '_row' 行号），errors 为逐行错误"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = []
+        self.errors = []
+        self.total = 0
+
+    def add_error(self, row_num, field, message):
+        self.errors.append({
+            'row': row_num,
+            'field': field,
+            'column': _FIELD_LABELS.get(field, field),
+            'message': message,
+        })
+
+    def error_rows(self):
+        return sorted({e['row'] for e in self.errors})
+
+    def to_report(self):
+        return {
+            'kind': self.kind,
+            'total_rows': self.total,
+            'valid_rows': len(self.rows),
+            'invalid_rows': len(self.error_rows()),
+            'errors': sorted(self.errors, key=lambda e: e['row']),
+        }
+
+
+# ---------------- 读取 ----------------
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Excel 中按数字存储的手机号 / 身份证号
+        return str(int(value))
+    return str(value).strip()
+
+
+def iter_sheet_rows(stream, filename, sheet_name=None):
+    """流式读取表格，逐行产出 (行号, 单元格文本元组)，第一行为表头"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.csv':
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        for row_num, row in enumerate(csv.reader(text), start=1):
+            yield row_num, tuple(_cell_text(v) for v in row)
+        return
+
+    if ext not in ('.xlsx', '.xlsm'):
+        raise RosterImportError('仅支持 .xlsx 或 .csv 文件')
+
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise RosterImportError(f'文件解析失败: {e}')
+    try:
+        if sheet_name and sheet_name in workbook.sheetnames:
+            worksheet = workbook[sheet_name]
+        else:
+            worksheet = workbook.worksheets[0]
+        for row_num, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            yield row_num, tuple(_cell_text(v) for v in row)
+    finally:
+        workbook.close()
+
+
+def _map_headers(header_row, columns):
+    aliases = {}
+    for field, names in columns.items():
+        for name in names:
+            aliases[name.lower()] = field
+    mapping = {}
+    for index, header in enumerate(header_row):
+        field = aliases.get(str(header).strip().lower())
+        if field and field not in mapping:
+            mapping[field] = index
+    return mapping
+
+
+# ---------------- 按列校验 ----------------
+
+def _check_required(values, label):
+    return {i: f'{label}不能为空' for i, v in enumerate(values) if not v}
+
+
+def _check_names(values):
+    return {
+        i: '姓名长度应为2-20个字符'
+        for i, v in enumerate(values)
+        if v and not 2 <= len(v) <= 20
+    }
+
+
+def _check_id_cards(values):
+    return {
+        i: '身份证号不正确（应为18位且校验码正确）'
+        for i, v in enumerate(values)
+        if v and not validate_id_card(v)
+    }
+
+
+def _check_phones(values):
+    return {
+        i: '联系电话格式不正确（应为11位手机号）'
+        for i, v in enumerate(values)
+        if v and not _PHONE_RE.match(v)
+    }
+
+
+def _check_genders(genders, id_cards):
+    errors = {}
+    for i, (gender, id_card) in enumerate(zip(genders, id_cards)):
+        if not gender:
+            continue
+        normalized = normalize_gender(gender)
+        if normalized not in ('男', '女'):
+            errors[i] = '性别只能填写"男"或"女"'
+            continue
+        if id_card_gender_conflict(id_card, normalized):
+            errors[i] = '性别与身份证号不符'
+    return errors
+
+
+def _check_positions(values):
+    return {
+        i: '职务只能选择"教练"、"领队"、"医务人员"、"随行人员"'
+        for i, v in enumerate(values)
+        if v and resolve_position(v) is None
+    }
+
+
+def _check_duplicates(values, label, row_nums):
+    seen = {}
+    errors = {}
+    for i, v in enumerate(values):
+        key = v.upper()
+        if not key:
+            continue
+        if key in seen:
+            errors[i] = f'{label}与第{row_nums[seen[key]]}行重复'
+        else:
+            seen[key] = i
+    return errors
+
+
+def resolve_position(value):
+    """职务中文名或代码 -> team_staff.position，无法识别时返回 None"""
+    value = (value or '').strip()
+    if value in STAFF_POSITIONS:
+        return STAFF_POSITIONS[value]
+    if value.lower() in _POSITION_CODES:
+        return value.lower()
+    return None
+
+
+# ---------------- 解析入口 ----------------
+
+def parse_roster(stream, filename, kind, sheet_name=None, max_rows=None):
+    """解析队员（kind='players'）或随行人员（kind='staff'）名单，返回 RosterParseResult
+
+    文件无法读取、缺少必需列或超过行数上限时抛出 RosterImportError。
+    """
+    if kind == 'players':
+        columns, required = PLAYER_COLUMNS, PLAYER_REQUIRED
+    elif kind == 'staff':
+        columns, required = STAFF_COLUMNS, STAFF_REQUIRED
+    else:
+        raise RosterImportError('kind 只能是 players 或 staff')
+
+    rows = iter_sheet_rows(stream, filename, sheet_name)
+    header = next(rows, None)
+    if header is None:
+        raise RosterImportError('文件为空')
+    mapping = _map_headers(header[1], columns)
+    missing = [columns[f][0] for f in required if f not in mapping]
+    if missing:
+        raise RosterImportError(f'缺少必需的列: {", ".join(missing)}')
+
+    # 按列收集（跳过整行为空的行），后续校验按列整体进行
+    row_nums = []
+    data = {field: [] for field in columns}
+    for row_num, cells in rows:
+        if not any(cells):
+            continue
+        if max_rows and len(row_nums) >= max_rows:
+            raise RosterImportError(f'单次最多导入 {max_rows} 行')
+        row_nums.append(row_num)
+        for field in columns:
+            index = mapping.get(field)
+            data[field].append(cells[index] if index is not None and index < len(cells) else '')
+
+    result = RosterParseResult(kind)
+    result.total = len(row_nums)
+    data['id_card'] = [v.upper() for v in data['id_card']]
+
+    checks = [(field, _check_required(data[field], _FIELD_LABELS.get(field, field))) for field in required]
+    checks += [
+        ('name', _check_names(data['name'])),
+        ('id_card', _check_id_cards(data['id_card'])),
+        ('id_card', _check_duplicates(data['id_card'], '身份证号', row_nums)),
+        ('phone', _check_phones(data['phone'])),
+        ('gender', _check_genders(data['gender'], data['id_card'])),
+    ]
+    if kind == 'staff':
+        checks.append(('position', _check_positions(data['position'])))
+
+    invalid = set()
+    for field, errors in checks:
+        for index, message in errors.items():
+            result.add_error(row_nums[index], field, message)
+            invalid.add(index)
+
+    for index, row_num in enumerate(row_nums):
+        if index in invalid:
+            continue
+        record = {field: data[field][index] for field in columns}
+        record['_row'] = row_num
+        birth_date, gender, age_group = derive_player_demographics(record['id_card'], record['gender'])
+        record['gender'] = gender
+        record['birth_date'] = birth_date
+        record['age'] = calculate_age(birth_date)
+        if kind == 'players':
+            record['age_group'] = age_group
+        else:
+            record['position'] = resolve_position(record['position'])
+        result.rows.append(record)
+
+    return result
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 服务端会话存储
+
+默认的签名 Cookie 会话每次修改都要重新序列化、签名并下发整个 Cookie，也无法在服务端让某个会话失效。
+启用 SESSION_BACKEND=redis / mysql 后，Cookie 中只保存随机会话 ID，会话内容存放在服务端：
+
+- 只有会话内容被修改时才写存储并下发 Cookie；未修改的请求最多每 SESSION_REFRESH_INTERVAL 秒
+  续期一次有效期，其余请求对存储只有一次读取；
+- 存储按 user_id 建立索引，登录（单点登录挤下线）和冻结账号时直接删除该用户的其他会话，
+  请求中不再需要逐个比对数据库中的 session_token；
+- 登录时更换会话 ID，防止会话固定攻击。
+"""
+
+import logging
+import os
+import secrets
+import time
+
+from flask import has_app_context, current_app
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from config import Config
+from utils.redis_client import create_redis_client
+
+logger = logging.getLogger(__name__)
+
+_SID_MAX_LENGTH = 128
+_EXPIRED_CLEANUP_INTERVAL = 600
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """服务端会话：内容修改时置 modified，save_session 据此决定是否写存储"""
+
+    def __init__(self, initial=None, sid=None, new=False, last_write=0.0):
+        def on_update(self):
+            self.modified = True
+
+        CallbackDict.__init__(self, initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.last_write = last_write
+        self.modified = False
+        self.rotate = False
+
+    def regenerate(self):
+        """在本次响应中更换会话 ID（登录成功后调用），旧 ID 立即作废"""
+        self.rotate = True
+        self.modified = True
+
+
+class RedisSessionStore:
+    """Redis 会话存储：每个会话一个 hash（d 内容 / t 最近写入时间 / u 用户ID），每个用户一个会话 ID 集合"""
+
+    def __init__(self, client, key_prefix='wushu:session:'):
+        self._client = client
+        self._prefix = key_prefix
+
+    def _key(self, sid):
+        return f"{self._prefix}{sid}"
+
+    def _user_key(self, user_id):
+        return f"{self._prefix}user:{user_id}"
+
+    def get(self, sid):
+        record = self._client.hmget(self._key(sid), 'd', 't')
+        if record[0] is None:
+            return None
+        return record[0].decode('utf-8'), float(record[1] or 0)
+
+    def save(self, sid, data, user_id, ttl):
+        pipe = self._client.pipeline(transaction=False)
+        mapping = {'d': data, 't': time.time()}
+        if user_id is not None:
+            mapping['u'] = user_id
+        pipe.hset(self._key(sid), mapping=mapping)
+        pipe.expire(self._key(sid), ttl)
+        if user_id is not None:
+            pipe.sadd(self._user_key(user_id), sid)
+            pipe.expire(self._user_key(user_id), ttl)
+        pipe.execute()
+
+    def touch(self, sid, ttl):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(self._key(sid), 't', time.time())
+        pipe.expire(self._key(sid), ttl)
+        pipe.execute()
+
+    def delete(self, sid):
+        user_id = self._client.hget(self._key(sid), 'u')
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(self._key(sid))
+        if user_id is not None:
+            pipe.srem(self._user_key(user_id.decode('utf-8')), sid)
+        pipe.execute()
+
+    def delete_user(self, user_id, keep_sid=None):
+        sids = [s.decode('utf-8') for s in self._client.smembers(self._user_key(user_id))]
+        doomed = [s for s in sids if s != keep_sid]
+        if not doomed:
+            return 0
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(*[self._key(s) for s in doomed])
+        pipe.srem(self._user_key(user_id), *doomed)
+        pipe.execute()
+        return len(doomed)
+
+
+class MySQLSessionStore:
+    """MySQL 会话存储（user_sessions 表），过期记录由写入路径定期顺带清理"""
+
+    def __init__(self, connection_factory):
+        self._connection_factory = connection_factory
+        self._last_cleanup = 0.0
+
+    def verify(self):
+        """启动时确认 user_sessions 表存在（旧库需先执行迁移 v7），缺表时抛出 RuntimeError"""
+        from mysql.connector import Error, errorcode
+        try:
+            with self._connection_factory() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM user_sessions LIMIT 1")
+                cursor.fetchall()
+                cursor.close()
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                raise RuntimeError(
+                    "SESSION_BACKEND=mysql 但 user_sessions 表不存在，所有登录都会失败；请先完成数据库迁移（v7）"
+                ) from e
+            logger.error(f"检查 user_sessions 表失败: {e}")
+
+    def get(self, sid):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT data, UNIX_TIMESTAMP(updated_at) FROM user_sessions "
+                "WHERE session_id = %s AND expires_at > NOW()",
+                (sid,),
+            )
+            row = cursor.fetchone()
+            cursor.close()
+        if not row:
+            return None
+        return row[0], float(row[1] or 0)
+
+    def save(self, sid, data, user_id, ttl):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                INSERT INTO user_sessions (session_id, user_id, data, updated_at, expires_at)
+                VALUES (%s, %s, %s, NOW(), NOW() + INTERVAL %s SECOND)
+                ON DUPLICATE KEY UPDATE
+                    user_id = VALUES(user_id), data = VALUES(data),
+                    updated_at = VALUES(updated_at), expires_at = VALUES(expires_at)
+                """,
+                (sid, user_id, data, ttl),
+            )
+            now = time.time()
+            if now - self._last_cleanup >= _EXPIRED_CLEANUP_INTERVAL:
+                self._last_cleanup = now
+                cursor.execute("DELETE FROM user_sessions WHERE expires_at < NOW() LIMIT 5000")
+            conn.commit()
+            cursor.close()
+
+    def touch(self, sid, ttl):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE user_sessions SET updated_at = NOW(), expires_at = NOW() + INTERVAL %s SECOND "
+                "WHERE session_id = %s",
+                (ttl, sid),
+            )
+            conn.commit()
+            cursor.close()
+
+    def delete(self, sid):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM user_sessions WHERE session_id = %s", (sid,))
+            conn.commit()
+            cursor.close()
+
+    def delete_user(self, user_id, keep_sid=None):
+        with self._connection_factory() as conn:
+            cursor = conn.cursor()
+            if keep_sid:
+                cursor.execute(
+                    "DELETE FROM user_sessions WHERE user_id = %s AND session_id <> %s",
+                    (user_id, keep_sid),
+                )
+            else:
+                cursor.execute("DELETE FROM user_sessions WHERE user_id = %s", (user_id,))
+            deleted = cursor.rowcount
+            conn.commit()
+            cursor.close()
+        return deleted
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Cookie 只保存会话 ID 的 SessionInterface
+
+    Args:
+        store: RedisSessionStore / MySQLSessionStore
+        refresh_interval: 未修改的会话最多每隔多少秒续期一次（秒）
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, store, refresh_interval=300):
+        self.store = store
+        self.refresh_interval = refresh_interval
+
+    @staticmethod
+    def _new_sid():
+        return secrets.token_urlsafe(32)
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > _SID_MAX_LENGTH:
+            return self.session_class(sid=self._new_sid(), new=True)
+        try:
+            record = self.store.get(sid)
+        except Exception as e:
+            # 存储不可用时按未登录处理，不能因此放行
+            logger.error(f"读取服务端会话失败: {e}")
+            record = None
+        if record is None:
+            return self.session_class(sid=self._new_sid(), new=True)
+        data, last_write = record
+        try:
+            initial = self.serializer.loads(data)
+        except Exception:
+            logger.warning("服务端会话内容无法解析，已作为新会话处理")
+            return self.session_class(sid=self._new_sid(), new=True)
+        return self.session_class(initial, sid=sid, last_write=last_write)
+
+    def _ttl(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            # 会话被清空（登出、被挤下线）：删除服务端记录和 Cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(
+                    name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly,
+                )
+            return
+
+        ttl = self._ttl(app)
+        if session.rotate:
+            if not session.new:
+                self.store.delete(session.sid)
+            session.sid = self._new_sid()
+            session.new = True
+            session.rotate = False
+
+        if session.modified or session.new:
+            data = self.serializer.dumps(dict(session))
+            self.store.save(session.sid, data, session.get('user_id'), ttl)
+        elif time.time() - session.last_write >= self.refresh_interval:
+            self.store.touch(session.sid, ttl)
+            if not session.permanent:
+                return
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+
+
+def _create_store(backend_name):
+    if backend_name == 'mysql':
+        from database import DatabaseManager
+        return MySQLSessionStore(DatabaseManager().get_connection)
+
+    redis_url = os.getenv('REDIS_URL')
+    if not redis_url:
+        logger.warning(f"SESSION_BACKEND={backend_name} but REDIS_URL is not set, keep cookie sessions")
+        return None
+    try:
+        client = create_redis_client(redis_url)
+        return RedisSessionStore(client, key_prefix=getattr(Config, 'SESSION_KEY_PREFIX', 'wushu:session:'))
+    except Exception as e:
+        logger.warning(f"Redis session store init failed, keep cookie sessions: {e}")
+        return None
+
+
+def init_server_session(app):
+    """按 SESSION_BACKEND 为应用启用服务端会话，返回是否启用
+
+    cookie（默认）保持 Flask 签名 Cookie 会话；redis / mysql 使用对应存储；
+    auto 在设置了 REDIS_URL 时使用 Redis，否则保持 Cookie 会话。
+    """
+    backend_name = (app.config.get('SESSION_BACKEND') or 'cookie').lower()
+    if backend_name == 'auto':
+        backend_name = 'redis' if os.getenv('REDIS_URL') else 'cookie'
+    if backend_name == 'cookie':
+        return False
+
+    store = _create_store(backend_name)
+    if store is None:
+        return False
+    app.session_interface = ServerSideSessionInterface(
+        store,
+        refresh_interval=app.config.get('SESSION_REFRESH_INTERVAL', 300),
+    )
+    logger.info(f"已启用服务端会话存储: {backend_name}")
+    return True
+
+
+def verify_server_session_store(app):
+    """数据库初始化之后调用：服务端会话存储不可用（如缺表）时直接抛出异常，阻止应用以无法登录的状态启动"""
+    interface = app.session_interface
+    if isinstance(interface, ServerSideSessionInterface) and hasattr(interface.store, 'verify'):
+        interface.store.verify()
+
+
+def server_sessions_enabled():
+    return has_app_context() and isinstance(current_app.session_interface, ServerSideSessionInterface)
+
+
+def revoke_user_sessions(user_id, keep_sid=None):
+    """删除某个用户在服务端的全部会话（可保留当前会话），返回删除数量；未启用服务端会话时返回 0"""
+    if user_id is None or not server_sessions_enabled():
+        return 0
+    try:
+        return current_app.session_interface.store.delete_user(user_id, keep_sid=keep_sid)
+    except Exception as e:
+        logger.error(f"撤销用户 {user_id} 的会话失败: {e}")
+        return 0
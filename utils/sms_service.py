@@ -18,6 +18,7 @@ from alibabacloud_dypnsapi20170525 import models as dypnsapi_20170525_models
 from alibabacloud_tea_util import models as util_models
 from alibabacloud_tea_util.client import Client as UtilClient
 from config import config as config_map
+from utils.redis_client import create_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +28,7 @@ def _get_redis_client():
     if not redis_url:
         return None
     try:
-        import redis
-        return redis.from_url(redis_url, decode_responses=True)
+        return create_redis_client(redis_url, decode_responses=True)
     except Exception as e:
         logger.warning(f"Redis client init failed, fallback to memory: {e}")
         return None
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+武术赛事管理系统 - 流式 XLSX 导出
+
+基于 xlsxwriter 的 constant_memory 模式：每写完一行即落到临时文件，工作簿不在内存中保留单元格，
+内存占用与行数、工作表数无关。配合非缓冲游标按批读取，导出整场赛事的队伍信息时内存保持平稳。
+
+- new_workbook(): 创建写入临时文件的 constant_memory 工作簿；
+- iter_file_chunks(): 按块读出生成的文件并在结束后删除，用于 Response 流式返回；
+- iter_zip(): 把多个工作簿逐个打包为 ZIP 并边生成边输出（不需要可 seek 的输出流）；
+- write_table(): 写入表头 + 数据行，写入过程中顺带统计列宽，不再二次遍历所有单元格。
+"""
+
+import os
+import re
+import tempfile
+import zipfile
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_CHUNK_SIZE = 64 * 1024
+_FETCH_SIZE = 500
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def new_workbook():
+    """创建一个写入临时文件的 constant_memory 工作簿，返回 (workbook, path)
+
+    调用方负责 workbook.close()，之后用 iter_file_chunks(path) 读出并删除文件。
+    """
+    import xlsxwriter
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        # 身份证号、手机号等保持文本，不自动转为数字
+        'strings_to_numbers': False,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+    })
+    return workbook, path
+
+
+def iter_file_chunks(path, chunk_size=_CHUNK_SIZE):
+    """按块读取文件，读完（或客户端断开）后删除文件"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        discard_file(path)
+
+
+def iter_rows(cursor, size=_FETCH_SIZE):
+    """从非缓冲游标按批读取并逐行产出"""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield from rows
+
+
+def safe_sheet_name(name, used):
+    """生成合法且不重复的工作表名（最长 31 个字符，不含 []:*?/\\）"""
+    base = _INVALID_SHEET_CHARS.sub('', str(name or '')).strip().strip("'") or 'Sheet'
+    base = base[:31]
+    candidate = base
+    index = 2
+    while candidate.lower() in used:
+        suffix = f"({index})"
+        candidate = base[:31 - len(suffix)] + suffix
+        index += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+class _ChunkSink:
+    """不可 seek 的输出缓冲：zipfile 写入的数据暂存于此，由生成器取走"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries, chunk_size=_CHUNK_SIZE):
+    """把 (文件名, 临时文件路径) 逐个写入 ZIP 并流式产出字节
+
+    entries 可以是生成器：每生成一个工作簿就立即打包输出，临时文件写入后即删除。
+    xlsx 本身已压缩，ZIP 中按存储方式（不再压缩）写入。
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for arcname, path in entries:
+            try:
+                with open(path, 'rb') as src, archive.open(arcname, mode='w', force_zip64=True) as dest:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        dest.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+            finally:
+                discard_file(path)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def write_table(worksheet, headers, rows, header_format=None, start_row=0, max_width=50):
+    """写入表头与数据行（rows 为字典的可迭代对象），返回写入的数据行数
+
+    列宽在写入时按内容长度累计，写完后一次性设置。
+    """
+    widths = [len(str(h)) for h in headers]
+    for col, header in enumerate(headers):
+        worksheet.write(start_row, col, header, header_format)
+
+    count = 0
+    for row_index, item in enumerate(rows, start=start_row + 1):
+        for col, header in enumerate(headers):
+            value = item.get(header, '')
+            if value is None:
+                value = ''
+            worksheet.write(row_index, col, value)
+            length = len(str(value))
+            if length > widths[col]:
+                widths[col] = length
+        count += 1
+
+    for col, width in enumerate(widths):
+        worksheet.set_column(col, col, min(width + 2, max_width))
+    return count
+
+
+def discard_file(path):
+    """删除导出过程中产生的临时文件（导出失败时由调用方清理）"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后台任务 worker：从 jobs 表领取并执行通知分发、维护等耗时任务。
+
+用法:
+    python worker.py                 # 使用 Config.JOB_WORKER_THREADS 个线程
+    python worker.py --threads 8     # 指定并发线程数
+
+单独运行 worker 时可在 Web 进程中设置 JOB_EMBEDDED_WORKER=false 关闭内嵌 worker。
+"""
+
+import argparse
+import os
+import signal
+
+# 本进程即为 worker，导入 app 时不再额外启动内嵌 worker
+os.environ['JOB_EMBEDDED_WORKER'] = 'false'
+
+from app import app  # noqa: E402  导入所有路由模块，注册任务处理函数
+from utils.jobs import JobWorker  # noqa: E402
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='武术赛事管理系统后台任务 worker')
+    parser.add_argument('--threads', type=int, default=None, help='并发执行的任务数')
+    parser.add_argument('--poll-interval', type=float, default=None, help='无任务时的轮询间隔（秒）')
+    parser.add_argument('--job-type', action='append', dest='job_types', help='只处理指定类型的任务，可重复')
+    args = parser.parse_args()
+
+    worker = JobWorker(
+        max_workers=args.threads,
+        poll_interval=args.poll_interval,
+        job_types=args.job_types,
+    )
+
+    def _handle_signal(signum, frame):
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _handle_signal)
+    signal.signal(signal.SIGINT, _handle_signal)
+
+    with app.app_context():
+        worker.run_forever()